@@ -0,0 +1,34 @@
+"""add_ai_call_queue_wait
+
+Revision ID: 005_ai_call_queue_wait
+Revises: 004_intermediate_views
+Create Date: 2026-01-05 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_ai_call_queue_wait'
+down_revision = '004_intermediate_views'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 检查字段是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('ai_call_metrics')]
+    
+    if 'queue_wait_ms' not in existing_columns:
+        op.add_column(
+            'ai_call_metrics',
+            sa.Column('queue_wait_ms', sa.Integer(), nullable=True, comment='限流排队等待时间（毫秒）')
+        )
+
+
+def downgrade() -> None:
+    op.drop_column('ai_call_metrics', 'queue_wait_ms')
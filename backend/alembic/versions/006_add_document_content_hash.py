@@ -0,0 +1,39 @@
+"""add_document_content_hash
+
+Revision ID: 006_document_content_hash
+Revises: 005_ai_call_queue_wait
+Create Date: 2026-01-08 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_document_content_hash'
+down_revision = '005_ai_call_queue_wait'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 检查字段是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    existing_columns = [col['name'] for col in inspector.get_columns('documents')]
+    
+    if 'content_hash' not in existing_columns:
+        op.add_column(
+            'documents',
+            sa.Column('content_hash', sa.String(64), nullable=True, comment='文件内容指纹（SHA-256，用于跨文档去重）')
+        )
+    
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('documents')]
+    if 'idx_documents_content_hash' not in existing_indexes:
+        op.create_index('idx_documents_content_hash', 'documents', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_documents_content_hash', 'documents')
+    op.drop_column('documents', 'content_hash')
@@ -0,0 +1,54 @@
+"""add_document_segment_embeddings
+
+Revision ID: 007_segment_embeddings
+Revises: 006_document_content_hash
+Create Date: 2026-01-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+from pgvector.sqlalchemy import Vector
+import uuid
+
+
+# revision identifiers, used by Alembic.
+revision = '007_segment_embeddings'
+down_revision = '006_document_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 检查表是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    
+    if 'document_segment_embeddings' not in inspector.get_table_names():
+        op.create_table(
+            'document_segment_embeddings',
+            sa.Column('id', UUID(as_uuid=True), primary_key=True, default=uuid.uuid4),
+            sa.Column('document_id', UUID(as_uuid=True), nullable=False, comment='文档ID'),
+            sa.Column('chunk_index', sa.Integer(), nullable=False, comment='分块序号（从0开始）'),
+            sa.Column('start_offset', sa.Integer(), nullable=False, comment='分块在文档内容中的起始位置'),
+            sa.Column('end_offset', sa.Integer(), nullable=False, comment='分块在文档内容中的结束位置'),
+            sa.Column('text', sa.Text(), nullable=False, comment='分块文本'),
+            sa.Column('embedding', Vector(1536), nullable=False, comment='分块向量（使用pgvector，1536维）'),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), comment='创建时间'),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        )
+        op.create_index('ix_document_segment_embeddings_document_id', 'document_segment_embeddings', ['document_id'])
+    
+    # 分块数量远多于文档数量，使用HNSW索引（无需训练，增量插入后召回率稳定）
+    op.execute('''
+        CREATE INDEX IF NOT EXISTS idx_document_segment_embeddings_embedding
+        ON document_segment_embeddings
+        USING hnsw (embedding vector_cosine_ops);
+    ''')
+
+
+def downgrade() -> None:
+    op.execute('DROP INDEX IF EXISTS idx_document_segment_embeddings_embedding;')
+    op.drop_index('ix_document_segment_embeddings_document_id', 'document_segment_embeddings')
+    op.drop_table('document_segment_embeddings')
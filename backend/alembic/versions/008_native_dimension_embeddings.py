@@ -0,0 +1,96 @@
+"""native_dimension_embeddings
+
+Revision ID: 008_native_dim_embeddings
+Revises: 007_segment_embeddings
+Create Date: 2026-01-20 10:00:00.000000
+
+向量列从零填充的vector(1536)改为默认本地模型（MiniLM）的原生维度vector(384)。
+目标类型是固定值，不读取运行时配置，同一版本在任何环境中建出相同的表结构。
+
+- 已有向量截取前384维（本地模型向量之后的部分都是零填充）
+- 超出部分不全为零的向量（如OpenAI生成的1536维向量）无法无损转换：
+  system_learning_data中置为NULL，document_segment_embeddings中删除，需重新生成
+- 使用其他维度或半精度存储（EMBEDDING_DIMENSION / EMBEDDING_STORAGE_TYPE=halfvec）时，
+  迁移完成后运行 scripts/reembed_documents.py 调整列类型并重新生成向量（见012迁移）
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008_native_dim_embeddings'
+down_revision = '007_segment_embeddings'
+branch_labels = None
+depends_on = None
+
+PADDED_DIMENSION = 1536
+TARGET_DIMENSION = 384
+TARGET_STORAGE_TYPE = 'vector'
+
+# (表名, 向量索引名, 索引方式, 索引参数)
+VECTOR_TABLES = [
+    ('system_learning_data', 'idx_system_learning_data_embedding', 'ivfflat', 'WITH (lists = 100)'),
+    ('document_segment_embeddings', 'idx_document_segment_embeddings_embedding', 'hnsw', ''),
+]
+
+
+def _column_type(table):
+    """向量列当前的存储类型和维度（降级时按实际列类型转换，reembed脚本可能已修改过列类型）"""
+    column_type = op.get_bind().execute(sa.text("""
+        SELECT format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = 'embedding'
+    """), {"table": table}).scalar_one()
+    storage_type, _, dim = column_type.rstrip(')').partition('(')
+    return storage_type, int(dim)
+
+
+def upgrade() -> None:
+    dim = TARGET_DIMENSION
+    for table, index_name, method, with_clause in VECTOR_TABLES:
+        op.execute(f'DROP INDEX IF EXISTS {index_name};')
+        
+        # 超出目标维度的部分不全为零的向量无法截断
+        lossy = (
+            f"(embedding::real[])[{dim + 1}:{PADDED_DIMENSION}] "
+            f"<> array_fill(0::real, ARRAY[{PADDED_DIMENSION - dim}])"
+        )
+        if table == 'system_learning_data':
+            op.execute(f'UPDATE {table} SET embedding = NULL WHERE embedding IS NOT NULL AND {lossy};')
+        else:
+            op.execute(f'DELETE FROM {table} WHERE {lossy};')
+        
+        op.execute(f'''
+            ALTER TABLE {table}
+            ALTER COLUMN embedding TYPE {TARGET_STORAGE_TYPE}({dim})
+            USING ((embedding::real[])[1:{dim}])::{TARGET_STORAGE_TYPE}({dim});
+        ''')
+        op.execute(f'''
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON {table}
+            USING {method} (embedding {TARGET_STORAGE_TYPE}_cosine_ops)
+            {with_clause};
+        ''')
+
+
+def downgrade() -> None:
+    for table, index_name, method, with_clause in VECTOR_TABLES:
+        storage_type, dim = _column_type(table)
+        if storage_type == 'vector' and dim == PADDED_DIMENSION:
+            continue
+        if dim > PADDED_DIMENSION:
+            raise ValueError(f"{table}.embedding维度大于{PADDED_DIMENSION}，无法降级: {dim}")
+        
+        op.execute(f'DROP INDEX IF EXISTS {index_name};')
+        padding = f" || array_fill(0::real, ARRAY[{PADDED_DIMENSION - dim}])" if dim < PADDED_DIMENSION else ""
+        op.execute(f'''
+            ALTER TABLE {table}
+            ALTER COLUMN embedding TYPE vector({PADDED_DIMENSION})
+            USING (embedding::real[]{padding})::vector({PADDED_DIMENSION});
+        ''')
+        op.execute(f'''
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON {table}
+            USING {method} (embedding vector_cosine_ops)
+            {with_clause};
+        ''')
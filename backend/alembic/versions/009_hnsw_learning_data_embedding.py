@@ -0,0 +1,58 @@
+"""hnsw_learning_data_embedding
+
+Revision ID: 009_hnsw_learning_data
+Revises: 008_native_dim_embeddings
+Create Date: 2026-01-22 10:00:00.000000
+
+system_learning_data的向量索引从IVFFlat改为HNSW：
+- 推荐的第一阶段只按向量距离排序，由HNSW索引返回近似最近邻候选
+- HNSW不需要先有数据再建索引（IVFFlat的lists在空表上建立时聚类质量很差），
+  查询时通过hnsw.ef_search调整召回率（RECOMMENDATION_HNSW_EF_SEARCH）
+- m=16、ef_construction=64为pgvector默认值，数据量很大时可调大以提高召回率
+- 索引的操作符类按向量列的实际类型选择（008建立的是vector，reembed脚本可能改为halfvec），不读取运行时配置
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009_hnsw_learning_data'
+down_revision = '008_native_dim_embeddings'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'idx_system_learning_data_embedding'
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def _storage_type():
+    """system_learning_data.embedding列的实际存储类型（vector或halfvec）"""
+    column_type = op.get_bind().execute(sa.text("""
+        SELECT format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = CAST('system_learning_data' AS regclass) AND a.attname = 'embedding'
+    """)).scalar_one()
+    return column_type.partition('(')[0]
+
+
+def upgrade() -> None:
+    storage_type = _storage_type()
+    op.execute(f'DROP INDEX IF EXISTS {INDEX_NAME};')
+    op.execute(f'''
+        CREATE INDEX IF NOT EXISTS {INDEX_NAME}
+        ON system_learning_data
+        USING hnsw (embedding {storage_type}_cosine_ops)
+        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION});
+    ''')
+
+
+def downgrade() -> None:
+    storage_type = _storage_type()
+    op.execute(f'DROP INDEX IF EXISTS {INDEX_NAME};')
+    op.execute(f'''
+        CREATE INDEX IF NOT EXISTS {INDEX_NAME}
+        ON system_learning_data
+        USING ivfflat (embedding {storage_type}_cosine_ops)
+        WITH (lists = 100);
+    ''')
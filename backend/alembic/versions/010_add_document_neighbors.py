@@ -0,0 +1,56 @@
+"""add_document_neighbors
+
+Revision ID: 010_document_neighbors
+Revises: 009_hnsw_learning_data
+Create Date: 2026-01-26 10:00:00.000000
+
+预先计算的相似文档邻居表（每个文档前K个最相似文档），相似文档和推荐接口直接读取，
+不再每次请求执行向量搜索。
+升级后运行 python scripts/rebuild_document_neighbors.py 为已有文档生成邻居列表。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '010_document_neighbors'
+down_revision = '009_hnsw_learning_data'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 检查表是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    
+    if 'document_neighbors' not in inspector.get_table_names():
+        op.create_table(
+            'document_neighbors',
+            sa.Column('document_id', UUID(as_uuid=True), primary_key=True, comment='文档ID'),
+            sa.Column('neighbor_id', UUID(as_uuid=True), primary_key=True, comment='相似文档ID'),
+            sa.Column('similarity', sa.Float(), nullable=False, comment='余弦相似度（1 - 余弦距离）'),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), comment='更新时间'),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['neighbor_id'], ['documents.id'], ondelete='CASCADE'),
+        )
+        op.create_index(
+            'idx_document_neighbors_document_similarity',
+            'document_neighbors',
+            ['document_id', sa.text('similarity DESC')]
+        )
+        op.create_index('idx_document_neighbors_neighbor_id', 'document_neighbors', ['neighbor_id'])
+    
+    # 读取邻居时按document_id关联学习数据
+    existing_indexes = [idx['name'] for idx in inspector.get_indexes('system_learning_data')]
+    if 'ix_system_learning_data_document_id' not in existing_indexes:
+        op.create_index('ix_system_learning_data_document_id', 'system_learning_data', ['document_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_system_learning_data_document_id', 'system_learning_data')
+    op.drop_index('idx_document_neighbors_neighbor_id', 'document_neighbors')
+    op.drop_index('idx_document_neighbors_document_similarity', 'document_neighbors')
+    op.drop_table('document_neighbors')
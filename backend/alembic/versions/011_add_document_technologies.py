@@ -0,0 +1,50 @@
+"""add_document_technologies
+
+Revision ID: 011_document_technologies
+Revises: 010_document_neighbors
+Create Date: 2026-01-28 10:00:00.000000
+
+文档技术名词表：视角结果保存时提取一次技术名词，知识图谱按技术 GROUP BY 聚合，
+不再每次请求读取所有处理结果的JSONB并重新提取。
+升级后运行 python scripts/backfill_document_technologies.py 为已有处理结果补充技术名词。
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '011_document_technologies'
+down_revision = '010_document_neighbors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 检查表是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    
+    if 'document_technologies' not in inspector.get_table_names():
+        op.create_table(
+            'document_technologies',
+            sa.Column('document_id', UUID(as_uuid=True), primary_key=True, comment='文档ID'),
+            sa.Column('view', sa.String(50), primary_key=True, comment='视角名称（来源处理结果）'),
+            sa.Column('technology', sa.String(100), primary_key=True, comment='技术名词（已标准化）'),
+            sa.Column('document_type', sa.String(50), nullable=False, comment='文档类型（与处理结果一致，用于过滤）'),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), comment='创建时间'),
+            sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ondelete='CASCADE'),
+        )
+        op.create_index(
+            'idx_document_technologies_technology',
+            'document_technologies',
+            ['technology', 'document_id']
+        )
+        op.create_index('idx_document_technologies_document_type', 'document_technologies', ['document_type'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_document_technologies_document_type', 'document_technologies')
+    op.drop_index('idx_document_technologies_technology', 'document_technologies')
+    op.drop_table('document_technologies')
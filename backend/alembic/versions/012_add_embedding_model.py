@@ -0,0 +1,50 @@
+"""add_embedding_model
+
+Revision ID: 012_embedding_model
+Revises: 011_document_technologies
+Create Date: 2026-01-30 10:00:00.000000
+
+向量表增加embedding_model列，记录生成向量的嵌入模型，检索时只比较同一模型的向量。
+已有向量标记为默认本地模型（MiniLM）：008迁移后保留的向量都是该模型生成的384维向量，
+标记值是固定值，不读取运行时配置。
+之后更换嵌入模型（或维度、存储类型）时，修改配置后运行 python scripts/reembed_documents.py，
+调整向量列并用新模型重新生成所有向量。
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012_embedding_model'
+down_revision = '011_document_technologies'
+branch_labels = None
+depends_on = None
+
+VECTOR_TABLES = ['system_learning_data', 'document_segment_embeddings']
+BASELINE_MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+
+
+def upgrade() -> None:
+    # 检查列是否已存在（处理部分执行的情况）
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    
+    for table in VECTOR_TABLES:
+        columns = [col['name'] for col in inspector.get_columns(table)]
+        if 'embedding_model' not in columns:
+            op.add_column(table, sa.Column(
+                'embedding_model',
+                sa.String(200),
+                nullable=True,
+                comment='生成向量的嵌入模型（检索时只比较同一模型的向量）'
+            ))
+        conn.execute(
+            sa.text(f'UPDATE {table} SET embedding_model = :model WHERE embedding IS NOT NULL AND embedding_model IS NULL'),
+            {'model': BASELINE_MODEL_NAME}
+        )
+
+
+def downgrade() -> None:
+    for table in VECTOR_TABLES:
+        op.drop_column(table, 'embedding_model')
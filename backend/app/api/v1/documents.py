@@ -135,6 +135,7 @@ async def delete_document_and_related_data(
 async def upload_document(
     file: UploadFile = File(...),
     views: Optional[str] = Query(None, description="启用的视角列表（逗号分隔，如：learning,system）。如果未指定，系统将自动推荐"),
+    use_cache: bool = Query(True, description="是否复用AI响应缓存和相同内容文档的结果（false时重新调用AI生成，用于重新处理）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -144,6 +145,7 @@ async def upload_document(
     - 文件大小限制：15MB
     - 如果上传同名文档，会自动覆盖旧文档
     - views参数：可选，指定要启用的视角（learning/qa/system），多个视角用逗号分隔。如果未指定，系统将根据文档内容自动推荐
+    - use_cache参数：可选，默认true；重新处理同名文档时传false，强制重新调用AI生成
     """
     from sqlalchemy import select
     
@@ -270,13 +272,18 @@ async def upload_document(
             allowed_extensions=settings.get_allowed_extensions()
         )
         
+        # 计算内容指纹（用于复用相同内容文档的处理结果）
+        from app.services.document_dedup_service import DocumentDedupService
+        content_hash = DocumentDedupService.compute_content_hash(file_content)
+        
         # 创建文档记录
         document = Document(
             filename=file.filename,
             file_path=file_path,
             file_size=file_size,
             file_type=file_ext,
-            status="pending"
+            status="pending",
+            content_hash=content_hash
         )
         
         db.add(document)
@@ -322,7 +329,7 @@ async def upload_document(
         await db.refresh(task)
         
         # 异步启动处理任务（传递enabled_views参数）
-        process_document_task.delay(str(document.id), str(task.id), enabled_views=enabled_views)
+        process_document_task.delay(str(document.id), str(task.id), enabled_views=enabled_views, use_cache=use_cache)
         
         logger.info("文档上传成功，任务已启动", 
                    document_id=str(document.id), 
@@ -601,6 +608,7 @@ async def recommend_views(
 async def switch_view(
     document_id: str,
     view: str = Query(..., description="目标视角（learning/qa/system）"),
+    use_cache: bool = Query(True, description="是否复用已有结果和AI响应缓存（false时重新调用AI生成该视角）"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -614,6 +622,7 @@ async def switch_view(
     Args:
         document_id: 文档ID
         view: 目标视角（learning/qa/system）
+        use_cache: 是否复用已有结果和AI响应缓存
     """
     from uuid import UUID
     
@@ -637,7 +646,8 @@ async def switch_view(
         result = await ViewSwitcher.switch_view(
             document_id=doc_id,
             target_view=view,
-            db=db
+            db=db,
+            use_cache=use_cache
         )
         return result
     except ValueError as e:
@@ -1094,14 +1104,13 @@ async def get_similar_documents(
     获取相似文档列表
     
     - 基于向量相似度搜索相似文档
-    - 使用pgvector的余弦相似度搜索
+    - 读取预先计算的相似文档邻居列表（未生成时使用pgvector的余弦相似度实时搜索）
     - 返回Top-K相似文档（默认5个）
     - 可选相似度阈值过滤
     """
     from uuid import UUID
-    from sqlalchemy import select, text
+    from sqlalchemy import select
     from app.models.system_learning_data import SystemLearningData
-    from app.models.document import Document
     
     try:
         doc_id = UUID(document_id)
@@ -1124,11 +1133,13 @@ async def get_similar_documents(
             detail="threshold参数必须在0.0-1.0之间"
         )
     
-    # 1. 获取目标文档的向量
+    # 1. 获取目标文档的向量（只比较当前嵌入模型生成的向量）
+    from app.models.embedding_vector import storage_model_name
     target_query = await db.execute(
         select(SystemLearningData)
         .where(SystemLearningData.document_id == doc_id)
         .where(SystemLearningData.embedding.isnot(None))
+        .where(SystemLearningData.embedding_model == storage_model_name())
     )
     target_data = target_query.scalar_one_or_none()
     
@@ -1145,80 +1156,31 @@ async def get_similar_documents(
             detail="文档向量不存在，无法搜索相似文档"
         )
     
-    # 2. 使用pgvector的余弦相似度搜索
-    # SQL: SELECT document_id, 1 - (embedding <=> $1) as similarity
-    #      FROM system_learning_data
-    #      WHERE document_id != $2 AND embedding IS NOT NULL
-    #      ORDER BY embedding <=> $1
-    #      LIMIT $3
-    
-    # 构建查询
-    # 注意：pgvector的 <=> 操作符返回余弦距离（0-2），需要转换为相似度（0-1）
-    # 相似度 = 1 - (距离 / 2) 或直接使用 1 - (embedding <=> target_embedding)
-    # 但更准确的是：相似度 = 1 - (embedding <=> target_embedding) / 2
-    
-    # 使用原始SQL查询以利用pgvector的索引
-    # 将向量转换为字符串格式（PostgreSQL数组格式）
-    import numpy as np
-    if isinstance(target_data.embedding, np.ndarray):
-        target_embedding_list = target_data.embedding.tolist()
-    else:
-        target_embedding_list = list(target_data.embedding) if hasattr(target_data.embedding, '__iter__') else target_data.embedding
-    
-    # 转换为PostgreSQL数组格式的字符串: '[0.1, 0.2, ...]'
-    target_embedding_str = '[' + ','.join(map(str, target_embedding_list)) + ']'
-    
-    # 使用CAST将字符串转换为vector类型
-    query = text("""
-        SELECT 
-            sld.document_id,
-            1 - (sld.embedding <=> CAST(:target_embedding AS vector)) as similarity,
-            sld.content_summary,
-            sld.document_type
-        FROM system_learning_data sld
-        WHERE sld.document_id != :target_document_id
-          AND sld.embedding IS NOT NULL
-        ORDER BY sld.embedding <=> CAST(:target_embedding AS vector)
-        LIMIT :limit
-    """)
-    
-    # 执行查询
-    result = await db.execute(
-        query,
-        {
-            "target_embedding": target_embedding_str,
-            "target_document_id": doc_id,
-            "limit": limit
-        }
-    )
-    
-    similar_records = result.fetchall()
+    # 2. 读取预先计算的邻居列表（一次联表查询，耗时与文档总数无关）
+    # 邻居列表尚未生成时（如未执行批量重建的旧文档），实时使用pgvector的HNSW索引检索
+    from app.services.document_neighbor_service import DocumentNeighborService
+    similar_records = await DocumentNeighborService.get_neighbors(db, doc_id, limit)
+    if not similar_records:
+        similar_records = await DocumentNeighborService.search_neighbors(
+            db, doc_id, target_data.embedding, limit
+        )
     
-    # 3. 应用相似度阈值过滤（如果指定）
-    filtered_records = []
+    # 3. 应用相似度阈值过滤（如果指定）并构建结果
+    similar_items = []
     for record in similar_records:
         similarity = float(record.similarity)
-        if threshold is None or similarity >= threshold:
-            filtered_records.append(record)
-    
-    # 4. 获取文档详细信息
-    similar_items = []
-    for record in filtered_records:
-        doc_query = await db.execute(
-            select(Document).where(Document.id == record.document_id)
-        )
-        document = doc_query.scalar_one_or_none()
+        if threshold is not None and similarity < threshold:
+            continue
         
-        if document:
-            similar_items.append(SimilarDocumentItem(
-                document_id=str(record.document_id),
-                filename=document.filename,
-                file_type=document.file_type,
-                document_type=record.document_type,
-                similarity=float(record.similarity),
-                content_summary=record.content_summary[:200] if record.content_summary else None,
-                upload_time=document.upload_time
-            ))
+        similar_items.append(SimilarDocumentItem(
+            document_id=str(record.document_id),
+            filename=record.filename,
+            file_type=record.file_type,
+            document_type=record.document_type,
+            similarity=similarity,
+            content_summary=record.content_summary[:200] if record.content_summary else None,
+            upload_time=record.upload_time
+        ))
     
     logger.info("相似文档搜索完成",
                document_id=document_id,
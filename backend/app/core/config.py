@@ -24,10 +24,74 @@ class Settings(BaseSettings):
     DEEPSEEK_API_KEY: str = ""
     DEEPSEEK_API_BASE: str = "https://api.deepseek.com"
     
+    # AI调用HTTP客户端配置
+    AI_USE_ASYNC_CLIENT: bool = True  # 是否使用异步客户端（False时回退到同步客户端，在线程池中执行）
+    AI_HTTP_MAX_CONNECTIONS: int = 20  # 连接池最大连接数（每个进程）
+    AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10  # 连接池最大保持连接数
+    AI_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空闲连接保持时间（秒）
+    AI_CONNECT_TIMEOUT: float = 10.0  # 建立连接超时（秒）
+    AI_REQUEST_TIMEOUT: float = 600.0  # 单次AI调用默认超时（秒），可在调用时覆盖
+    AI_STEP_MAX_CONCURRENCY: int = 3  # 单个视角处理器内同时执行的AI子步骤数上限
+    
+    # AI调用限流配置（基于Redis，所有Worker共享，0表示不限制）
+    AI_RATE_LIMIT_ENABLED: bool = True  # 是否启用全局限流（Redis不可用时自动放行）
+    AI_MAX_CONCURRENT_CALLS: int = 8  # 所有Worker同时进行的AI调用数上限
+    AI_REQUESTS_PER_MINUTE: int = 60  # 每分钟请求数上限（RPM）
+    AI_TOKENS_PER_MINUTE: int = 200000  # 每分钟token数上限（TPM）
+    AI_RATE_LIMIT_MAX_WAIT: float = 300.0  # 最长排队时间（秒），超过则调用失败
+    
+    # AI响应缓存配置（相同请求直接返回缓存结果，不调用API）
+    AI_RESPONSE_CACHE_ENABLED: bool = True  # 是否启用响应缓存（单次调用可通过use_cache=False绕过）
+    AI_RESPONSE_CACHE_TTL: int = 3600 * 24 * 7  # 缓存过期时间（秒），默认7天
+    AI_RESPONSE_CACHE_MAX_ENTRIES: int = 10000  # Redis中最多保留的条目数（超过后淘汰最久未访问的）
+    AI_RESPONSE_CACHE_DISK_PATH: str = ""  # 本地磁盘缓存文件路径（SQLite），为空则不启用
+    AI_RESPONSE_CACHE_DISK_MAX_ENTRIES: int = 50000  # 磁盘缓存最多保留的条目数
+    
+    # AI上下文检索配置（长文档的子步骤只发送与该步骤最相关的段落）
+    AI_CONTEXT_RETRIEVAL_ENABLED: bool = True  # 是否启用检索模式（关闭后每个子步骤都发送全部段落）
+    AI_CONTEXT_TOKEN_BUDGET: int = 8000  # 每个子步骤发送的段落内容token预算（文档未超出时发送全部段落）
+    AI_CONTEXT_TOP_K: int = 80  # 每个子步骤最多发送的段落数
+    AI_CONTEXT_VECTOR_MEMO_MB: int = 32  # 段落向量进程内缓存上限（MB，float32存储，384维约2.2万个段落）
+    
     # 向量化服务配置
     USE_LOCAL_EMBEDDING: bool = True  # 是否使用本地嵌入模型（优先）
     EMBEDDING_MODEL_NAME: str = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"  # 本地嵌入模型名称
+    EMBEDDING_BACKEND: str = "torch"  # 本地模型推理后端：torch（sentence-transformers）/ onnx（ONNX Runtime FP32）/ onnx_int8（int8动态量化）
+    EMBEDDING_ONNX_MODEL_PATH: str = ""  # ONNX模型文件路径（为空则从模型仓库下载onnx/model.onnx）
+    EMBEDDING_ONNX_CACHE_DIR: str = ""  # int8量化模型的保存目录（为空则保存在FP32模型文件旁）
+    EMBEDDING_ONNX_THREADS: int = 0  # ONNX Runtime推理线程数（0表示使用默认值）
+    EMBEDDING_MAX_SEQ_LENGTH: int = 128  # 本地模型的最大token数（ONNX后端按此截断，与sentence-transformers模型配置一致；分块大小不超过此窗口）
+    EMBEDDING_DIMENSION: int = 384  # 向量存储维度（嵌入模型原生维度：MiniLM为384，OpenAI ada-002为1536），维度不一致的向量会被丢弃；更换模型后运行scripts/reembed_documents.py
+    EMBEDDING_STORAGE_TYPE: str = "vector"  # 向量存储类型：vector（float32）/ halfvec（float16，需要pgvector 0.7+）
+    RECOMMENDATION_ANN_CANDIDATES: int = 100  # 推荐第一阶段ANN召回的候选数（第二阶段对候选按综合分数重排）
+    RECOMMENDATION_HNSW_EF_SEARCH: int = 100  # HNSW查询时的搜索宽度（越大召回率越高、越慢，不小于候选数）
+    DOCUMENT_NEIGHBORS_K: int = 20  # 每个文档预先计算的相似文档数（不小于相似文档接口的limit上限20）
     OPENAI_API_KEY: str = ""  # OpenAI API Key（可选，用于OpenAI Embeddings API）
+    EMBEDDING_BATCH_SIZE: int = 32  # 本地模型每次前向计算的文本数（同时也是微批队列的最大批大小）
+    EMBEDDING_MICRO_BATCH_WAIT_MS: int = 5  # 并发单条请求合并为一批的最长等待时间（毫秒），0表示不合并
+    OPENAI_EMBEDDING_MAX_INPUTS: int = 2048  # OpenAI Embeddings API单次请求的最大文本数
+    EMBEDDING_CHUNKED: bool = True  # 是否分块向量化文档（关闭后只向量化前8000字符）
+    EMBEDDING_CHUNK_CHARS: int = 1000  # 每个分块的最大字符数（相邻段落合并）；本地模型还不超过EMBEDDING_MAX_SEQ_LENGTH-2个token（按分词器测得的字符/token比例换算），避免超出模型窗口被截断
+    EMBEDDING_MAX_CHUNKS: int = 512  # 每个文档的最大分块数（超长文档从全文均匀抽取分块，分块大小不变）
+    EMBEDDING_STORE_SEGMENTS: bool = True  # 是否持久化分块向量（用于段落级检索）
+    EMBEDDING_CACHE_ENABLED: bool = True  # 是否启用向量缓存（按模型名称和文本内容寻址）
+    EMBEDDING_CACHE_TTL: int = 3600 * 24 * 30  # 向量缓存过期时间（秒），默认30天
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 200000  # Redis中最多保留的向量数（超过后淘汰最久未访问的）
+    EMBEDDING_CACHE_DTYPE: str = "float16"  # 向量存储精度：float16（体积减半，余弦相似度误差<1e-3）/ float32
+    EMBEDDING_CACHE_DISK_PATH: str = ""  # 本地磁盘向量缓存文件路径（SQLite），为空则不启用
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES: int = 1000000  # 磁盘缓存最多保留的向量数
+    EMBEDDING_SERVER_URL: str = ""  # 共享嵌入服务地址（unix:///path/to.sock 或 http://host:port），为空则每个进程各自加载模型
+    EMBEDDING_SERVER_TIMEOUT: float = 60.0  # 调用共享嵌入服务的超时时间（秒）
+    
+    # 文档内容提取配置
+    PDF_EXTRACTION_MODE: str = "thread"  # PDF提取模式：thread（每个文档一个线程逐页提取，超时页面的线程被丢弃）/ process（每个页码区间一个子进程，多核并行）
+    PDF_PAGES_PER_TASK: int = 20  # process模式下每个任务提取的页数
+    EXTRACTION_THREAD_WORKERS: int = 4  # 提取线程池大小（每个进程）
+    EXTRACTION_PROCESS_WORKERS: int = 0  # 同时运行的解析子进程数（每个进程，0表示使用CPU核数）
+    EXTRACTION_EXECUTOR: str = "process"  # docx/pptx/md/txt解析执行方式：process（每个任务一个子进程，超时只终止该子进程；Celery prefork工作进程中可用）/ thread（线程池，超时后解析在后台跑完）
+    
+    # 文本预处理配置
+    TEXT_DEDUP_SIMILARITY_THRESHOLD: float = 0.7  # 重复段落判定阈值（4字符shingle的Jaccard相似度）
     
     # 文件上传配置
     UPLOAD_DIR: str = "/app/uploads"
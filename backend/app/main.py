@@ -76,6 +76,13 @@ async def startup_event():
 async def shutdown_event():
     """应用关闭事件"""
     logger.info("应用关闭")
+    
+    # 释放AI服务的HTTP连接池
+    try:
+        from app.services.ai_service import close_ai_service
+        await close_ai_service()
+    except Exception as e:
+        logger.warning("关闭AI服务连接池失败", error=str(e))
 
 
 @app.get("/")
@@ -7,6 +7,9 @@ from app.models.processing_result import ProcessingResult
 from app.models.processing_task import ProcessingTask
 from app.models.system_learning_data import SystemLearningData
 from app.models.intermediate_result import DocumentIntermediateResult
+from app.models.document_segment_embedding import DocumentSegmentEmbedding
+from app.models.document_neighbor import DocumentNeighbor
+from app.models.document_technology import DocumentTechnology
 
 __all__ = [
     "Document",
@@ -15,4 +18,7 @@ __all__ = [
     "ProcessingTask",
     "SystemLearningData",
     "DocumentIntermediateResult",  # 新增：中间结果模型
+    "DocumentSegmentEmbedding",
+    "DocumentNeighbor",
+    "DocumentTechnology",
 ]
@@ -20,6 +20,7 @@ class AICallMetrics(Base):
     error_type = Column(String(50), nullable=True, comment="错误类型（timeout/rate_limit/server_error/network_error等）")
     error_message = Column(Text, nullable=True, comment="错误信息")
     retry_count = Column(Integer, nullable=False, default=0, comment="重试次数")
+    queue_wait_ms = Column(Integer, nullable=True, comment="限流排队等待时间（毫秒）")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="创建时间")
     
     __table_args__ = (
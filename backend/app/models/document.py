@@ -1,7 +1,7 @@
 """
 文档模型
 """
-from sqlalchemy import Column, String, BigInteger, DateTime, Text, func
+from sqlalchemy import Column, String, BigInteger, DateTime, Text, func, Index
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from app.core.database import Base
@@ -19,9 +19,14 @@ class Document(Base):
     upload_time = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="上传时间")
     status = Column(String(20), nullable=False, default="pending", comment="处理状态（pending/processing/completed/failed）")
     content_extracted = Column(Text, nullable=True, comment="提取的文档内容")
+    content_hash = Column(String(64), nullable=True, comment="文件内容指纹（SHA-256，用于跨文档去重）")
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="创建时间")
     updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), comment="更新时间")
 
+    __table_args__ = (
+        Index('idx_documents_content_hash', 'content_hash'),
+    )
+
     def __repr__(self):
         return f"<Document(id={self.id}, filename={self.filename}, status={self.status})>"
 
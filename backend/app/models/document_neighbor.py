@@ -0,0 +1,24 @@
+"""
+相似文档邻居模型
+"""
+from sqlalchemy import Column, Float, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class DocumentNeighbor(Base):
+    """相似文档邻居表（每个文档预先计算的前K个最相似文档，文档完成处理时增量更新）"""
+    __tablename__ = "document_neighbors"
+    
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, comment="文档ID")
+    neighbor_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, comment="相似文档ID")
+    similarity = Column(Float, nullable=False, comment="余弦相似度（1 - 余弦距离）")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now(), comment="更新时间")
+    
+    __table_args__ = (
+        Index("idx_document_neighbors_document_similarity", "document_id", similarity.desc()),
+        Index("idx_document_neighbors_neighbor_id", "neighbor_id"),
+    )
+    
+    def __repr__(self):
+        return f"<DocumentNeighbor(document_id={self.document_id}, neighbor_id={self.neighbor_id}, similarity={self.similarity})>"
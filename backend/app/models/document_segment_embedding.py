@@ -0,0 +1,31 @@
+"""
+文档分块向量模型
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, func
+from sqlalchemy.dialects.postgresql import UUID
+import uuid
+from app.core.database import Base
+from app.models.embedding_vector import embedding_type
+
+
+class DocumentSegmentEmbedding(Base):
+    """
+    文档分块向量表（长文档按段落分块向量化，支持段落级检索）
+    
+    start_offset/end_offset对应预处理后的文档内容（document_intermediate_results.preprocessed_content），
+    与段落切分结果segments的位置一致
+    """
+    __tablename__ = "document_segment_embeddings"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True, comment="文档ID")
+    chunk_index = Column(Integer, nullable=False, comment="分块序号（从0开始）")
+    start_offset = Column(Integer, nullable=False, comment="分块在文档内容中的起始位置")
+    end_offset = Column(Integer, nullable=False, comment="分块在文档内容中的结束位置")
+    text = Column(Text, nullable=False, comment="分块文本")
+    embedding = Column(embedding_type(), nullable=False, comment="分块向量（使用pgvector，嵌入模型原生维度）")
+    embedding_model = Column(String(200), nullable=True, comment="生成向量的嵌入模型（检索时只比较同一模型的向量）")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="创建时间")
+    
+    def __repr__(self):
+        return f"<DocumentSegmentEmbedding(document_id={self.document_id}, chunk_index={self.chunk_index})>"
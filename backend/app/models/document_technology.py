@@ -0,0 +1,25 @@
+"""
+文档技术名词模型
+"""
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+from app.core.database import Base
+
+
+class DocumentTechnology(Base):
+    """文档技术名词表（视角结果保存时提取并标准化的技术名词，知识图谱按技术聚合，不读取结果JSONB）"""
+    __tablename__ = "document_technologies"
+    
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True, comment="文档ID")
+    view = Column(String(50), primary_key=True, comment="视角名称（来源处理结果）")
+    technology = Column(String(100), primary_key=True, comment="技术名词（已标准化）")
+    document_type = Column(String(50), nullable=False, comment="文档类型（与处理结果一致，用于过滤）")
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), comment="创建时间")
+    
+    __table_args__ = (
+        Index("idx_document_technologies_technology", "technology", "document_id"),
+        Index("idx_document_technologies_document_type", "document_type"),
+    )
+    
+    def __repr__(self):
+        return f"<DocumentTechnology(document_id={self.document_id}, view={self.view}, technology={self.technology})>"
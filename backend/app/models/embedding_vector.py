@@ -0,0 +1,58 @@
+"""
+向量列类型
+- 向量按嵌入模型的原生维度存储（EMBEDDING_DIMENSION），不再零填充到1536维
+- EMBEDDING_STORAGE_TYPE=halfvec 时以半精度存储（需要pgvector 0.7+），体积和索引再减半
+- 每条向量记录生成它的嵌入模型（embedding_model），检索时只比较同一模型的向量；
+  更换模型后运行 scripts/reembed_documents.py 调整列维度并重新生成
+"""
+from pgvector.sqlalchemy import Vector
+
+from app.core.config import settings
+
+STORAGE_TYPES = ("vector", "halfvec")
+
+# 备选的云服务嵌入模型（原生1536维）
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+class HalfVector(Vector):
+    """pgvector半精度向量类型（文本格式与vector相同，复用Vector的读写转换和距离运算符）"""
+    cache_ok = True
+    
+    def get_col_spec(self, **kw):
+        if self.dim is None:
+            return "HALFVEC"
+        return "HALFVEC(%d)" % self.dim
+
+
+def vector_sql_type() -> str:
+    """
+    当前配置的向量存储类型名称（用于原生SQL中的CAST）
+    
+    Raises:
+        ValueError: 配置的存储类型无效
+    """
+    storage_type = settings.EMBEDDING_STORAGE_TYPE
+    if storage_type not in STORAGE_TYPES:
+        raise ValueError(f"无效的向量存储类型: {storage_type}，可选: {', '.join(STORAGE_TYPES)}")
+    return storage_type
+
+
+def embedding_type(dim: int = None) -> Vector:
+    """
+    按配置创建向量列类型
+    
+    Args:
+        dim: 向量维度，如果为None则使用EMBEDDING_DIMENSION
+    """
+    dim = dim or settings.EMBEDDING_DIMENSION
+    return HalfVector(dim) if vector_sql_type() == "halfvec" else Vector(dim)
+
+
+def storage_model_name() -> str:
+    """
+    向量列存储的嵌入模型（写入embedding_model列，检索时按此过滤）
+    
+    本地模型的不同推理后端（torch/onnx/onnx_int8）输出一致，视为同一模型
+    """
+    return settings.EMBEDDING_MODEL_NAME if settings.USE_LOCAL_EMBEDDING else OPENAI_EMBEDDING_MODEL
@@ -3,9 +3,9 @@
 """
 from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, func
 from sqlalchemy.dialects.postgresql import UUID
-from pgvector.sqlalchemy import Vector
 import uuid
 from app.core.database import Base
+from app.models.embedding_vector import embedding_type
 
 
 class SystemLearningData(Base):
@@ -13,9 +13,10 @@ class SystemLearningData(Base):
     __tablename__ = "system_learning_data"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, comment="文档ID")
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True, comment="文档ID")
     content_summary = Column(Text, nullable=False, comment="内容摘要")
-    embedding = Column(Vector(1536), nullable=True, comment="内容向量（使用pgvector，1536维）")
+    embedding = Column(embedding_type(), nullable=True, comment="内容向量（使用pgvector，嵌入模型原生维度）")
+    embedding_model = Column(String(200), nullable=True, comment="生成向量的嵌入模型（检索时只比较同一模型的向量）")
     document_type = Column(String(50), nullable=False, comment="文档类型")
     processing_result_summary = Column(Text, nullable=True, comment="处理结果摘要")
     processing_time = Column(Integer, nullable=True, comment="处理耗时")
@@ -36,7 +36,8 @@ class AIMonitoringService:
         response_time_ms: Optional[int] = None,
         error_type: Optional[str] = None,
         error_message: Optional[str] = None,
-        retry_count: int = 0
+        retry_count: int = 0,
+        queue_wait_ms: Optional[int] = None
     ) -> None:
         """
         记录AI调用指标
@@ -50,6 +51,7 @@ class AIMonitoringService:
             error_type: 错误类型
             error_message: 错误信息
             retry_count: 重试次数
+            queue_wait_ms: 限流排队等待时间（毫秒）
         """
         if not self.enabled:
             return
@@ -68,7 +70,8 @@ class AIMonitoringService:
                     response_time_ms=response_time_ms,
                     error_type=error_type,
                     error_message=error_message[:500] if error_message else None,  # 限制长度
-                    retry_count=retry_count
+                    retry_count=retry_count,
+                    queue_wait_ms=queue_wait_ms
                 )
                 
                 db.add(metrics)
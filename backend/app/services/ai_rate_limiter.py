@@ -0,0 +1,351 @@
+"""
+AI调用限流服务 - 所有Worker共享的并发限制和令牌桶限流
+- 令牌桶：限制每分钟请求数（RPM）和每分钟token数（TPM），先于并发名额获取，
+  被限速的调用不占用并发名额
+- 分布式信号量：限制所有进程同时进行的AI调用数，持有期间定期续租（长时间的流式响应不会过期）
+- 记录排队等待时间
+"""
+from typing import Optional, Dict, List, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import math
+import random
+import time
+import uuid
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+# 获取信号量：清理过期租约后，如果持有数未达上限则加入
+# KEYS[1]=信号量zset  ARGV[1]=上限 ARGV[2]=租约时长（秒） ARGV[3]=持有者token
+_ACQUIRE_SEMAPHORE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local lease = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - lease)
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('EXPIRE', KEYS[1], math.ceil(lease))
+    return 1
+end
+return 0
+"""
+
+# 续租信号量：持有者仍在集合中时刷新其时间戳
+# KEYS[1]=信号量zset  ARGV[1]=持有者token ARGV[2]=租约时长（秒）
+_RENEW_SEMAPHORE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[1])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])))
+    return 1
+end
+return 0
+"""
+
+# 令牌桶：同时检查请求桶和token桶，两者都足够时才一起扣减；否则返回需要等待的秒数
+# KEYS[1]=请求桶 KEYS[2]=token桶  ARGV[1]=RPM ARGV[2]=TPM ARGV[3]=本次token消耗
+# 容量为0表示不限制
+_ACQUIRE_BUCKETS_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local function level(key, capacity)
+    local data = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+end
+
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local wait = 0
+local req_level, tok_level
+
+if rpm > 0 then
+    req_level = level(KEYS[1], rpm)
+    if req_level < 1 then
+        wait = math.max(wait, (1 - req_level) * 60 / rpm)
+    end
+end
+if tpm > 0 then
+    cost = math.min(cost, tpm)
+    tok_level = level(KEYS[2], tpm)
+    if tok_level < cost then
+        wait = math.max(wait, (cost - tok_level) * 60 / tpm)
+    end
+end
+
+if wait > 0 then
+    return tostring(wait)
+end
+
+if rpm > 0 then
+    redis.call('HSET', KEYS[1], 'tokens', req_level - 1, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+end
+if tpm > 0 then
+    redis.call('HSET', KEYS[2], 'tokens', tok_level - cost, 'ts', now)
+    redis.call('EXPIRE', KEYS[2], 120)
+end
+return '0'
+"""
+
+# 按实际用量修正token桶（允许为负，后续请求会等待补足）
+# KEYS[1]=token桶  ARGV[1]=TPM ARGV[2]=修正量（实际-预估）
+_ADJUST_TOKENS_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or capacity
+local ts = tonumber(data[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+redis.call('HSET', KEYS[1], 'tokens', tokens - tonumber(ARGV[2]), 'ts', now)
+redis.call('EXPIRE', KEYS[1], 120)
+return 1
+"""
+
+
+class RateLimitTicket:
+    """一次限流许可（记录排队等待时间）"""
+    
+    def __init__(self, estimated_tokens: int):
+        self.estimated_tokens = estimated_tokens
+        self.queue_wait_ms = 0
+
+
+class AIRateLimiter:
+    """
+    AI调用限流器（基于Redis，所有Worker共享）
+    
+    - Redis不可用时放行（fail-open），只记录警告，不影响AI调用
+    - 信号量使用带租约的zset，进程崩溃后租约到期自动释放
+    """
+    
+    _key_prefix = "ai_rate_limit"
+    # 中文约0.6 token/字符，英文约0.3 token/字符，按偏保守的比例估算
+    TOKENS_PER_CHAR = 0.6
+    # 未指定max_tokens时预估的输出token数
+    DEFAULT_COMPLETION_TOKENS = 1024
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_concurrent: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        tokens_per_minute: Optional[int] = None,
+        max_wait: Optional[float] = None
+    ):
+        """
+        初始化限流器
+        
+        Args:
+            redis_url: Redis地址，如果为None则从配置读取
+            max_concurrent: 所有Worker共享的最大并发AI调用数（0表示不限制）
+            requests_per_minute: 每分钟请求数上限（0表示不限制）
+            tokens_per_minute: 每分钟token数上限（0表示不限制）
+            max_wait: 最长排队时间（秒），超过则抛出TimeoutError
+        """
+        self.enabled = settings.AI_RATE_LIMIT_ENABLED
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.max_concurrent = settings.AI_MAX_CONCURRENT_CALLS if max_concurrent is None else max_concurrent
+        self.requests_per_minute = settings.AI_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute
+        self.tokens_per_minute = settings.AI_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute
+        self.max_wait = settings.AI_RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+        # 租约时长：单次调用超时 + 余量，防止崩溃的Worker永久占用名额
+        self.lease_seconds = settings.AI_REQUEST_TIMEOUT + 60
+        
+        self._redis = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore_key = f"{self._key_prefix}:semaphore"
+        self._request_bucket_key = f"{self._key_prefix}:rpm"
+        self._token_bucket_key = f"{self._key_prefix}:tpm"
+    
+    def _get_redis(self):
+        """获取异步Redis客户端（按事件循环懒加载）"""
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=True)
+            self._redis_loop = loop
+        return self._redis
+    
+    @classmethod
+    def estimate_tokens(cls, messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> int:
+        """
+        预估一次调用消耗的token数（输入 + 输出）
+        
+        Args:
+            messages: 消息列表
+            max_tokens: 最大输出token数
+        
+        Returns:
+            预估token数
+        """
+        chars = sum(len(message.get("content") or "") for message in messages)
+        return int(math.ceil(chars * cls.TOKENS_PER_CHAR)) + (max_tokens or cls.DEFAULT_COMPLETION_TOKENS)
+    
+    @classmethod
+    def estimate_usage(cls, messages: List[Dict[str, str]], completion: str) -> int:
+        """
+        按输入和已生成的内容估算实际token用量（流式响应没有返回usage时使用）
+        
+        Args:
+            messages: 消息列表
+            completion: 已生成的内容
+        
+        Returns:
+            估算的token数
+        """
+        chars = sum(len(message.get("content") or "") for message in messages) + len(completion)
+        return int(math.ceil(chars * cls.TOKENS_PER_CHAR))
+    
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens: int) -> AsyncIterator[RateLimitTicket]:
+        """
+        获取调用许可（在整个AI调用期间持有，包括流式响应）
+        
+        先等待RPM/TPM令牌桶，再获取并发名额：被限速的调用排队时不占用并发名额。
+        持有并发名额期间每隔租约时长的1/3续租一次。
+        
+        Args:
+            estimated_tokens: 预估token数
+        
+        Yields:
+            RateLimitTicket，包含排队等待时间
+        
+        Raises:
+            TimeoutError: 排队超过max_wait
+        """
+        ticket = RateLimitTicket(estimated_tokens)
+        holder = None
+        renewer = None
+        
+        if self.enabled:
+            start = time.monotonic()
+            try:
+                await self._acquire_buckets(estimated_tokens, start)
+                holder = await self._acquire_semaphore(start)
+            except TimeoutError:
+                raise
+            except Exception as e:
+                # Redis不可用时放行
+                logger.warning("AI限流不可用，直接放行", error=str(e))
+                holder = None
+            ticket.queue_wait_ms = int((time.monotonic() - start) * 1000)
+            if ticket.queue_wait_ms > 1000:
+                logger.info("AI调用排队等待", queue_wait_ms=ticket.queue_wait_ms, estimated_tokens=estimated_tokens)
+            if holder:
+                renewer = asyncio.ensure_future(self._keep_semaphore(holder))
+        
+        try:
+            yield ticket
+        finally:
+            if renewer:
+                renewer.cancel()
+            if holder:
+                await self._release_semaphore(holder)
+    
+    def _check_wait(self, start: float, next_wait: float = 0) -> None:
+        """检查是否超过（或继续等待next_wait秒后将超过）最长排队时间"""
+        if time.monotonic() - start + next_wait > self.max_wait:
+            raise TimeoutError(f"AI调用排队超时（超过{self.max_wait}秒）")
+    
+    async def _acquire_semaphore(self, start: float) -> Optional[str]:
+        """获取分布式信号量，返回持有者token；不限制并发时返回None"""
+        if self.max_concurrent <= 0:
+            return None
+        
+        client = self._get_redis()
+        holder = uuid.uuid4().hex
+        delay = 0.05
+        while True:
+            acquired = await client.eval(
+                _ACQUIRE_SEMAPHORE_SCRIPT, 1, self._semaphore_key,
+                self.max_concurrent, self.lease_seconds, holder
+            )
+            if int(acquired) == 1:
+                return holder
+            self._check_wait(start)
+            # 指数退避 + 抖动，避免多个Worker同时重试
+            await asyncio.sleep(delay + random.uniform(0, delay))
+            delay = min(delay * 2, 1.0)
+    
+    async def _keep_semaphore(self, holder: str) -> None:
+        """持有并发名额期间定期续租，防止长时间的调用（如流式响应）租约过期后名额被他人占用"""
+        interval = max(self.lease_seconds / 3, 0.01)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                renewed = await self._get_redis().eval(
+                    _RENEW_SEMAPHORE_SCRIPT, 1, self._semaphore_key, holder, self.lease_seconds
+                )
+            except Exception as e:
+                logger.warning("AI并发名额续租失败", error=str(e))
+                continue
+            if int(renewed) != 1:
+                logger.warning("AI并发名额租约已过期，停止续租")
+                return
+    
+    async def _release_semaphore(self, holder: str) -> None:
+        """释放分布式信号量"""
+        try:
+            await self._get_redis().zrem(self._semaphore_key, holder)
+        except Exception as e:
+            # 释放失败时依赖租约过期
+            logger.warning("释放AI并发名额失败", error=str(e))
+    
+    async def _acquire_buckets(self, estimated_tokens: int, start: float) -> None:
+        """从请求桶和token桶扣减，不足时等待补充"""
+        if self.requests_per_minute <= 0 and self.tokens_per_minute <= 0:
+            return
+        
+        client = self._get_redis()
+        while True:
+            wait = float(await client.eval(
+                _ACQUIRE_BUCKETS_SCRIPT, 2, self._request_bucket_key, self._token_bucket_key,
+                self.requests_per_minute, self.tokens_per_minute, estimated_tokens
+            ))
+            if wait <= 0:
+                return
+            self._check_wait(start, wait)
+            await asyncio.sleep(wait + random.uniform(0, 0.1))
+    
+    async def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        按实际token用量修正token桶
+        
+        Args:
+            estimated_tokens: 获取许可时的预估值
+            actual_tokens: 实际消耗（response.usage.total_tokens）
+        """
+        if not self.enabled or self.tokens_per_minute <= 0 or not actual_tokens:
+            return
+        delta = actual_tokens - estimated_tokens
+        if delta == 0:
+            return
+        try:
+            await self._get_redis().eval(
+                _ADJUST_TOKENS_SCRIPT, 1, self._token_bucket_key,
+                self.tokens_per_minute, delta
+            )
+        except Exception as e:
+            logger.warning("修正AI token用量失败", error=str(e))
+
+
+# 全局限流器实例（延迟初始化）
+_ai_rate_limiter: Optional[AIRateLimiter] = None
+
+
+def get_ai_rate_limiter() -> AIRateLimiter:
+    """获取AI限流器实例（单例模式）"""
+    global _ai_rate_limiter
+    if _ai_rate_limiter is None:
+        _ai_rate_limiter = AIRateLimiter()
+    return _ai_rate_limiter
@@ -0,0 +1,169 @@
+"""
+AI响应缓存服务 - 基于请求内容寻址的LLM响应缓存
+- 缓存key为模型、温度、消息（系统提示 + 用户提示）等请求参数的哈希
+- Redis + 本地磁盘两级缓存（见TwoTierCache），统计命中/未命中次数（未通过校验的缓存内容计为未命中）
+- bypass_response_cache()：在作用域内（包括其中创建的异步任务）绕过缓存，用于重新处理和切换视角时强制重新生成
+"""
+from typing import Callable, Iterator, Optional, Dict, List
+from contextlib import contextmanager
+import contextvars
+import hashlib
+import json
+import structlog
+
+from app.core.config import settings
+from app.services.two_tier_cache import TwoTierCache
+
+logger = structlog.get_logger()
+
+# 当前上下文是否绕过响应缓存（asyncio任务创建时复制上下文，并发的子步骤继承调用方的设置）
+_bypass = contextvars.ContextVar("ai_response_cache_bypass", default=False)
+
+
+@contextmanager
+def bypass_response_cache(bypass: bool = True) -> Iterator[None]:
+    """
+    在作用域内绕过AI响应缓存（既不读取也不写入），bypass为False时不改变当前设置
+    
+    视角处理器内部的AI调用不逐个传递use_cache，入口处（ViewRegistry.process、处理任务）用此作用域统一控制
+    """
+    if not bypass:
+        yield
+        return
+    token = _bypass.set(True)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def is_response_cache_bypassed() -> bool:
+    """当前上下文是否绕过AI响应缓存"""
+    return _bypass.get()
+
+
+class AIResponseCache(TwoTierCache):
+    """
+    AI响应缓存
+    
+    - 相同请求（重新处理、切换视角、同名文件覆盖上传）直接返回缓存结果，不调用API
+    - Redis或磁盘不可用时视为未命中，不影响AI调用
+    """
+    
+    _key_prefix = "ai_response_cache"
+    _disk_table = "responses"
+    _disk_value_column = "content"
+    _label = "AI响应缓存"
+    # 缓存key的版本号，调整key的组成或响应格式时递增，使旧缓存失效
+    KEY_VERSION = 1
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        disk_max_entries: Optional[int] = None
+    ):
+        """
+        初始化响应缓存
+        
+        Args:
+            redis_url: Redis地址，如果为None则从配置读取
+            ttl: 缓存过期时间（秒）
+            max_entries: Redis中最多保留的条目数，超过后按最近访问时间淘汰
+            disk_path: 磁盘缓存文件路径（为空则不启用磁盘缓存）
+            disk_max_entries: 磁盘缓存最多保留的条目数
+        """
+        super().__init__(
+            redis_url=redis_url or settings.REDIS_URL,
+            ttl=ttl or settings.AI_RESPONSE_CACHE_TTL,
+            max_entries=max_entries or settings.AI_RESPONSE_CACHE_MAX_ENTRIES,
+            disk_path=settings.AI_RESPONSE_CACHE_DISK_PATH if disk_path is None else disk_path,
+            disk_max_entries=disk_max_entries or settings.AI_RESPONSE_CACHE_DISK_MAX_ENTRIES
+        )
+        self.enabled = settings.AI_RESPONSE_CACHE_ENABLED
+    
+    @classmethod
+    def make_key(
+        cls,
+        model: str,
+        temperature: float,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        **kwargs
+    ) -> str:
+        """
+        生成缓存key（请求参数的SHA-256哈希）
+        
+        Args:
+            model: 模型名称
+            temperature: 温度参数
+            messages: 消息列表（包含系统提示和用户提示）
+            max_tokens: 最大token数
+            **kwargs: 其他透传给API的参数
+        
+        Returns:
+            缓存key
+        """
+        payload = {
+            "v": cls.KEY_VERSION,
+            "model": model,
+            "temperature": temperature,
+            "messages": [[m.get("role"), m.get("content")] for m in messages],
+            "max_tokens": max_tokens,
+            "extra": kwargs
+        }
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str, validator: Optional[Callable[[str], object]] = None) -> Optional[str]:
+        """
+        获取缓存的响应内容
+        
+        Args:
+            key: 缓存key
+            validator: 响应校验函数（校验失败时抛出异常），未通过校验的缓存内容视为未命中
+        
+        Returns:
+            响应内容，未命中返回None
+        """
+        if not self.enabled:
+            return None
+        
+        value = (await self._load_many([key]))[0]
+        # 磁盘缓存中的旧条目以TEXT存储
+        content = value.decode("utf-8") if isinstance(value, bytes) else value
+        if content is not None and validator is not None:
+            try:
+                validator(content)
+            except Exception as e:
+                logger.warning("缓存的AI响应未通过校验，视为未命中", error=str(e))
+                content = None
+        await self._record(int(content is not None), int(content is None))
+        return content
+    
+    async def set(self, key: str, content: str) -> None:
+        """
+        保存响应内容
+        
+        Args:
+            key: 缓存key
+            content: 响应内容
+        """
+        if not self.enabled or not content:
+            return
+        
+        await self._store_many({key: content.encode("utf-8")})
+
+
+# 全局响应缓存实例（延迟初始化）
+_ai_response_cache: Optional[AIResponseCache] = None
+
+
+def get_ai_response_cache() -> AIResponseCache:
+    """获取AI响应缓存实例（单例模式）"""
+    global _ai_response_cache
+    if _ai_response_cache is None:
+        _ai_response_cache = AIResponseCache()
+    return _ai_response_cache
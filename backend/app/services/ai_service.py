@@ -3,7 +3,10 @@ AI服务 - DeepSeek API集成
 提供统一的AI调用接口
 """
 from typing import Optional, Dict, List, Callable, AsyncGenerator
-from openai import OpenAI
+import asyncio
+import functools
+import httpx
+from openai import OpenAI, AsyncOpenAI
 import structlog
 from tenacity import (
     retry,
@@ -16,6 +19,9 @@ from tenacity import (
 from app.core.config import settings
 from app.services.ai_mock_service import AIMockService
 from app.services.ai_monitoring_service import AIMonitoringService
+from app.services.ai_rate_limiter import get_ai_rate_limiter
+from app.services.ai_response_cache import get_ai_response_cache, is_response_cache_bypassed
+from app.services.context_packer import ContextPacker
 import time
 
 logger = structlog.get_logger()
@@ -38,10 +44,12 @@ class AIService:
         if not self.api_key:
             raise ValueError("DeepSeek API Key未配置，请在.env文件中设置DEEPSEEK_API_KEY")
         
-        self.client = OpenAI(
-            api_key=self.api_key,
-            base_url=self.api_base
-        )
+        # 异步客户端（默认）：共享keep-alive连接池，懒加载并绑定到当前事件循环
+        # 同步客户端仅作为回退方案，调用在线程池中执行，避免阻塞事件循环
+        self.use_async_client = settings.AI_USE_ASYNC_CLIENT
+        self._async_client: Optional[AsyncOpenAI] = None
+        self._async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sync_client: Optional[OpenAI] = None
         
         # 初始化Mock服务（如果启用）
         self.mock_service = AIMockService.get_instance()
@@ -54,6 +62,109 @@ class AIService:
         self.monitoring_service = AIMonitoringService.get_instance()
         if self.monitoring_service and self.monitoring_service.enabled:
             logger.info("AI监控服务已集成")
+        
+        # 全局限流器（所有Worker共享并发名额和RPM/TPM配额）
+        self.rate_limiter = get_ai_rate_limiter()
+        
+        # 响应缓存（相同请求直接返回缓存结果）
+        self.response_cache = get_ai_response_cache()
+    
+    @staticmethod
+    def _build_timeout(timeout: Optional[float] = None) -> httpx.Timeout:
+        """
+        构建请求超时配置
+        
+        Args:
+            timeout: 单次调用超时（秒），如果为None则使用配置的默认值
+        
+        Returns:
+            httpx超时配置
+        """
+        return httpx.Timeout(
+            timeout or settings.AI_REQUEST_TIMEOUT,
+            connect=settings.AI_CONNECT_TIMEOUT
+        )
+    
+    def _get_async_client(self) -> AsyncOpenAI:
+        """
+        获取异步客户端（懒加载）
+        
+        httpx连接池绑定在创建它的事件循环上，如果事件循环发生变化（如Celery任务新建了循环），
+        则重新创建客户端，旧连接随旧循环一起释放
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            if self._async_client is not None:
+                logger.debug("事件循环已变化，重新创建AI异步客户端")
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY
+                ),
+                timeout=self._build_timeout()
+            )
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base,
+                timeout=self._build_timeout(),
+                http_client=http_client
+            )
+            self._async_client_loop = loop
+            logger.info("AI异步客户端已创建",
+                       max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                       max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS)
+        return self._async_client
+    
+    def _get_sync_client(self) -> OpenAI:
+        """获取同步客户端（懒加载，仅用于回退）"""
+        if self._sync_client is None:
+            self._sync_client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.api_base,
+                timeout=self._build_timeout()
+            )
+        return self._sync_client
+    
+    async def _create_completion(self, timeout: Optional[float] = None, **params):
+        """
+        发起chat.completions.create调用
+        
+        优先使用异步客户端；异步客户端不可用时回退到同步客户端（在线程池中执行）
+        
+        Args:
+            timeout: 单次调用超时（秒）
+            **params: 透传给chat.completions.create的参数
+        
+        Returns:
+            异步客户端返回响应或AsyncStream；同步回退返回响应或Stream
+        """
+        request_timeout = self._build_timeout(timeout)
+        
+        if self.use_async_client:
+            try:
+                client = self._get_async_client()
+            except Exception as e:
+                logger.warning("AI异步客户端创建失败，回退到同步客户端", error=str(e))
+                self.use_async_client = False
+            else:
+                return await client.chat.completions.create(timeout=request_timeout, **params)
+        
+        client = self._get_sync_client()
+        return await asyncio.to_thread(
+            functools.partial(client.chat.completions.create, timeout=request_timeout, **params)
+        )
+    
+    async def aclose(self) -> None:
+        """关闭异步客户端，释放连接池"""
+        if self._async_client is not None:
+            try:
+                await self._async_client.close()
+            except Exception as e:
+                logger.warning("关闭AI异步客户端失败", error=str(e))
+            finally:
+                self._async_client = None
+                self._async_client_loop = None
     
     @retry(
         stop=stop_after_attempt(3),
@@ -69,6 +180,9 @@ class AIService:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         document_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        response_validator: Optional[Callable[[str], object]] = None,
         **kwargs
     ):
         """
@@ -80,29 +194,64 @@ class AIService:
             temperature: 温度参数，控制随机性（0-1）
             max_tokens: 最大token数
             document_id: 文档ID（用于监控）
+            timeout: 单次调用超时（秒），如果为None则使用配置的默认值
+            use_cache: 是否使用响应缓存（False时绕过缓存，强制调用API；bypass_response_cache作用域内同样绕过）
+            response_validator: 响应校验函数（校验失败时抛出异常），只有通过校验的响应才写入缓存，
+                未通过校验的缓存内容视为未命中（计入未命中统计）
             **kwargs: 其他参数
         
         Yields:
             流式返回的文本块（str）
         """
+        cache_key = None
+        if use_cache and self.response_cache.enabled and not is_response_cache_bypassed():
+            cache_key = self.response_cache.make_key(model, temperature, messages, max_tokens, **kwargs)
+            cached = await self.response_cache.get(cache_key, response_validator)
+            if cached is not None:
+                logger.info("AI响应缓存命中（流式）", model=model, cache_key=cache_key[:16])
+                yield cached
+                return
+        
+        estimated_tokens = self.rate_limiter.estimate_tokens(messages, max_tokens)
+        full_content = []
+        # 请求在最后一块中返回usage（OpenAI兼容接口的stream_options），用于校正TPM令牌桶
+        extra_body = dict(kwargs.pop("extra_body", None) or {})
+        extra_body.setdefault("stream_options", {"include_usage": True})
         try:
-            # 创建流式响应
-            stream = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=True,  # 启用流式响应
-                **kwargs
-            )
+            # 并发名额在整个流式响应期间持有
+            async with self.rate_limiter.acquire(estimated_tokens):
+                # 创建流式响应
+                stream = await self._create_completion(
+                    timeout=timeout,
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True,  # 启用流式响应
+                    extra_body=extra_body,
+                    **kwargs
+                )
+                
+                total_tokens = None
+                try:
+                    # 逐块返回内容
+                    async for chunk in _iter_stream_chunks(stream):
+                        total_tokens = _usage_total_tokens(chunk) or total_tokens
+                        if chunk.choices and len(chunk.choices) > 0:
+                            delta = chunk.choices[0].delta
+                            if delta and delta.content:
+                                full_content.append(delta.content)
+                                yield delta.content
+                finally:
+                    # 中途失败或调用方提前停止时按已生成的内容估算
+                    if total_tokens is None:
+                        total_tokens = self.rate_limiter.estimate_usage(messages, "".join(full_content))
+                    await self.rate_limiter.record_usage(estimated_tokens, total_tokens)
             
-            # 逐块返回内容
-            for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0:
-                    delta = chunk.choices[0].delta
-                    if delta and delta.content:
-                        yield delta.content
-                        
+            content = "".join(full_content)
+            if cache_key and self._is_valid_response(content, response_validator):
+                await self.response_cache.set(cache_key, content)
+        
         except Exception as e:
             logger.error("流式AI调用失败", model=model, error=str(e))
             raise
@@ -114,6 +263,9 @@ class AIService:
         temperature: float = 0.7,
         max_tokens: Optional[int] = None,
         document_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        response_validator: Optional[Callable[[str], object]] = None,
         **kwargs
     ) -> str:
         """
@@ -125,6 +277,10 @@ class AIService:
             temperature: 温度参数，控制随机性（0-1）
             max_tokens: 最大token数
             document_id: 文档ID（用于监控）
+            timeout: 单次调用超时（秒），如果为None则使用配置的默认值
+            use_cache: 是否使用响应缓存（False时绕过缓存，强制调用API；bypass_response_cache作用域内同样绕过）
+            response_validator: 响应校验函数（校验失败时抛出异常），只有通过校验的响应才写入缓存，
+                未通过校验的缓存内容视为未命中（计入未命中统计）
             **kwargs: 其他参数
         
         Returns:
@@ -134,6 +290,7 @@ class AIService:
         retry_count = 0
         error_type = None
         error_message = None
+        ticket = None
         
         # 检查Mock服务（如果启用，先尝试模拟失败）
         if self.mock_service and await self.mock_service.should_fail():
@@ -141,17 +298,35 @@ class AIService:
                        failure_type=self.mock_service.failure_type.value)
             await self.mock_service.simulate_failure()
         
+        # 检查响应缓存
+        cache_key = None
+        if use_cache and self.response_cache.enabled and not is_response_cache_bypassed():
+            cache_key = self.response_cache.make_key(model, temperature, messages, max_tokens, **kwargs)
+            cached = await self.response_cache.get(cache_key, response_validator)
+            if cached is not None:
+                logger.info("AI响应缓存命中", model=model, cache_key=cache_key[:16])
+                return cached
+        
+        estimated_tokens = self.rate_limiter.estimate_tokens(messages, max_tokens)
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                **kwargs
-            )
+            async with self.rate_limiter.acquire(estimated_tokens) as ticket:
+                # 响应时间不包含排队时间（排队时间单独记录为queue_wait_ms）
+                start_time = time.time()
+                response = await self._create_completion(
+                    timeout=timeout,
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    **kwargs
+                )
             
             content = response.choices[0].message.content.strip()
             response_time_ms = int((time.time() - start_time) * 1000)
+            total_tokens = response.usage.total_tokens if response.usage else None
+            await self.rate_limiter.record_usage(estimated_tokens, total_tokens)
+            if cache_key and self._is_valid_response(content, response_validator):
+                await self.response_cache.set(cache_key, content)
             
             # 记录成功指标
             if self.monitoring_service.enabled:
@@ -161,10 +336,12 @@ class AIService:
                     model=model,
                     status="success",
                     response_time_ms=response_time_ms,
-                    retry_count=retry_count
+                    retry_count=retry_count,
+                    queue_wait_ms=ticket.queue_wait_ms
                 )
             
-            logger.info("AI调用成功", model=model, tokens=response.usage.total_tokens if response.usage else 0)
+            logger.info("AI调用成功", model=model, tokens=total_tokens or 0,
+                       queue_wait_ms=ticket.queue_wait_ms)
             return content
             
         except Exception as e:
@@ -174,10 +351,11 @@ class AIService:
             
             # 判断错误类型
             status = "error_unknown"
-            if isinstance(e, TimeoutError) or "timeout" in error_message.lower():
+            from openai import APITimeoutError, APIConnectionError
+            if isinstance(e, (TimeoutError, APITimeoutError)) or "timeout" in error_message.lower():
                 status = "timeout"
                 error_type = "timeout"
-            elif isinstance(e, ConnectionError):
+            elif isinstance(e, (ConnectionError, APIConnectionError)):
                 status = "error_network"
                 error_type = "network_error"
             else:
@@ -203,7 +381,8 @@ class AIService:
                     response_time_ms=response_time_ms,
                     error_type=error_type,
                     error_message=error_message,
-                    retry_count=retry_count
+                    retry_count=retry_count,
+                    queue_wait_ms=ticket.queue_wait_ms if ticket else None
                 )
             
             logger.error("AI调用失败", error=error_message, model=model, error_type=error_type)
@@ -218,7 +397,10 @@ class AIService:
         max_tokens: Optional[int] = None,
         document_id: Optional[str] = None,
         stream: bool = False,
-        stream_callback: Optional[callable] = None
+        stream_callback: Optional[callable] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        response_validator: Optional[Callable[[str], object]] = None
     ) -> str:
         """
         生成文本（简化接口）
@@ -232,6 +414,9 @@ class AIService:
             document_id: 文档ID（用于监控）
             stream: 是否使用流式生成
             stream_callback: 流式回调函数，接收文本块 (chunk: str) -> None
+            timeout: 单次调用超时（秒）
+            use_cache: 是否使用响应缓存
+            response_validator: 响应校验函数，只有通过校验的响应才写入缓存
         
         Returns:
             生成的文本
@@ -249,7 +434,10 @@ class AIService:
                 model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                document_id=document_id
+                document_id=document_id,
+                timeout=timeout,
+                use_cache=use_cache,
+                response_validator=response_validator
             ):
                 full_content += chunk
                 if stream_callback:
@@ -262,9 +450,24 @@ class AIService:
                 model=model,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                document_id=document_id
+                document_id=document_id,
+                timeout=timeout,
+                use_cache=use_cache,
+                response_validator=response_validator
             )
     
+    @staticmethod
+    def _is_valid_response(content: str, response_validator: Optional[Callable[[str], object]]) -> bool:
+        """响应是否通过校验（没有校验函数时总是通过）"""
+        if response_validator is None:
+            return True
+        try:
+            response_validator(content)
+            return True
+        except Exception as e:
+            logger.warning("AI响应未通过校验，不写入缓存", error=str(e))
+            return False
+    
     async def generate_json(
         self,
         prompt: str,
@@ -275,7 +478,9 @@ class AIService:
         require_confidence: bool = False,
         document_id: Optional[str] = None,
         stream: bool = False,
-        stream_callback: Optional[callable] = None
+        stream_callback: Optional[callable] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True
     ) -> Dict:
         """
         生成JSON格式响应
@@ -287,13 +492,12 @@ class AIService:
             temperature: 温度参数（JSON生成使用较低温度）
             require_sources: 是否要求返回source_ids
             require_confidence: 是否要求返回confidence
+            timeout: 单次调用超时（秒）
+            use_cache: 是否使用响应缓存
         
         Returns:
             解析后的JSON字典
         """
-        import json
-        import re
-        
         # 添加JSON格式要求
         json_prompt = f"{prompt}\n\n请只返回JSON格式，不要包含其他文字说明。"
         
@@ -308,13 +512,38 @@ class AIService:
             if requirements:
                 json_prompt += f"\n\n返回的JSON必须包含以下字段：\n" + "\n".join(requirements)
         
+        # 只缓存能解析为JSON的响应，格式无效的响应不会在缓存有效期内被重复使用
+        parse = functools.partial(
+            self._parse_json_response,
+            require_sources=require_sources,
+            require_confidence=require_confidence
+        )
         response_text = await self.generate_text(
             prompt=json_prompt,
             system_prompt=system_prompt,
             model=model,
             temperature=temperature,
-            document_id=document_id
+            document_id=document_id,
+            timeout=timeout,
+            use_cache=use_cache,
+            response_validator=parse
         )
+        return parse(response_text)
+    
+    def _parse_json_response(
+        self,
+        response_text: str,
+        require_sources: bool,
+        require_confidence: bool
+    ) -> Dict:
+        """
+        从AI响应文本中解析JSON（兼容markdown代码块和前后说明文字）
+        
+        Raises:
+            Exception: 无法解析为JSON
+        """
+        import json
+        import re
         
         # 清理响应文本：移除markdown代码块标记
         cleaned_text = response_text.strip()
@@ -417,7 +646,11 @@ class AIService:
         model: str = "deepseek-chat",
         temperature: float = 0.3,
         require_confidence: bool = True,
-        document_id: Optional[str] = None
+        document_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        use_cache: bool = True,
+        retrieval_query: Optional[str] = None,
+        context_token_budget: Optional[int] = None
     ) -> Dict:
         """
         生成带来源和可信度的JSON响应
@@ -429,17 +662,31 @@ class AIService:
             model: 模型名称
             temperature: 温度参数
             require_confidence: 是否要求返回confidence
+            timeout: 单次调用超时（秒）
+            use_cache: 是否使用响应缓存
+            retrieval_query: 子步骤的检索问题；提供时只发送与之最相关的段落（文档超出token预算时）
+            context_token_budget: 段落内容的token预算，如果为None则从配置读取
         
         Returns:
             解析后的JSON字典，包含source_ids和confidence
         """
         from app.services.source_segmenter import SourceSegmenter
         
+        # 检索模式：按相关性选取段落（保留原段落编号，source_ids仍可解析）
+        header = "文档内容已按段落编号："
+        if retrieval_query and settings.AI_CONTEXT_RETRIEVAL_ENABLED and segments:
+            selected = await ContextPacker.select_segments(
+                segments, retrieval_query, token_budget=context_token_budget
+            )
+            if len(selected) < len(segments):
+                header = "文档内容已按段落编号（按相关性选取了部分段落，编号为原文段落编号）："
+                segments = selected
+        
         # 格式化段落为prompt格式
         segments_text = SourceSegmenter.format_segments_for_prompt(segments)
         
         # 增强prompt，包含段落信息
-        enhanced_prompt = f"""文档内容已按段落编号：
+        enhanced_prompt = f"""{header}
 
 {segments_text}
 
@@ -457,10 +704,42 @@ class AIService:
             temperature=temperature,
             require_sources=True,
             require_confidence=require_confidence,
-            document_id=document_id
+            document_id=document_id,
+            timeout=timeout,
+            use_cache=use_cache
         )
 
 
+async def _iter_stream_chunks(stream) -> AsyncGenerator:
+    """
+    统一迭代流式响应
+    
+    异步客户端返回AsyncStream，直接异步迭代；
+    同步回退返回Stream，逐块在线程池中读取，避免阻塞事件循环
+    """
+    if hasattr(stream, "__aiter__"):
+        async for chunk in stream:
+            yield chunk
+        return
+    
+    iterator = iter(stream)
+    sentinel = object()
+    while True:
+        chunk = await asyncio.to_thread(next, iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def _usage_total_tokens(chunk) -> Optional[int]:
+    """读取流式响应块中的usage（只有开启include_usage时最后一块才有）"""
+    # 旧版openai SDK的chunk模型没有usage字段，作为额外字段保留（dict）
+    usage = getattr(chunk, "usage", None)
+    if isinstance(usage, dict):
+        return usage.get("total_tokens")
+    return getattr(usage, "total_tokens", None)
+
+
 def _is_retryable_error(exception: Exception) -> bool:
     """
     判断错误是否可重试
@@ -471,7 +750,11 @@ def _is_retryable_error(exception: Exception) -> bool:
     Returns:
         如果可重试返回True
     """
-    from openai import APIError
+    from openai import APIError, APIConnectionError
+    
+    # 连接错误/超时（包括APITimeoutError），可重试
+    if isinstance(exception, APIConnectionError):
+        return True
     
     # 429 Too Many Requests - 限流，可重试
     if isinstance(exception, APIError):
@@ -503,3 +786,9 @@ def get_ai_service() -> AIService:
         _ai_service = AIService()
     return _ai_service
 
+
+async def close_ai_service() -> None:
+    """关闭AI服务实例的连接池（应用关闭时调用）"""
+    if _ai_service is not None:
+        await _ai_service.aclose()
+
@@ -13,6 +13,7 @@ from app.utils.tech_name_utils import clean_tech_name, normalize_tech_name, are_
 from app.services.ai_service import get_ai_service
 from app.services.source_segmenter import SourceSegmenter
 from app.services.confidence_calculator import ConfidenceCalculator
+from app.services.step_scheduler import ProcessingStep, StepScheduler
 
 logger = structlog.get_logger()
 
@@ -20,96 +21,115 @@ logger = structlog.get_logger()
 class ArchitectureProcessor:
     """架构文档处理器"""
     
+    # 各子步骤的检索问题（长文档只发送与之最相关的段落）
+    RETRIEVAL_QUERIES = {
+        "config_steps": "安装部署、配置步骤、配置文件、依赖引入、代码示例、启动和测试命令",
+        "components": "系统架构、组件、模块、服务、中间件、数据库及其职责和交互",
+        "checklist": "配置项、参数设置、注意事项、检查验证、常见问题",
+        "related_technologies": "使用到的技术栈、框架、中间件、工具和版本",
+    }
+    
+    # 子步骤进度范围（progress_callback接收的原始进度值）
+    PROGRESS_START = 65
+    PROGRESS_END = 88
+    
     @staticmethod
-    async def process(content: str, progress_callback=None, stream_callback: Optional[callable] = None) -> Dict:
+    async def process(
+        content: str,
+        progress_callback=None,
+        stream_callback: Optional[callable] = None,
+        segments: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         处理架构/搭建文档
         
         Args:
             content: 文档内容
-            progress_callback: 进度回调函数 (task_id, progress, stage)
+            progress_callback: 进度回调函数 (progress, stage)，每个分支完成时调用一次
+            segments: 预先切分的段落（与content对应），为空则自动切分
         
         Returns:
             处理结果字典
         """
         logger.info("开始处理架构文档", content_length=len(content))
         
-        # 0. 段落切分（带异常处理）
-        try:
-            segments = SourceSegmenter.segment_content(content, timeout=5.0)
-            logger.info("段落切分完成", segments_count=len(segments), content_length=len(content))
-            # 如果段落切分返回空列表，使用兜底策略
-            if not segments:
-                logger.warning("段落切分返回空列表，使用兜底策略")
-                segments = SourceSegmenter._fallback_segment(content)
-                logger.info("兜底策略完成", segments_count=len(segments))
-        except Exception as e:
-            logger.error("段落切分失败，使用兜底策略", error=str(e))
-            segments = SourceSegmenter._fallback_segment(content)  # 使用兜底策略而不是空列表
+        # 0. 段落切分（优先使用调用方传入的切分结果，否则按内容哈希复用切分缓存）
+        segments = SourceSegmenter.get_segments(content, segments)
         
-        # 1. 配置流程提取（带异常处理）
-        if progress_callback:
-            await progress_callback(65, "处理架构文档（步骤1/5：提取配置流程）...")
-        try:
-            config_steps = await ArchitectureProcessor._extract_config_steps(content, segments)
-        except Exception as e:
-            logger.error("配置流程提取失败，使用默认值", error=str(e))
-            config_steps = []
-        
-        # 2. 组件识别（带异常处理）
-        if progress_callback:
-            await progress_callback(70, "处理架构文档（步骤2/5：识别组件）...")
-        try:
-            components = await ArchitectureProcessor._identify_components(content, segments)
-        except Exception as e:
-            logger.error("组件识别失败，使用默认值", error=str(e))
-            components = []
-        
-        # 3. 全景视图生成（带异常处理）
-        if progress_callback:
-            await progress_callback(75, "处理架构文档（步骤3/5：生成架构视图）...")
-        try:
-            architecture_view = await ArchitectureProcessor._generate_architecture_view(content, segments, components)
-        except Exception as e:
-            logger.error("全景视图生成失败，使用默认值", error=str(e))
-            architecture_view = "系统架构视图生成失败，请查看原始文档。"
-        
-        # 4. 白话串讲（带异常处理）
-        if progress_callback:
-            await progress_callback(80, "处理架构文档（步骤4/5：生成白话解释）...")
-        try:
-            plain_explanation = await ArchitectureProcessor._generate_plain_explanation(content, segments)
-        except Exception as e:
-            logger.error("白话串讲生成失败，使用默认值", error=str(e))
-            plain_explanation = "白话解释生成失败，请查看原始文档。"
+        # 1-6. 按依赖关系并发执行子步骤（带异常处理）
+        # 白话串讲不依赖其他步骤；架构视图和技术栈提取只依赖组件识别；检查清单只依赖配置流程
+        steps = [
+            ProcessingStep(
+                "config_steps",
+                lambda: ArchitectureProcessor._extract_config_steps(content, segments),
+                fallback=lambda: [],
+                description="配置流程提取"
+            ),
+            ProcessingStep(
+                "components",
+                lambda: ArchitectureProcessor._identify_components(content, segments),
+                fallback=lambda: [],
+                description="组件识别"
+            ),
+            ProcessingStep(
+                "architecture_view",
+                lambda components: ArchitectureProcessor._generate_architecture_view(content, segments, components),
+                depends_on=("components",),
+                fallback=lambda: "系统架构视图生成失败，请查看原始文档。",
+                description="全景视图生成"
+            ),
+            ProcessingStep(
+                "plain_explanation",
+                lambda: ArchitectureProcessor._generate_plain_explanation(content, segments),
+                fallback=lambda: "白话解释生成失败，请查看原始文档。",
+                description="白话串讲生成"
+            ),
+            ProcessingStep(
+                "checklist",
+                lambda config_steps: ArchitectureProcessor._generate_checklist(content, segments, config_steps),
+                depends_on=("config_steps",),
+                fallback=lambda: {
+                    "items": [],
+                    "confidence": None,
+                    "confidence_label": None,
+                    "sources": []
+                },
+                description="检查清单生成"
+            ),
+            ProcessingStep(
+                "related_technologies",
+                lambda components: ArchitectureProcessor._extract_related_technologies(content, segments, components),
+                depends_on=("components",),
+                fallback=lambda: {
+                    "technologies": [],
+                    "confidence": None,
+                    "confidence_label": None,
+                    "sources": []
+                },
+                description="技术栈提取"
+            )
+        ]
         
-        # 5. 配置检查清单（带异常处理）
-        if progress_callback:
-            await progress_callback(85, "处理架构文档（步骤5/5：生成检查清单）...")
-        try:
-            checklist = await ArchitectureProcessor._generate_checklist(content, segments, config_steps)
-        except Exception as e:
-            logger.error("检查清单生成失败，使用默认值", error=str(e))
-            checklist = {
-                "items": [],
-                "confidence": None,
-                "confidence_label": None,
-                "sources": []
-            }
+        async def on_step_complete(step: ProcessingStep, completed: int, total: int):
+            """按分支完成情况报告进度（65%-88%）"""
+            if progress_callback:
+                progress = ArchitectureProcessor.PROGRESS_START + int(
+                    (ArchitectureProcessor.PROGRESS_END - ArchitectureProcessor.PROGRESS_START) * completed / total
+                )
+                await progress_callback(progress, f"处理架构文档（{completed}/{total}：{step.description}完成）...")
         
-        # 6. 提取相关技术栈（带异常处理）
         if progress_callback:
-            await progress_callback(88, "处理架构文档（提取技术栈）...")
-        try:
-            related_technologies = await ArchitectureProcessor._extract_related_technologies(content, segments, components)
-        except Exception as e:
-            logger.error("技术栈提取失败，使用默认值", error=str(e))
-            related_technologies = {
-                "technologies": [],
-                "confidence": None,
-                "confidence_label": None,
-                "sources": []
-            }
+            await progress_callback(
+                ArchitectureProcessor.PROGRESS_START,
+                f"处理架构文档（0/{len(steps)}：并行处理中）..."
+            )
+        step_results = await StepScheduler(steps, on_step_complete=on_step_complete).run()
+        config_steps = step_results["config_steps"]
+        components = step_results["components"]
+        architecture_view = step_results["architecture_view"]
+        plain_explanation = step_results["plain_explanation"]
+        checklist = step_results["checklist"]
+        related_technologies = step_results["related_technologies"]
         
         result = {
             "config_steps": config_steps,
@@ -217,7 +237,8 @@ class ArchitectureProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                require_confidence=False  # 弱展示，不强制要求
+                require_confidence=False,  # 弱展示，不强制要求
+                retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["config_steps"]
             )
             
             # 确保返回列表格式
@@ -329,7 +350,8 @@ class ArchitectureProcessor:
                         segments=segments,
                         system_prompt="你是一个系统架构专家，必须提取至少10个实际配置步骤，不要只提取背景介绍。",
                         temperature=0.2,  # 降低温度，更确定性
-                        require_confidence=False  # 弱展示
+                        require_confidence=False,  # 弱展示
+                        retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["config_steps"]
                     )
                     
                     # 验证二次提取结果
@@ -503,7 +525,8 @@ class ArchitectureProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                require_confidence=False  # 弱展示
+                require_confidence=False,  # 弱展示
+                retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["components"]
             )
             
             # 确保返回列表格式
@@ -640,7 +663,8 @@ class ArchitectureProcessor:
                         segments=segments,
                         system_prompt="你是一个系统架构专家，必须识别至少5个组件，不要只识别基础设施组件。",
                         temperature=0.2,  # 降低温度，更确定性
-                        require_confidence=False  # 弱展示
+                        require_confidence=False,  # 弱展示
+                        retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["components"]
                     )
                     
                     # 验证二次识别结果
@@ -1027,7 +1051,8 @@ graph TB
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.4,
-                require_confidence=False  # 弱展示
+                require_confidence=False,  # 弱展示
+                retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["checklist"]
             )
             
             # 提取checklist列表
@@ -1129,7 +1154,8 @@ graph TB
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                require_confidence=False  # 弱展示
+                require_confidence=False,  # 弱展示
+                retrieval_query=ArchitectureProcessor.RETRIEVAL_QUERIES["related_technologies"]
             )
             
             # 提取technologies列表
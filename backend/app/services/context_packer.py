@@ -0,0 +1,194 @@
+"""
+上下文打包服务 - 按相关性为AI子步骤选取文档段落
+- 文档段落只向量化一次（按段落内容缓存），各子步骤复用
+- 按子步骤的检索问题对段落排序，在token预算内选取top-k段落
+- 选中的段落按原文顺序排列，保留原段落编号，source_ids仍可解析
+- 向量化不可用时退化为字符二元组的词面匹配
+"""
+from typing import Dict, List, Optional
+from array import array
+from collections import OrderedDict
+import asyncio
+import hashlib
+import math
+import structlog
+
+from app.core.config import settings
+from app.services.ai_rate_limiter import AIRateLimiter
+
+logger = structlog.get_logger()
+
+
+class _VectorMemo:
+    """
+    段落向量的进程内LRU缓存（按内容哈希存取）
+    
+    向量以float32数组保存，按占用字节数（AI_CONTEXT_VECTOR_MEMO_MB）淘汰最久未使用的条目
+    """
+    
+    def __init__(self):
+        self._vectors: "OrderedDict[str, array]" = OrderedDict()
+        self.nbytes = 0
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._vectors
+    
+    def __len__(self) -> int:
+        return len(self._vectors)
+    
+    def get(self, key: str) -> Optional[array]:
+        vector = self._vectors.get(key)
+        if vector is not None:
+            self._vectors.move_to_end(key)
+        return vector
+    
+    def put(self, key: str, embedding: List[float]) -> array:
+        vector = array("f", embedding)
+        old = self._vectors.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.itemsize * len(old)
+        self._vectors[key] = vector
+        self.nbytes += vector.itemsize * len(vector)
+        
+        max_bytes = settings.AI_CONTEXT_VECTOR_MEMO_MB * 1024 * 1024
+        while self.nbytes > max_bytes and len(self._vectors) > 1:
+            _, evicted = self._vectors.popitem(last=False)
+            self.nbytes -= evicted.itemsize * len(evicted)
+        return vector
+
+
+class ContextPacker:
+    """
+    上下文打包器
+    
+    文档总token数不超过预算时原样返回全部段落，只有长文档才做检索
+    """
+    
+    # 每个段落在prompt中的格式开销（"[段落N] " 和段落间空行）
+    SEGMENT_OVERHEAD_TOKENS = 6
+    
+    _vector_memo = _VectorMemo()
+    _pending: Dict[str, asyncio.Task] = {}
+    
+    @classmethod
+    def estimate_tokens(cls, segment: Dict) -> int:
+        """预估段落在prompt中占用的token数"""
+        return int(math.ceil(len(segment.get("text") or "") * AIRateLimiter.TOKENS_PER_CHAR)) + cls.SEGMENT_OVERHEAD_TOKENS
+    
+    @classmethod
+    async def select_segments(
+        cls,
+        segments: List[Dict],
+        query: str,
+        token_budget: Optional[int] = None,
+        top_k: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        选取与检索问题最相关的段落
+        
+        Args:
+            segments: 全部段落
+            query: 子步骤的检索问题
+            token_budget: 段落内容的token预算，如果为None则从配置读取
+            top_k: 最多选取的段落数，如果为None则从配置读取
+        
+        Returns:
+            选中的段落（原段落对象，按原文顺序）；未超出预算时返回全部段落
+        """
+        token_budget = token_budget or settings.AI_CONTEXT_TOKEN_BUDGET
+        top_k = top_k or settings.AI_CONTEXT_TOP_K
+        
+        costs = [cls.estimate_tokens(segment) for segment in segments]
+        total_tokens = sum(costs)
+        if total_tokens <= token_budget and len(segments) <= top_k:
+            return segments
+        
+        scores = await cls._score_segments(segments, query)
+        ranked = sorted(range(len(segments)), key=lambda i: scores[i], reverse=True)
+        
+        selected = []
+        used_tokens = 0
+        for index in ranked:
+            if len(selected) >= top_k:
+                break
+            if used_tokens + costs[index] > token_budget:
+                continue
+            selected.append(index)
+            used_tokens += costs[index]
+        selected.sort()
+        
+        logger.info(
+            "按相关性选取段落",
+            total_segments=len(segments),
+            selected_segments=len(selected),
+            total_tokens=total_tokens,
+            selected_tokens=used_tokens,
+            token_budget=token_budget
+        )
+        return [segments[i] for i in selected]
+    
+    @classmethod
+    async def _score_segments(cls, segments: List[Dict], query: str) -> List[float]:
+        """计算各段落与检索问题的相关性（优先向量余弦相似度，否则词面匹配）"""
+        texts = [segment.get("text") or "" for segment in segments]
+        # 段落和检索问题分开向量化，使并发的子步骤能共用同一次段落向量化
+        vectors = await cls._embed_texts(texts)
+        query_vector = (await cls._embed_texts([query]))[0]
+        if query_vector is not None and all(v is not None for v in vectors):
+            return [cls._cosine(vector, query_vector) for vector in vectors]
+        
+        logger.debug("向量化不可用，使用词面匹配选取段落")
+        return cls._lexical_scores(texts, query)
+    
+    @classmethod
+    async def _embed_texts(cls, texts: List[str]) -> List[Optional[array]]:
+        """向量化文本（按内容缓存；并发的子步骤共用同一次向量化）"""
+        keys = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        # 已缓存的向量先取出，之后的向量化淘汰旧条目时不受影响
+        vectors = [cls._vector_memo.get(key) for key in keys]
+        missing = list({key: text for key, text, vector in zip(keys, texts, vectors) if vector is None}.items())
+        
+        if missing:
+            batch_key = hashlib.sha256("\0".join(key for key, _ in missing).encode("utf-8")).hexdigest()
+            task = cls._pending.get(batch_key)
+            if task is None or task.get_loop() is not asyncio.get_running_loop():
+                task = asyncio.ensure_future(cls._embed_missing(missing))
+                cls._pending[batch_key] = task
+                task.add_done_callback(lambda _: cls._pending.pop(batch_key, None))
+            embedded = await asyncio.shield(task)
+            vectors = [vector if vector is not None else embedded.get(key) for key, vector in zip(keys, vectors)]
+        return vectors
+    
+    @classmethod
+    async def _embed_missing(cls, missing: List[tuple]) -> Dict[str, array]:
+        """向量化未缓存的文本，返回{内容哈希: 向量}（向量化失败的不包含在内）"""
+        from app.services.embedding_service import get_embedding_service
+        
+        embeddings = await get_embedding_service().generate_embeddings_batch([text for _, text in missing])
+        embedded = {}
+        for (key, _), embedding in zip(missing, embeddings):
+            # 向量化失败（服务暂时不可用）不缓存，下次重新向量化
+            if embedding is not None:
+                embedded[key] = cls._vector_memo.put(key, embedding)
+        return embedded
+    
+    @staticmethod
+    def _cosine(a: List[float], b: List[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+    
+    @staticmethod
+    def _bigrams(text: str) -> set:
+        text = "".join(text.lower().split())
+        return {text[i:i + 2] for i in range(len(text) - 1)}
+    
+    @classmethod
+    def _lexical_scores(cls, texts: List[str], query: str) -> List[float]:
+        """词面匹配得分：与检索问题共有的字符二元组数，按段落长度归一化"""
+        query_bigrams = cls._bigrams(query)
+        scores = []
+        for text in texts:
+            bigrams = cls._bigrams(text)
+            scores.append(len(bigrams & query_bigrams) / math.sqrt(len(bigrams) + 1))
+        return scores
@@ -0,0 +1,245 @@
+"""
+文档去重服务 - 基于内容指纹复用已处理文档的结果
+"""
+from typing import Optional, Dict, List, Any
+import hashlib
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.models.document import Document
+from app.models.document_type import DocumentType
+from app.models.intermediate_result import DocumentIntermediateResult
+from app.models.processing_result import ProcessingResult
+from app.models.system_learning_data import SystemLearningData
+from app.models.document_segment_embedding import DocumentSegmentEmbedding
+from app.services.document_technology_service import DocumentTechnologyService
+
+logger = structlog.get_logger()
+
+
+class DocumentDedupService:
+    """
+    文档去重服务
+    
+    - 内容指纹：原始文件字节的SHA-256（与文件名、文档ID无关）
+    - 相同指纹且已完成处理的文档，直接复制其中间结果、类型识别结果、各视角结果和学习数据，
+      不再重复提取内容和调用AI
+    """
+    
+    _chunk_size = 1024 * 1024
+    
+    @staticmethod
+    def compute_content_hash(file_content: bytes) -> str:
+        """
+        计算文件内容指纹
+        
+        Args:
+            file_content: 文件原始字节
+        
+        Returns:
+            SHA-256十六进制字符串
+        """
+        return hashlib.sha256(file_content).hexdigest()
+    
+    @classmethod
+    def compute_file_hash(cls, file_path: str) -> str:
+        """
+        计算已保存文件的内容指纹（分块读取，用于上传时未记录指纹的旧文档）
+        
+        Args:
+            file_path: 文件路径
+        
+        Returns:
+            SHA-256十六进制字符串
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls._chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    async def find_completed_duplicate(document: Document, db: AsyncSession) -> Optional[Document]:
+        """
+        查找内容相同且已完成处理的文档
+        
+        Args:
+            document: 当前文档（需已设置content_hash）
+            db: 数据库会话
+        
+        Returns:
+            最近完成的相同内容文档，不存在则返回None
+        """
+        if not document.content_hash:
+            return None
+        
+        result = await db.execute(
+            select(Document)
+            .where(Document.content_hash == document.content_hash)
+            .where(Document.id != document.id)
+            .where(Document.status == "completed")
+            .order_by(Document.updated_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    @staticmethod
+    async def clone_results(
+        source: Document,
+        target: Document,
+        db: AsyncSession,
+        required_views: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        将源文档的处理结果复制到目标文档
+        
+        Args:
+            source: 已完成处理的源文档
+            target: 目标文档
+            db: 数据库会话
+            required_views: 用户指定的视角（源文档的启用视角不包含这些视角时不复用）
+        
+        Returns:
+            复制结果 {detected_type, primary_view, enabled_views, cloned_views, missing_views,
+            preprocessed_content, segments}；源文档结果不完整或视角不满足时返回None（不做任何修改）
+        """
+        doc_type_result = await db.execute(
+            select(DocumentType)
+            .where(DocumentType.document_id == source.id)
+            .order_by(DocumentType.detected_at.desc())
+            .limit(1)
+        )
+        source_type = doc_type_result.scalar_one_or_none()
+        
+        intermediate_result = await db.execute(
+            select(DocumentIntermediateResult)
+            .where(DocumentIntermediateResult.document_id == source.id)
+        )
+        source_intermediate = intermediate_result.scalar_one_or_none()
+        
+        views_result = await db.execute(
+            select(ProcessingResult).where(ProcessingResult.document_id == source.id)
+        )
+        source_views = list(views_result.scalars().all())
+        
+        if not source_type or not source_intermediate or not source_views:
+            logger.info("相同内容文档的结果不完整，不复用", source_document_id=str(source.id))
+            return None
+        
+        enabled_views = list(source_type.enabled_views or [source_type.primary_view])
+        primary_view = source_type.primary_view
+        if required_views:
+            # 用户指定的视角必须都是源文档启用过的视角，主视角按源文档的检测得分重新选择
+            if not set(required_views).issubset(enabled_views):
+                logger.info("用户指定的视角与相同内容文档不一致，不复用",
+                           source_document_id=str(source.id),
+                           required_views=required_views,
+                           source_views=enabled_views)
+                return None
+            scores = source_type.detection_scores or {}
+            enabled_views = list(required_views)
+            if primary_view not in enabled_views:
+                primary_view = max(enabled_views, key=lambda v: scores.get(v, 0.0))
+        
+        if primary_view not in {v.view for v in source_views}:
+            logger.info("相同内容文档缺少主视角结果，不复用",
+                       source_document_id=str(source.id),
+                       primary_view=primary_view)
+            return None
+        
+        target.content_extracted = source.content_extracted
+        
+        db.add(DocumentIntermediateResult(
+            document_id=target.id,
+            content=source_intermediate.content,
+            preprocessed_content=source_intermediate.preprocessed_content,
+            segments=source_intermediate.segments,
+            metadata_json={
+                **(source_intermediate.metadata_json or {}),
+                'filename': target.filename,
+                'deduplicated_from': str(source.id)
+            }
+        ))
+        
+        db.add(DocumentType(
+            document_id=target.id,
+            detected_type=source_type.detected_type,
+            primary_view=primary_view,
+            enabled_views=enabled_views,
+            detection_scores=source_type.detection_scores,
+            confidence=source_type.confidence,
+            detection_method=source_type.detection_method
+        ))
+        
+        cloned_views = []
+        for view_result in source_views:
+            if view_result.view not in enabled_views:
+                continue
+            db.add(ProcessingResult(
+                document_id=target.id,
+                view=view_result.view,
+                document_type=view_result.document_type,
+                result_data=view_result.result_data,
+                is_primary=view_result.view == primary_view,
+                processing_time=view_result.processing_time
+            ))
+            await DocumentTechnologyService.save_for_view_safely(
+                db, target.id, view_result.view, view_result.document_type, view_result.result_data,
+                commit=False
+            )
+            cloned_views.append(view_result.view)
+        
+        learning_result = await db.execute(
+            select(SystemLearningData)
+            .where(SystemLearningData.document_id == source.id)
+            .order_by(SystemLearningData.created_at.desc())
+            .limit(1)
+        )
+        source_learning = learning_result.scalar_one_or_none()
+        if source_learning:
+            db.add(SystemLearningData(
+                document_id=target.id,
+                content_summary=source_learning.content_summary,
+                embedding=source_learning.embedding,
+                embedding_model=source_learning.embedding_model,
+                document_type=source_learning.document_type,
+                processing_result_summary=source_learning.processing_result_summary,
+                processing_time=source_learning.processing_time,
+                quality_score=source_learning.quality_score
+            ))
+        
+        chunk_result = await db.execute(
+            select(DocumentSegmentEmbedding)
+            .where(DocumentSegmentEmbedding.document_id == source.id)
+            .order_by(DocumentSegmentEmbedding.chunk_index)
+        )
+        for chunk in chunk_result.scalars().all():
+            db.add(DocumentSegmentEmbedding(
+                document_id=target.id,
+                chunk_index=chunk.chunk_index,
+                start_offset=chunk.start_offset,
+                end_offset=chunk.end_offset,
+                text=chunk.text,
+                embedding=chunk.embedding,
+                embedding_model=chunk.embedding_model
+            ))
+        
+        await db.flush()
+        
+        missing_views = [v for v in enabled_views if v not in cloned_views]
+        logger.info("已复用相同内容文档的处理结果",
+                   source_document_id=str(source.id),
+                   document_id=str(target.id),
+                   cloned_views=cloned_views,
+                   missing_views=missing_views)
+        
+        return {
+            'detected_type': source_type.detected_type,
+            'primary_view': primary_view,
+            'enabled_views': enabled_views,
+            'cloned_views': cloned_views,
+            'missing_views': missing_views,
+            'preprocessed_content': source_intermediate.preprocessed_content or source_intermediate.content,
+            'segments': source_intermediate.segments or []
+        }
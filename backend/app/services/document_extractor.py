@@ -4,22 +4,327 @@
 """
 import os
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Optional, Callable, AsyncIterator, List, Tuple
 import structlog
 
+from app.core.config import settings
+from app.services.extraction_executor import ExtractionExecutor, can_start_processes
+
 logger = structlog.get_logger()
 
 
+def _extract_pdf_page(pdf, index: int) -> str:
+    """提取已打开PDF的单页文本，并释放该页的解析缓存"""
+    page = pdf.pages[index]
+    try:
+        return page.extract_text() or ""
+    finally:
+        page.flush_cache()
+
+
+def _count_pdf_pages(file_path: str) -> int:
+    """获取PDF总页数（在进程池中执行）"""
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pdf_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """
+    提取PDF页码区间[start, end)的文本（在进程池中执行）
+    
+    单页失败时该页返回空字符串，不影响同一区间的其他页
+    """
+    import pdfplumber
+    texts = []
+    with pdfplumber.open(file_path) as pdf:
+        for index in range(start, end):
+            try:
+                texts.append(_extract_pdf_page(pdf, index))
+            except Exception:
+                texts.append("")
+    return texts
+
+
+def _parse_word(file_path: str) -> str:
+    """解析Word文档（在解析执行器中执行）"""
+    from docx import Document
+    
+    doc = Document(file_path)
+    content_parts = []
+    
+    # 提取段落
+    for paragraph in doc.paragraphs:
+        if paragraph.text.strip():
+            content_parts.append(paragraph.text)
+    
+    # 提取表格
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = " | ".join([cell.text.strip() for cell in row.cells])
+            if row_text.strip():
+                content_parts.append(row_text)
+    
+    return "\n".join(content_parts)
+
+
+def _parse_ppt(file_path: str) -> Tuple[str, int]:
+    """解析PPT文档（在解析执行器中执行），返回(内容, 幻灯片数)"""
+    from pptx import Presentation
+    
+    prs = Presentation(file_path)
+    content_parts = []
+    
+    for slide_num, slide in enumerate(prs.slides, 1):
+        slide_content = []
+        
+        # 提取幻灯片标题和内容
+        for shape in slide.shapes:
+            if hasattr(shape, "text") and shape.text.strip():
+                slide_content.append(shape.text.strip())
+        
+        if slide_content:
+            content_parts.append(f"--- 幻灯片 {slide_num} ---")
+            content_parts.extend(slide_content)
+            content_parts.append("")  # 空行分隔
+    
+    return "\n".join(content_parts), len(prs.slides)
+
+
+def _parse_markdown(file_path: str) -> Tuple[str, Optional[str]]:
+    """
+    解析Markdown文档（在解析执行器中执行）
+    
+    优先按UTF-8读取，失败时检测编码，返回(内容, 检测到的编码)，UTF-8读取成功时编码为None
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return f.read(), None
+    except UnicodeDecodeError:
+        import chardet
+        with open(file_path, 'rb') as f:
+            raw_data = f.read()
+            encoding = chardet.detect(raw_data)['encoding']
+        
+        with open(file_path, 'r', encoding=encoding) as f:
+            return f.read(), encoding
+
+
+def _parse_txt(file_path: str) -> Tuple[str, str]:
+    """解析TXT文档（在解析执行器中执行），返回(内容, 编码)"""
+    import chardet
+    
+    # 检测编码
+    with open(file_path, 'rb') as f:
+        raw_data = f.read()
+        encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
+    
+    # 读取内容
+    with open(file_path, 'r', encoding=encoding) as f:
+        return f.read(), encoding
+
+
 class DocumentExtractor:
     """文档内容提取器"""
     
     # 超时配置
     PDF_EXTRACTION_TIMEOUT = 120  # PDF提取总超时：2分钟
     PDF_PAGE_TIMEOUT = 5  # 单页提取超时：5秒
+    MAX_PDF_PAGE_TIMEOUTS = 3  # 单个文档最多超时页数（超过则不再提取剩余页面）
     MAX_PDF_PAGES = 500  # 最大处理页数（超过则截断）
     MAX_CONTENT_LENGTH = 400000  # 最大内容长度（40万字符，与文档大小验证器保持一致）
     
+    @classmethod
+    async def iter_pdf_pages(
+        cls,
+        file_path: str,
+        mode: Optional[str] = None
+    ) -> AsyncIterator[Tuple[int, int, str]]:
+        """
+        流式逐页提取PDF文本
+        
+        - thread模式（默认）：文件只打开一次，在该文档独占的线程中逐页提取，每页带超时保护
+        - process模式：按页码区间切分，每个区间在独立的子进程中多核并行提取，按页码顺序返回；
+          子进程在第一页返回前不可用时，按thread模式提取
+        
+        调用方提前停止迭代（如内容已超过上限）时，尚未开始的提取任务会被取消
+        
+        Args:
+            file_path: PDF文件路径
+            mode: 提取模式（thread/process），如果为None则从配置读取
+        
+        Yields:
+            (页码, 总页数, 页面文本)，提取失败或超时的页面文本为空字符串
+        """
+        mode = mode or settings.PDF_EXTRACTION_MODE
+        pages = None
+        if mode == ExtractionExecutor.MODE_PROCESS:
+            if not can_start_processes():
+                logger.warning("当前进程是守护进程，不能创建子进程，PDF按thread模式提取", file_path=file_path)
+            else:
+                executor = ExtractionExecutor.get_instance(ExtractionExecutor.MODE_PROCESS)
+                # 子进程无法创建时执行器已回退到线程池，此时按thread模式提取
+                if executor.mode == ExtractionExecutor.MODE_PROCESS:
+                    pages = cls._iter_pdf_pages_process(file_path, executor)
+        
+        if pages is not None:
+            yielded = False
+            # 显式关闭内层生成器，保证提前停止时其清理逻辑在当前任务中完成
+            try:
+                async for item in pages:
+                    yielded = True
+                    yield item
+                return
+            except (BrokenProcessPool, AssertionError) as e:
+                # 已返回部分页面时无法从头切换，交给调用方处理
+                if yielded:
+                    raise
+                logger.warning("PDF进程池提取失败，按thread模式提取", file_path=file_path, error=str(e))
+            finally:
+                await pages.aclose()
+        
+        pages = cls._iter_pdf_pages_thread(file_path)
+        try:
+            async for item in pages:
+                yield item
+        finally:
+            await pages.aclose()
+    
+    @classmethod
+    def _limit_pages(cls, file_path: str, total_pages: int) -> int:
+        """限制最大处理页数"""
+        if total_pages > cls.MAX_PDF_PAGES:
+            logger.warning(
+                "PDF页数过多，将截断处理",
+                file_path=file_path,
+                total_pages=total_pages,
+                max_pages=cls.MAX_PDF_PAGES
+            )
+            return cls.MAX_PDF_PAGES
+        return total_pages
+    
+    @staticmethod
+    def _discard_page_reader(pool: ThreadPoolExecutor, pdf) -> None:
+        """丢弃文档的提取线程：排队关闭文件（在仍在执行的页面之后），线程执行完后退出，不等待"""
+        if pdf is not None:
+            pool.submit(pdf.close)
+        pool.shutdown(wait=False)
+    
+    @classmethod
+    async def _iter_pdf_pages_thread(cls, file_path: str) -> AsyncIterator[Tuple[int, int, str]]:
+        """
+        thread模式：文件只打开一次，在该文档独占的单线程执行器中逐页提取
+        
+        超时的页面无法中断，仍占用线程和已打开的文件：丢弃该执行器，在新线程中重新打开文件
+        继续提取后面的页面，卡住的线程不会占用其他文档的提取线程；
+        同一文档超时MAX_PDF_PAGE_TIMEOUTS页后不再提取剩余页面，每个文档最多遗留这么多个线程
+        """
+        import pdfplumber
+        
+        loop = asyncio.get_running_loop()
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-extract")
+        pdf = None
+        try:
+            pdf = await loop.run_in_executor(pool, pdfplumber.open, file_path)
+            total_pages = cls._limit_pages(
+                file_path, await loop.run_in_executor(pool, lambda: len(pdf.pages))
+            )
+            timeouts = 0
+            for index in range(total_pages):
+                page_num = index + 1
+                try:
+                    page_text = await asyncio.wait_for(
+                        loop.run_in_executor(pool, _extract_pdf_page, pdf, index),
+                        timeout=cls.PDF_PAGE_TIMEOUT
+                    )
+                except asyncio.TimeoutError:
+                    timeouts += 1
+                    logger.warning(
+                        f"PDF第{page_num}页提取超时，跳过",
+                        file_path=file_path,
+                        page_num=page_num,
+                        timeout=cls.PDF_PAGE_TIMEOUT,
+                        timeouts=timeouts
+                    )
+                    page_text = ""
+                    cls._discard_page_reader(pool, pdf)
+                    pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-extract")
+                    pdf = None
+                    if timeouts >= cls.MAX_PDF_PAGE_TIMEOUTS:
+                        logger.warning(
+                            "PDF超时页数过多，停止提取剩余页面",
+                            file_path=file_path,
+                            processed_pages=page_num,
+                            total_pages=total_pages
+                        )
+                        yield page_num, total_pages, page_text
+                        return
+                    pdf = await loop.run_in_executor(pool, pdfplumber.open, file_path)
+                except Exception as e:
+                    logger.warning(
+                        f"PDF第{page_num}页提取失败，跳过",
+                        file_path=file_path,
+                        page_num=page_num,
+                        error=str(e)
+                    )
+                    page_text = ""
+                yield page_num, total_pages, page_text
+        finally:
+            cls._discard_page_reader(pool, pdf)
+    
+    @classmethod
+    async def _iter_pdf_pages_process(
+        cls,
+        file_path: str,
+        executor: ExtractionExecutor
+    ) -> AsyncIterator[Tuple[int, int, str]]:
+        """process模式：按页码区间在子进程中并行提取（同时运行的子进程数受执行器限制）"""
+        total_pages = await executor.run(_count_pdf_pages, file_path)
+        total_pages = cls._limit_pages(file_path, total_pages)
+        
+        pages_per_task = max(1, settings.PDF_PAGES_PER_TASK)
+        ranges = [
+            (start, min(start + pages_per_task, total_pages))
+            for start in range(0, total_pages, pages_per_task)
+        ]
+        tasks = [
+            asyncio.ensure_future(executor.run(
+                _extract_pdf_page_range, file_path, start, end,
+                timeout=cls.PDF_PAGE_TIMEOUT * (end - start)
+            ))
+            for start, end in ranges
+        ]
+        try:
+            for (start, end), task in zip(ranges, tasks):
+                try:
+                    texts = await task
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"PDF第{start + 1}-{end}页提取超时，跳过",
+                        file_path=file_path,
+                        timeout=cls.PDF_PAGE_TIMEOUT * (end - start)
+                    )
+                    texts = [""] * (end - start)
+                except (BrokenProcessPool, AssertionError):
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        f"PDF第{start + 1}-{end}页提取失败，跳过",
+                        file_path=file_path,
+                        error=str(e)
+                    )
+                    texts = [""] * (end - start)
+                for offset, page_text in enumerate(texts):
+                    yield start + offset + 1, total_pages, page_text
+        finally:
+            # 提前停止或出错时取消其余区间：未开始的不再启动，正在执行的只终止各自的子进程
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     @staticmethod
     async def extract_pdf(
         file_path: str, 
@@ -38,89 +343,40 @@ class DocumentExtractor:
             提取的文本内容
         """
         try:
-            import pdfplumber
-            import concurrent.futures
-            
             async def _extract_with_timeout():
                 content_parts = []
+                current_length = 0  # 累计内容长度（增量维护）
                 total_pages = 0
                 processed_pages = 0
                 
-                # 在线程池中执行同步的PDF操作
-                loop = asyncio.get_event_loop()
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    # 先获取总页数
-                    def get_page_count():
-                        with pdfplumber.open(file_path) as pdf:
-                            return len(pdf.pages)
-                    
-                    total_pages = await loop.run_in_executor(executor, get_page_count)
-                    
-                    if total_pages > DocumentExtractor.MAX_PDF_PAGES:
-                        logger.warning(
-                            "PDF页数过多，将截断处理",
-                            file_path=file_path,
-                            total_pages=total_pages,
-                            max_pages=DocumentExtractor.MAX_PDF_PAGES
-                        )
-                        total_pages = DocumentExtractor.MAX_PDF_PAGES
-                    
-                    # 分页提取，每页设置超时
-                    with pdfplumber.open(file_path) as pdf:
-                        for page_num, page in enumerate(pdf.pages[:total_pages], 1):
-                            # 检查总内容长度
-                            current_length = sum(len(part) for part in content_parts)
-                            if current_length > DocumentExtractor.MAX_CONTENT_LENGTH:
-                                logger.warning(
-                                    "PDF内容过长，提前截断",
-                                    file_path=file_path,
-                                    current_length=current_length,
-                                    max_length=DocumentExtractor.MAX_CONTENT_LENGTH,
-                                    processed_pages=processed_pages
-                                )
-                                break
-                            
-                            # 单页提取（带超时）
-                            def extract_page_text(p):
-                                return p.extract_text() or ""
-                            
+                pages = DocumentExtractor.iter_pdf_pages(file_path)
+                try:
+                    async for page_num, total_pages, page_text in pages:
+                        if page_text:
+                            content_parts.append(page_text)
+                            current_length += len(page_text)
+                        
+                        processed_pages += 1
+                        
+                        # 进度回调（异步）
+                        if progress_callback:
                             try:
-                                page_text = await asyncio.wait_for(
-                                    loop.run_in_executor(executor, extract_page_text, page),
-                                    timeout=DocumentExtractor.PDF_PAGE_TIMEOUT
-                                )
-                                
-                                if page_text:
-                                    content_parts.append(page_text)
-                                
-                                processed_pages += 1
-                                
-                                # 进度回调（异步）
-                                if progress_callback:
-                                    try:
-                                        await progress_callback(processed_pages, total_pages)
-                                    except Exception:
-                                        pass  # 忽略回调错误
-                                
-                            except asyncio.TimeoutError:
-                                logger.warning(
-                                    f"PDF第{page_num}页提取超时，跳过",
-                                    file_path=file_path,
-                                    page_num=page_num,
-                                    timeout=DocumentExtractor.PDF_PAGE_TIMEOUT
-                                )
-                                # 跳过超时的页面，继续处理下一页
-                                processed_pages += 1
-                                continue
-                            except Exception as e:
-                                logger.warning(
-                                    f"PDF第{page_num}页提取失败，跳过",
-                                    file_path=file_path,
-                                    page_num=page_num,
-                                    error=str(e)
-                                )
-                                processed_pages += 1
-                                continue
+                                await progress_callback(processed_pages, total_pages)
+                            except Exception:
+                                pass  # 忽略回调错误
+                        
+                        # 检查总内容长度
+                        if current_length > DocumentExtractor.MAX_CONTENT_LENGTH:
+                            logger.warning(
+                                "PDF内容过长，提前截断",
+                                file_path=file_path,
+                                current_length=current_length,
+                                max_length=DocumentExtractor.MAX_CONTENT_LENGTH,
+                                processed_pages=processed_pages
+                            )
+                            break
+                finally:
+                    await pages.aclose()
                 
                 content = "\n\n".join(content_parts)
                 logger.info(
@@ -135,7 +391,7 @@ class DocumentExtractor:
             # 执行提取，带总超时保护
             content = await asyncio.wait_for(_extract_with_timeout(), timeout=timeout)
             return content
-            
+        
         except asyncio.TimeoutError:
             logger.error(
                 "PDF提取总超时",
@@ -151,27 +407,10 @@ class DocumentExtractor:
     async def extract_word(file_path: str) -> str:
         """提取Word文档内容"""
         try:
-            from docx import Document
-            
-            doc = Document(file_path)
-            content_parts = []
-            
-            # 提取段落
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    content_parts.append(paragraph.text)
-            
-            # 提取表格
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = " | ".join([cell.text.strip() for cell in row.cells])
-                    if row_text.strip():
-                        content_parts.append(row_text)
-            
-            content = "\n".join(content_parts)
+            content = await ExtractionExecutor.get_instance().run(_parse_word, file_path)
             logger.info("Word内容提取成功", file_path=file_path)
             return content
-            
+        
         except Exception as e:
             logger.error("Word提取失败", file_path=file_path, error=str(e))
             raise Exception(f"Word内容提取失败: {str(e)}")
@@ -180,28 +419,10 @@ class DocumentExtractor:
     async def extract_ppt(file_path: str) -> str:
         """提取PPT文档内容"""
         try:
-            from pptx import Presentation
-            
-            prs = Presentation(file_path)
-            content_parts = []
-            
-            for slide_num, slide in enumerate(prs.slides, 1):
-                slide_content = []
-                
-                # 提取幻灯片标题和内容
-                for shape in slide.shapes:
-                    if hasattr(shape, "text") and shape.text.strip():
-                        slide_content.append(shape.text.strip())
-                
-                if slide_content:
-                    content_parts.append(f"--- 幻灯片 {slide_num} ---")
-                    content_parts.extend(slide_content)
-                    content_parts.append("")  # 空行分隔
-            
-            content = "\n".join(content_parts)
-            logger.info("PPT内容提取成功", file_path=file_path, slides=len(prs.slides))
+            content, slides = await ExtractionExecutor.get_instance().run(_parse_ppt, file_path)
+            logger.info("PPT内容提取成功", file_path=file_path, slides=slides)
             return content
-            
+        
         except Exception as e:
             logger.error("PPT提取失败", file_path=file_path, error=str(e))
             raise Exception(f"PPT内容提取失败: {str(e)}")
@@ -210,28 +431,13 @@ class DocumentExtractor:
     async def extract_markdown(file_path: str) -> str:
         """提取Markdown文档内容"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            logger.info("Markdown内容提取成功", file_path=file_path)
-            return content
-            
-        except UnicodeDecodeError:
-            # 尝试其他编码
-            try:
-                import chardet
-                with open(file_path, 'rb') as f:
-                    raw_data = f.read()
-                    encoding = chardet.detect(raw_data)['encoding']
-                
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                
+            content, encoding = await ExtractionExecutor.get_instance().run(_parse_markdown, file_path)
+            if encoding:
                 logger.info("Markdown内容提取成功（检测编码）", file_path=file_path, encoding=encoding)
-                return content
-            except Exception as e:
-                logger.error("Markdown提取失败", file_path=file_path, error=str(e))
-                raise Exception(f"Markdown内容提取失败: {str(e)}")
+            else:
+                logger.info("Markdown内容提取成功", file_path=file_path)
+            return content
+        
         except Exception as e:
             logger.error("Markdown提取失败", file_path=file_path, error=str(e))
             raise Exception(f"Markdown内容提取失败: {str(e)}")
@@ -240,20 +446,10 @@ class DocumentExtractor:
     async def extract_txt(file_path: str) -> str:
         """提取TXT文档内容"""
         try:
-            import chardet
-            
-            # 检测编码
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-                encoding = chardet.detect(raw_data)['encoding'] or 'utf-8'
-            
-            # 读取内容
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-            
+            content, encoding = await ExtractionExecutor.get_instance().run(_parse_txt, file_path)
             logger.info("TXT内容提取成功", file_path=file_path, encoding=encoding)
             return content
-            
+        
         except Exception as e:
             logger.error("TXT提取失败", file_path=file_path, error=str(e))
             raise Exception(f"TXT内容提取失败: {str(e)}")
@@ -0,0 +1,268 @@
+"""
+相似文档邻居服务 - 预先计算每个文档的前K个最相似文档
+- 文档完成处理时增量更新：HNSW检索新文档的近邻写入其邻居列表，
+  同时把新文档插入这些近邻的列表（超过K个时淘汰最不相似的）
+- 批量重建：对所有文档重新检索并覆盖邻居列表（修正增量更新的近似误差，补齐删除文档后的空缺）
+- 读取：一次联表查询按相似度取前N个邻居及文档信息，耗时与文档总数无关
+"""
+from typing import List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.core.config import settings
+from app.models.document_neighbor import DocumentNeighbor
+from app.models.embedding_vector import storage_model_name, vector_sql_type
+from app.models.system_learning_data import SystemLearningData
+
+logger = structlog.get_logger()
+
+# 邻居及其文档信息（neighbors为(neighbor_id, similarity)子查询，由调用方提供）
+_NEIGHBOR_DETAILS_SQL = """
+    WITH neighbors AS ({neighbors})
+    SELECT
+        n.neighbor_id AS document_id,
+        n.similarity,
+        d.filename,
+        d.file_type,
+        d.upload_time,
+        d.status,
+        sld.content_summary,
+        sld.document_type,
+        sld.quality_score
+    FROM neighbors n
+    JOIN documents d ON d.id = n.neighbor_id
+    LEFT JOIN LATERAL (
+        SELECT content_summary, document_type, quality_score
+        FROM system_learning_data
+        WHERE document_id = n.neighbor_id
+        ORDER BY created_at DESC
+        LIMIT 1
+    ) sld ON true
+    ORDER BY n.similarity DESC
+"""
+
+
+class DocumentNeighborService:
+    """相似文档邻居服务"""
+    
+    @staticmethod
+    def _to_vector_literal(embedding) -> str:
+        """向量转换为pgvector文本格式"""
+        return '[' + ','.join(map(str, list(embedding))) + ']'
+    
+    @staticmethod
+    async def _get_embedding(db: AsyncSession, document_id: UUID) -> Optional[str]:
+        """获取文档最新的向量（pgvector文本格式），没有向量时返回None"""
+        result = await db.execute(
+            select(SystemLearningData.embedding)
+            .where(SystemLearningData.document_id == document_id)
+            .where(SystemLearningData.embedding.isnot(None))
+            .where(SystemLearningData.embedding_model == storage_model_name())
+            .order_by(SystemLearningData.created_at.desc())
+            .limit(1)
+        )
+        embedding = result.scalar_one_or_none()
+        if embedding is None:
+            return None
+        return DocumentNeighborService._to_vector_literal(embedding)
+    
+    @staticmethod
+    async def search_nearest(
+        db: AsyncSession,
+        document_id: UUID,
+        embedding: str,
+        limit: int
+    ) -> List[Tuple[UUID, float]]:
+        """
+        HNSW检索最相似的文档
+        
+        Args:
+            db: 数据库会话
+            document_id: 文档ID（结果中排除自身）
+            embedding: 文档向量（pgvector文本格式）
+            limit: 返回数量
+        
+        Returns:
+            [(文档ID, 相似度)]，按相似度降序，每个文档只出现一次
+        """
+        from app.services.recommendation_service import RecommendationService
+        
+        await RecommendationService.configure_ann_search(db, limit)
+        vector_type = vector_sql_type()
+        result = await db.execute(text(f"""
+            SELECT sld.document_id, 1 - (sld.embedding <=> CAST(:embedding AS {vector_type})) AS similarity
+            FROM system_learning_data sld
+            WHERE sld.document_id != :document_id
+              AND sld.embedding IS NOT NULL
+              AND sld.embedding_model = :embedding_model
+            ORDER BY sld.embedding <=> CAST(:embedding AS {vector_type})
+            LIMIT :limit
+        """), {
+            "embedding": embedding,
+            "document_id": document_id,
+            "embedding_model": storage_model_name(),
+            "limit": limit
+        })
+        
+        # 同一文档可能有多条学习数据（重新处理），只保留最相似的一条
+        nearest = {}
+        for row in result.fetchall():
+            if row.document_id not in nearest:
+                nearest[row.document_id] = float(row.similarity)
+        return list(nearest.items())
+    
+    @staticmethod
+    async def replace_neighbors(
+        db: AsyncSession,
+        document_id: UUID,
+        neighbors: List[Tuple[UUID, float]]
+    ) -> None:
+        """覆盖文档的邻居列表"""
+        await db.execute(delete(DocumentNeighbor).where(DocumentNeighbor.document_id == document_id))
+        if neighbors:
+            await db.execute(insert(DocumentNeighbor).values([
+                {"document_id": document_id, "neighbor_id": neighbor_id, "similarity": similarity}
+                for neighbor_id, similarity in neighbors
+            ]))
+    
+    @staticmethod
+    async def update_for_document(db: AsyncSession, document_id: UUID) -> int:
+        """
+        文档完成处理后增量更新邻居表（调用方负责提交）
+        
+        - 新文档的邻居列表：HNSW检索的前K个
+        - 反向插入：新文档插入检索到的近邻（前2K个）的邻居列表，超过K个时淘汰最不相似的；
+          余弦相似度对称，直接复用检索得到的相似度
+        
+        Returns:
+            新文档的邻居数量（文档没有向量时为0）
+        """
+        k = settings.DOCUMENT_NEIGHBORS_K
+        embedding = await DocumentNeighborService._get_embedding(db, document_id)
+        if embedding is None:
+            return 0
+        
+        nearest = await DocumentNeighborService.search_nearest(db, document_id, embedding, k * 2)
+        await DocumentNeighborService.replace_neighbors(db, document_id, nearest[:k])
+        
+        if nearest:
+            statement = insert(DocumentNeighbor).values([
+                {"document_id": neighbor_id, "neighbor_id": document_id, "similarity": similarity}
+                for neighbor_id, similarity in nearest
+            ])
+            await db.execute(statement.on_conflict_do_update(
+                index_elements=[DocumentNeighbor.document_id, DocumentNeighbor.neighbor_id],
+                set_={"similarity": statement.excluded.similarity, "updated_at": statement.excluded.updated_at}
+            ))
+            # 淘汰超出K个的最不相似邻居
+            await db.execute(text("""
+                DELETE FROM document_neighbors dn
+                USING (
+                    SELECT document_id, neighbor_id,
+                           row_number() OVER (PARTITION BY document_id ORDER BY similarity DESC) AS position
+                    FROM document_neighbors
+                    WHERE document_id = ANY(:document_ids)
+                ) ranked
+                WHERE dn.document_id = ranked.document_id
+                  AND dn.neighbor_id = ranked.neighbor_id
+                  AND ranked.position > :k
+            """), {"document_ids": [neighbor_id for neighbor_id, _ in nearest], "k": k})
+        
+        logger.info("相似文档邻居已更新", document_id=str(document_id),
+                    neighbors=len(nearest[:k]), reverse_candidates=len(nearest))
+        return len(nearest[:k])
+    
+    @staticmethod
+    async def rebuild(db: AsyncSession, batch_size: int = 200) -> int:
+        """
+        批量重建所有文档的邻居列表（每批提交一次）
+        
+        Returns:
+            重建的文档数量
+        """
+        k = settings.DOCUMENT_NEIGHBORS_K
+        total = 0
+        last_id = None
+        while True:
+            query = (
+                select(SystemLearningData.document_id)
+                .where(SystemLearningData.embedding.isnot(None))
+                .where(SystemLearningData.embedding_model == storage_model_name())
+                .distinct()
+                .order_by(SystemLearningData.document_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(SystemLearningData.document_id > last_id)
+            document_ids = (await db.execute(query)).scalars().all()
+            if not document_ids:
+                break
+            
+            for document_id in document_ids:
+                embedding = await DocumentNeighborService._get_embedding(db, document_id)
+                nearest = await DocumentNeighborService.search_nearest(db, document_id, embedding, k)
+                await DocumentNeighborService.replace_neighbors(db, document_id, nearest)
+            await db.commit()
+            
+            total += len(document_ids)
+            last_id = document_ids[-1]
+            logger.info("相似文档邻居重建进度", rebuilt=total)
+        return total
+    
+    @staticmethod
+    async def get_neighbors(db: AsyncSession, document_id: UUID, limit: int) -> list:
+        """
+        读取预先计算的邻居及其文档信息（一次联表查询，按相似度降序）
+        
+        Returns:
+            记录列表（document_id, similarity, filename, file_type, upload_time, status,
+            content_summary, document_type, quality_score）；邻居列表尚未生成时为空
+        """
+        neighbors = """
+            SELECT neighbor_id, similarity
+            FROM document_neighbors
+            WHERE document_id = :document_id
+            ORDER BY similarity DESC
+            LIMIT :limit
+        """
+        result = await db.execute(
+            text(_NEIGHBOR_DETAILS_SQL.format(neighbors=neighbors)),
+            {"document_id": document_id, "limit": limit}
+        )
+        return result.fetchall()
+    
+    @staticmethod
+    async def search_neighbors(db: AsyncSession, document_id: UUID, embedding, limit: int) -> list:
+        """
+        实时检索邻居及其文档信息（邻居列表尚未生成时使用，返回格式与get_neighbors相同）
+        
+        Args:
+            embedding: 文档向量
+        """
+        from app.services.recommendation_service import RecommendationService
+        
+        await RecommendationService.configure_ann_search(db, limit)
+        vector_type = vector_sql_type()
+        neighbors = f"""
+            SELECT sld.document_id AS neighbor_id,
+                   1 - (sld.embedding <=> CAST(:embedding AS {vector_type})) AS similarity
+            FROM system_learning_data sld
+            WHERE sld.document_id != :document_id
+              AND sld.embedding IS NOT NULL
+              AND sld.embedding_model = :embedding_model
+            ORDER BY sld.embedding <=> CAST(:embedding AS {vector_type})
+            LIMIT :limit
+        """
+        result = await db.execute(
+            text(_NEIGHBOR_DETAILS_SQL.format(neighbors=neighbors)),
+            {
+                "embedding": DocumentNeighborService._to_vector_literal(embedding),
+                "document_id": document_id,
+                "embedding_model": storage_model_name(),
+                "limit": limit
+            }
+        )
+        return result.fetchall()
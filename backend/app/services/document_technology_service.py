@@ -0,0 +1,250 @@
+"""
+文档技术名词服务 - 视角结果保存时提取一次技术名词并写入document_technologies表
+- 保存：每个视角结果提取、标准化后覆盖该视角的技术名词
+- 补充：为已有处理结果批量提取（升级后运行一次）
+- 聚合：知识图谱按技术 GROUP BY 统计文档数和共同文档数，不读取结果JSONB，
+  返回行数只与技术数量有关
+"""
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import delete, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+import structlog
+
+from app.models.document_technology import DocumentTechnology
+from app.models.processing_result import ProcessingResult
+from app.services.view_registry import ViewRegistry
+
+logger = structlog.get_logger()
+
+# 技术名词列长度
+MAX_TECHNOLOGY_LENGTH = 100
+
+
+class DocumentTechnologyService:
+    """文档技术名词服务"""
+    
+    @staticmethod
+    async def extract_technologies(result_data: Dict, document_type: str) -> List[str]:
+        """
+        从一个视角的处理结果中提取标准化的技术名词
+        
+        Args:
+            result_data: 处理结果（result_data）
+            document_type: 处理结果的文档类型（兼容view名称）
+        
+        Returns:
+            去重后的技术名词列表（按名称排序）
+        """
+        from app.services.entity_extractor import EntityExtractor, get_entity_extractor
+        
+        processing_result = result_data if isinstance(result_data, dict) else {}
+        technologies = await get_entity_extractor().extract_technologies_from_result(processing_result)
+        
+        # 兼容处理：如果document_type是view名称，转换为类型
+        if document_type in ViewRegistry.TYPE_TO_VIEW_MAP.values():
+            document_type = ViewRegistry.get_type_mapping(document_type)
+        
+        # 架构文档：从组件名称和依赖中提取更多技术名词
+        if document_type == 'architecture' and isinstance(processing_result.get('components'), list):
+            for comp in processing_result['components']:
+                if isinstance(comp, dict) and 'name' in comp:
+                    comp_name = comp.get('name', '').strip()
+                    comp_deps = comp.get('dependencies', [])
+                    if comp_name and comp_deps:
+                        technologies.extend(EntityExtractor._extract_tech_from_text(comp_name))
+                        for dep in comp_deps:
+                            if isinstance(dep, str):
+                                technologies.extend(EntityExtractor._extract_tech_from_text(dep))
+        
+        # 去重并标准化：将 "MQ" 扩展为 "RocketMQ"（如果文档中提到 RocketMQ）
+        technologies = set(technologies)
+        if 'MQ' in technologies and 'RocketMQ' not in technologies:
+            if any('rocketmq' in tech.lower() or 'rocket' in tech.lower() for tech in technologies):
+                technologies.discard('MQ')
+                technologies.add('RocketMQ')
+        
+        return sorted(tech for tech in technologies if tech and len(tech) <= MAX_TECHNOLOGY_LENGTH)
+    
+    @staticmethod
+    async def save_for_view(
+        db: AsyncSession,
+        document_id: UUID,
+        view: str,
+        document_type: str,
+        result_data: Dict
+    ) -> List[str]:
+        """
+        提取并覆盖文档某个视角的技术名词（调用方负责提交）
+        
+        Returns:
+            保存的技术名词列表
+        """
+        document_id = UUID(document_id) if isinstance(document_id, str) else document_id
+        technologies = await DocumentTechnologyService.extract_technologies(result_data, document_type)
+        await db.execute(
+            delete(DocumentTechnology)
+            .where(DocumentTechnology.document_id == document_id)
+            .where(DocumentTechnology.view == view)
+        )
+        if technologies:
+            await db.execute(insert(DocumentTechnology).values([
+                {"document_id": document_id, "view": view, "document_type": document_type, "technology": tech}
+                for tech in technologies
+            ]))
+        return technologies
+    
+    @staticmethod
+    async def save_for_view_safely(
+        db: AsyncSession,
+        document_id: UUID,
+        view: str,
+        document_type: str,
+        result_data: Dict,
+        commit: bool = True
+    ) -> List[str]:
+        """
+        保存视角技术名词，失败时只记录警告（可稍后运行backfill补充）
+        
+        写入在保存点（SAVEPOINT）中执行，提取或写入失败只回滚技术名词，
+        不影响调用方事务中尚未提交的其他修改。
+        
+        Args:
+            commit: 是否在保存后提交事务（为False时由调用方提交）
+        
+        Returns:
+            保存的技术名词列表（失败时为空列表）
+        """
+        try:
+            async with db.begin_nested():
+                technologies = await DocumentTechnologyService.save_for_view(
+                    db, document_id, view, document_type, result_data
+                )
+            if commit:
+                await db.commit()
+            return technologies
+        except Exception as e:
+            if commit:
+                await db.rollback()
+            logger.warning(
+                "保存文档技术名词失败，可稍后批量补充",
+                error=str(e),
+                document_id=str(document_id),
+                view=view
+            )
+            return []
+    
+    @staticmethod
+    async def backfill(db: AsyncSession, batch_size: int = 200) -> int:
+        """
+        为所有已有处理结果提取技术名词（每批提交一次，可重复执行）
+        
+        Returns:
+            处理的结果数量
+        """
+        total = 0
+        last_id = None
+        while True:
+            query = (
+                select(
+                    ProcessingResult.id,
+                    ProcessingResult.document_id,
+                    ProcessingResult.view,
+                    ProcessingResult.document_type,
+                    ProcessingResult.result_data
+                )
+                .order_by(ProcessingResult.id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(ProcessingResult.id > last_id)
+            rows = (await db.execute(query)).fetchall()
+            if not rows:
+                break
+            
+            for row in rows:
+                await DocumentTechnologyService.save_for_view(
+                    db, row.document_id, row.view, row.document_type, row.result_data
+                )
+            await db.commit()
+            
+            total += len(rows)
+            last_id = rows[-1].id
+            logger.info("文档技术名词补充进度", processed=total)
+        return total
+    
+    @staticmethod
+    def _filters(document_type: Optional[str], document_id: Optional[UUID]) -> Tuple[str, Dict]:
+        """已完成文档的过滤条件（可选按文档类型、文档ID过滤）"""
+        conditions = ["d.status = 'completed'"]
+        params = {}
+        if document_type:
+            conditions.append("dt.document_type = :document_type")
+            params["document_type"] = document_type
+        if document_id:
+            conditions.append("dt.document_id = :document_id")
+            params["document_id"] = document_id
+        return " AND ".join(conditions), params
+    
+    @staticmethod
+    async def technology_frequencies(
+        db: AsyncSession,
+        document_type: Optional[str] = None,
+        document_id: Optional[UUID] = None
+    ) -> List[Tuple[str, int]]:
+        """
+        每个技术出现的文档数（同一文档的多个视角只计一次）
+        
+        Returns:
+            [(技术名词, 文档数)]，按技术名词排序
+        """
+        where, params = DocumentTechnologyService._filters(document_type, document_id)
+        result = await db.execute(text(f"""
+            SELECT dt.technology, COUNT(DISTINCT dt.document_id) AS documents
+            FROM document_technologies dt
+            JOIN documents d ON d.id = dt.document_id
+            WHERE {where}
+            GROUP BY dt.technology
+            ORDER BY dt.technology
+        """), params)
+        return [(row.technology, int(row.documents)) for row in result.fetchall()]
+    
+    @staticmethod
+    async def shared_document_counts(
+        db: AsyncSession,
+        techs: List[str],
+        document_type: Optional[str] = None,
+        document_id: Optional[UUID] = None
+    ):
+        """
+        指定技术两两之间的共同文档数（按技术对 GROUP BY，返回行数最多为技术对数量）
+        
+        Returns:
+            len(techs) x len(techs) 整数矩阵（对角线为该技术的文档数）
+        """
+        import numpy as np
+        
+        counts = np.zeros((len(techs), len(techs)), dtype=np.int64)
+        if not techs:
+            return counts
+        
+        where, params = DocumentTechnologyService._filters(document_type, document_id)
+        result = await db.execute(text(f"""
+            WITH docs AS (
+                SELECT DISTINCT dt.document_id, dt.technology
+                FROM document_technologies dt
+                JOIN documents d ON d.id = dt.document_id
+                WHERE {where} AND dt.technology = ANY(:techs)
+            )
+            SELECT a.technology AS source, b.technology AS target, COUNT(*) AS documents
+            FROM docs a
+            JOIN docs b ON b.document_id = a.document_id AND b.technology >= a.technology
+            GROUP BY a.technology, b.technology
+        """), {**params, "techs": list(techs)})
+        
+        positions = {tech: i for i, tech in enumerate(techs)}
+        for row in result.fetchall():
+            i, j = positions[row.source], positions[row.target]
+            counts[i, j] = counts[j, i] = int(row.documents)
+        return counts
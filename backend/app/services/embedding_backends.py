@@ -0,0 +1,245 @@
+"""
+嵌入模型推理后端
+- torch: sentence-transformers（PyTorch全精度，默认）
+- onnx: ONNX Runtime（FP32，不导入torch，启动更轻）
+- onnx_int8: ONNX Runtime + int8动态量化（CPU推理更快、内存更小）
+
+所有后端提供相同的 encode(texts, batch_size) 接口，返回与输入顺序对应的向量
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+import os
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+class EmbeddingBackend(ABC):
+    """嵌入模型推理后端基类（未实现全部抽象方法的子类无法实例化）"""
+    
+    name = ""
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+    
+    @classmethod
+    @abstractmethod
+    def is_available(cls) -> bool:
+        """后端依赖是否已安装"""
+    
+    @abstractmethod
+    def load(self) -> "EmbeddingBackend":
+        """加载模型（同步操作，调用方应在线程池中执行）"""
+    
+    @abstractmethod
+    def get_sentence_embedding_dimension(self) -> int:
+        """向量维度"""
+    
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32):
+        """批量向量化，返回与texts顺序对应的向量"""
+    
+    def count_tokens(self, texts: List[str]) -> Optional[List[int]]:
+        """每条文本的token数（不含首尾特殊token、不截断），后端不提供分词器时返回None"""
+        return None
+
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """sentence-transformers（PyTorch）后端"""
+    
+    name = "torch"
+    
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self._model = None
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import sentence_transformers  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    
+    def load(self) -> "SentenceTransformerBackend":
+        import sentence_transformers
+        self._model = sentence_transformers.SentenceTransformer(self.model_name)
+        return self
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._model.get_sentence_embedding_dimension()
+    
+    def encode(self, texts: List[str], batch_size: int = 32):
+        return self._model.encode(texts, batch_size=batch_size)
+    
+    def count_tokens(self, texts: List[str]) -> Optional[List[int]]:
+        tokenizer = getattr(self._model, "tokenizer", None)
+        if tokenizer is None:
+            return None
+        return [len(tokenizer.tokenize(text)) for text in texts]
+
+
+class OnnxBackend(EmbeddingBackend):
+    """
+    ONNX Runtime后端
+    
+    - 模型文件：EMBEDDING_ONNX_MODEL_PATH，未配置时从HuggingFace下载模型仓库中的 onnx/model.onnx
+    - 分词：tokenizers（Rust实现，不依赖torch），截断到EMBEDDING_MAX_SEQ_LENGTH
+    - 池化：按attention mask对token向量取平均（与sentence-transformers的Mean Pooling一致）
+    """
+    
+    name = "onnx"
+    
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self._session = None
+        self._tokenizer = None
+        self._counting_tokenizer = None
+        self._input_names: List[str] = []
+        self._dimension = 0
+    
+    @classmethod
+    def is_available(cls) -> bool:
+        try:
+            import onnxruntime  # noqa: F401
+            import tokenizers  # noqa: F401
+            return True
+        except ImportError:
+            return False
+    
+    def _resolve_model_path(self) -> str:
+        """获取FP32模型文件路径（本地配置优先，否则从模型仓库下载）"""
+        if settings.EMBEDDING_ONNX_MODEL_PATH:
+            return settings.EMBEDDING_ONNX_MODEL_PATH
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(self.model_name, "onnx/model.onnx")
+    
+    def _prepare_model_file(self) -> str:
+        return self._resolve_model_path()
+    
+    def load(self) -> "OnnxBackend":
+        import onnxruntime
+        from tokenizers import Tokenizer
+        
+        model_path = self._prepare_model_file()
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if settings.EMBEDDING_ONNX_THREADS > 0:
+            options.intra_op_num_threads = settings.EMBEDDING_ONNX_THREADS
+        self._session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [i.name for i in self._session.get_inputs()]
+        
+        self._tokenizer = Tokenizer.from_pretrained(self.model_name)
+        self._tokenizer.enable_truncation(max_length=settings.EMBEDDING_MAX_SEQ_LENGTH)
+        # padding必须使用模型自己的pad token（XLM-R类模型按pad id计算位置编码）
+        pad_token = next((t for t in ("<pad>", "[PAD]") if self._tokenizer.token_to_id(t) is not None), "[PAD]")
+        self._tokenizer.enable_padding(pad_id=self._tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        
+        self._dimension = len(self.encode(["warmup"])[0])
+        logger.info("ONNX嵌入模型加载成功", model_path=model_path, backend=self.name, dimension=self._dimension)
+        return self
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self._dimension
+    
+    def encode(self, texts: List[str], batch_size: int = 32):
+        import numpy as np
+        
+        results = []
+        for offset in range(0, len(texts), batch_size):
+            encodings = self._tokenizer.encode_batch(texts[offset:offset + batch_size])
+            input_ids = np.asarray([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.asarray([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.asarray([e.type_ids for e in encodings], dtype=np.int64)
+            feeds = {name: value for name, value in feeds.items() if name in self._input_names}
+            
+            token_embeddings = self._session.run(None, feeds)[0]
+            results.append(self.mean_pooling(token_embeddings, attention_mask))
+        return np.concatenate(results) if results else np.zeros((0, self._dimension), dtype=np.float32)
+    
+    def count_tokens(self, texts: List[str]) -> Optional[List[int]]:
+        if self._tokenizer is None:
+            return None
+        if self._counting_tokenizer is None:
+            # 推理用的分词器开启了截断和padding，计数使用不截断的副本
+            from tokenizers import Tokenizer
+            self._counting_tokenizer = Tokenizer.from_str(self._tokenizer.to_str())
+            self._counting_tokenizer.no_truncation()
+            self._counting_tokenizer.no_padding()
+        encodings = self._counting_tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(e.ids) for e in encodings]
+    
+    @staticmethod
+    def mean_pooling(token_embeddings, attention_mask):
+        """按attention mask对token向量取平均（padding位置不参与）"""
+        import numpy as np
+        
+        mask = attention_mask[..., None].astype(token_embeddings.dtype)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        return summed / counts
+
+
+class OnnxInt8Backend(OnnxBackend):
+    """ONNX Runtime + int8动态量化后端（首次使用时量化FP32模型并保存，之后直接加载）"""
+    
+    name = "onnx_int8"
+    
+    def _prepare_model_file(self) -> str:
+        source_path = self._resolve_model_path()
+        cache_dir = settings.EMBEDDING_ONNX_CACHE_DIR or os.path.dirname(os.path.abspath(source_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        quantized_path = os.path.join(cache_dir, self.model_name.replace("/", "__") + ".int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            
+            logger.info("int8动态量化嵌入模型", source=source_path, target=quantized_path)
+            # 先写临时文件再改名，避免多个进程同时量化时读到不完整的文件
+            tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+            quantize_dynamic(source_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, quantized_path)
+        return quantized_path
+
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    backend.name: backend for backend in (SentenceTransformerBackend, OnnxBackend, OnnxInt8Backend)
+}
+
+
+def get_backend_class(name: Optional[str] = None) -> Type[EmbeddingBackend]:
+    """
+    获取推理后端类
+    
+    Args:
+        name: 后端名称（torch/onnx/onnx_int8），如果为None则从配置读取
+    
+    Raises:
+        ValueError: 未知的后端名称
+    """
+    name = name or settings.EMBEDDING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"未知的嵌入模型后端: {name}，可选: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
+
+
+def cosine_parity(reference, candidate) -> List[float]:
+    """
+    逐条计算两个后端输出向量的余弦相似度（用于校验量化/ONNX输出与PyTorch一致）
+    
+    Args:
+        reference: 参考后端（PyTorch）的输出
+        candidate: 待校验后端的输出
+    
+    Returns:
+        每条文本的余弦相似度
+    """
+    import numpy as np
+    
+    a = np.asarray(reference, dtype=np.float64)
+    b = np.asarray(candidate, dtype=np.float64)
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return ((a * b).sum(axis=1) / np.clip(norms, 1e-12, None)).tolist()
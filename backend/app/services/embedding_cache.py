@@ -0,0 +1,142 @@
+"""
+向量缓存服务 - 按模型名称和文本内容寻址的向量缓存
+- 缓存key为模型名称 + 规范化文本（合并空白）的SHA-256哈希
+- 向量以float16/float32字节存储，体积约为JSON的1/4-1/8
+- Redis + 本地磁盘两级缓存（见TwoTierCache），支持批量读写（MGET/pipeline），统计命中/未命中次数
+"""
+from typing import Optional, List
+import hashlib
+import structlog
+
+from app.core.config import settings
+from app.services.two_tier_cache import TwoTierCache
+
+logger = structlog.get_logger()
+
+
+class EmbeddingCache(TwoTierCache):
+    """
+    向量缓存
+    
+    - 重新处理、回填和重复内容直接使用缓存向量，不做模型推理
+    - Redis或磁盘不可用时视为未命中，不影响向量生成
+    """
+    
+    _key_prefix = "embedding_cache"
+    _disk_table = "embeddings"
+    _disk_value_column = "vector"
+    _label = "向量缓存"
+    # 缓存key的版本号，调整key的组成或向量格式时递增，使旧缓存失效
+    # 2：向量改为原生维度（不再零填充到1536维），key包含存储维度
+    KEY_VERSION = 2
+    
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        ttl: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        dtype: Optional[str] = None,
+        disk_path: Optional[str] = None,
+        disk_max_entries: Optional[int] = None
+    ):
+        """
+        初始化向量缓存
+        
+        Args:
+            redis_url: Redis地址，如果为None则从配置读取
+            ttl: 缓存过期时间（秒）
+            max_entries: Redis中最多保留的条目数，超过后按最近访问时间淘汰
+            dtype: 向量存储精度（float16/float32）
+            disk_path: 磁盘缓存文件路径（为空则不启用磁盘缓存）
+            disk_max_entries: 磁盘缓存最多保留的条目数
+        """
+        super().__init__(
+            redis_url=redis_url or settings.REDIS_URL,
+            ttl=ttl or settings.EMBEDDING_CACHE_TTL,
+            max_entries=max_entries or settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            disk_path=settings.EMBEDDING_CACHE_DISK_PATH if disk_path is None else disk_path,
+            disk_max_entries=disk_max_entries or settings.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+        )
+        self.enabled = settings.EMBEDDING_CACHE_ENABLED
+        self.dtype = dtype or settings.EMBEDDING_CACHE_DTYPE
+    
+    @classmethod
+    def make_key(cls, model: str, text: str) -> str:
+        """
+        生成缓存key（存储维度 + 模型名称 + 规范化文本的SHA-256哈希）
+        
+        规范化只合并空白字符，不改变文本内容，空白差异不影响向量；
+        修改EMBEDDING_DIMENSION后旧维度的缓存不再命中
+        """
+        normalized = " ".join(text.split())
+        raw = f"{cls.KEY_VERSION}\0{settings.EMBEDDING_DIMENSION}\0{model}\0{normalized}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def encode(self, embedding: List[float]) -> bytes:
+        """向量编码为紧凑字节"""
+        import numpy as np
+        return np.asarray(embedding, dtype=self.dtype).tobytes()
+    
+    def decode(self, data: bytes) -> List[float]:
+        """字节解码为向量"""
+        import numpy as np
+        return np.frombuffer(data, dtype=self.dtype).astype(np.float64).tolist()
+    
+    async def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        批量获取缓存的向量
+        
+        Args:
+            model: 模型名称
+            texts: 文本列表
+        
+        Returns:
+            向量列表，未命中的位置为None
+        """
+        if not self.enabled or not texts:
+            return [None] * len(texts)
+        
+        values = await self._load_many([self.make_key(model, text) for text in texts])
+        
+        hits = sum(1 for value in values if value is not None)
+        await self._record(hits, len(values) - hits)
+        
+        results: List[Optional[List[float]]] = []
+        for value in values:
+            try:
+                results.append(self.decode(value) if value is not None else None)
+            except Exception as e:
+                logger.warning("向量缓存数据损坏，视为未命中", error=str(e))
+                results.append(None)
+        return results
+    
+    async def set_many(self, model: str, texts: List[str], embeddings: List[Optional[List[float]]]) -> None:
+        """
+        批量保存向量（跳过None）
+        
+        Args:
+            model: 生成向量的模型名称
+            texts: 文本列表
+            embeddings: 与文本对应的向量列表
+        """
+        if not self.enabled:
+            return
+        
+        items = {
+            self.make_key(model, text): self.encode(embedding)
+            for text, embedding in zip(texts, embeddings)
+            if embedding is not None
+        }
+        await self._store_many(items)
+
+
+# 全局向量缓存实例（延迟初始化）
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """获取向量缓存实例（单例模式）"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
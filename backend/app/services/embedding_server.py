@@ -0,0 +1,99 @@
+"""
+共享嵌入服务 - 单进程加载嵌入模型，API和Celery Worker通过Unix套接字或本机HTTP调用
+- 每个节点只保留一份模型，Worker重启（worker_max_tasks_per_child）不再重新加载模型
+- 并发请求在服务端合并为批次计算（复用EmbeddingService的微批队列）
+- 向量缓存和OpenAI降级由调用方（EmbeddingService）负责，服务端只做本地模型推理
+
+启动: python -m app.services.embedding_server --uds /tmp/it-doc-helper-embedding.sock
+      python -m app.services.embedding_server --host 127.0.0.1 --port 8100
+调用方配置: EMBEDDING_SERVER_URL=unix:///tmp/it-doc-helper-embedding.sock 或 http://127.0.0.1:8100
+"""
+from typing import List, Optional
+import argparse
+import asyncio
+import structlog
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from app.services.embedding_service import EmbeddingService
+
+logger = structlog.get_logger()
+
+
+class EmbedRequest(BaseModel):
+    """向量化请求"""
+    texts: List[str]
+
+
+class ModelHost(EmbeddingService):
+    """
+    嵌入服务端的模型宿主
+    
+    只使用本进程加载的本地模型，不查向量缓存，也不降级到OpenAI
+    """
+    
+    def __init__(self):
+        super().__init__(server_url="")
+    
+    async def _embed_prepared(self, texts: List[str]) -> List[Optional[List[float]]]:
+        return await self._generate_via_local_model(texts)
+    
+    async def embed(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        向量化一个请求的文本
+        
+        每条文本进入微批队列，与其他并发请求的文本合并为批次计算
+        """
+        return list(await asyncio.gather(*[self._enqueue(text) for text in texts]))
+
+
+def create_app(host: Optional[ModelHost] = None) -> FastAPI:
+    """
+    创建嵌入服务应用
+    
+    Args:
+        host: 模型宿主，如果为None则新建
+    """
+    host = host or ModelHost()
+    app = FastAPI(title="IT学习辅助系统 - 嵌入服务")
+    
+    @app.on_event("startup")
+    async def load_model():
+        # 启动时加载模型，第一个请求不承担加载耗时
+        if host._use_local_model:
+            await host._get_local_model()
+        else:
+            logger.warning("嵌入模型后端依赖不可用，嵌入服务将对所有请求返回空向量")
+    
+    @app.get("/health")
+    async def health():
+        return {
+            "status": "ok",
+            "model": host._embedding_model_name,
+            "model_loaded": host._local_model is not None
+        }
+    
+    @app.post("/embed")
+    async def embed(request: EmbedRequest):
+        embeddings = await host.embed(request.texts)
+        return {"model": host._embedding_model_name, "embeddings": embeddings}
+    
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享嵌入服务")
+    parser.add_argument("--uds", default="", help="Unix套接字路径（指定后忽略host/port）")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8100, help="监听端口")
+    args = parser.parse_args()
+    
+    import uvicorn
+    if args.uds:
+        uvicorn.run(create_app(), uds=args.uds)
+    else:
+        uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,21 @@
 """
 文档向量化服务
 支持多种向量生成方案：
-1. 本地嵌入模型（sentence-transformers）- 优先方案
+1. 本地嵌入模型（sentence-transformers / ONNX Runtime，见embedding_backends）- 优先方案
 2. 其他云服务Embeddings API（OpenAI等）- 备选方案
 
+所有向量都写入同一组向量列，只有存储模型（storage_model_name）生成、维度与存储维度一致的向量才会返回：
+不同模型的向量不可比较，截断或零填充后也不是有效的向量。
+
 注意：向量化服务不使用DeepSeek API。
 DeepSeek API仅用于文档处理的其他功能（类型识别、内容总结、问题生成等）。
 """
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import asyncio
 from app.core.config import settings
+from app.services.embedding_backends import SentenceTransformerBackend, get_backend_class
+from app.services.embedding_cache import get_embedding_cache
+from app.models.embedding_vector import OPENAI_EMBEDDING_MODEL, storage_model_name
 import structlog
 
 logger = structlog.get_logger()
@@ -17,32 +24,394 @@ logger = structlog.get_logger()
 class EmbeddingService:
     """向量化服务类，封装向量生成逻辑"""
     
-    def __init__(self):
+    OPENAI_EMBEDDING_MODEL = OPENAI_EMBEDDING_MODEL
+    
+    def __init__(self, server_url: Optional[str] = None):
         """
         初始化向量化服务
         
         注意：向量化服务不使用DeepSeek API。
         DeepSeek API仅用于文档处理的其他功能（类型识别、内容总结、问题生成等）。
+        
+        Args:
+            server_url: 共享嵌入服务地址，如果为None则从配置读取；为空时在本进程加载本地模型
         """
-        self.embedding_dimension = 1536  # OpenAI标准维度
+        self.embedding_dimension = settings.EMBEDDING_DIMENSION  # 存储维度（嵌入模型原生维度）
+        self.storage_model = storage_model_name()  # 向量列存储的嵌入模型（写入embedding_model列）
+        
+        # 共享嵌入服务（配置后本地模型方案改为调用嵌入服务，本进程不加载模型）
+        self._server_url = settings.EMBEDDING_SERVER_URL if server_url is None else server_url
+        self._server_client = None
+        self._server_client_loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # 本地模型推理后端（torch/onnx/onnx_int8）
+        try:
+            self._backend_class = get_backend_class()
+        except ValueError as e:
+            logger.warning("嵌入模型后端配置无效，使用PyTorch后端", error=str(e))
+            self._backend_class = SentenceTransformerBackend
         
         # 初始化本地嵌入模型（延迟加载）
         self._local_model = None
         self._use_local_model = self._should_use_local_model()
         self._embedding_model_name = settings.EMBEDDING_MODEL_NAME
+        # 向量缓存中本地模型的标识（非PyTorch后端的输出有微小差异，分开缓存）
+        self._local_model_id = (
+            self._embedding_model_name if self._backend_class is SentenceTransformerBackend
+            else f"{self._embedding_model_name}#{self._backend_class.name}"
+        )
+        
+        # OpenAI客户端（延迟创建，所有请求复用）
+        self._openai_client = None
+        
+        # 微批队列：并发的单条请求合并为一次前向计算
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: set = set()
     
     async def generate_embedding(self, text: str) -> Optional[List[float]]:
         """
         生成文本向量
         
         优先使用本地嵌入模型，如果不可用则尝试其他云服务的Embeddings API。
+        并发调用会在微批队列中短暂等待，合并为一次批量计算。
         
         Args:
             text: 要向量化的文本内容
             
         Returns:
-            向量列表（1536维），如果生成失败返回None
+            向量列表（EMBEDDING_DIMENSION维），如果生成失败返回None
+        """
+        text = self._prepare_text(text)
+        if text is None:
+            return None
+        
+        if settings.EMBEDDING_MICRO_BATCH_WAIT_MS <= 0:
+            return (await self._embed_prepared([text]))[0]
+        return await self._enqueue(text)
+    
+    async def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        批量生成向量
+        
+        本地模型按长度排序后一次encode（同一批内长度相近，减少padding）；
+        OpenAI API一次请求传入多条文本。
+        
+        Args:
+            texts: 文本列表
+        
+        Returns:
+            向量列表，每个元素对应一个文本的向量（失败则为None）
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        prepared = [(i, self._prepare_text(text)) for i, text in enumerate(texts)]
+        prepared = [(i, text) for i, text in prepared if text is not None]
+        if not prepared:
+            return results
+        
+        embeddings = await self._embed_prepared([text for _, text in prepared])
+        for (i, _), embedding in zip(prepared, embeddings):
+            results[i] = embedding
+        return results
+    
+    async def generate_document_embedding(
+        self,
+        content: str,
+        segments: Optional[List[Dict]] = None
+    ) -> Tuple[Optional[List[float]], List[Dict]]:
+        """
+        分块向量化文档，池化得到文档向量
+        
+        相邻段落合并为不超过模型窗口的分块（按分词器测得的字符/token比例换算，见chunk_char_budget）后批量向量化，
+        按分块长度加权平均得到文档向量，避免只截取文档开头。
+        关闭EMBEDDING_CHUNKED时退化为截断后整体向量化。
+        
+        Args:
+            content: 文档内容
+            segments: 预先切分的段落（可选，未提供时自动切分；必须是对content的切分，分块位置取自段落位置）
+        
+        Returns:
+            (文档向量, 分块列表)；分块包含chunk_index/start/end/text/embedding，
+            只包含向量化成功的分块
+        """
+        if not settings.EMBEDDING_CHUNKED:
+            return await self.generate_embedding(content), []
+        
+        chars_per_token = await self._measure_chars_per_token(content) if settings.USE_LOCAL_EMBEDDING else None
+        chunks = self.build_chunks(content, segments, chars_per_token)
+        if not chunks:
+            return None, []
+        
+        embeddings = await self.generate_embeddings_batch([chunk["text"] for chunk in chunks])
+        embedded = []
+        for chunk, embedding in zip(chunks, embeddings):
+            if embedding is not None:
+                chunk["embedding"] = embedding
+                embedded.append(chunk)
+        
+        document_embedding = self.pool_embeddings(
+            [chunk["embedding"] for chunk in embedded],
+            [len(chunk["text"]) for chunk in embedded]
+        )
+        logger.info("文档分块向量化完成",
+                   chunk_count=len(chunks),
+                   embedded_count=len(embedded),
+                   content_length=len(content),
+                   chars_per_token=chars_per_token)
+        return document_embedding, embedded
+    
+    # 没有本地分词器时估算字符/token比例：CJK字符按1个token计，其他字符（英文、代码、空白）按每3个字符1个token计
+    # （多语言MiniLM的分词器上中文约1.3字符/token、英文约4字符/token，取保守值）
+    OTHER_CHARS_PER_TOKEN = 3.0
+    # 测量字符/token比例时抽取的文本片段数
+    TOKEN_SAMPLE_PIECES = 8
+    
+    @staticmethod
+    def _is_cjk(char: str) -> bool:
+        code = ord(char)
+        return (
+            0x3040 <= code <= 0x30FF or 0x3400 <= code <= 0x4DBF or 0x4E00 <= code <= 0x9FFF
+            or 0xAC00 <= code <= 0xD7AF or 0xF900 <= code <= 0xFAFF or 0xFF00 <= code <= 0xFFEF
+        )
+    
+    @classmethod
+    def estimate_chars_per_token(cls, text: str) -> float:
+        """
+        按字符类型估算字符/token比例（不小于1）
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            平均每个token对应的字符数
+        """
+        if not text:
+            return 1.0
+        cjk = sum(1 for char in text if cls._is_cjk(char))
+        tokens = cjk + (len(text) - cjk) / cls.OTHER_CHARS_PER_TOKEN
+        return max(1.0, len(text) / tokens)
+    
+    @classmethod
+    def _token_sample(cls, content: str) -> List[str]:
+        """从文档中均匀抽取若干窗口大小的片段（用于测量字符/token比例）"""
+        piece_chars = max(1, settings.EMBEDDING_MAX_SEQ_LENGTH - 2)
+        if len(content) <= piece_chars * cls.TOKEN_SAMPLE_PIECES:
+            return [content[offset:offset + piece_chars] for offset in range(0, len(content), piece_chars)]
+        step = (len(content) - piece_chars) / (cls.TOKEN_SAMPLE_PIECES - 1)
+        return [content[int(i * step):int(i * step) + piece_chars] for i in range(cls.TOKEN_SAMPLE_PIECES)]
+    
+    async def _measure_chars_per_token(self, content: str) -> float:
+        """
+        测量文档的字符/token比例
+        
+        本进程加载了本地模型时用模型的分词器测量抽样片段，取各片段中最小的比例（token最密的片段也不超出窗口）；
+        使用共享嵌入服务或分词器不可用时按字符类型估算
+        """
+        pieces = [piece for piece in self._token_sample(content) if piece.strip()]
+        if not pieces:
+            return 1.0
+        counts = None
+        if self._use_local_model and not self._server_url:
+            try:
+                model = await self._get_local_model()
+                counts = model.count_tokens(pieces)
+            except Exception as e:
+                logger.warning("分词器测量token数失败，按字符类型估算", error=str(e))
+        if not counts:
+            return min(self.estimate_chars_per_token(piece) for piece in pieces)
+        return max(1.0, min(len(piece) / max(count, 1) for piece, count in zip(pieces, counts)))
+    
+    @staticmethod
+    def chunk_char_budget(chars_per_token: Optional[float] = None) -> int:
+        """
+        分块的目标字符数
+        
+        本地模型只编码前EMBEDDING_MAX_SEQ_LENGTH个token，超出部分被截断。
+        扣除首尾特殊token后按字符/token比例换算为字符数，使分块内容都能被模型看到
+        （未提供比例时按1个字符1个token保守换算）；OpenAI模型窗口足够大，只受EMBEDDING_CHUNK_CHARS限制
+        
+        Args:
+            chars_per_token: 文档的字符/token比例（见_measure_chars_per_token）
+        """
+        if settings.USE_LOCAL_EMBEDDING:
+            window_chars = int((settings.EMBEDDING_MAX_SEQ_LENGTH - 2) * (chars_per_token or 1.0))
+            return max(1, min(settings.EMBEDDING_CHUNK_CHARS, window_chars))
+        return settings.EMBEDDING_CHUNK_CHARS
+    
+    @staticmethod
+    def build_chunks(
+        content: str,
+        segments: Optional[List[Dict]] = None,
+        chars_per_token: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        将相邻段落合并为分块
+        
+        分块大小为chunk_char_budget(chars_per_token)，超过分块大小的段落按字符切开；
+        超长文档的分块数超过EMBEDDING_MAX_CHUNKS时，从全文均匀抽取EMBEDDING_MAX_CHUNKS个分块（含首尾），
+        不放大分块（放大后超出模型窗口的部分会被截断，文档大部分内容不会被向量化）
+        """
+        from app.services.source_segmenter import SourceSegmenter
+        
+        if not content or not content.strip():
+            return []
+        segments = SourceSegmenter.get_segments(content, segments)
+        
+        chunk_chars = EmbeddingService.chunk_char_budget(chars_per_token)
+        
+        chunks: List[Dict] = []
+        texts: List[str] = []
+        start = end = 0
+        length = 0
+        for segment in segments:
+            segment_text = segment.get("text") or ""
+            if not segment_text.strip():
+                continue
+            seg_start = segment.get("start", segment.get("position", 0))
+            # 超过分块大小的段落按字符切开（段落文本与原文对应，切片位置即原文偏移）
+            for offset in range(0, len(segment_text), chunk_chars):
+                text = segment_text[offset:offset + chunk_chars]
+                # 段落之间以两个换行连接，计入分块长度
+                if texts and length + 2 + len(text) > chunk_chars:
+                    chunks.append({"chunk_index": len(chunks), "start": start, "end": end, "text": "\n\n".join(texts)})
+                    texts = []
+                    length = 0
+                if not texts:
+                    start = seg_start + offset
+                else:
+                    length += 2
+                texts.append(text)
+                length += len(text)
+                end = seg_start + offset + len(text)
+            end = segment.get("end", end)
+        if texts:
+            chunks.append({"chunk_index": len(chunks), "start": start, "end": end, "text": "\n\n".join(texts)})
+        return EmbeddingService._sample_chunks(chunks, settings.EMBEDDING_MAX_CHUNKS)
+    
+    @staticmethod
+    def _sample_chunks(chunks: List[Dict], limit: int) -> List[Dict]:
+        """从分块中均匀抽取limit个（保留首尾分块，重新编号）"""
+        if limit <= 0 or len(chunks) <= limit:
+            return chunks
+        if limit == 1:
+            sampled = [chunks[0]]
+        else:
+            step = (len(chunks) - 1) / (limit - 1)
+            sampled = [chunks[round(i * step)] for i in range(limit)]
+        for index, chunk in enumerate(sampled):
+            chunk["chunk_index"] = index
+        return sampled
+    
+    @staticmethod
+    def pool_embeddings(embeddings: List[List[float]], weights: Optional[List[float]] = None) -> Optional[List[float]]:
+        """
+        池化分块向量（加权平均后L2归一化）
+        
+        Args:
+            embeddings: 分块向量列表
+            weights: 权重（如分块长度），如果为None则等权
+        
+        Returns:
+            文档向量，如果没有分块向量返回None
+        """
+        if not embeddings:
+            return None
+        import numpy as np
+        
+        matrix = np.asarray(embeddings, dtype=np.float64)
+        if weights is None:
+            pooled = matrix.mean(axis=0)
+        else:
+            pooled = np.average(matrix, axis=0, weights=np.asarray(weights, dtype=np.float64))
+        norm = np.linalg.norm(pooled)
+        if norm > 0:
+            pooled = pooled / norm
+        return pooled.tolist()
+    
+    async def save_segment_embeddings(self, db, document_id, chunks: List[Dict]) -> int:
+        """
+        持久化分块向量（覆盖该文档已有的分块向量，由调用方提交事务）
+        
+        Args:
+            db: 数据库会话
+            document_id: 文档ID
+            chunks: generate_document_embedding返回的分块列表
+        
+        Returns:
+            保存的分块数
+        """
+        from sqlalchemy import delete
+        from app.models.document_segment_embedding import DocumentSegmentEmbedding
+        
+        await db.execute(
+            delete(DocumentSegmentEmbedding).where(DocumentSegmentEmbedding.document_id == document_id)
+        )
+        db.add_all([
+            DocumentSegmentEmbedding(
+                document_id=document_id,
+                chunk_index=chunk["chunk_index"],
+                start_offset=chunk["start"],
+                end_offset=chunk["end"],
+                text=chunk["text"],
+                embedding=chunk["embedding"],
+                embedding_model=self.storage_model
+            )
+            for chunk in chunks
+        ])
+        return len(chunks)
+    
+    async def search_segments(
+        self,
+        db,
+        query: str,
+        limit: int = 10,
+        document_id=None
+    ) -> List[Dict]:
+        """
+        段落级检索（按余弦距离使用HNSW索引）
+        
+        Args:
+            db: 数据库会话
+            query: 检索文本
+            limit: 返回数量
+            document_id: 只在指定文档内检索（可选）
+        
+        Returns:
+            分块列表（document_id/chunk_index/start/end/text/similarity），按相似度降序
         """
+        from sqlalchemy import select
+        from app.models.document_segment_embedding import DocumentSegmentEmbedding
+        
+        query_embedding = await self.generate_embedding(query)
+        if query_embedding is None:
+            return []
+        
+        distance = DocumentSegmentEmbedding.embedding.cosine_distance(query_embedding)
+        stmt = (
+            select(DocumentSegmentEmbedding, distance.label("distance"))
+            .where(DocumentSegmentEmbedding.embedding_model == self.storage_model)
+            .order_by(distance)
+            .limit(limit)
+        )
+        if document_id is not None:
+            stmt = stmt.where(DocumentSegmentEmbedding.document_id == document_id)
+        
+        result = await db.execute(stmt)
+        return [
+            {
+                "document_id": str(row.DocumentSegmentEmbedding.document_id),
+                "chunk_index": row.DocumentSegmentEmbedding.chunk_index,
+                "start": row.DocumentSegmentEmbedding.start_offset,
+                "end": row.DocumentSegmentEmbedding.end_offset,
+                "text": row.DocumentSegmentEmbedding.text,
+                "similarity": 1 - float(row.distance)
+            }
+            for row in result
+        ]
+    
+    def _prepare_text(self, text: str) -> Optional[str]:
+        """跳过空文本，截断过长的文本"""
         if not text or not text.strip():
             logger.warning("文本为空，跳过向量生成")
             return None
@@ -53,28 +422,117 @@ class EmbeddingService:
         if len(text) > max_length:
             logger.warning("文本过长，进行截断", original_length=len(text), max_length=max_length)
             text = text[:max_length]
+        return text
+    
+    async def _embed_prepared(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        向量化已预处理的文本
         
+        先查向量缓存（按首选方案的模型名称寻址），未命中的文本再向量化；
+        方案1（本地模型）失败的文本再尝试方案2（其他云服务Embeddings API）
+        """
+        results: List[Optional[List[float]]] = [None] * len(texts)
         try:
+            cache = get_embedding_cache()
+            primary_model = self._local_model_id if self._use_local_model else self.OPENAI_EMBEDDING_MODEL
+            results = self._check_dimensions(await cache.get_many(primary_model, texts), primary_model)
+            
             # 方案1：优先使用本地嵌入模型（如果可用）
-            if self._use_local_model:
-                embedding = await self._generate_via_local_model(text)
-                if embedding:
-                    return embedding
+            missing = [i for i, embedding in enumerate(results) if embedding is None]
+            if missing and self._use_local_model:
+                missing_texts = [texts[i] for i in missing]
+                embeddings = await self._generate_via_local_model(missing_texts)
+                await cache.set_many(self._local_model_id, missing_texts, embeddings)
+                for i, embedding in zip(missing, embeddings):
+                    results[i] = embedding
             
             # 方案2：尝试使用其他云服务的Embeddings API（如OpenAI）
-            embedding = await self._generate_via_other_embeddings_api(text)
-            if embedding:
-                return embedding
+            # 只在存储模型就是该API的模型时使用，其他模型的向量与已存储的向量不可比较
+            missing = [i for i, embedding in enumerate(results) if embedding is None]
+            if missing and self.storage_model == self.OPENAI_EMBEDDING_MODEL:
+                missing_texts = [texts[i] for i in missing]
+                embeddings = await self._generate_via_other_embeddings_api(missing_texts)
+                await cache.set_many(self.OPENAI_EMBEDDING_MODEL, missing_texts, embeddings)
+                for i, embedding in zip(missing, embeddings):
+                    results[i] = embedding
             
             # 如果所有方案都失败，返回None
-            logger.warning("所有向量生成方案都不可用", 
-                          use_local_model=self._use_local_model,
-                          has_openai_key=bool(settings.OPENAI_API_KEY))
-            return None
-            
+            if all(embedding is None for embedding in results):
+                logger.warning("所有向量生成方案都不可用", 
+                              use_local_model=self._use_local_model,
+                              has_openai_key=bool(settings.OPENAI_API_KEY))
+            return results
+        
         except Exception as e:
-            logger.error("向量生成失败", error=str(e), text_length=len(text))
-            return None
+            logger.error("向量生成失败", error=str(e), batch_size=len(texts))
+            return [None] * len(texts)
+    
+    async def _enqueue(self, text: str) -> Optional[List[float]]:
+        """
+        加入微批队列，等待所在批次完成
+        
+        队列达到批大小时立即计算，否则等待EMBEDDING_MICRO_BATCH_WAIT_MS后计算
+        """
+        loop = asyncio.get_running_loop()
+        if self._pending_loop is not loop:
+            # 事件循环变化（如Celery任务各自创建事件循环），丢弃旧循环的队列状态
+            self._pending = []
+            self._flush_handle = None
+            self._pending_loop = loop
+        
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= settings.EMBEDDING_BATCH_SIZE:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(settings.EMBEDDING_MICRO_BATCH_WAIT_MS / 1000, self._flush)
+        return await future
+    
+    def _flush(self) -> None:
+        """取出队列中的全部请求，作为一个批次计算"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        
+        task = asyncio.ensure_future(self._run_batch(pending))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+    
+    async def _run_batch(self, pending: List[Tuple[str, asyncio.Future]]) -> None:
+        embeddings = await self._embed_prepared([text for text, _ in pending])
+        logger.debug("微批向量化完成", batch_size=len(pending))
+        for (_, future), embedding in zip(pending, embeddings):
+            # 调用方可能已超时取消
+            if not future.done():
+                future.set_result(embedding)
+    
+    def _check_dimensions(
+        self,
+        embeddings: List[Optional[List[float]]],
+        source: str
+    ) -> List[Optional[List[float]]]:
+        """
+        丢弃维度与存储维度不一致的向量（截断或零填充后不是有效的向量）
+        
+        Args:
+            embeddings: 向量列表（失败的位置为None）
+            source: 向量来源（用于日志）
+        """
+        checked = [
+            embedding if embedding is None or len(embedding) == self.embedding_dimension else None
+            for embedding in embeddings
+        ]
+        rejected = sum(1 for embedding, kept in zip(embeddings, checked) if embedding is not None and kept is None)
+        if rejected:
+            logger.error("向量维度与存储维度不一致，已丢弃；更换嵌入模型后需修改EMBEDDING_DIMENSION并运行scripts/reembed_documents.py",
+                        source=source,
+                        rejected=rejected,
+                        expected=self.embedding_dimension,
+                        actual=next(len(e) for e in embeddings if e is not None and len(e) != self.embedding_dimension))
+        return checked
     
     def _should_use_local_model(self) -> bool:
         """
@@ -86,13 +544,14 @@ class EmbeddingService:
         # 检查配置
         use_local = settings.USE_LOCAL_EMBEDDING
         if use_local:
-            try:
-                # 尝试导入sentence-transformers，如果成功则使用本地模型
-                import sentence_transformers
+            if self._server_url:
+                # 模型由共享嵌入服务加载，本进程不需要安装推理依赖
                 return True
-            except ImportError:
-                logger.warning("sentence-transformers未安装，将使用API方案")
-                return False
+            # 检查推理后端的依赖（sentence-transformers或onnxruntime）是否已安装
+            if self._backend_class.is_available():
+                return True
+            logger.warning("嵌入模型后端依赖未安装，将使用API方案", backend=self._backend_class.name)
+            return False
         return False
     
     async def _get_local_model(self):
@@ -100,138 +559,170 @@ class EmbeddingService:
         获取本地嵌入模型实例（延迟加载）
         
         Returns:
-            SentenceTransformer模型实例
+            推理后端实例（提供encode(texts, batch_size)）
         """
         if self._local_model is None:
             try:
-                import sentence_transformers
                 # 使用配置的模型名称
                 model_name = self._embedding_model_name
-                logger.info("加载本地嵌入模型", model_name=model_name)
-                self._local_model = sentence_transformers.SentenceTransformer(model_name)
+                logger.info("加载本地嵌入模型", model_name=model_name, backend=self._backend_class.name)
+                # 加载模型是同步操作（下载、量化、初始化），在线程池中执行
+                loop = asyncio.get_running_loop()
+                self._local_model = await loop.run_in_executor(None, self._backend_class(model_name).load)
                 actual_dim = self._local_model.get_sentence_embedding_dimension()
                 logger.info("本地嵌入模型加载成功", 
                            model_name=model_name,
+                           backend=self._backend_class.name,
                            model_dimension=actual_dim,
                            target_dimension=self.embedding_dimension)
+                if actual_dim != self.embedding_dimension:
+                    logger.error("嵌入模型维度与EMBEDDING_DIMENSION不一致，生成的向量将被丢弃",
+                                model_dimension=actual_dim,
+                                target_dimension=self.embedding_dimension)
             except ImportError:
-                logger.error("sentence-transformers未安装，无法使用本地模型")
+                logger.error("嵌入模型后端依赖未安装，无法使用本地模型", backend=self._backend_class.name)
                 raise
             except Exception as e:
                 logger.error("加载本地嵌入模型失败", error=str(e))
                 raise
         return self._local_model
     
-    async def _generate_via_local_model(self, text: str) -> Optional[List[float]]:
+    async def _generate_via_local_model(self, texts: List[str]) -> List[Optional[List[float]]]:
         """
-        使用本地嵌入模型生成向量（方案1，优先）
+        使用本地嵌入模型批量生成向量（方案1，优先）
+        
+        文本按长度排序后一次encode，同一批内长度相近，padding最少
         
         Args:
-            text: 要向量化的文本
-            
+            texts: 要向量化的文本列表
+        
         Returns:
-            向量列表，如果生成失败返回None
+            向量列表，如果生成失败对应位置为None
         """
+        if self._server_url:
+            return await self._generate_via_embedding_server(texts)
+        
         try:
             model = await self._get_local_model()
             
-            # 生成向量（同步操作，在异步环境中运行）
-            import asyncio
-            loop = asyncio.get_event_loop()
-            embedding = await loop.run_in_executor(None, model.encode, text)
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+            sorted_texts = [texts[i] for i in order]
             
-            # 转换为列表
-            embedding_list = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+            # 生成向量（同步操作，在异步环境中运行）
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(
+                None,
+                lambda: model.encode(sorted_texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+            )
             
-            # 调整维度到1536（如果需要）
-            actual_dim = len(embedding_list)
-            if actual_dim != self.embedding_dimension:
-                logger.info("向量维度调整", 
-                           original_dim=actual_dim, 
-                           target_dim=self.embedding_dimension)
-                if actual_dim > self.embedding_dimension:
-                    # 截断到1536维
-                    embedding_list = embedding_list[:self.embedding_dimension]
-                else:
-                    # 填充到1536维（使用零填充或重复填充）
-                    # 使用零填充更安全
-                    embedding_list = embedding_list + [0.0] * (self.embedding_dimension - actual_dim)
+            results: List[Optional[List[float]]] = [None] * len(texts)
+            for i, embedding in zip(order, embeddings):
+                # 转换为列表
+                results[i] = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+            results = self._check_dimensions(results, self._local_model_id)
             
             logger.info("使用本地嵌入模型生成向量成功", 
-                       dimension=len(embedding_list),
-                       original_dim=actual_dim)
-            return embedding_list
-            
+                       count=len(texts),
+                       dimension=self.embedding_dimension)
+            return results
+        
         except ImportError:
             logger.warning("sentence-transformers未安装，跳过本地模型方案")
-            return None
+            return [None] * len(texts)
         except Exception as e:
             logger.error("本地嵌入模型生成向量失败", error=str(e))
-            return None
+            return [None] * len(texts)
+    
+    def _get_server_client(self):
+        """获取嵌入服务HTTP客户端（按事件循环懒加载，支持unix://套接字和http://地址）"""
+        loop = asyncio.get_running_loop()
+        if self._server_client is None or self._server_client_loop is not loop:
+            import httpx
+            if self._server_url.startswith("unix://"):
+                transport = httpx.AsyncHTTPTransport(uds=self._server_url[len("unix://"):])
+                base_url = "http://embedding-server"
+            else:
+                transport = None
+                base_url = self._server_url
+            self._server_client = httpx.AsyncClient(
+                base_url=base_url,
+                transport=transport,
+                timeout=settings.EMBEDDING_SERVER_TIMEOUT
+            )
+            self._server_client_loop = loop
+        return self._server_client
+    
+    async def _generate_via_embedding_server(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        调用共享嵌入服务批量生成向量（方案1的远程形式）
+        
+        Args:
+            texts: 要向量化的文本列表
+        
+        Returns:
+            向量列表，如果嵌入服务不可用对应位置为None
+        """
+        try:
+            response = await self._get_server_client().post("/embed", json={"texts": texts})
+            response.raise_for_status()
+            embeddings = response.json()["embeddings"]
+            logger.info("使用共享嵌入服务生成向量成功", count=len(texts))
+            return self._check_dimensions(embeddings, self._server_url)
+        except Exception as e:
+            logger.error("共享嵌入服务调用失败", error=str(e), server_url=self._server_url)
+            return [None] * len(texts)
     
-    async def _generate_via_other_embeddings_api(self, text: str) -> Optional[List[float]]:
+    def _get_openai_client(self):
+        """获取OpenAI客户端（延迟创建，复用连接）"""
+        if self._openai_client is None:
+            from openai import OpenAI
+            self._openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        return self._openai_client
+    
+    async def _generate_via_other_embeddings_api(self, texts: List[str]) -> List[Optional[List[float]]]:
         """
-        使用其他云服务的Embeddings API（方案3）
+        使用其他云服务的Embeddings API批量生成向量（方案2）
         
-        支持OpenAI等兼容OpenAI API格式的服务
+        支持OpenAI等兼容OpenAI API格式的服务，每次请求传入多条文本
         
         Args:
-            text: 要向量化的文本
-            
+            texts: 要向量化的文本列表
+        
         Returns:
-            向量列表，如果API不可用返回None
+            向量列表，如果API不可用对应位置为None
         """
         # 检查是否配置了OpenAI API Key
-        openai_api_key = settings.OPENAI_API_KEY
-        if not openai_api_key:
-            return None
+        if not settings.OPENAI_API_KEY:
+            return [None] * len(texts)
         
+        results: List[Optional[List[float]]] = [None] * len(texts)
         try:
-            from openai import OpenAI
-            
-            client = OpenAI(api_key=openai_api_key)
-            response = client.embeddings.create(
-                model="text-embedding-ada-002",  # 或 text-embedding-3-small/large
-                input=text
-            )
-            
-            embedding = response.data[0].embedding
-            
-            # 确保维度为1536
-            if len(embedding) != self.embedding_dimension:
-                logger.warning("向量维度不匹配", 
-                             expected=self.embedding_dimension,
-                             actual=len(embedding))
-                if len(embedding) > self.embedding_dimension:
-                    embedding = embedding[:self.embedding_dimension]
-                else:
-                    embedding = embedding + [0.0] * (self.embedding_dimension - len(embedding))
+            client = self._get_openai_client()
+            loop = asyncio.get_running_loop()
             
-            logger.info("使用OpenAI Embeddings API生成向量成功", dimension=len(embedding))
-            return embedding
+            chunk_size = settings.OPENAI_EMBEDDING_MAX_INPUTS
+            for offset in range(0, len(texts), chunk_size):
+                chunk = texts[offset:offset + chunk_size]
+                response = await loop.run_in_executor(
+                    None,
+                    lambda: client.embeddings.create(
+                        model=self.OPENAI_EMBEDDING_MODEL,
+                        input=chunk
+                    )
+                )
+                for item in response.data:
+                    results[offset + item.index] = item.embedding
+            results = self._check_dimensions(results, self.OPENAI_EMBEDDING_MODEL)
             
+            logger.info("使用OpenAI Embeddings API生成向量成功", count=len(texts), dimension=self.embedding_dimension)
+            return results
+        
         except Exception as e:
             logger.debug("OpenAI Embeddings API不可用或调用失败", error=str(e))
-            return None
+            return results
     
     # 已删除：DeepSeek Embeddings API方案（DeepSeek不提供此API）
     # 已删除：Chat API降级方案（影响用户体验，不再使用）
-    
-    async def generate_embeddings_batch(self, texts: List[str]) -> List[Optional[List[float]]]:
-        """
-        批量生成向量
-        
-        Args:
-            texts: 文本列表
-            
-        Returns:
-            向量列表，每个元素对应一个文本的向量（失败则为None）
-        """
-        results = []
-        for text in texts:
-            embedding = await self.generate_embedding(text)
-            results.append(embedding)
-        return results
 
 
 # 全局向量化服务实例（延迟初始化）
@@ -272,8 +763,9 @@ async def warmup_embedding_model(timeout: float = 30.0) -> bool:
             logger.info("开始预热嵌入模型...")
             try:
                 # 使用一个短文本测试，触发模型加载
+                # 直接调用本地模型（不经过向量缓存，确保模型被加载）
                 await asyncio.wait_for(
-                    service.generate_embedding("warmup"),
+                    service._generate_via_local_model(["warmup"]),
                     timeout=timeout
                 )
                 _model_warmup_done = True
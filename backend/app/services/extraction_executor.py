@@ -0,0 +1,241 @@
+"""
+文档解析执行器 - 将CPU密集的文档解析移出事件循环
+- process模式（默认）：每个解析任务在独立的子进程中执行（同时运行的子进程数不超过max_workers），
+  超时或取消时只终止执行该任务的子进程，真正中断解析，同时进行的其他解析不受影响；
+  子进程由billiard（Celery使用的multiprocessing分支）创建，Celery prefork工作进程（守护进程）中同样可用
+- thread模式：线程池，开销小，但超时后解析仍会在后台跑完
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import functools
+import multiprocessing
+import os
+import signal
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+def _process_context():
+    """
+    创建解析子进程的上下文
+    
+    优先使用billiard：标准库multiprocessing不允许守护进程（Celery prefork工作进程）创建子进程
+    """
+    try:
+        import billiard
+        return billiard.get_context()
+    except ImportError:
+        return multiprocessing.get_context()
+
+
+def can_start_processes() -> bool:
+    """
+    当前进程能否创建解析子进程
+    
+    billiard可用时任何进程都可以；只有标准库multiprocessing时守护进程不允许创建子进程
+    """
+    try:
+        import billiard  # noqa: F401
+        return True
+    except ImportError:
+        return not multiprocessing.current_process().daemon
+
+
+def _run_in_child(conn, func: Callable[..., Any], args: Tuple) -> None:
+    """子进程入口：执行解析函数，通过管道返回 (是否成功, 返回值或异常)"""
+    try:
+        outcome = (True, func(*args))
+    except BaseException as e:
+        outcome = (False, e)
+    try:
+        conn.send(outcome)
+    except Exception as e:
+        # 返回值或异常无法pickle
+        conn.send((False, RuntimeError(f"解析结果无法传回: {e}")))
+    finally:
+        conn.close()
+
+
+def _kill_process(process) -> None:
+    """强制结束子进程（子进程可能继承了Celery工作进程的SIGTERM处理函数，使用SIGKILL）"""
+    sigkill = getattr(signal, "SIGKILL", None)
+    try:
+        if sigkill is None:
+            process.terminate()
+        else:
+            os.kill(process.pid, sigkill)
+    except (OSError, ValueError):
+        pass
+
+
+class ExtractionExecutor:
+    """
+    文档解析执行器（每个进程每种模式一个实例）
+    
+    提交到process模式的函数及其参数、返回值必须可pickle（模块级函数）
+    """
+    
+    MODE_PROCESS = "process"
+    MODE_THREAD = "thread"
+    
+    _instances: Dict[str, "ExtractionExecutor"] = {}
+    
+    def __init__(self, mode: str, max_workers: Optional[int] = None):
+        """
+        初始化执行器
+        
+        Args:
+            mode: 执行模式（process/thread）
+            max_workers: 最大同时运行的子进程数/线程数，如果为None则从配置读取
+        """
+        if mode not in (self.MODE_PROCESS, self.MODE_THREAD):
+            raise ValueError(f"不支持的解析执行模式: {mode}")
+        self.mode = mode
+        if max_workers is None:
+            if mode == self.MODE_PROCESS:
+                max_workers = settings.EXTRACTION_PROCESS_WORKERS or os.cpu_count() or 1
+            else:
+                max_workers = settings.EXTRACTION_THREAD_WORKERS
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # 限制同时运行的子进程数（asyncio信号量绑定事件循环，按循环重新创建）
+        self._slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+    
+    @classmethod
+    def get_instance(cls, mode: Optional[str] = None) -> "ExtractionExecutor":
+        """
+        获取执行器实例（单例模式，按模式区分）
+        
+        Args:
+            mode: 执行模式，如果为None则从配置读取（EXTRACTION_EXECUTOR）
+        
+        Returns:
+            ExtractionExecutor实例
+        """
+        mode = mode or settings.EXTRACTION_EXECUTOR
+        if mode not in cls._instances:
+            cls._instances[mode] = cls(mode)
+        return cls._instances[mode]
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """获取线程池（懒加载；thread模式及process模式回退时使用）"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="doc-extract"
+            )
+        return self._pool
+    
+    def _fall_back_to_threads(self, reason: str) -> None:
+        """切换到线程池"""
+        logger.warning("解析子进程不可用，回退到线程池", reason=reason)
+        self.mode = self.MODE_THREAD
+        self.max_workers = settings.EXTRACTION_THREAD_WORKERS
+    
+    def _process_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.max_workers))
+        return self._slots[1]
+    
+    async def run(self, func: Callable[..., Any], *args, timeout: Optional[float] = None) -> Any:
+        """
+        执行同步解析函数
+        
+        Args:
+            func: 同步函数（process模式下必须是模块级函数）
+            *args: 函数参数
+            timeout: 超时时间（秒，从开始执行时计时），None表示不限制
+        
+        Returns:
+            函数返回值
+        
+        Raises:
+            asyncio.TimeoutError: 超时（process模式下执行该任务的子进程已被终止）
+            BrokenProcessPool: 子进程异常退出（如被系统杀死）
+        """
+        if self.mode == self.MODE_PROCESS and not can_start_processes():
+            self._fall_back_to_threads("当前进程是守护进程，不能创建子进程")
+        if self.mode == self.MODE_PROCESS:
+            async with self._process_slots():
+                try:
+                    process, reader = self._start_process(func, args)
+                except (OSError, AssertionError) as e:
+                    # 运行环境禁止创建子进程（或守护进程中使用标准库multiprocessing）
+                    self._fall_back_to_threads(str(e))
+                else:
+                    return await self._wait_for_process(process, reader, timeout)
+        return await self._run_in_thread(func, args, timeout)
+    
+    @staticmethod
+    def _start_process(func: Callable[..., Any], args: Tuple):
+        """启动执行单个任务的子进程，返回 (子进程, 结果管道读端)"""
+        context = _process_context()
+        reader, writer = context.Pipe(duplex=False)
+        process = context.Process(target=_run_in_child, args=(writer, func, args), daemon=True)
+        try:
+            process.start()
+        except BaseException:
+            reader.close()
+            raise
+        finally:
+            writer.close()
+        return process, reader
+    
+    @staticmethod
+    async def _wait_for_process(process, reader, timeout: Optional[float]) -> Any:
+        """等待子进程返回结果；超时或取消时终止该子进程"""
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        fd = reader.fileno()
+        
+        def on_readable():
+            loop.remove_reader(fd)
+            if done.done():
+                return
+            try:
+                succeeded, value = reader.recv()
+            except (EOFError, OSError):
+                # 子进程没有返回结果就退出了（崩溃或被杀死）
+                done.set_exception(BrokenProcessPool("解析子进程异常退出"))
+                return
+            except Exception as e:
+                done.set_exception(e)
+                return
+            if succeeded:
+                done.set_result(value)
+            else:
+                done.set_exception(value)
+        
+        loop.add_reader(fd, on_readable)
+        try:
+            if timeout is None:
+                return await done
+            return await asyncio.wait_for(done, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            if process.is_alive():
+                _kill_process(process)
+                logger.warning("文档解析已中断，解析子进程已终止", pid=process.pid)
+            raise
+        finally:
+            loop.remove_reader(fd)
+            reader.close()
+    
+    async def _run_in_thread(self, func: Callable[..., Any], args: Tuple, timeout: Optional[float]) -> Any:
+        """在线程池中执行（超时只能放弃等待，解析会在后台跑完）"""
+        future = asyncio.wrap_future(self.executor.submit(functools.partial(func, *args)))
+        if timeout is None:
+            return await future
+        return await asyncio.wait_for(future, timeout=timeout)
+    
+    def reset(self) -> None:
+        """丢弃当前线程池，下次使用时重新创建"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
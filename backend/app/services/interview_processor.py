@@ -11,6 +11,7 @@ import json
 from app.services.ai_service import get_ai_service
 from app.services.source_segmenter import SourceSegmenter
 from app.services.confidence_calculator import ConfidenceCalculator
+from app.services.step_scheduler import ProcessingStep, StepScheduler
 
 logger = structlog.get_logger()
 
@@ -18,62 +19,75 @@ logger = structlog.get_logger()
 class InterviewProcessor:
     """面试题文档处理器"""
     
+    # 答案提取窗口大小（段落数）：超过该数量时按窗口切分，并行提取后按source_ids合并
+    ANSWER_WINDOW_SEGMENTS = 40
+    # 每个窗口最多保留的答案数
+    MAX_ANSWERS_PER_WINDOW = 20
+    
+    # 各子步骤的检索问题（长文档只发送与之最相关的段落；答案提取按窗口覆盖全部段落，不做检索）
+    RETRIEVAL_QUERIES = {
+        "summary": "面试题目、考察的知识点、技术主题、难度和题型",
+        "questions": "核心概念、原理、技术细节、常见问题和最佳实践",
+    }
+    
     @staticmethod
-    async def process(content: str, stream_callback: Optional[callable] = None) -> Dict:
+    async def process(
+        content: str,
+        stream_callback: Optional[callable] = None,
+        segments: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         处理面试题文档
         
         Args:
             content: 文档内容
+            segments: 预先切分的段落（与content对应），为空则自动切分
         
         Returns:
             处理结果字典
         """
         logger.info("开始处理面试题文档", content_length=len(content))
         
-        # 0. 段落切分（带异常处理）
-        try:
-            segments = SourceSegmenter.segment_content(content, timeout=5.0)
-            logger.info("段落切分完成", segments_count=len(segments), content_length=len(content))
-            # 如果段落切分返回空列表，使用兜底策略
-            if not segments:
-                logger.warning("段落切分返回空列表，使用兜底策略")
-                segments = SourceSegmenter._fallback_segment(content)
-                logger.info("兜底策略完成", segments_count=len(segments))
-        except Exception as e:
-            logger.error("段落切分失败，使用兜底策略", error=str(e))
-            segments = SourceSegmenter._fallback_segment(content)  # 使用兜底策略而不是空列表
+        # 0. 段落切分（优先使用调用方传入的切分结果，否则按内容哈希复用切分缓存）
+        segments = SourceSegmenter.get_segments(content, segments)
         
-        # 1. 内容总结（带异常处理）
-        try:
-            summary = await InterviewProcessor._extract_summary(content, segments)
-        except Exception as e:
-            logger.error("内容总结失败，使用默认值", error=str(e))
-            summary = {
-                "key_points": [],
-                "question_types": {},
-                "difficulty": {},
-                "total_questions": 0
-            }
-        
-        # 2. 问题生成（带异常处理）
-        try:
-            generated_questions = await InterviewProcessor._generate_questions(content, segments, summary)
-        except Exception as e:
-            logger.error("问题生成失败，使用默认值", error=str(e))
-            generated_questions = []
-        
-        # 3. 答案提取（带异常处理）
-        try:
-            extracted_answers = await InterviewProcessor._extract_answers(content, segments)
-        except Exception as e:
-            logger.error("答案提取失败，使用默认值", error=str(e))
-            extracted_answers = {
-                "answers": [],
-                "confidence": None,
-                "confidence_label": None,
-                "sources": []
-            }
+        # 1-3. 按依赖关系并发执行子步骤（带异常处理）
+        # 问题生成依赖内容总结；答案提取只依赖段落，与前两步并发执行
+        steps = [
+            ProcessingStep(
+                "summary",
+                lambda: InterviewProcessor._extract_summary(content, segments),
+                fallback=lambda: {
+                    "key_points": [],
+                    "question_types": {},
+                    "difficulty": {},
+                    "total_questions": 0
+                },
+                description="内容总结"
+            ),
+            ProcessingStep(
+                "generated_questions",
+                lambda summary: InterviewProcessor._generate_questions(content, segments, summary),
+                depends_on=("summary",),
+                fallback=lambda: [],
+                description="问题生成"
+            ),
+            ProcessingStep(
+                "extracted_answers",
+                lambda: InterviewProcessor._extract_answers(content, segments),
+                fallback=lambda: {
+                    "answers": [],
+                    "confidence": None,
+                    "confidence_label": None,
+                    "sources": []
+                },
+                description="答案提取"
+            )
+        ]
+        step_results = await StepScheduler(steps).run()
+        summary = step_results["summary"]
+        generated_questions = step_results["generated_questions"]
+        extracted_answers = step_results["extracted_answers"]
         
         result = {
             "summary": summary,
@@ -112,7 +126,8 @@ class InterviewProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                require_confidence=False  # 弱展示，不强制要求
+                require_confidence=False,  # 弱展示，不强制要求
+                retrieval_query=InterviewProcessor.RETRIEVAL_QUERIES["summary"]
             )
             
             # 验证和补充数据
@@ -202,7 +217,8 @@ class InterviewProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.7,
-                require_confidence=False  # 弱展示，不强制要求
+                require_confidence=False,  # 弱展示，不强制要求
+                retrieval_query=InterviewProcessor.RETRIEVAL_QUERIES["questions"]
             )
             
             # 确保返回列表格式
@@ -264,52 +280,45 @@ class InterviewProcessor:
             return []
     
     @staticmethod
-    async def _extract_answers(content: str, segments: List[Dict]) -> List[Dict]:
-        """提取答案"""
-        ai_service = get_ai_service()
-        
-        prompt = """请从以下面试题文档中提取所有答案。
-
-请返回JSON格式：
-{
-  "answers": ["答案1", "答案2", ...],
-  "source_ids": [1, 2, 3],  // 引用的段落编号（可选）
-  "confidence": 85  // 可信度分数(0-100)（可选）
-}
-
-如果没有找到答案，answers返回空数组 []。"""
+    async def _extract_answers(content: str, segments: List[Dict]) -> Dict:
+        """
+        提取答案
         
-        system_prompt = "你是一个文档分析专家，擅长从文档中提取结构化信息。"
+        长文档按段落窗口切分，各窗口并行提取，再按source_ids顺序合并；
+        作为process的一个步骤运行时，窗口调度器与外层共用AI_STEP_MAX_CONCURRENCY名额
+        """
+        window_size = InterviewProcessor.ANSWER_WINDOW_SEGMENTS
+        windows = [segments[i:i + window_size] for i in range(0, len(segments), window_size)] or [segments]
         
         try:
-            result = await ai_service.generate_with_sources(
-                prompt=prompt,
-                segments=segments,
-                system_prompt=system_prompt,
-                temperature=0.3,
-                require_confidence=False  # 弱展示，不强制要求
-            )
-            
-            # 提取answers列表
-            if isinstance(result, dict) and "answers" in result:
-                answers = result["answers"]
-            elif isinstance(result, list):
-                answers = result
+            if len(windows) == 1:
+                window_results = [await InterviewProcessor._request_answers(windows[0])]
             else:
-                answers = []
+                logger.info("答案提取按窗口并行执行", windows=len(windows), segments_count=len(segments))
+                window_steps = [
+                    ProcessingStep(
+                        f"window_{idx}",
+                        lambda window=window: InterviewProcessor._request_answers(window),
+                        description=f"答案提取（窗口{idx + 1}/{len(windows)}）"
+                    )
+                    for idx, window in enumerate(windows)
+                ]
+                step_results = await StepScheduler(window_steps).run()
+                # 失败的窗口结果为None，跳过
+                window_results = [
+                    step_results[f"window_{idx}"] for idx in range(len(windows))
+                    if step_results[f"window_{idx}"] is not None
+                ]
             
-            # 限制数量并转换为带可信度的格式
-            answers_list = answers[:20]
+            merged = InterviewProcessor._merge_answer_windows(window_results)
+            answers_list = merged["answers"]
             
             # 弱展示：如果AI返回了可信度和来源，则添加
-            if isinstance(result, dict) and ("confidence" in result or "source_ids" in result):
-                base_confidence = ConfidenceCalculator.normalize_confidence(
-                    result.get("confidence")
-                )
-                source_ids = result.get("source_ids", [])
+            if merged["has_meta"]:
+                source_ids = merged["source_ids"]
                 
                 confidence_result = ConfidenceCalculator.calculate_confidence(
-                    base_confidence=base_confidence,
+                    base_confidence=merged["base_confidence"],
                     source_ids=source_ids,
                     segments=segments,
                     content=content,
@@ -346,4 +355,84 @@ class InterviewProcessor:
                 "confidence_label": None,
                 "sources": []
             }
+    
+    @staticmethod
+    async def _request_answers(window_segments: List[Dict]) -> Dict:
+        """
+        对一个段落窗口调用AI提取答案
+        
+        Returns:
+            {"answers": [...], "source_ids": [...], "confidence": 原始可信度, "has_meta": bool}
+        """
+        ai_service = get_ai_service()
+        
+        prompt = """请从以下面试题文档中提取所有答案。
 
+请返回JSON格式：
+{
+  "answers": ["答案1", "答案2", ...],
+  "source_ids": [1, 2, 3],  // 引用的段落编号（可选）
+  "confidence": 85  // 可信度分数(0-100)（可选）
+}
+
+如果没有找到答案，answers返回空数组 []。"""
+        
+        system_prompt = "你是一个文档分析专家，擅长从文档中提取结构化信息。"
+        
+        result = await ai_service.generate_with_sources(
+            prompt=prompt,
+            segments=window_segments,
+            system_prompt=system_prompt,
+            temperature=0.3,
+            require_confidence=False  # 弱展示，不强制要求
+        )
+        
+        # 提取answers列表
+        if isinstance(result, dict) and "answers" in result:
+            answers = result["answers"]
+        elif isinstance(result, list):
+            answers = result
+        else:
+            answers = []
+        
+        has_meta = isinstance(result, dict) and ("confidence" in result or "source_ids" in result)
+        return {
+            "answers": answers[:InterviewProcessor.MAX_ANSWERS_PER_WINDOW],
+            "source_ids": result.get("source_ids", []) if has_meta else [],
+            "confidence": result.get("confidence") if has_meta else None,
+            "has_meta": has_meta
+        }
+    
+    @staticmethod
+    def _merge_answer_windows(window_results: List[Dict]) -> Dict:
+        """
+        合并各窗口的答案提取结果
+        
+        窗口按原文段落顺序排列，答案按窗口顺序拼接并去重，source_ids取并集并排序，
+        基础可信度取各窗口的平均值
+        """
+        answers = []
+        seen_answers = set()
+        source_ids = set()
+        confidences = []
+        has_meta = False
+        
+        for window in window_results:
+            for answer in window["answers"]:
+                key = answer if isinstance(answer, str) else str(answer)
+                if key in seen_answers:
+                    continue
+                seen_answers.add(key)
+                answers.append(answer)
+            
+            if window["has_meta"]:
+                has_meta = True
+                source_ids.update(window["source_ids"])
+                confidences.append(ConfidenceCalculator.normalize_confidence(window["confidence"]))
+        
+        return {
+            "answers": answers,
+            "source_ids": sorted(source_ids),
+            "base_confidence": sum(confidences) / len(confidences) if confidences else 50.0,
+            "has_meta": has_meta
+        }
@@ -3,11 +3,9 @@
 - 从架构师视角构建技术栈知识图谱
 - 节点是IT技术名词（带架构层次信息），边表示上下游关系
 """
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
-from collections import defaultdict, Counter
 import structlog
-from app.services.view_registry import ViewRegistry
 
 logger = structlog.get_logger()
 
@@ -38,9 +36,8 @@ class KnowledgeGraphBuilder:
         """
         from sqlalchemy import select
         from app.models.processing_result import ProcessingResult
-        from app.models.system_learning_data import SystemLearningData
         from app.models.document import Document
-        from app.services.entity_extractor import get_entity_extractor
+        from app.services.document_technology_service import DocumentTechnologyService
         
         logger.info("开始构建知识图谱（基于技术名词）", 
                    threshold=similarity_threshold, 
@@ -49,7 +46,8 @@ class KnowledgeGraphBuilder:
         try:
             from uuid import UUID
             
-            # 1. 获取文档结果（如果指定了document_id，只获取该文档）
+            doc_uuid = None
+            # 1. 单文档模式：只获取该文档的处理结果
             if document_id:
                 try:
                     doc_uuid = UUID(document_id) if isinstance(document_id, str) else document_id
@@ -80,118 +78,27 @@ class KnowledgeGraphBuilder:
                 
                 query_result = await db.execute(query)
                 documents_data = query_result.fetchall()
-            else:
-                # 获取所有已处理的文档结果
-                query = select(
-                    ProcessingResult.document_id,
-                    ProcessingResult.document_type,
-                    ProcessingResult.result_data
-                ).join(
-                    Document, ProcessingResult.document_id == Document.id
-                ).where(
-                    Document.status == 'completed'
-                )
                 
-                if document_type:
-                    query = query.where(ProcessingResult.document_type == document_type)
+                if len(documents_data) == 0:
+                    logger.warning("没有已处理的文档，无法构建知识图谱")
+                    return {
+                        "nodes": [],
+                        "edges": [],
+                        "total_nodes": 0,
+                        "total_edges": 0,
+                        "generated_at": datetime.now().isoformat()
+                    }
                 
-                query_result = await db.execute(query)
-                documents_data = query_result.fetchall()
-            
-            if len(documents_data) == 0:
-                logger.warning("没有已处理的文档，无法构建知识图谱")
-                return {
-                    "nodes": [],
-                    "edges": [],
-                    "total_nodes": 0,
-                    "total_edges": 0,
-                    "generated_at": datetime.now().isoformat()
-                }
+                # 2. 只有一个处理结果时，使用架构分析器生成架构视角的知识图谱
+                if len(documents_data) == 1:
+                    return await KnowledgeGraphBuilder._build_architecture_graph(
+                        db, documents_data[0], similarity_threshold, max_nodes
+                    )
             
-            # 2. 如果是单文档模式，使用架构分析器生成架构视角的知识图谱
-            if document_id and len(documents_data) == 1:
-                return await KnowledgeGraphBuilder._build_architecture_graph(
-                    db, documents_data[0], similarity_threshold, max_nodes
-                )
-            
-            # 3. 多文档模式：从文档中提取技术名词
-            extractor = get_entity_extractor()
-            technology_docs_map = defaultdict(set)  # 技术 -> 包含该技术的文档集合
-            doc_technologies_map = {}  # 文档ID -> 技术列表
-            all_technologies = set()  # 所有提取到的技术名词集合（用于单文档模式）
-            component_relationships = {}  # 组件关系（用于架构文档）
-            
-            for doc_data in documents_data:
-                doc_id = str(doc_data.document_id)
-                processing_result = doc_data.result_data if isinstance(doc_data.result_data, dict) else {}
-                
-                # 从处理结果中提取技术名词
-                technologies = await extractor.extract_technologies_from_result(processing_result)
-                
-                # 如果是架构文档，从 components 中提取更多信息
-                # 兼容处理：如果document_type是view名称，转换为类型
-                document_type = doc_data.document_type
-                if document_type in ViewRegistry.TYPE_TO_VIEW_MAP.values():
-                    document_type = ViewRegistry.get_type_mapping(document_type)
-                
-                if document_type == 'architecture' and 'components' in processing_result:
-                    components = processing_result.get('components', [])
-                    if isinstance(components, list):
-                        # 提取组件依赖关系
-                        for comp in components:
-                            if isinstance(comp, dict) and 'name' in comp:
-                                comp_name = comp.get('name', '').strip()
-                                comp_deps = comp.get('dependencies', [])
-                                if comp_name and comp_deps:
-                                    # 从组件名称中提取技术名词
-                                    from app.services.entity_extractor import EntityExtractor
-                                    comp_techs = EntityExtractor._extract_tech_from_text(comp_name)
-                                    technologies.extend(comp_techs)
-                                    
-                                    # 从依赖中提取技术名词
-                                    for dep in comp_deps:
-                                        if isinstance(dep, str):
-                                            dep_techs = EntityExtractor._extract_tech_from_text(dep)
-                                            technologies.extend(dep_techs)
-                                            # 记录组件关系
-                                            for comp_tech in comp_techs:
-                                                for dep_tech in dep_techs:
-                                                    if comp_tech != dep_tech:
-                                                        if comp_tech not in component_relationships:
-                                                            component_relationships[comp_tech] = set()
-                                                        component_relationships[comp_tech].add(dep_tech)
-                
-                # 如果处理结果中没有，尝试从文档内容中提取
-                if not technologies:
-                    try:
-                        doc_uuid = UUID(doc_id) if isinstance(doc_data.document_id, str) else doc_data.document_id
-                        sld_query = await db.execute(
-                            select(SystemLearningData.content_summary)
-                            .where(SystemLearningData.document_id == doc_uuid)
-                        )
-                        sld_data = sld_query.scalar_one_or_none()
-                        if sld_data and hasattr(sld_data, 'content_summary') and sld_data.content_summary:
-                            technologies = await extractor.extract_technologies_from_content(sld_data.content_summary)
-                    except Exception as e:
-                        logger.warning("获取文档内容摘要失败", document_id=doc_id, error=str(e))
-                
-                # 去重并标准化技术名词
-                technologies = list(set(technologies))
-                # 标准化：将 "MQ" 扩展为 "RocketMQ"（如果文档中提到 RocketMQ）
-                if 'MQ' in technologies:
-                    # 检查是否有 RocketMQ 相关的技术
-                    has_rocketmq = any('rocketmq' in tech.lower() or 'rocket' in tech.lower() for tech in technologies)
-                    if has_rocketmq and 'RocketMQ' not in technologies:
-                        technologies.append('RocketMQ')
-                        technologies.remove('MQ')
-                
-                if technologies:
-                    doc_technologies_map[doc_id] = technologies
-                    for tech in technologies:
-                        technology_docs_map[tech].add(doc_id)
-                        all_technologies.add(tech)
+            # 3. 从文档技术名词表按技术聚合（处理结果保存时已提取，不读取结果JSONB）
+            frequencies = await DocumentTechnologyService.technology_frequencies(db, document_type, doc_uuid)
             
-            if len(technology_docs_map) == 0:
+            if len(frequencies) == 0:
                 logger.warning("未提取到技术名词，无法构建知识图谱")
                 return {
                     "nodes": [],
@@ -201,174 +108,19 @@ class KnowledgeGraphBuilder:
                     "generated_at": datetime.now().isoformat()
                 }
             
-            # 3. 构建技术名词节点（优化：优先选择有强关联关系的技术）
-            from app.services.tech_relationship_service import get_tech_relationship_service
-            relationship_service = get_tech_relationship_service()
-            
-            if document_id:
-                # 单文档模式：只显示该文档中的技术名词，但优先选择有强关联关系的
-                tech_scores = {}
-                for tech in all_technologies:
-                    # 计算技术的重要性分数：基于与其他技术的关联强度
-                    score = 0
-                    related_count = 0
-                    for other_tech in all_technologies:
-                        if tech != other_tech:
-                            strength = relationship_service.get_relationship_strength_sync(tech, other_tech)
-                            if strength > 0:
-                                score += strength
-                                related_count += 1
-                    # 重要性 = 平均关联强度 + 关联数量权重
-                    avg_strength = score / related_count if related_count > 0 else 0
-                    tech_scores[tech] = avg_strength * 0.7 + (related_count / len(all_technologies)) * 0.3 if len(all_technologies) > 1 else 1.0
-                
-                # 按重要性分数排序
-                sorted_techs = sorted(tech_scores.items(), key=lambda x: x[1], reverse=True)
-                selected_techs = [tech for tech, score in sorted_techs[:max_nodes]]
-                tech_frequency = {tech: 1 for tech in selected_techs}
-            else:
-                # 多文档模式：按出现频率和关联关系综合排序
-                tech_frequency = {tech: len(docs) for tech, docs in technology_docs_map.items()}
-                tech_scores = {}
-                for tech, freq in tech_frequency.items():
-                    # 计算综合分数：频率 + 关联关系强度
-                    related_strength_sum = 0
-                    related_count = 0
-                    for other_tech, other_freq in tech_frequency.items():
-                        if tech != other_tech:
-                            strength = relationship_service.get_relationship_strength_sync(tech, other_tech)
-                            if strength > 0:
-                                related_strength_sum += strength
-                                related_count += 1
-                    avg_related_strength = related_strength_sum / related_count if related_count > 0 else 0
-                    # 综合分数 = 频率权重(0.4) + 关联强度权重(0.6)
-                    tech_scores[tech] = (freq / max(tech_frequency.values()) if tech_frequency.values() else 0) * 0.4 + avg_related_strength * 0.6
-                
-                sorted_techs = sorted(tech_scores.items(), key=lambda x: x[1], reverse=True)
-                selected_techs = [tech for tech, score in sorted_techs[:max_nodes]]
-            
-            # 4. 构建节点列表（优化：节点大小基于重要性和关联度）
-            nodes = []
-            # 计算每个节点的边数量（用于确定节点大小）
-            node_edge_count = {}
-            for tech in selected_techs:
-                node_edge_count[tech] = 0
-            
-            # 临时计算边数量（在正式构建边之前）
-            for i, tech1 in enumerate(selected_techs):
-                for j, tech2 in enumerate(selected_techs):
-                    if i >= j:
-                        continue
-                    strength = relationship_service.get_relationship_strength_sync(tech1, tech2)
-                    if strength >= similarity_threshold:
-                        node_edge_count[tech1] = node_edge_count.get(tech1, 0) + 1
-                        node_edge_count[tech2] = node_edge_count.get(tech2, 0) + 1
-            
-            max_edge_count = max(node_edge_count.values()) if node_edge_count.values() else 1
-            
-            for tech in selected_techs:
-                frequency = tech_frequency[tech]
-                edge_count = node_edge_count.get(tech, 0)
-                
-                # 节点大小基于：频率(30%) + 关联度(70%)
-                # 关联度 = 边的数量 / 最大边数量
-                edge_ratio = edge_count / max_edge_count if max_edge_count > 0 else 0
-                importance = (frequency / max(tech_frequency.values()) if tech_frequency.values() else 1) * 0.3 + edge_ratio * 0.7
-                
-                # 节点大小：最小30，最大60
-                size = int(30 + importance * 30)
-                
-                nodes.append({
-                    "id": tech,
-                    "label": tech,
-                    "type": "technology",
-                    "frequency": frequency,
-                    "color": KnowledgeGraphBuilder._get_tech_color(tech),
-                    "size": size
-                })
-            
-            # 5. 构建边列表（基于技术栈的实际关联关系，优化筛选逻辑）
-            edges = []
-            processed_pairs = set()
-            
-            # 先收集所有可能的边及其权重
-            candidate_edges = []
-            
-            for i, tech1 in enumerate(selected_techs):
-                for j, tech2 in enumerate(selected_techs):
-                    if i >= j:
-                        continue
-                    
-                    pair_key = tuple(sorted([tech1, tech2]))
-                    if pair_key in processed_pairs:
-                        continue
-                    
-                    processed_pairs.add(pair_key)
-                    
-                    # 获取技术栈的实际关联强度（基于架构师/开发者的视角）
-                    relationship_strength = relationship_service.get_relationship_strength_sync(tech1, tech2)
-                    
-                    # 如果关联强度超过阈值，加入候选边
-                    if relationship_strength >= similarity_threshold:
-                        if document_id:
-                            # 单文档模式：只使用技术栈关联强度
-                            final_weight = relationship_strength
-                            cooccurrence = 1.0
-                            docs_count = 1
-                        else:
-                            # 多文档模式：使用技术栈关联强度 + 文档共现度
-                            docs_with_tech1 = technology_docs_map.get(tech1, set())
-                            docs_with_tech2 = technology_docs_map.get(tech2, set())
-                            docs_with_both = docs_with_tech1 & docs_with_tech2
-                            docs_with_either = docs_with_tech1 | docs_with_tech2
-                            
-                            cooccurrence = len(docs_with_both) / len(docs_with_either) if len(docs_with_either) > 0 else 0
-                            
-                            # 最终权重 = 技术栈关联强度 * 0.7 + 文档共现度 * 0.3
-                            final_weight = relationship_strength * 0.7 + cooccurrence * 0.3
-                            docs_count = len(docs_with_both)
-                        
-                        candidate_edges.append({
-                            "source": tech1,
-                            "target": tech2,
-                            "cooccurrence": round(cooccurrence, 3),
-                            "relationship_strength": round(relationship_strength, 3),
-                            "weight": round(final_weight, 3),
-                            "label": f"{relationship_strength:.2f}",
-                            "documents_count": docs_count
-                        })
-            
-            # 按最终权重排序
-            candidate_edges.sort(key=lambda x: x["weight"], reverse=True)
-            
-            # 优化边筛选：确保每个节点至少有一条边（如果可能），但优先保留强关联边
-            # 1. 先保留所有强关联边（权重 >= 0.5）
-            strong_edges = [e for e in candidate_edges if e["relationship_strength"] >= 0.5]
-            edges.extend(strong_edges)
-            
-            # 2. 确保每个节点至少有一条边（如果还没有）
-            nodes_with_edges = set()
-            for edge in edges:
-                nodes_with_edges.add(edge["source"])
-                nodes_with_edges.add(edge["target"])
-            
-            for tech in selected_techs:
-                if tech not in nodes_with_edges:
-                    # 为该节点找一条最强的边
-                    for edge in candidate_edges:
-                        if edge not in edges and (edge["source"] == tech or edge["target"] == tech):
-                            edges.append(edge)
-                            nodes_with_edges.add(tech)
-                            break
-            
-            # 3. 补充其他边，但限制总数
-            remaining_edges = [e for e in candidate_edges if e not in edges]
-            # 限制边的数量：最多 max_nodes * 2（避免图过于复杂）
-            max_edges = min(len(edges) + len(remaining_edges), max_nodes * 2)
-            edges.extend(remaining_edges[:max_edges - len(edges)])
-            
-            # 最终排序
-            edges.sort(key=lambda x: x["weight"], reverse=True)
+            # 4-5. 选择技术节点并构建边（共同文档数只对选中的技术按技术对聚合）
+            single_document = doc_uuid is not None
+            selection = KnowledgeGraphBuilder.select_technology_nodes(
+                [tech for tech, _ in frequencies],
+                None if single_document else [count for _, count in frequencies],
+                max_nodes
+            )
+            shared = None if single_document else await DocumentTechnologyService.shared_document_counts(
+                db, selection[0], document_type
+            )
+            nodes, edges = KnowledgeGraphBuilder.build_technology_edges(
+                selection, shared, similarity_threshold, max_nodes
+            )
             
             result = {
                 "nodes": nodes,
@@ -382,7 +134,7 @@ class KnowledgeGraphBuilder:
             logger.info("知识图谱构建完成（基于技术名词）", 
                        nodes=len(nodes), 
                        edges=len(edges),
-                       technologies=len(selected_techs))
+                       technologies=len(nodes))
             
             return result
             
@@ -397,6 +149,158 @@ class KnowledgeGraphBuilder:
                 "generated_at": datetime.now().isoformat()
             }
     
+    @staticmethod
+    def select_technology_nodes(techs: List[str], frequencies: Optional[List[int]], max_nodes: int) -> Tuple:
+        """
+        节点评分并选择前max_nodes个技术节点
+        
+        Args:
+            techs: 技术名词列表（同分时保持该顺序）
+            frequencies: 与techs对应的文档数；为None时为单文档模式（评分只使用技术栈关联强度）
+            max_nodes: 最大节点数
+        
+        Returns:
+            (选中的技术, 选中技术的文档数, 所有技术中的最大文档数, 选中技术之间的关联强度矩阵)
+        """
+        import numpy as np
+        from app.services.tech_relationship_service import get_tech_relationship_service
+        
+        relationship_service = get_tech_relationship_service()
+        
+        # 3. 节点评分：与其他技术的平均关联强度 + 关联数量（单文档）/ 出现频率（多文档）
+        n = len(techs)
+        strengths = relationship_service.strength_array(techs)
+        
+        related = strengths > 0
+        np.fill_diagonal(related, False)
+        # cumsum按列顺序逐个累加，浮点结果与逐项累加完全一致
+        related_sums = np.cumsum(np.where(related, strengths, 0.0), axis=1)[:, -1] if n else np.zeros(0)
+        related_counts = related.sum(axis=1)
+        avg_strengths = np.divide(related_sums, related_counts, out=np.zeros(n), where=related_counts > 0)
+        
+        if frequencies is None:
+            if n > 1:
+                scores = avg_strengths * 0.7 + (related_counts / n) * 0.3
+            else:
+                scores = np.ones(n)
+            frequencies = np.ones(n, dtype=np.int64)
+        else:
+            frequencies = np.asarray(frequencies, dtype=np.int64)
+            scores = (frequencies / frequencies.max()) * 0.4 + avg_strengths * 0.6
+        
+        # 频率归一化使用所有技术中的最大频率
+        max_frequency = int(frequencies.max())
+        selected = np.argsort(-scores, kind="stable")[:max_nodes]
+        return (
+            [techs[i] for i in selected],
+            frequencies[selected],
+            max_frequency,
+            strengths[np.ix_(selected, selected)]
+        )
+    
+    @staticmethod
+    def build_technology_edges(
+        selection: Tuple,
+        shared,
+        similarity_threshold: float,
+        max_nodes: int
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """
+        为选中的技术节点构建节点数据和边
+        
+        Args:
+            selection: select_technology_nodes的返回值
+            shared: 选中技术两两之间的共同文档数矩阵；为None时为单文档模式（不计算共现度）
+            similarity_threshold: 关联度阈值
+            max_nodes: 最大节点数
+        
+        Returns:
+            (节点列表, 边列表)
+        """
+        import numpy as np
+        
+        selected_techs, frequencies, max_frequency, selected_strengths = selection
+        
+        # 4. 节点：大小基于频率(30%) + 边数量(70%)
+        above_threshold = np.triu(selected_strengths >= similarity_threshold, k=1)
+        edge_counts = above_threshold.sum(axis=0) + above_threshold.sum(axis=1)
+        max_edge_count = int(edge_counts.max()) if len(selected_techs) else 1
+        
+        nodes = []
+        for tech, frequency, edge_count in zip(selected_techs, frequencies.tolist(), edge_counts.tolist()):
+            edge_ratio = edge_count / max_edge_count if max_edge_count > 0 else 0
+            importance = (frequency / max_frequency) * 0.3 + edge_ratio * 0.7
+            nodes.append({
+                "id": tech,
+                "label": tech,
+                "type": "technology",
+                "frequency": frequency,
+                "color": KnowledgeGraphBuilder._get_tech_color(tech),
+                "size": int(30 + importance * 30)
+            })
+        
+        # 5. 候选边：上三角中关联强度达到阈值的技术对（行优先，与逐对循环的顺序一致）
+        sources, targets = np.nonzero(above_threshold)
+        relationship_strengths = selected_strengths[sources, targets]
+        if shared is None:
+            cooccurrences = np.ones(len(sources))
+            docs_counts = np.ones(len(sources), dtype=np.int64)
+            weights = relationship_strengths
+        else:
+            docs_counts = shared[sources, targets]
+            either = frequencies[sources] + frequencies[targets] - docs_counts
+            cooccurrences = np.divide(docs_counts, either, out=np.zeros(len(sources)), where=either > 0)
+            weights = relationship_strengths * 0.7 + cooccurrences * 0.3
+        
+        # 排序和筛选使用保留3位小数后的值（与返回的字段一致）
+        rounded_strengths = np.asarray([round(x, 3) for x in relationship_strengths.tolist()])
+        rounded_weights = np.asarray([round(x, 3) for x in weights.tolist()])
+        order = np.argsort(-rounded_weights, kind="stable")
+        
+        # 1) 保留所有强关联边（关联强度 >= 0.5）
+        chosen = np.zeros(len(order), dtype=bool)  # 按排序后的位置标记
+        chosen[rounded_strengths[order] >= 0.5] = True
+        edge_positions = list(np.flatnonzero(chosen))
+        
+        # 2) 确保每个节点至少有一条边：为没有边的节点选择包含它的最强候选边
+        has_edge = np.zeros(len(selected_techs), dtype=bool)
+        has_edge[sources[order][chosen]] = True
+        has_edge[targets[order][chosen]] = True
+        if not has_edge.all() and len(order):
+            endpoints = np.concatenate([sources[order], targets[order]])
+            positions = np.tile(np.arange(len(order)), 2)
+            by_node = np.lexsort((positions, endpoints))
+            bounds = np.searchsorted(endpoints[by_node], np.arange(len(selected_techs) + 1))
+            for node in np.flatnonzero(~has_edge):
+                for position in positions[by_node[bounds[node]:bounds[node + 1]]]:
+                    if not chosen[position]:
+                        chosen[position] = True
+                        edge_positions.append(position)
+                        break
+        
+        # 3) 补充其他边，总数最多 max_nodes * 2
+        remaining = np.flatnonzero(~chosen)
+        max_edges = min(len(edge_positions) + len(remaining), max_nodes * 2)
+        edge_positions.extend(remaining[:max_edges - len(edge_positions)])
+        
+        edge_positions = np.asarray(edge_positions, dtype=np.int64)
+        edge_positions = edge_positions[np.argsort(-rounded_weights[order][edge_positions], kind="stable")]
+        
+        edges = []
+        for candidate in order[edge_positions].tolist():
+            relationship_strength = float(relationship_strengths[candidate])
+            edges.append({
+                "source": selected_techs[sources[candidate]],
+                "target": selected_techs[targets[candidate]],
+                "cooccurrence": round(float(cooccurrences[candidate]), 3),
+                "relationship_strength": round(relationship_strength, 3),
+                "weight": float(rounded_weights[candidate]),
+                "label": f"{relationship_strength:.2f}",
+                "documents_count": int(docs_counts[candidate])
+            })
+        
+        return nodes, edges
+    
     @staticmethod
     async def _build_architecture_graph(
         db,
@@ -0,0 +1,166 @@
+"""
+近似重复检测索引 - 基于字符shingle的MinHash + LSH
+- 每段文本只哈希一遍（一次置换MinHash + 致密化），签名计算与文本长度成线性关系
+- LSH分桶只召回可能相似的候选，再用shingle集合的Jaccard相似度精确判定
+- 整体去重复杂度接近线性，替代逐对SequenceMatcher比较
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import zlib
+
+
+class NearDuplicateIndex:
+    """
+    近似重复检测索引
+    
+    用法：对每段文本先query，不重复时再add；相似度为字符shingle集合的Jaccard相似度
+    """
+    
+    SHINGLE_SIZE = 4  # 字符shingle长度（兼顾中文和英文）
+    NUM_PERM = 64  # MinHash签名长度（分桶数）
+    BANDS = 16  # LSH分段数（每段 NUM_PERM / BANDS 行）
+    
+    _VALUE_BITS = 26  # 32位哈希去掉分桶位后剩余的位数
+    
+    def __init__(self, threshold: float = 0.7, shingle_size: Optional[int] = None):
+        """
+        初始化索引
+        
+        Args:
+            threshold: 相似度阈值（Jaccard），达到该值视为重复
+            shingle_size: 字符shingle长度，如果为None则使用默认值
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError(f"相似度阈值必须在(0, 1]之间: {threshold}")
+        self.threshold = threshold
+        self.shingle_size = shingle_size or self.SHINGLE_SIZE
+        self._rows = self.NUM_PERM // self.BANDS
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(self.BANDS)]
+        self._shingles: List[Set[int]] = []
+    
+    def __len__(self) -> int:
+        return len(self._shingles)
+    
+    def shingle(self, text: str) -> Set[int]:
+        """
+        计算文本的shingle哈希集合（空白字符统一为单个空格）
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            shingle哈希集合（CRC32）
+        """
+        text = ' '.join(text.split())
+        k = self.shingle_size
+        if len(text) <= k:
+            return {zlib.crc32(text.encode('utf-8'))}
+        return {zlib.crc32(text[i:i + k].encode('utf-8')) for i in range(len(text) - k + 1)}
+    
+    def signature(self, shingles: Set[int]) -> List[int]:
+        """
+        计算MinHash签名（一次置换：哈希低位选桶，高位取桶内最小值；空桶向右借值致密化）
+        
+        Args:
+            shingles: shingle哈希集合
+        
+        Returns:
+            长度为NUM_PERM的签名
+        """
+        num_perm = self.NUM_PERM
+        bucket_bits = num_perm.bit_length() - 1
+        empty = -1
+        bins = [empty] * num_perm
+        for h in shingles:
+            index = h & (num_perm - 1)
+            value = h >> bucket_bits
+            if bins[index] == empty or value < bins[index]:
+                bins[index] = value
+        
+        if empty in bins:
+            # 致密化：空桶取右侧最近非空桶的值，并加上距离偏移，避免不同空桶得到相同的值
+            # 从右向左环形扫描两遍即可覆盖所有空桶
+            filled = list(bins)
+            nearest, distance = empty, 0
+            for position in range(2 * num_perm - 1, -1, -1):
+                index = position % num_perm
+                if bins[index] != empty:
+                    nearest, distance = bins[index], 0
+                    continue
+                distance += 1
+                if nearest != empty:
+                    filled[index] = nearest + (distance << self._VALUE_BITS)
+            bins = filled
+        return bins
+    
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, ...]]:
+        rows = self._rows
+        return [tuple(signature[b * rows:(b + 1) * rows]) for b in range(self.BANDS)]
+    
+    @staticmethod
+    def jaccard(a: Set[int], b: Set[int]) -> float:
+        """计算两个shingle集合的Jaccard相似度"""
+        if not a and not b:
+            return 1.0
+        intersection = len(a & b)
+        return intersection / (len(a) + len(b) - intersection)
+    
+    def query(self, text: str) -> Optional[int]:
+        """
+        查找与文本相似度达到阈值的已索引文本
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            已索引文本的编号（按add顺序，从0开始），不存在则返回None
+        """
+        return self._query(self.shingle(text))[0]
+    
+    def add(self, text: str) -> int:
+        """
+        将文本加入索引
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            文本编号
+        """
+        shingles = self.shingle(text)
+        return self._add(shingles, self.signature(shingles))
+    
+    def add_if_unique(self, text: str) -> bool:
+        """
+        文本不与已索引文本重复时加入索引
+        
+        Args:
+            text: 文本
+        
+        Returns:
+            是否加入（False表示是重复文本）
+        """
+        shingles = self.shingle(text)
+        match, signature = self._query(shingles)
+        if match is not None:
+            return False
+        self._add(shingles, signature)
+        return True
+    
+    def _query(self, shingles: Set[int]) -> Tuple[Optional[int], List[int]]:
+        signature = self.signature(shingles)
+        checked = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            for candidate in self._buckets[band].get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if self.jaccard(shingles, self._shingles[candidate]) >= self.threshold:
+                    return candidate, signature
+        return None, signature
+    
+    def _add(self, shingles: Set[int], signature: List[int]) -> int:
+        doc_id = len(self._shingles)
+        self._shingles.append(shingles)
+        for band, key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(key, []).append(doc_id)
+        return doc_id
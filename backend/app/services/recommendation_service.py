@@ -6,8 +6,11 @@
 """
 from typing import Dict, List, Optional
 from datetime import datetime
+import asyncio
 import structlog
 
+from app.core.config import settings
+
 logger = structlog.get_logger()
 
 
@@ -43,20 +46,28 @@ class RecommendationService:
         
         try:
             if document_id:
-                # 只使用书籍推荐，不推荐本地文档
-                book_recommendations = await RecommendationService._recommend_books(
-                    db, document_id, limit
+                # 相似的本地文档（预先计算的邻居列表 + 重排）和相关书籍同时生成；
+                # 书籍推荐使用独立的数据库会话，两者可以并发
+                local_recommendations, book_recommendations = await asyncio.gather(
+                    RecommendationService._recommend_by_document(
+                        db, document_id, limit, document_type, min_quality_score
+                    ),
+                    RecommendationService._recommend_books(db, document_id, limit),
+                    return_exceptions=True
                 )
                 
-                # 处理书籍推荐结果
+                if isinstance(local_recommendations, Exception):
+                    logger.warning("本地文档推荐失败", error=str(local_recommendations))
+                    local_recommendations = []
                 if isinstance(book_recommendations, Exception):
                     logger.warning("书籍推荐失败", error=str(book_recommendations))
-                    recommendations = []
-                else:
-                    recommendations = book_recommendations or []
+                    book_recommendations = []
+                
+                recommendations = (local_recommendations or []) + (book_recommendations or [])
                 
-                logger.info("书籍推荐完成", 
-                           books=len(recommendations),
+                logger.info("文档推荐完成",
+                           local=len(local_recommendations or []),
+                           books=len(book_recommendations or []),
                            total=len(recommendations))
             else:
                 # 通用推荐（基于质量分数和类型）
@@ -67,6 +78,7 @@ class RecommendationService:
             # 按推荐度（recommendation_score）降序排序，确保推荐度高的排在前面
             if recommendations:
                 recommendations.sort(key=lambda x: x.get("recommendation_score", 0), reverse=True)
+                recommendations = recommendations[:limit]
             
             result = {
                 "recommendations": recommendations,
@@ -88,6 +100,21 @@ class RecommendationService:
                 "generated_at": datetime.now().isoformat()
             }
     
+    @staticmethod
+    async def configure_ann_search(db, candidate_limit: int) -> None:
+        """
+        设置当前事务的HNSW搜索宽度
+        
+        ef_search不能小于返回的候选数，否则召回的候选不足；pgvector上限为1000
+        """
+        from sqlalchemy import text
+        
+        ef_search = min(max(settings.RECOMMENDATION_HNSW_EF_SEARCH, candidate_limit), 1000)
+        await db.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+            {"ef_search": str(ef_search)}
+        )
+    
     @staticmethod
     async def _recommend_by_document(
         db,
@@ -101,6 +128,8 @@ class RecommendationService:
         from sqlalchemy import select, text
         from app.models.system_learning_data import SystemLearningData
         from app.models.document import Document
+        from app.models.document_neighbor import DocumentNeighbor
+        from app.models.embedding_vector import storage_model_name, vector_sql_type
         
         try:
             doc_id = UUID(document_id)
@@ -108,11 +137,13 @@ class RecommendationService:
             logger.warning("无效的文档ID", document_id=document_id)
             return []
         
-        # 1. 获取目标文档的向量和元数据
+        # 1. 获取目标文档的向量和元数据（只比较当前嵌入模型生成的向量）
+        embedding_model = storage_model_name()
         target_query = await db.execute(
             select(SystemLearningData)
             .where(SystemLearningData.document_id == doc_id)
             .where(SystemLearningData.embedding.isnot(None))
+            .where(SystemLearningData.embedding_model == embedding_model)
         )
         target_data = target_query.scalar_one_or_none()
         
@@ -135,31 +166,108 @@ class RecommendationService:
         
         target_embedding_str = '[' + ','.join(map(str, target_embedding_list)) + ']'
         
-        # 构建SQL查询，综合多个因素计算推荐分数
+        # 向量类型与列的存储类型一致（vector或halfvec）
+        vector_type = vector_sql_type()
+        
         # 构建动态WHERE条件，避免None参数的类型问题
-        where_conditions = [
-            "sld.document_id != :target_document_id",
-            "sld.embedding IS NOT NULL",
-            "d.status = 'completed'"
-        ]
+        filter_conditions = []
+        filter_params = {}
         
-        params = {
+        # 添加可选的过滤条件
+        if document_type:
+            filter_conditions.append("sld.document_type = :document_type")
+            filter_params["document_type"] = document_type
+        
+        if min_quality_score is not None:
+            filter_conditions.append("sld.quality_score >= :min_quality_score")
+            filter_params["min_quality_score"] = min_quality_score
+        
+        rank_params = {
             "target_embedding": target_embedding_str,
-            "target_document_id": doc_id,
             "target_type": target_data.document_type or "",
-            "limit": limit * 10  # 多取一些，因为要过滤掉相似度<70%的
+            "embedding_model": embedding_model,
+            **filter_params
         }
         
-        # 添加可选的过滤条件
-        if document_type:
-            where_conditions.append("sld.document_type = :document_type")
-            params["document_type"] = document_type
+        # 第一阶段：候选召回
+        # 没有过滤条件时优先使用预先计算的邻居列表（按文档ID的索引查询，耗时与文档总数无关）；
+        # 邻居列表不考虑过滤条件，带过滤条件时过滤后可能所剩无几，直接走ANN检索
+        recommendations = []
+        if not filter_conditions:
+            neighbor_result = await db.execute(
+                select(DocumentNeighbor.neighbor_id)
+                .where(DocumentNeighbor.document_id == doc_id)
+                .order_by(DocumentNeighbor.similarity.desc())
+            )
+            neighbor_ids = list(neighbor_result.scalars().all())
+            if neighbor_ids:
+                recommendations = await RecommendationService._rank_candidates(
+                    db, neighbor_ids, rank_params, filter_conditions, vector_type, limit
+                )
+                if len(recommendations) >= limit:
+                    return recommendations
+                logger.info("邻居列表推荐数量不足，回退到ANN检索",
+                           document_id=document_id,
+                           neighbor_recommendations=len(recommendations),
+                           limit=limit)
+        
+        # 邻居列表尚未生成或推荐数量不足：ANN检索
+        # 只按向量距离排序，可以使用HNSW索引，耗时不随文档总数线性增长；
+        # 同表的过滤条件在索引扫描之后生效，候选数量留出余量
+        candidate_limit = max(limit * 10, settings.RECOMMENDATION_ANN_CANDIDATES)
+        await RecommendationService.configure_ann_search(db, candidate_limit)
+        candidate_conditions = [
+            "sld.document_id != :target_document_id",
+            "sld.embedding IS NOT NULL",
+            "sld.embedding_model = :embedding_model"
+        ] + filter_conditions
+        candidate_query = text(f"""
+            SELECT sld.document_id
+            FROM system_learning_data sld
+            WHERE {" AND ".join(candidate_conditions)}
+            ORDER BY sld.embedding <=> CAST(:target_embedding AS {vector_type})
+            LIMIT :candidate_limit
+        """)
+        candidate_result = await db.execute(candidate_query, {
+            "target_embedding": target_embedding_str,
+            "target_document_id": doc_id,
+            "candidate_limit": candidate_limit,
+            "embedding_model": embedding_model,
+            **filter_params
+        })
+        candidate_ids = [row.document_id for row in candidate_result.fetchall()]
         
-        if min_quality_score is not None:
-            where_conditions.append("sld.quality_score >= :min_quality_score")
-            params["min_quality_score"] = min_quality_score
+        if not candidate_ids:
+            return recommendations
+        
+        return await RecommendationService._rank_candidates(
+            db, candidate_ids, rank_params, filter_conditions, vector_type, limit
+        )
+    
+    @staticmethod
+    async def _rank_candidates(
+        db,
+        candidate_ids: List,
+        rank_params: Dict,
+        filter_conditions: List[str],
+        vector_type: str,
+        limit: int
+    ) -> List[Dict]:
+        """第二阶段：只对候选重排，综合多个因素计算推荐分数并按阈值筛选"""
+        from sqlalchemy import text
         
+        where_conditions = [
+            "sld.document_id = ANY(:candidate_ids)",
+            "sld.embedding IS NOT NULL",
+            "sld.embedding_model = :embedding_model",
+            "d.status = 'completed'"
+        ] + filter_conditions
         where_clause = " AND ".join(where_conditions)
+        params = {
+            **rank_params,
+            "candidate_ids": candidate_ids,
+            "limit": len(candidate_ids),  # 候选全部参与重排，相似度阈值在下面筛选
+        }
         
         query = text(f"""
             SELECT 
@@ -172,7 +280,7 @@ class RecommendationService:
                 d.file_type,
                 d.upload_time,
                 -- 向量相似度分数（0-1）
-                1 - (sld.embedding <=> CAST(:target_embedding AS vector)) as similarity_score,
+                1 - (sld.embedding <=> CAST(:target_embedding AS {vector_type})) as similarity_score,
                 -- 类型匹配分数（相同类型=1，不同类型=0.5）
                 CASE 
                     WHEN sld.document_type = :target_type THEN 1.0
@@ -192,7 +300,7 @@ class RecommendationService:
             WHERE {where_clause}
             ORDER BY 
                 -- 综合推荐分数（加权平均）
-                (0.5 * (1 - (sld.embedding <=> CAST(:target_embedding AS vector))) +
+                (0.5 * (1 - (sld.embedding <=> CAST(:target_embedding AS {vector_type}))) +
                  0.2 * CASE WHEN sld.document_type = :target_type THEN 1.0 ELSE 0.5 END +
                  0.2 * COALESCE(sld.quality_score / 100.0, 0.5) +
                  0.1 * CASE 
@@ -3,7 +3,9 @@
 将文档内容按段落切分，生成段落索引和映射关系
 """
 import re
-from typing import List, Dict, Optional
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple
 import structlog
 
 logger = structlog.get_logger()
@@ -15,6 +17,57 @@ class SourceSegmenter:
     # 超长段落阈值（字符数）
     MAX_SEGMENT_LENGTH = 2000
     
+    # 预编译的匹配模式
+    _LIST_ITEM_PATTERN = re.compile(r'\s*(?:[-*+]|\d+\.)\s+')
+    _SENTENCE_END_PATTERN = re.compile(r'[。！？\n]')
+    
+    # 切分结果缓存（按内容哈希，进程内LRU），供未传入切分结果的调用方复用
+    SEGMENT_MEMO_SIZE = 32
+    _segment_memo: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    
+    @classmethod
+    def get_segments(cls, content: str, segments: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        获取文档的段落切分结果（各视角处理器的入口）
+        
+        - 调用方已传入切分结果（如中间结果中保存的segments）时直接使用
+        - 否则按内容哈希查找切分缓存，未命中时切分并缓存
+        - 切分失败或结果为空时使用兜底策略
+        
+        Args:
+            content: 文档内容
+            segments: 预先切分的段落（与content对应）
+        
+        Returns:
+            段落列表（调用方不应修改）
+        """
+        if segments:
+            return segments
+        if not content:
+            return []
+        
+        key = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        cached = cls._segment_memo.get(key)
+        if cached is not None:
+            cls._segment_memo.move_to_end(key)
+            logger.debug("复用段落切分缓存", segments_count=len(cached), content_length=len(content))
+            return cached
+        
+        try:
+            segments = cls.segment_content(content, timeout=5.0)
+            # 如果段落切分返回空列表，使用兜底策略
+            if not segments:
+                logger.warning("段落切分返回空列表，使用兜底策略")
+                segments = cls._fallback_segment(content)
+        except Exception as e:
+            logger.error("段落切分失败，使用兜底策略", error=str(e))
+            segments = cls._fallback_segment(content)
+        
+        cls._segment_memo[key] = segments
+        while len(cls._segment_memo) > cls.SEGMENT_MEMO_SIZE:
+            cls._segment_memo.popitem(last=False)
+        return segments
+    
     @staticmethod
     def segment_content(content: str, timeout: float = 5.0) -> List[Dict]:
         """
@@ -23,83 +76,39 @@ class SourceSegmenter:
         Args:
             content: 文档内容
             timeout: 超时时间（秒），超过则使用快速模式
-            
+        
         Returns:
             [
                 {
                     "id": 1,
                     "text": "段落内容",
                     "position": 0,
-                    "length": 100
+                    "length": 100,
+                    "start": 0,
+                    "end": 100
                 },
                 ...
             ]
+            text 与 content[start:end] 完全一致，position 与 start 相同（兼容旧字段）
         """
         if not content:
             return []
         
         try:
-            import asyncio
             import time
             
             start_time = time.time()
             segments = []
-            position = 0
             
-            # 1. 按空行切分
-            paragraphs = re.split(r'\n\s*\n', content)
-            
-            segment_id = 1
-            for para in paragraphs:
-                para = para.strip()
-                if not para:
-                    continue
-                
-                # 2. 识别Markdown block（代码块、引用块等）
-                markdown_blocks = SourceSegmenter._extract_markdown_blocks(para)
+            # 1. 单遍扫描识别block（代码块、引用块、列表、普通段落），记录精确偏移
+            for block in SourceSegmenter._tokenize_blocks(content):
+                block_text = content[block["start"]:block["end"]]
                 
-                if markdown_blocks:
-                    # 如果包含Markdown block，按block切分
-                    for block in markdown_blocks:
-                        block_text = block["text"]
-                        block_position = position + content[position:].find(block_text)
-                        
-                        # 3. 处理超长段落
-                        if len(block_text) > SourceSegmenter.MAX_SEGMENT_LENGTH:
-                            sub_segments = SourceSegmenter._split_long_segment(
-                                block_text, block_position
-                            )
-                            segments.extend(sub_segments)
-                        else:
-                            segments.append({
-                                "id": segment_id,
-                                "text": block_text,
-                                "position": block_position,
-                                "length": len(block_text)
-                            })
-                            segment_id += 1
-                        
-                        position = block_position + len(block_text)
+                # 2. 处理超长段落
+                if len(block_text) > SourceSegmenter.MAX_SEGMENT_LENGTH:
+                    segments.extend(SourceSegmenter._split_long_segment(block_text, block["start"]))
                 else:
-                    # 普通段落
-                    para_position = position + content[position:].find(para)
-                    
-                    # 3. 处理超长段落
-                    if len(para) > SourceSegmenter.MAX_SEGMENT_LENGTH:
-                        sub_segments = SourceSegmenter._split_long_segment(
-                            para, para_position
-                        )
-                        segments.extend(sub_segments)
-                    else:
-                        segments.append({
-                            "id": segment_id,
-                            "text": para,
-                            "position": para_position,
-                            "length": len(para)
-                        })
-                        segment_id += 1
-                    
-                    position = para_position + len(para)
+                    segments.append(SourceSegmenter._build_segment(block_text, block["start"]))
             
             # 检查超时
             elapsed_time = time.time() - start_time
@@ -125,7 +134,7 @@ class SourceSegmenter:
             )
             
             return segments
-            
+        
         except Exception as e:
             logger.error(
                 "段落切分失败，使用兜底策略",
@@ -137,135 +146,157 @@ class SourceSegmenter:
             return SourceSegmenter._fallback_segment(content)
     
     @staticmethod
-    def _extract_markdown_blocks(text: str) -> List[Dict]:
+    def _build_segment(text: str, start: int, segment_id: int = 0) -> Dict:
+        """构建段落（id稍后重新分配）"""
+        return {
+            "id": segment_id,
+            "text": text,
+            "position": start,
+            "length": len(text),
+            "start": start,
+            "end": start + len(text)
+        }
+    
+    @staticmethod
+    def _trim_span(text: str, start: int, end: int) -> Tuple[int, int]:
+        """去除区间[start, end)首尾的空白，返回新的区间（全是空白时start == end）"""
+        span = text[start:end]
+        stripped = span.strip()
+        if not stripped:
+            return start, start
+        start += len(span) - len(span.lstrip())
+        return start, start + len(stripped)
+    
+    @classmethod
+    def _tokenize_blocks(cls, content: str) -> List[Dict]:
         """
-        提取Markdown block（代码块、引用块等）
+        单遍扫描识别Markdown block和普通段落
+        
+        - 代码块：``` 开始到 ``` 结束（可跨空行，未闭合时延续到文末）
+        - 引用块：连续的 > 开头的行
+        - 列表：连续的列表项行（缩进的续行归入列表）
+        - 普通段落：其他连续非空行，空行分隔
         
         Returns:
-            [{"text": "block内容", "type": "code|quote|list"}, ...]
+            [{"type": "code|quote|list|paragraph", "start": int, "end": int}, ...]
+            区间已去除首尾空白，按位置排序
         """
         blocks = []
+        block_type = None
+        block_start = block_end = 0
+        
+        def close_block():
+            start, end = cls._trim_span(content, block_start, block_end)
+            if end > start:
+                blocks.append({"type": block_type, "start": start, "end": end})
         
-        # 代码块（```...``` 或 ```language...```）
-        code_pattern = r'```[\s\S]*?```'
-        for match in re.finditer(code_pattern, text):
-            blocks.append({
-                "text": match.group(0),
-                "type": "code",
-                "start": match.start(),
-                "end": match.end()
-            })
-        
-        # 引用块（> 开头）
-        quote_pattern = r'^>.*$'
-        quote_lines = []
-        for line in text.split('\n'):
-            if re.match(quote_pattern, line):
-                quote_lines.append(line)
-            elif quote_lines:
-                blocks.append({
-                    "text": '\n'.join(quote_lines),
-                    "type": "quote",
-                    "start": text.find('\n'.join(quote_lines)),
-                    "end": text.find('\n'.join(quote_lines)) + len('\n'.join(quote_lines))
-                })
-                quote_lines = []
-        
-        # 有序/无序列表
-        list_pattern = r'^[\s]*[-*+]\s+|^[\s]*\d+\.\s+'
-        list_lines = []
-        for line in text.split('\n'):
-            if re.match(list_pattern, line):
-                list_lines.append(line)
-            elif list_lines:
-                blocks.append({
-                    "text": '\n'.join(list_lines),
-                    "type": "list",
-                    "start": text.find('\n'.join(list_lines)),
-                    "end": text.find('\n'.join(list_lines)) + len('\n'.join(list_lines))
-                })
-                list_lines = []
-        
-        # 按位置排序
-        blocks.sort(key=lambda x: x["start"])
+        length = len(content)
+        line_start = 0
+        while line_start <= length:
+            line_end = content.find('\n', line_start)
+            if line_end == -1:
+                line_end = length
+            line = content[line_start:line_end]
+            stripped = line.strip()
+            
+            if block_type == "code":
+                block_end = line_end
+                if stripped.startswith('```'):
+                    close_block()
+                    block_type = None
+            elif not stripped:
+                if block_type is not None:
+                    close_block()
+                    block_type = None
+            elif stripped.startswith('```'):
+                if block_type is not None:
+                    close_block()
+                block_type, block_start, block_end = "code", line_start, line_end
+                # 单行代码块（```code```）
+                if len(stripped) > 3 and stripped.endswith('```'):
+                    close_block()
+                    block_type = None
+            else:
+                if line.startswith('>'):
+                    line_type = "quote"
+                elif cls._LIST_ITEM_PATTERN.match(line):
+                    line_type = "list"
+                elif block_type == "list" and line[:1].isspace():
+                    line_type = "list"  # 列表项的缩进续行
+                else:
+                    line_type = "paragraph"
+                
+                if line_type == block_type:
+                    block_end = line_end
+                else:
+                    if block_type is not None:
+                        close_block()
+                    block_type, block_start, block_end = line_type, line_start, line_end
+            
+            line_start = line_end + 1
+        
+        if block_type is not None:
+            close_block()
         
         return blocks
     
-    @staticmethod
-    def _split_long_segment(text: str, base_position: int) -> List[Dict]:
+    @classmethod
+    def _split_long_segment(cls, text: str, base_position: int) -> List[Dict]:
         """
-        切分超长段落，使用滑动窗口找到最强连续子段
+        切分超长段落：在句子边界（。！？换行）切分，相邻句子合并到不超过阈值
         
         Args:
             text: 超长段落文本
             base_position: 基础位置（在原文中的位置）
-            
+        
         Returns:
-            段落列表
+            段落列表（text为原文切片，位置精确）
         """
-        segments = []
-        window_size = SourceSegmenter.MAX_SEGMENT_LENGTH
-        step_size = window_size // 2  # 滑动步长
+        window_size = cls.MAX_SEGMENT_LENGTH
         
-        # 尝试在句子边界切分
-        sentence_endings = re.compile(r'[。！？\n]')
-        sentences = sentence_endings.split(text)
+        # 句子区间（句末标点归入前一句，换行不计入）
+        sentences = []
+        sentence_start = 0
+        for match in cls._SENTENCE_END_PATTERN.finditer(text):
+            sentence_end = match.start() if match.group() == '\n' else match.end()
+            sentences.append(cls._trim_span(text, sentence_start, sentence_end))
+            sentence_start = match.end()
+        sentences.append(cls._trim_span(text, sentence_start, len(text)))
         
-        current_segment = ""
-        current_length = 0
-        segment_start = 0
+        segments = []
+        segment_start = segment_end = None
         
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
+        def flush():
+            if segment_start is not None:
+                segments.append(cls._build_segment(
+                    text[segment_start:segment_end], base_position + segment_start
+                ))
+        
+        for start, end in sentences:
+            if start == end:
                 continue
             
-            sentence_length = len(sentence)
+            if end - start > window_size:
+                # 单句超长：按固定长度切分
+                flush()
+                segment_start = None
+                for chunk_start in range(start, end, window_size):
+                    chunk_start, chunk_end = cls._trim_span(text, chunk_start, min(chunk_start + window_size, end))
+                    if chunk_end > chunk_start:
+                        segments.append(cls._build_segment(
+                            text[chunk_start:chunk_end], base_position + chunk_start
+                        ))
+                continue
             
-            # 如果当前段落加上新句子不超过阈值，则添加
-            if current_length + sentence_length <= window_size:
-                if current_segment:
-                    current_segment += " " + sentence
-                else:
-                    current_segment = sentence
-                    segment_start = base_position + text.find(sentence)
-                current_length += sentence_length
-            else:
-                # 保存当前段落
-                if current_segment:
-                    segments.append({
-                        "id": 0,  # 稍后重新分配
-                        "text": current_segment,
-                        "position": segment_start,
-                        "length": len(current_segment)
-                    })
-                
-                # 开始新段落
-                current_segment = sentence
-                segment_start = base_position + text.find(sentence)
-                current_length = sentence_length
-        
-        # 添加最后一个段落
-        if current_segment:
-            segments.append({
-                "id": 0,  # 稍后重新分配
-                "text": current_segment,
-                "position": segment_start,
-                "length": len(current_segment)
-            })
-        
-        # 如果仍然没有段落（极端情况），按固定长度切分
-        if not segments:
-            chunk_size = SourceSegmenter.MAX_SEGMENT_LENGTH
-            for i in range(0, len(text), chunk_size):
-                chunk = text[i:i + chunk_size]
-                segments.append({
-                    "id": 0,
-                    "text": chunk,
-                    "position": base_position + i,
-                    "length": len(chunk)
-                })
+            # 当前段落加上新句子超过阈值，则保存当前段落并开始新段落
+            if segment_start is not None and end - segment_start > window_size:
+                flush()
+                segment_start = None
+            if segment_start is None:
+                segment_start = start
+            segment_end = end
         
+        flush()
         return segments
     
     @staticmethod
@@ -275,28 +306,30 @@ class SourceSegmenter:
         
         Args:
             content: 文档内容
-            
+        
         Returns:
             段落列表
         """
         segments = []
         paragraphs = content.split('\n\n')
         
+        offset = 0
         for idx, para in enumerate(paragraphs, 1):
-            para = para.strip()
-            if not para:
+            para_start, para_end = SourceSegmenter._trim_span(content, offset, offset + len(para))
+            offset += len(para) + 2
+            if para_end == para_start:
                 continue
             
             # 如果段落太长，简单截断
-            if len(para) > SourceSegmenter.MAX_SEGMENT_LENGTH:
-                para = para[:SourceSegmenter.MAX_SEGMENT_LENGTH] + "..."
+            truncated = para_end - para_start > SourceSegmenter.MAX_SEGMENT_LENGTH
+            if truncated:
+                para_end = para_start + SourceSegmenter.MAX_SEGMENT_LENGTH
             
-            segments.append({
-                "id": idx,
-                "text": para,
-                "position": content.find(para),
-                "length": len(para)
-            })
+            segment = SourceSegmenter._build_segment(content[para_start:para_end], para_start, idx)
+            if truncated:
+                segment["text"] += "..."
+                segment["length"] = len(segment["text"])
+            segments.append(segment)
         
         logger.info(
             "快速切分完成",
@@ -314,19 +347,14 @@ class SourceSegmenter:
         Args:
             content: 文档内容
             chunk_size: 切分大小（字符数）
-            
+        
         Returns:
             段落列表
         """
         segments = []
         for i in range(0, len(content), chunk_size):
             chunk = content[i:i + chunk_size]
-            segments.append({
-                "id": len(segments) + 1,
-                "text": chunk,
-                "position": i,
-                "length": len(chunk)
-            })
+            segments.append(SourceSegmenter._build_segment(chunk, i, len(segments) + 1))
         
         logger.warning(
             "使用兜底策略切分",
@@ -343,7 +371,7 @@ class SourceSegmenter:
         
         Args:
             segments: 段落列表
-            
+        
         Returns:
             格式化后的字符串，用于AI prompt
         """
@@ -364,7 +392,7 @@ class SourceSegmenter:
         Args:
             segments: 所有段落列表
             source_ids: 段落ID列表
-            
+        
         Returns:
             对应的段落列表
         """
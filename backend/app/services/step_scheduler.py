@@ -0,0 +1,202 @@
+"""
+处理步骤调度器 - 按依赖关系并发执行处理器的子步骤
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import contextvars
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+
+class ProcessingStep:
+    """
+    处理步骤定义
+    
+    Args:
+        name: 步骤名称（同时作为结果字典的key）
+        func: 异步函数，依赖步骤的结果以关键字参数传入（参数名即依赖步骤名称）
+        depends_on: 依赖的步骤名称
+        fallback: 默认值工厂函数，步骤失败时调用
+        description: 步骤描述（用于日志和进度信息）
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Awaitable[Any]],
+        depends_on: Tuple[str, ...] = (),
+        fallback: Optional[Callable[[], Any]] = None,
+        description: Optional[str] = None
+    ):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+        self.fallback = fallback
+        self.description = description or name
+
+
+class _StepSlot:
+    """
+    步骤占用的并发名额
+    
+    步骤内嵌套的调度器与外层共用信号量：等待嵌套步骤期间让出本步骤的名额，
+    嵌套调度器结束后再取回，同一处理器内同时执行的步骤数始终不超过外层上限
+    """
+    
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.held = False
+        self.lent = 0
+    
+    async def acquire(self) -> None:
+        await self.semaphore.acquire()
+        self.held = True
+    
+    def release(self) -> None:
+        if self.held:
+            self.held = False
+            self.semaphore.release()
+    
+    def lend(self) -> None:
+        """嵌套调度器开始执行，让出名额（同一步骤内多个嵌套调度器只让出一次）"""
+        if self.lent == 0:
+            self.release()
+        self.lent += 1
+    
+    async def reclaim(self) -> None:
+        """嵌套调度器执行结束，最后一个结束时取回名额"""
+        self.lent -= 1
+        if self.lent == 0:
+            await self.acquire()
+
+
+# 当前正在执行的步骤的名额（嵌套调度器据此共用外层的信号量）
+_current_slot: contextvars.ContextVar[Optional[_StepSlot]] = contextvars.ContextVar(
+    "step_scheduler_slot", default=None
+)
+
+
+class StepScheduler:
+    """
+    处理步骤调度器
+    
+    - 所有依赖已完成的步骤立即开始执行，互不依赖的AI调用并发进行
+    - 通过信号量限制同时执行的步骤数量；在步骤内嵌套运行的调度器共用外层的信号量
+      （忽略自身的max_concurrency），嵌套步骤和外层步骤合计不超过外层上限
+    - 单个步骤失败时使用该步骤的默认值，不影响其他步骤
+    - 进度回调中抛出的异常（如处理超时）会取消其余步骤并向上抛出
+    
+    总耗时约等于最长依赖链的耗时，而不是所有步骤耗时之和
+    """
+    
+    def __init__(
+        self,
+        steps: List[ProcessingStep],
+        max_concurrency: Optional[int] = None,
+        on_step_complete: Optional[Callable[[ProcessingStep, int, int], Awaitable[None]]] = None
+    ):
+        """
+        初始化调度器
+        
+        Args:
+            steps: 步骤列表
+            max_concurrency: 最大并发步骤数，如果为None则从配置读取（嵌套在其他调度器的步骤中运行时不生效）
+            on_step_complete: 步骤完成回调 (step, completed_count, total_count)，回调串行执行
+        
+        Raises:
+            ValueError: 步骤名称重复、依赖不存在或存在循环依赖
+        """
+        self.steps = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"步骤名称重复: {step.name}")
+            self.steps[step.name] = step
+        
+        for step in steps:
+            for dep in step.depends_on:
+                if dep not in self.steps:
+                    raise ValueError(f"步骤 {step.name} 依赖未定义的步骤: {dep}")
+        
+        self._check_cycles()
+        
+        self.max_concurrency = max(1, max_concurrency or settings.AI_STEP_MAX_CONCURRENCY)
+        self.on_step_complete = on_step_complete
+    
+    def _check_cycles(self) -> None:
+        """检查循环依赖"""
+        visiting, visited = set(), set()
+        
+        def visit(name: str):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"步骤存在循环依赖: {name}")
+            visiting.add(name)
+            for dep in self.steps[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+        
+        for name in self.steps:
+            visit(name)
+    
+    async def run(self) -> Dict[str, Any]:
+        """
+        执行所有步骤
+        
+        Returns:
+            {步骤名称: 步骤结果}
+        """
+        parent_slot = _current_slot.get()
+        if parent_slot is not None:
+            semaphore = parent_slot.semaphore
+            parent_slot.lend()
+        else:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+        futures: Dict[str, asyncio.Future] = {
+            name: asyncio.get_running_loop().create_future() for name in self.steps
+        }
+        completed = [0]
+        total = len(self.steps)
+        # 串行化完成回调，保证回调收到的完成数（进度）单调递增
+        callback_lock = asyncio.Lock()
+        
+        async def run_step(step: ProcessingStep):
+            dep_results = {}
+            for dep in step.depends_on:
+                dep_results[dep] = await futures[dep]
+            
+            slot = _StepSlot(semaphore)
+            await slot.acquire()
+            token = _current_slot.set(slot)
+            try:
+                result = await step.func(**dep_results)
+            except Exception as e:
+                logger.error(f"{step.description}失败，使用默认值", step=step.name, error=str(e))
+                result = step.fallback() if step.fallback else None
+            finally:
+                _current_slot.reset(token)
+                slot.release()
+            
+            futures[step.name].set_result(result)
+            async with callback_lock:
+                completed[0] += 1
+                if self.on_step_complete:
+                    await self.on_step_complete(step, completed[0], total)
+        
+        tasks = [asyncio.ensure_future(run_step(step)) for step in self.steps.values()]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            if parent_slot is not None:
+                await parent_slot.reclaim()
+        
+        return {name: future.result() for name, future in futures.items()}
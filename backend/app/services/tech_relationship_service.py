@@ -3,15 +3,148 @@
 - 定义技术之间的实际关联关系（基于架构师/开发者的视角）
 - 提供技术栈组合知识库
 """
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Optional, Tuple, Set
 import structlog
 
 logger = structlog.get_logger()
 
+# 技术类型（小写名称 -> 类型），未列出的技术为 'other'
+TECH_TYPES: Dict[str, str] = {
+    # 编程语言
+    **dict.fromkeys(['java', 'javascript', 'typescript', 'python', 'go', 'rust', 'c++', 'c#', 'php', 'ruby', 'swift', 'kotlin'], 'language'),
+    # 框架
+    **dict.fromkeys(['react', 'vue', 'angular', 'django', 'flask', 'spring', 'express', 'fastapi', 'laravel', 'gin', 'echo'], 'framework'),
+    # 数据库
+    **dict.fromkeys(['mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch', 'sqlite', 'oracle'], 'database'),
+    # 工具和平台
+    **dict.fromkeys(['docker', 'kubernetes', 'git', 'jenkins', 'aws', 'azure', 'gcp', 'nginx', 'apache'], 'tool'),
+}
+
+# 同类技术的弱关联强度
+SAME_TYPE_STRENGTH = 0.3
+# 同一技术栈中的技术：关联强度 = 技术栈权重 * 该系数
+STACK_STRENGTH_FACTOR = 0.6
+
+
+class TechRelationshipIndex:
+    """
+    技术关联关系索引（由关联关系定义和技术栈组合预先构建，查询不再线性扫描）
+    
+    - 邻接表：技术名称统一小写，关联关系双向存储，同一对技术定义了多个强度时取最大值
+    - 技术栈成员位图：第i位表示属于第i个技术栈，两个技术位图按位与后的最低位即第一个共同技术栈
+    - 关联强度优先级与逐项查找一致：直接/反向关联 > 同一技术栈 > 同类技术 > 无关联
+    """
+    
+    def __init__(self, relationships: Dict[str, List[Tuple[str, float]]], stacks: List[Dict[str, any]]):
+        self._adjacency: Dict[str, Dict[str, Tuple[str, float]]] = {}
+        # 先写入所有正向关联，再写入反向关联（相关技术列表中正向关联排在前面）
+        for tech, related_list in relationships.items():
+            for related_tech, strength in related_list:
+                self._add_edge(tech, related_tech, strength)
+        for tech, related_list in relationships.items():
+            for related_tech, strength in related_list:
+                self._add_edge(related_tech, tech, strength)
+        
+        self._stack_scores = [stack['weight'] * STACK_STRENGTH_FACTOR for stack in stacks]
+        self._stack_bits: Dict[str, int] = {}
+        for i, stack in enumerate(stacks):
+            for tech in stack['technologies']:
+                key = tech.lower()
+                self._stack_bits[key] = self._stack_bits.get(key, 0) | (1 << i)
+    
+    def _add_edge(self, tech: str, related_tech: str, strength: float) -> None:
+        neighbors = self._adjacency.setdefault(tech.lower(), {})
+        key = related_tech.lower()
+        if key not in neighbors or strength > neighbors[key][1]:
+            neighbors[key] = (related_tech, strength)
+    
+    def _fallback_strength(self, bits1: int, bits2: int, type1: str, type2: str) -> float:
+        """没有直接关联时的关联强度（同一技术栈或同类技术）"""
+        common = bits1 & bits2
+        if common:
+            return self._stack_scores[(common & -common).bit_length() - 1]
+        if type1 == type2 and type1 != 'other':
+            return SAME_TYPE_STRENGTH
+        return 0.0
+    
+    def strength(self, tech1: str, tech2: str) -> float:
+        """两个技术之间的关联强度（与参数顺序无关）"""
+        key1, key2 = tech1.lower(), tech2.lower()
+        edge = self._adjacency.get(key1, {}).get(key2)
+        if edge is not None:
+            return edge[1]
+        return self._fallback_strength(
+            self._stack_bits.get(key1, 0), self._stack_bits.get(key2, 0),
+            TECH_TYPES.get(key1, 'other'), TECH_TYPES.get(key2, 'other')
+        )
+    
+    def strength_matrix(self, techs: List[str]) -> List[List[float]]:
+        """
+        批量计算关联强度矩阵
+        
+        Returns:
+            n x n 矩阵，matrix[i][j] 为 techs[i] 与 techs[j] 的关联强度
+        """
+        return self.strength_array(techs).tolist()
+    
+    def strength_array(self, techs: List[str]):
+        """
+        批量计算关联强度矩阵（NumPy数组，按优先级从低到高逐层填充）
+        
+        - 同类技术：类型编码两两比较
+        - 同一技术栈：按技术栈倒序覆盖，第一个共同技术栈的强度最后写入
+        - 直接/反向关联：只遍历列表中技术的邻接表
+        
+        Returns:
+            n x n float64数组，与逐对调用strength的结果一致
+        """
+        import numpy as np
+        
+        keys = [tech.lower() for tech in techs]
+        n = len(keys)
+        matrix = np.zeros((n, n), dtype=np.float64)
+        if n == 0:
+            return matrix
+        
+        type_codes: Dict[str, int] = {}
+        codes = np.asarray([
+            -1 if TECH_TYPES.get(key, 'other') == 'other'
+            else type_codes.setdefault(TECH_TYPES[key], len(type_codes))
+            for key in keys
+        ])
+        matrix[(codes[:, None] == codes[None, :]) & (codes[:, None] >= 0)] = SAME_TYPE_STRENGTH
+        
+        bits = [self._stack_bits.get(key, 0) for key in keys]
+        for stack_index in reversed(range(len(self._stack_scores))):
+            members = np.asarray([(b >> stack_index) & 1 for b in bits], dtype=bool)
+            if members.any():
+                matrix[np.outer(members, members)] = self._stack_scores[stack_index]
+        
+        positions: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            positions.setdefault(key, []).append(i)
+        rows, columns, values = [], [], []
+        for i, key in enumerate(keys):
+            for related_key, (_, strength) in self._adjacency.get(key, {}).items():
+                for j in positions.get(related_key, ()):
+                    rows.append(i)
+                    columns.append(j)
+                    values.append(strength)
+        if rows:
+            matrix[rows, columns] = values
+        return matrix
+    
+    def related(self, tech: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """与指定技术有直接或反向关联的技术，按关联强度降序"""
+        neighbors = self._adjacency.get(tech.lower(), {})
+        return sorted(neighbors.values(), key=lambda x: x[1], reverse=True)[:limit]
+
 
 class TechRelationshipService:
     """技术栈关联关系服务"""
     
+    _index: Optional[TechRelationshipIndex] = None
+    
     # 技术栈关联关系定义（基于实际开发场景）
     TECH_RELATIONSHIPS: Dict[str, List[Tuple[str, float]]] = {
         # 编程语言 -> 常用框架/工具
@@ -212,33 +345,8 @@ class TechRelationshipService:
             except Exception as e:
                 logger.warning("AI获取关联关系失败，使用静态定义", tech1=tech1, tech2=tech2, error=str(e))
         
-        # 检查直接关联（静态定义）
-        if tech1 in TechRelationshipService.TECH_RELATIONSHIPS:
-            for related_tech, strength in TechRelationshipService.TECH_RELATIONSHIPS[tech1]:
-                if related_tech.lower() == tech2.lower():
-                    return strength
-        
-        # 检查反向关联
-        if tech2 in TechRelationshipService.TECH_RELATIONSHIPS:
-            for related_tech, strength in TechRelationshipService.TECH_RELATIONSHIPS[tech2]:
-                if related_tech.lower() == tech1.lower():
-                    return strength
-        
-        # 检查技术栈组合
-        for stack in TechRelationshipService.TECH_STACKS:
-            techs = [t.lower() for t in stack['technologies']]
-            if tech1.lower() in techs and tech2.lower() in techs:
-                # 在同一个技术栈中，给予基础关联强度
-                return stack['weight'] * 0.6
-        
-        # 默认：同类技术有弱关联
-        tech1_type = TechRelationshipService._get_tech_type(tech1)
-        tech2_type = TechRelationshipService._get_tech_type(tech2)
-        
-        if tech1_type == tech2_type and tech1_type != 'other':
-            return 0.3  # 同类技术有弱关联
-        
-        return 0.0  # 无关联
+        # 静态定义（直接/反向关联、技术栈组合、同类技术）
+        return TechRelationshipService.get_index().strength(tech1, tech2)
     
     @staticmethod
     def get_relationship_strength_sync(tech1: str, tech2: str) -> float:
@@ -252,55 +360,38 @@ class TechRelationshipService:
         Returns:
             关联强度 (0.0 - 1.0)
         """
-        # 检查直接关联
-        if tech1 in TechRelationshipService.TECH_RELATIONSHIPS:
-            for related_tech, strength in TechRelationshipService.TECH_RELATIONSHIPS[tech1]:
-                if related_tech.lower() == tech2.lower():
-                    return strength
-        
-        # 检查反向关联
-        if tech2 in TechRelationshipService.TECH_RELATIONSHIPS:
-            for related_tech, strength in TechRelationshipService.TECH_RELATIONSHIPS[tech2]:
-                if related_tech.lower() == tech1.lower():
-                    return strength
+        return TechRelationshipService.get_index().strength(tech1, tech2)
+    
+    @staticmethod
+    def strength_matrix(techs: List[str]) -> List[List[float]]:
+        """
+        批量获取技术之间的关联强度矩阵（不使用AI）
         
-        # 检查技术栈组合
-        for stack in TechRelationshipService.TECH_STACKS:
-            techs = [t.lower() for t in stack['technologies']]
-            if tech1.lower() in techs and tech2.lower() in techs:
-                return stack['weight'] * 0.6
+        Args:
+            techs: 技术名称列表
         
-        # 默认：同类技术有弱关联
-        tech1_type = TechRelationshipService._get_tech_type(tech1)
-        tech2_type = TechRelationshipService._get_tech_type(tech2)
+        Returns:
+            n x n 矩阵，matrix[i][j] 为 techs[i] 与 techs[j] 的关联强度
+        """
+        return TechRelationshipService.get_index().strength_matrix(techs)
+    
+    @staticmethod
+    def strength_array(techs: List[str]):
+        """
+        批量获取关联强度矩阵（NumPy数组，用于向量化计算）
         
-        if tech1_type == tech2_type and tech1_type != 'other':
-            return 0.3
+        Args:
+            techs: 技术名称列表
         
-        return 0.0
+        Returns:
+            n x n float64数组
+        """
+        return TechRelationshipService.get_index().strength_array(techs)
     
     @staticmethod
     def _get_tech_type(tech: str) -> str:
         """获取技术类型"""
-        tech_lower = tech.lower()
-        
-        # 编程语言
-        if tech_lower in ['java', 'javascript', 'typescript', 'python', 'go', 'rust', 'c++', 'c#', 'php', 'ruby', 'swift', 'kotlin']:
-            return 'language'
-        
-        # 框架
-        elif tech_lower in ['react', 'vue', 'angular', 'django', 'flask', 'spring', 'express', 'fastapi', 'laravel', 'gin', 'echo']:
-            return 'framework'
-        
-        # 数据库
-        elif tech_lower in ['mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch', 'sqlite', 'oracle']:
-            return 'database'
-        
-        # 工具和平台
-        elif tech_lower in ['docker', 'kubernetes', 'git', 'jenkins', 'aws', 'azure', 'gcp', 'nginx', 'apache']:
-            return 'tool'
-        
-        return 'other'
+        return TECH_TYPES.get(tech.lower(), 'other')
     
     @staticmethod
     def get_related_technologies(tech: str, limit: int = 10) -> List[Tuple[str, float]]:
@@ -314,27 +405,20 @@ class TechRelationshipService:
         Returns:
             [(技术名称, 关联强度), ...]
         """
-        relationships = []
-        
-        # 从直接关联中获取
-        if tech in TechRelationshipService.TECH_RELATIONSHIPS:
-            relationships.extend(TechRelationshipService.TECH_RELATIONSHIPS[tech])
-        
-        # 从反向关联中获取
-        for related_tech, related_list in TechRelationshipService.TECH_RELATIONSHIPS.items():
-            for rt, strength in related_list:
-                if rt.lower() == tech.lower():
-                    relationships.append((related_tech, strength))
-        
-        # 去重并排序
-        tech_strength_map = {}
-        for rt, strength in relationships:
-            rt_lower = rt.lower()
-            if rt_lower not in tech_strength_map or strength > tech_strength_map[rt_lower][1]:
-                tech_strength_map[rt_lower] = (rt, strength)
-        
-        result = sorted(tech_strength_map.values(), key=lambda x: x[1], reverse=True)
-        return result[:limit]
+        return TechRelationshipService.get_index().related(tech, limit)
+    
+    @classmethod
+    def get_index(cls) -> TechRelationshipIndex:
+        """获取关联关系索引（首次使用时构建）"""
+        if cls._index is None:
+            cls.rebuild_index()
+        return cls._index
+    
+    @classmethod
+    def rebuild_index(cls) -> TechRelationshipIndex:
+        """根据当前的关联关系定义和技术栈组合重建索引（修改TECH_RELATIONSHIPS或TECH_STACKS后调用）"""
+        cls._index = TechRelationshipIndex(cls.TECH_RELATIONSHIPS, cls.TECH_STACKS)
+        return cls._index
 
 
 def get_tech_relationship_service() -> TechRelationshipService:
@@ -135,6 +135,7 @@ class TechRelationshipUpdater:
         updated_relationships.sort(key=lambda x: x[1], reverse=True)
         
         TechRelationshipService.TECH_RELATIONSHIPS[tech] = updated_relationships[:15]
+        TechRelationshipService.rebuild_index()
         
         logger.info("技术关联关系更新完成", 
                    tech=tech, 
@@ -10,6 +10,7 @@ import structlog
 from app.services.ai_service import get_ai_service
 from app.services.source_segmenter import SourceSegmenter
 from app.services.confidence_calculator import ConfidenceCalculator
+from app.services.step_scheduler import ProcessingStep, StepScheduler
 from app.utils.tech_name_utils import clean_tech_name
 
 logger = structlog.get_logger()
@@ -18,80 +19,89 @@ logger = structlog.get_logger()
 class TechnicalProcessor:
     """IT技术文档处理器"""
     
+    # 各子步骤的检索问题（长文档只发送与之最相关的段落）
+    RETRIEVAL_QUERIES = {
+        "prerequisites": "学习前需要掌握的基础知识、前置条件、依赖的技术和环境要求",
+        "learning_methods": "学习方法、理论概念讲解、动手实践、示例代码和练习",
+        "related_technologies": "使用到的技术、框架、中间件、工具、组件及其关系",
+    }
+    
     @staticmethod
-    async def process(content: str, stream_callback: Optional[callable] = None) -> Dict:
+    async def process(
+        content: str,
+        stream_callback: Optional[callable] = None,
+        segments: Optional[List[Dict]] = None
+    ) -> Dict:
         """
         处理IT技术文档
         
         Args:
             content: 文档内容
+            segments: 预先切分的段落（与content对应），为空则自动切分
         
         Returns:
             处理结果字典
         """
         logger.info("开始处理IT技术文档", content_length=len(content))
         
-        # 0. 段落切分（带异常处理）
-        try:
-            segments = SourceSegmenter.segment_content(content, timeout=5.0)
-            logger.info("段落切分完成", segments_count=len(segments), content_length=len(content))
-            # 如果段落切分返回空列表，使用兜底策略
-            if not segments:
-                logger.warning("段落切分返回空列表，使用兜底策略")
-                segments = SourceSegmenter._fallback_segment(content)
-                logger.info("兜底策略完成", segments_count=len(segments))
-        except Exception as e:
-            logger.error("段落切分失败，使用兜底策略", error=str(e))
-            segments = SourceSegmenter._fallback_segment(content)  # 使用兜底策略而不是空列表
-        
-        # 1. 前置条件分析（带异常处理）
-        try:
-            prerequisites = await TechnicalProcessor._analyze_prerequisites(content, segments)
-        except Exception as e:
-            logger.error("前置条件分析失败，使用默认值", error=str(e))
-            prerequisites = {
-                "required": [],
-                "recommended": [],
-                "confidence": 50.0,
-                "confidence_label": "中",
-                "sources": []
-            }
-        
-        # 2. 学习路径规划（带异常处理）
-        try:
-            learning_path = await TechnicalProcessor._plan_learning_path(content, segments, prerequisites)
-        except Exception as e:
-            logger.error("学习路径规划失败，使用默认值", error=str(e))
-            learning_path = [
-                {"stage": 1, "title": "基础阶段", "content": "学习基础知识", "confidence": 50.0, "confidence_label": "中", "sources": []},
-                {"stage": 2, "title": "进阶阶段", "content": "深入学习", "confidence": 50.0, "confidence_label": "中", "sources": []},
-                {"stage": 3, "title": "实践阶段", "content": "实际应用", "confidence": 50.0, "confidence_label": "中", "sources": []}
-            ]
-        
-        # 3. 学习方法建议（带异常处理）
-        try:
-            learning_methods = await TechnicalProcessor._suggest_learning_methods(content, segments)
-        except Exception as e:
-            logger.error("学习方法建议失败，使用默认值", error=str(e))
-            learning_methods = {
-                "theory": "建议先理解基本概念，再深入学习。",
-                "practice": "建议通过实际项目练习，加深理解。",
-                "confidence": 50.0,
-                "confidence_label": "中",
-                "sources": []
-            }
+        # 0. 段落切分（优先使用调用方传入的切分结果，否则按内容哈希复用切分缓存）
+        segments = SourceSegmenter.get_segments(content, segments)
         
-        # 4. 技术关联分析（带异常处理）
-        try:
-            related_tech_result = await TechnicalProcessor._analyze_related_technologies(content, segments)
-        except Exception as e:
-            logger.error("技术关联分析失败，使用默认值", error=str(e))
-            related_tech_result = {
-                "technologies": [],
-                "confidence": 50.0,
-                "confidence_label": "中",
-                "sources": []
-            }
+        # 1-4. 按依赖关系并发执行子步骤（带异常处理）
+        # 只有学习路径规划依赖前置条件分析，其余步骤互不依赖，可并发执行
+        steps = [
+            ProcessingStep(
+                "prerequisites",
+                lambda: TechnicalProcessor._analyze_prerequisites(content, segments),
+                fallback=lambda: {
+                    "required": [],
+                    "recommended": [],
+                    "confidence": 50.0,
+                    "confidence_label": "中",
+                    "sources": []
+                },
+                description="前置条件分析"
+            ),
+            ProcessingStep(
+                "learning_path",
+                lambda prerequisites: TechnicalProcessor._plan_learning_path(content, segments, prerequisites),
+                depends_on=("prerequisites",),
+                fallback=lambda: [
+                    {"stage": 1, "title": "基础阶段", "content": "学习基础知识", "confidence": 50.0, "confidence_label": "中", "sources": []},
+                    {"stage": 2, "title": "进阶阶段", "content": "深入学习", "confidence": 50.0, "confidence_label": "中", "sources": []},
+                    {"stage": 3, "title": "实践阶段", "content": "实际应用", "confidence": 50.0, "confidence_label": "中", "sources": []}
+                ],
+                description="学习路径规划"
+            ),
+            ProcessingStep(
+                "learning_methods",
+                lambda: TechnicalProcessor._suggest_learning_methods(content, segments),
+                fallback=lambda: {
+                    "theory": "建议先理解基本概念，再深入学习。",
+                    "practice": "建议通过实际项目练习，加深理解。",
+                    "confidence": 50.0,
+                    "confidence_label": "中",
+                    "sources": []
+                },
+                description="学习方法建议"
+            ),
+            ProcessingStep(
+                "related_technologies",
+                lambda: TechnicalProcessor._analyze_related_technologies(content, segments),
+                fallback=lambda: {
+                    "technologies": [],
+                    "confidence": 50.0,
+                    "confidence_label": "中",
+                    "sources": []
+                },
+                description="技术关联分析"
+            )
+        ]
+        step_results = await StepScheduler(steps).run()
+        prerequisites = step_results["prerequisites"]
+        learning_path = step_results["learning_path"]
+        learning_methods = step_results["learning_methods"]
+        related_tech_result = step_results["related_technologies"]
         
         result = {
             "prerequisites": prerequisites,
@@ -137,7 +147,8 @@ class TechnicalProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.3,
-                require_confidence=True
+                require_confidence=True,
+                retrieval_query=TechnicalProcessor.RETRIEVAL_QUERIES["prerequisites"]
             )
             
             # 验证和补充，并清理技术名词
@@ -350,7 +361,8 @@ class TechnicalProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.6,
-                require_confidence=True
+                require_confidence=True,
+                retrieval_query=TechnicalProcessor.RETRIEVAL_QUERIES["learning_methods"]
             )
             
             # 验证和补充
@@ -431,7 +443,8 @@ class TechnicalProcessor:
                 segments=segments,
                 system_prompt=system_prompt,
                 temperature=0.4,
-                require_confidence=True
+                require_confidence=True,
+                retrieval_query=TechnicalProcessor.RETRIEVAL_QUERIES["related_technologies"]
             )
             
             # 提取technologies列表
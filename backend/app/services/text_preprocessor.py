@@ -4,12 +4,17 @@
 """
 import re
 import asyncio
-from typing import Dict, Any, List
-from difflib import SequenceMatcher
+from typing import Dict, Any, List, Optional
 import structlog
 
+from app.core.config import settings
+from app.services.near_duplicate_index import NearDuplicateIndex
+
 logger = structlog.get_logger()
 
+# clean_text中需要删除的不可见字符（控制字符、零宽字符）
+_INVISIBLE_CHARS_PATTERN = re.compile(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F-\x9F\u200B-\u200D\uFEFF]')
+
 
 class TextPreprocessor:
     """文本预处理器"""
@@ -21,7 +26,7 @@ class TextPreprocessor:
         
         Args:
             content: 原始文档内容
-            
+        
         Returns:
             格式统一后的内容
         """
@@ -55,7 +60,7 @@ class TextPreprocessor:
         
         Args:
             content: 格式统一后的内容
-            
+        
         Returns:
             清洗后的内容
         """
@@ -82,14 +87,59 @@ class TextPreprocessor:
         return content
     
     @staticmethod
-    def filter_noise(content: str, file_type: str = 'pdf') -> str:
+    def normalize_and_clean(content: str) -> str:
+        """
+        格式统一 + 文本清洗（单遍扫描，结果与 clean_text(normalize_format(content)) 完全一致）
+        
+        逐行处理：行首空白按字符数转为空格，行内空白合并为单个空格，只对含不可见字符的行做删除；
+        连续空行的合并和行尾空格的去除在同一次遍历中通过换行计数完成，不再多次拆分和拼接全文
+        
+        Args:
+            content: 原始文档内容
+        
+        Returns:
+            格式统一并清洗后的内容
+        """
+        if not content:
+            return content
+        
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+        # 大多数文档不含不可见字符，整体检查一次，避免逐行检查
+        has_invisible = _INVISIBLE_CHARS_PATTERN.search(content) is not None
+        
+        parts = []
+        newlines = -1  # 待输出的连续换行数（第一行之前没有换行）
+        for line in content.split('\n'):
+            newlines += 1
+            stripped = line.lstrip()
+            indent = len(line) - len(stripped)
+            body = ' '.join(stripped.split()) if stripped else ''
+            if has_invisible and body and _INVISIBLE_CHARS_PATTERN.search(body):
+                body = _INVISIBLE_CHARS_PATTERN.sub('', body)
+            if not indent and not body:
+                continue
+            # 与 re.sub(r'\n{3,}', '\n\n') 一致：只看删除字符后、去除行尾空格前是否为空行
+            parts.append('\n\n' if newlines >= 3 else '\n' * newlines)
+            newlines = 0
+            parts.append((' ' * indent + body).rstrip())
+        parts.append('\n\n' if newlines >= 3 else '\n' * newlines)
+        
+        return ''.join(parts)
+    
+    @staticmethod
+    def filter_noise(
+        content: str,
+        file_type: str = 'pdf',
+        similarity_threshold: Optional[float] = None
+    ) -> str:
         """
         噪声过滤
         
         Args:
             content: 清洗后的内容
             file_type: 文件类型（pdf/docx/pptx/md/txt）
-            
+            similarity_threshold: 重复段落的相似度阈值（shingle Jaccard），如果为None则从配置读取
+        
         Returns:
             过滤噪声后的内容
         """
@@ -131,28 +181,22 @@ class TextPreprocessor:
             
             filtered_lines.append(line)
         
-        # 3. 去除重复段落（基于相似度）
+        # 3. 去除重复段落（基于MinHash/LSH的近似重复检测，只与候选段落比较）
         content = '\n'.join(filtered_lines)
         paragraphs = content.split('\n\n')
         unique_paragraphs = []
-        seen_paragraphs = set()
+        if similarity_threshold is None:
+            similarity_threshold = settings.TEXT_DEDUP_SIMILARITY_THRESHOLD
+        index = NearDuplicateIndex(threshold=similarity_threshold)
         
         for para in paragraphs:
             para_stripped = para.strip()
             if not para_stripped:
                 continue
             
-            # 检查是否与已见过的段落高度相似
-            is_duplicate = False
-            for seen_para in seen_paragraphs:
-                similarity = SequenceMatcher(None, para_stripped, seen_para).ratio()
-                if similarity > 0.9:  # 相似度超过90%认为是重复
-                    is_duplicate = True
-                    break
-            
-            if not is_duplicate:
+            # 与已保留的段落高度相似（如重复的页眉页脚、版权声明）则跳过
+            if index.add_if_unique(para_stripped):
                 unique_paragraphs.append(para)
-                seen_paragraphs.add(para_stripped)
         
         return '\n\n'.join(unique_paragraphs)
     
@@ -169,7 +213,7 @@ class TextPreprocessor:
             content: 原始文档内容
             file_type: 文件类型（pdf/docx/pptx/md/txt）
             timeout: 超时时间（秒），超过则使用快速模式
-            
+        
         Returns:
             {
                 "cleaned_content": str,
@@ -198,11 +242,8 @@ class TextPreprocessor:
         try:
             # 使用超时保护
             async def _preprocess():
-                # 1. 格式统一
-                cleaned = TextPreprocessor.normalize_format(content)
-                
-                # 2. 文本清洗
-                cleaned = TextPreprocessor.clean_text(cleaned)
+                # 1-2. 格式统一 + 文本清洗（单遍扫描）
+                cleaned = TextPreprocessor.normalize_and_clean(content)
                 
                 # 3. 噪声过滤
                 cleaned = TextPreprocessor.filter_noise(cleaned, file_type)
@@ -222,8 +263,7 @@ class TextPreprocessor:
                     content_length=original_length
                 )
                 # 快速模式：只做基本的格式统一和清洗，跳过噪声过滤
-                cleaned_content = TextPreprocessor.normalize_format(content)
-                cleaned_content = TextPreprocessor.clean_text(cleaned_content)
+                cleaned_content = TextPreprocessor.normalize_and_clean(content)
                 # 跳过噪声过滤以节省时间
             
             cleaned_length = len(cleaned_content)
@@ -249,7 +289,7 @@ class TextPreprocessor:
                 "cleaned_content": cleaned_content,
                 "stats": stats
             }
-            
+        
         except Exception as e:
             logger.error(
                 "文本预处理失败，使用原始内容",
@@ -0,0 +1,290 @@
+"""
+两级缓存基类 - AI响应缓存和向量缓存共用的存储层
+- 一级缓存：Redis（所有Worker共享，TTL + LRU淘汰，最近访问时间记录在有序集合中）
+- 二级缓存：本地磁盘（可选，SQLite文件，Redis淘汰或重启后仍可命中）
+- 磁盘条目数由触发器维护，写入时只按索引删除过期和超出上限的条目，不扫描全表
+- 统计命中/未命中次数（进程内 + Redis中所有Worker汇总）
+"""
+from typing import Optional, Dict, List, Any
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import structlog
+
+logger = structlog.get_logger()
+
+
+class TwoTierCache:
+    """
+    Redis + SQLite两级缓存（按key存取字节）
+    
+    子类提供_key_prefix（Redis key前缀）、_disk_table/_disk_value_column（SQLite表和值列）、
+    _label（日志中的缓存名称），并负责key的生成和值的编码；
+    Redis或磁盘不可用时视为未命中，不影响调用方
+    """
+    
+    _key_prefix = ""
+    _disk_table = ""
+    _disk_value_column = "value"
+    _label = "缓存"
+    
+    # SQLite单条语句的参数个数有上限，分批查询
+    DISK_QUERY_BATCH = 500
+    
+    def __init__(
+        self,
+        redis_url: str,
+        ttl: int,
+        max_entries: int,
+        disk_path: str,
+        disk_max_entries: int
+    ):
+        """
+        初始化两级缓存
+        
+        Args:
+            redis_url: Redis地址
+            ttl: 缓存过期时间（秒）
+            max_entries: Redis中最多保留的条目数，超过后按最近访问时间淘汰
+            disk_path: 磁盘缓存文件路径（为空则不启用磁盘缓存）
+            disk_max_entries: 磁盘缓存最多保留的条目数
+        """
+        self.enabled = True
+        self.redis_url = redis_url
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        
+        self.hits = 0
+        self.misses = 0
+        
+        self._redis = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lru_key = f"{self._key_prefix}:lru"
+        self._stats_key = f"{self._key_prefix}:stats"
+        
+        self._disk_lock = threading.Lock()
+        self._disk_initialized = False
+    
+    def _get_redis(self):
+        """获取异步Redis客户端（按事件循环懒加载，返回bytes）"""
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(self.redis_url, decode_responses=False)
+            self._redis_loop = loop
+        return self._redis
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """
+        获取命中统计
+        
+        Returns:
+            {"hits", "misses", "hit_rate"}（所有Worker汇总）以及当前进程的统计
+        """
+        stats = {"process_hits": self.hits, "process_misses": self.misses}
+        hits, misses = self.hits, self.misses
+        try:
+            data = await self._get_redis().hgetall(self._stats_key)
+            if data:
+                hits = int(data.get(b"hits", 0))
+                misses = int(data.get(b"misses", 0))
+        except Exception as e:
+            logger.warning(f"获取{self._label}统计失败", error=str(e))
+        total = hits + misses
+        stats.update({
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0
+        })
+        return stats
+    
+    async def _record(self, hits: int, misses: int) -> None:
+        """累加进程内计数和Redis中的共享计数"""
+        self.hits += hits
+        self.misses += misses
+        try:
+            async with self._get_redis().pipeline(transaction=False) as pipe:
+                if hits:
+                    pipe.hincrby(self._stats_key, "hits", hits)
+                if misses:
+                    pipe.hincrby(self._stats_key, "misses", misses)
+                await pipe.execute()
+        except Exception:
+            pass
+    
+    def _entry_key(self, key: str) -> str:
+        return f"{self._key_prefix}:entry:{key}"
+    
+    async def _load_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """
+        批量读取（先Redis，未命中的再查磁盘，磁盘命中后回填Redis；不计入命中统计）
+        
+        Args:
+            keys: 缓存key列表
+        
+        Returns:
+            与keys对应的值，未命中的位置为None
+        """
+        values = await self._redis_get_many(keys)
+        
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing and self.disk_path:
+            disk_values = await asyncio.to_thread(self._disk_get_many, [keys[i] for i in missing])
+            refill = {}
+            for i, value in zip(missing, disk_values):
+                if value is not None:
+                    values[i] = value
+                    refill[keys[i]] = value
+            if refill:
+                await self._redis_set_many(refill)
+        return values
+    
+    async def _store_many(self, items: Dict[str, bytes]) -> None:
+        """
+        批量写入Redis和磁盘
+        
+        Args:
+            items: {缓存key: 值}
+        """
+        if not items:
+            return
+        await self._redis_set_many(items)
+        if self.disk_path:
+            await asyncio.to_thread(self._disk_set_many, items)
+    
+    async def _redis_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """从Redis批量获取，命中的条目更新最近访问时间"""
+        try:
+            client = self._get_redis()
+            values = await client.mget([self._entry_key(key) for key in keys])
+            touched = {key: time.time() for key, value in zip(keys, values) if value is not None}
+            if touched:
+                await client.zadd(self._lru_key, touched)
+            return list(values)
+        except Exception as e:
+            logger.warning(f"读取{self._label}失败", error=str(e))
+            return [None] * len(keys)
+    
+    async def _redis_set_many(self, items: Dict[str, bytes]) -> None:
+        """批量写入Redis，并按最近访问时间淘汰超出上限的条目"""
+        try:
+            client = self._get_redis()
+            now = time.time()
+            async with client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.setex(self._entry_key(key), self.ttl, value)
+                pipe.zadd(self._lru_key, {key: now for key in items})
+                # 清理已过期条目在LRU索引中的残留
+                pipe.zremrangebyscore(self._lru_key, "-inf", now - self.ttl)
+                pipe.zcard(self._lru_key)
+                results = await pipe.execute()
+            
+            overflow = results[-1] - self.max_entries
+            if overflow > 0:
+                evicted = await client.zpopmin(self._lru_key, overflow)
+                if evicted:
+                    await client.delete(*[self._entry_key(k.decode()) for k, _ in evicted])
+                    logger.debug(f"{self._label}LRU淘汰", count=len(evicted))
+        except Exception as e:
+            logger.warning(f"写入{self._label}失败", error=str(e))
+    
+    def _disk_connect(self) -> sqlite3.Connection:
+        """打开磁盘缓存（首次使用时建表、建索引和计数触发器）"""
+        if not self._disk_initialized:
+            directory = os.path.dirname(self.disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.disk_path, timeout=10)
+        if not self._disk_initialized:
+            table, column = self._disk_table, self._disk_value_column
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                f"key TEXT PRIMARY KEY, {column} BLOB NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed_at ON {table}(accessed_at)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_created_at ON {table}(created_at)")
+            # 条目数由触发器维护，淘汰时不需要COUNT(*)或OFFSET扫描全表
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entry_counts (name TEXT PRIMARY KEY, entries INTEGER NOT NULL)")
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_count_insert AFTER INSERT ON {table} BEGIN "
+                f"UPDATE cache_entry_counts SET entries = entries + 1 WHERE name = '{table}'; END"
+            )
+            conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_count_delete AFTER DELETE ON {table} BEGIN "
+                f"UPDATE cache_entry_counts SET entries = entries - 1 WHERE name = '{table}'; END"
+            )
+            # 已有的缓存文件首次使用时统计一次条目数
+            conn.execute(
+                f"INSERT OR IGNORE INTO cache_entry_counts (name, entries) SELECT ?, COUNT(*) FROM {table}",
+                (table,)
+            )
+            conn.commit()
+            self._disk_initialized = True
+        return conn
+    
+    def _disk_get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        """从磁盘缓存批量获取（在线程池中执行）"""
+        try:
+            with self._disk_lock:
+                conn = self._disk_connect()
+                try:
+                    table, column = self._disk_table, self._disk_value_column
+                    now = time.time()
+                    found = {}
+                    for offset in range(0, len(keys), self.DISK_QUERY_BATCH):
+                        batch = keys[offset:offset + self.DISK_QUERY_BATCH]
+                        placeholders = ",".join("?" * len(batch))
+                        rows = conn.execute(
+                            f"SELECT key, {column} FROM {table} WHERE key IN ({placeholders}) AND created_at > ?",
+                            (*batch, now - self.ttl)
+                        ).fetchall()
+                        found.update(rows)
+                    if found:
+                        conn.executemany(f"UPDATE {table} SET accessed_at = ? WHERE key = ?",
+                                         [(now, key) for key in found])
+                        conn.commit()
+                    return [found.get(key) for key in keys]
+                finally:
+                    conn.close()
+        except Exception as e:
+            logger.warning(f"读取{self._label}磁盘缓存失败", error=str(e))
+            return [None] * len(keys)
+    
+    def _disk_set_many(self, items: Dict[str, bytes]) -> None:
+        """批量写入磁盘缓存，并淘汰过期和超出上限的条目（在线程池中执行）"""
+        try:
+            with self._disk_lock:
+                conn = self._disk_connect()
+                try:
+                    table, column = self._disk_table, self._disk_value_column
+                    now = time.time()
+                    # 已存在的key原地更新（INSERT OR REPLACE会先删除旧行，计数触发器需要区分新增和更新）
+                    conn.executemany(
+                        f"INSERT INTO {table} (key, {column}, created_at, accessed_at) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, "
+                        "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                        [(key, value, now, now) for key, value in items.items()]
+                    )
+                    conn.execute(f"DELETE FROM {table} WHERE created_at <= ?", (now - self.ttl,))
+                    entries = conn.execute(
+                        "SELECT entries FROM cache_entry_counts WHERE name = ?", (table,)
+                    ).fetchone()[0]
+                    overflow = entries - self.disk_max_entries
+                    if overflow > 0:
+                        conn.execute(
+                            f"DELETE FROM {table} WHERE key IN ("
+                            f"SELECT key FROM {table} ORDER BY accessed_at LIMIT ?)",
+                            (overflow,)
+                        )
+                    conn.commit()
+                finally:
+                    conn.close()
+        except Exception as e:
+            logger.warning(f"写入{self._label}磁盘缓存失败", error=str(e))
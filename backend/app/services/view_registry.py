@@ -1,9 +1,11 @@
 """
 视角注册表 - 解耦视角和处理器的绑定关系
 """
-from typing import Dict, Type, Optional, List, Callable
+from typing import Dict, Type, Optional, List, Callable, Any
 import structlog
 
+from app.services.ai_response_cache import bypass_response_cache
+
 logger = structlog.get_logger()
 
 
@@ -12,6 +14,11 @@ class ViewRegistry:
     视角注册表 - 解耦视角和处理器的绑定关系
     
     支持动态注册视角配置，避免硬编码绑定关系
+    
+    处理器约定：process(content, stream_callback=None, segments=None)
+    - segments 为视角无关的段落切分结果（与content对应），由调用方传入，各视角共用，不重复切分
+    - 注册时声明 supports_progress 的处理器额外接收 progress_callback
+    - 处理器内的AI调用是否使用响应缓存由process(use_cache=...)的作用域统一控制
     """
     
     _registry: Dict[str, Dict] = {}
@@ -44,7 +51,8 @@ class ViewRegistry:
         view: str,  # learning/qa/system
         processor_class: Type,
         type_mapping: str,  # technical/interview/architecture（向后兼容）
-        result_adapter: Optional[Callable] = None
+        result_adapter: Optional[Callable] = None,
+        supports_progress: bool = False
     ):
         """
         注册视角配置
@@ -54,11 +62,13 @@ class ViewRegistry:
             processor_class: 处理器类
             type_mapping: 类型映射（用于向后兼容）
             result_adapter: 结果适配器（可选）
+            supports_progress: 处理器是否支持进度回调（progress_callback）
         """
         cls._registry[view] = {
             'processor_class': processor_class,
             'type_mapping': type_mapping,
             'result_adapter': result_adapter,
+            'supports_progress': supports_progress,
             'display_name': cls.VIEW_NAMES.get(view, view)
         }
         logger.info("注册视角", view=view, type_mapping=type_mapping)
@@ -81,6 +91,40 @@ class ViewRegistry:
             raise ValueError(f"未注册的视角: {view}。已注册的视角: {list(cls._registry.keys())}")
         return cls._registry[view]['processor_class']
     
+    @classmethod
+    async def process(
+        cls,
+        view: str,
+        content: str,
+        segments: Optional[List[Dict]] = None,
+        progress_callback: Optional[Callable] = None,
+        stream_callback: Optional[Callable] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        按处理器约定调用视角处理器
+        
+        Args:
+            view: 视角名称
+            content: 预处理后的内容
+            segments: 段落切分结果（与content对应），为空时处理器按内容哈希复用切分缓存
+            progress_callback: 进度回调函数（仅支持进度回调的处理器使用）
+            stream_callback: 流式内容回调函数
+            use_cache: 是否使用AI响应缓存（False时处理器内的所有AI调用都重新请求API）
+        
+        Returns:
+            处理结果
+        
+        Raises:
+            ValueError: 如果视角未注册
+        """
+        processor = cls.get_processor(view)()
+        kwargs = {'stream_callback': stream_callback, 'segments': segments}
+        if progress_callback and cls._registry[view]['supports_progress']:
+            kwargs['progress_callback'] = progress_callback
+        with bypass_response_cache(not use_cache):
+            return await processor.process(content, **kwargs)
+    
     @classmethod
     def get_type_mapping(cls, view: str) -> str:
         """
@@ -160,7 +204,8 @@ def _init_registry():
         'system',  # 系统视角
         ArchitectureProcessor,  # 原架构文档处理器
         'architecture',  # 向后兼容的类型
-        result_adapter=None
+        result_adapter=None,
+        supports_progress=True  # 按分支完成情况上报进度
     )
     
     logger.info("视角注册表初始化完成", views=list(ViewRegistry.list_views()))
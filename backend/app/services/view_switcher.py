@@ -29,7 +29,8 @@ class ViewSwitcher:
     async def switch_view(
         document_id: str,
         target_view: str,
-        db: AsyncSession
+        db: AsyncSession,
+        use_cache: bool = True
     ) -> Dict:
         """
         快速切换视角（对同一理解的再组织）
@@ -43,6 +44,7 @@ class ViewSwitcher:
         Args:
             document_id: 文档ID
             target_view: 目标视角
+            use_cache: 是否复用已有结果和AI响应缓存（False时重新调用AI生成并覆盖该视角的已有结果）
         
         Returns:
             {
@@ -69,7 +71,7 @@ class ViewSwitcher:
         )
         existing_result = existing_result_query.scalar_one_or_none()
         
-        if existing_result:
+        if existing_result and use_cache:
             # 如果结果已存在，直接返回
             elapsed_time = (datetime.now() - start_time).total_seconds()
             logger.info(
@@ -132,33 +134,33 @@ class ViewSwitcher:
             segments = intermediate.segments or []
         
         # 5. 仅重新组织AI处理（根据新视角）
-        processor_class = ViewRegistry.get_processor(target_view)
-        processor = processor_class()
-        
-        # 处理文档（复用中间结果）
+        # 处理文档（复用中间结果，包括段落切分结果；切换时不需要进度回调）
         processing_start = datetime.now()
         type_mapping = ViewRegistry.get_type_mapping(target_view)
-        
-        # 如果是架构文档，可能需要进度回调（但切换时不需要）
-        if type_mapping == 'architecture':
-            result_data = await processor.process(content, progress_callback=None)
-        else:
-            result_data = await processor.process(content)
+        result_data = await ViewRegistry.process(target_view, content, segments=segments, use_cache=use_cache)
         
         processing_time = int((datetime.now() - processing_start).total_seconds())
         
-        # 6. 保存新视角的结果（难点1：独立存储，不影响其他view）
-        view_result = ProcessingResult(
-            document_id=document_id,
-            view=target_view,
-            document_type=type_mapping,
-            result_data=result_data,  # 保持原生结构
-            is_primary=False,  # 切换的视角不是主视角
-            processing_time=processing_time
-        )
-        db.add(view_result)
+        # 6. 保存新视角的结果（难点1：独立存储，不影响其他view；重新生成时覆盖该视角的已有结果）
+        if existing_result:
+            existing_result.result_data = result_data
+            existing_result.processing_time = processing_time
+        else:
+            view_result = ProcessingResult(
+                document_id=document_id,
+                view=target_view,
+                document_type=type_mapping,
+                result_data=result_data,  # 保持原生结构
+                is_primary=False,  # 切换的视角不是主视角
+                processing_time=processing_time
+            )
+            db.add(view_result)
         await db.commit()  # 立即提交，确保该view结果稳定
         
+        # 提取新视角的技术名词（知识图谱按技术聚合，不再读取结果JSONB）
+        from app.services.document_technology_service import DocumentTechnologyService
+        await DocumentTechnologyService.save_for_view_safely(db, document_id, target_view, type_mapping, result_data)
+        
         elapsed_time = (datetime.now() - start_time).total_seconds()
         
         # 7. 检查是否超过5秒
@@ -24,6 +24,8 @@ from app.services.interview_processor import InterviewProcessor
 from app.services.technical_processor import TechnicalProcessor
 from app.services.architecture_processor import ArchitectureProcessor
 from app.services.intermediate_results_service import IntermediateResultsService
+from app.services.document_dedup_service import DocumentDedupService
+from app.services.ai_response_cache import bypass_response_cache
 from app.services.source_segmenter import SourceSegmenter
 from app.services.view_registry import ViewRegistry
 from app.tasks.view_processing_helper import process_views_with_priority, process_view_independently
@@ -103,13 +105,20 @@ async def update_progress(
 
 
 @celery_app.task(bind=True, name="app.tasks.document_processing.process_document")
-def process_document_task(self, document_id: str, task_id: str, enabled_views: Optional[list] = None):
+def process_document_task(
+    self,
+    document_id: str,
+    task_id: str,
+    enabled_views: Optional[list] = None,
+    use_cache: bool = True
+):
     """
     文档处理任务
     
     Args:
         document_id: 文档ID
         task_id: 处理任务ID
+        use_cache: 是否使用AI响应缓存和相同内容文档的结果（False时重新调用AI生成，用于重新处理）
     """
     import asyncio
     import nest_asyncio
@@ -198,6 +207,78 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                 
                 logger.info("开始处理文档", document_id=document_id, filename=document.filename)
                 
+                # 步骤0: 内容去重（相同内容的文档已处理完成时，直接复用其结果，不再提取内容和调用AI）
+                dedup_result = None
+                try:
+                    if not document.content_hash:
+                        # 旧文档上传时未记录指纹，从已保存的文件计算
+                        document.content_hash = await asyncio.to_thread(
+                            DocumentDedupService.compute_file_hash, document.file_path
+                        )
+                        await db.commit()
+                    
+                    # 重新处理（use_cache=False）时不复用相同内容文档的结果
+                    duplicate = await DocumentDedupService.find_completed_duplicate(document, db) if use_cache else None
+                    if duplicate:
+                        await update_progress(task_id, 10, "检测到相同内容的文档，复用处理结果...", "running")
+                        dedup_result = await DocumentDedupService.clone_results(
+                            source=duplicate,
+                            target=document,
+                            db=db,
+                            required_views=current_enabled_views or None
+                        )
+                except Exception as e:
+                    logger.warning("内容去重失败，继续正常处理", document_id=document_id, error=str(e))
+                    await db.rollback()
+                    await db.refresh(document)
+                    dedup_result = None
+                
+                if dedup_result:
+                    document.status = "completed"
+                    task_result = await db.execute(
+                        select(ProcessingTask).where(ProcessingTask.id == task_uuid)
+                    )
+                    task = task_result.scalar_one_or_none()
+                    if task:
+                        task.status = "completed"
+                        task.progress = 100
+                        task.current_stage = "处理完成"
+                        task.completed_at = datetime.now()
+                    await db.commit()
+                    
+                    # 复用的学习数据包含向量，同样更新相似文档邻居表
+                    try:
+                        from app.services.document_neighbor_service import DocumentNeighborService
+                        await DocumentNeighborService.update_for_document(db, doc_uuid)
+                        await db.commit()
+                    except Exception as e:
+                        await db.rollback()
+                        logger.warning("更新相似文档邻居失败，可稍后批量重建", error=str(e), document_id=document_id)
+                    
+                    # 源文档尚未生成的视角（如次视角仍在后台处理），在后台补充生成
+                    if dedup_result['missing_views']:
+                        process_secondary_views_task.delay(
+                            document_id,
+                            dedup_result['missing_views'],
+                            dedup_result['preprocessed_content'],
+                            json.dumps(dedup_result['segments'], ensure_ascii=False),
+                            task_id
+                        )
+                    
+                    await update_progress(
+                        task_id,
+                        100,
+                        "处理完成（复用相同内容文档的结果）",
+                        "completed",
+                        enabled_views=dedup_result['enabled_views'],
+                        primary_view=dedup_result['primary_view']
+                    )
+                    logger.info("文档处理完成（复用相同内容文档的结果）",
+                               document_id=document_id,
+                               primary_view=dedup_result['primary_view'],
+                               enabled_views=dedup_result['enabled_views'])
+                    return
+                
                 # 步骤1: 提取文档内容 (0-15%)
                 await update_progress(task_id, 10, "提取文档内容中...", "running")
                 try:
@@ -791,7 +872,8 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                         detection_scores=detection_scores,
                         db=db,
                         progress_callback=progress_callback,
-                        task_id=task_id  # 传递task_id用于流式生成
+                        task_id=task_id,  # 传递task_id用于流式生成
+                        use_cache=use_cache
                     )
                     
                     results = view_processing_result['results']
@@ -953,6 +1035,11 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                         )
                         db.add(primary_result)
                         await db.commit()
+                        
+                        from app.services.document_technology_service import DocumentTechnologyService
+                        await DocumentTechnologyService.save_for_view_safely(
+                            db, doc_uuid, primary_view, detected_type, result_data
+                        )
                     
                     # 更新文档状态
                     document.status = "completed"
@@ -1007,19 +1094,22 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                         
                         # 生成文档向量（同步生成，但设置超时避免卡死）
                         embedding = None
+                        segment_chunks = []
                         try:
                             from app.services.embedding_service import get_embedding_service
                             embedding_service = get_embedding_service()
                             
                             # 设置向量生成超时（30秒），避免首次加载模型时卡死
                             # 如果模型已预热，生成向量很快（0.5-5秒）
+                            # 分块向量化：按段落分块批量向量化后池化为文档向量，覆盖整篇文档
+                            # segments是对预处理后内容的切分，分块位置对应preprocessed_content
                             try:
-                                embedding = await asyncio.wait_for(
-                                    embedding_service.generate_embedding(content),
+                                embedding, segment_chunks = await asyncio.wait_for(
+                                    embedding_service.generate_document_embedding(preprocessed_content, segments),
                                     timeout=30.0  # 30秒超时（首次加载模型可能需要时间）
                                 )
                                 if embedding:
-                                    logger.info("文档向量生成成功", document_id=document_id)
+                                    logger.info("文档向量生成成功", document_id=document_id, chunk_count=len(segment_chunks))
                                 else:
                                     logger.warning("文档向量生成失败，但继续处理", document_id=document_id)
                             except asyncio.TimeoutError:
@@ -1030,10 +1120,12 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                             logger.warning("向量生成服务初始化失败，但继续处理", error=str(e), document_id=document_id)
                         
                         # 保存学习数据（包含向量，如果生成成功）
+                        from app.models.embedding_vector import storage_model_name
                         learning_data = SystemLearningData(
                             document_id=doc_uuid,
                             content_summary=content[:500] if len(content) > 500 else content,
                             embedding=embedding,  # 包含向量（如果生成成功）
+                            embedding_model=storage_model_name() if embedding else None,
                             document_type=detected_type,
                             processing_result_summary=str(result_data)[:500] if result_data else None,
                             processing_time=processing_time,
@@ -1043,11 +1135,23 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
                         learning_db = AsyncSessionLocal()
                         try:
                             learning_db.add(learning_data)
+                            if segment_chunks and settings.EMBEDDING_STORE_SEGMENTS:
+                                await embedding_service.save_segment_embeddings(learning_db, doc_uuid, segment_chunks)
                             await learning_db.commit()
                             if embedding:
                                 logger.info("学习数据已保存（包含向量）", document_id=document_id)
                             else:
                                 logger.info("学习数据已保存（向量未生成）", document_id=document_id)
+                            
+                            if embedding:
+                                # 更新相似文档邻居表（新文档的邻居列表，以及新文档插入近邻的列表）
+                                try:
+                                    from app.services.document_neighbor_service import DocumentNeighborService
+                                    await DocumentNeighborService.update_for_document(learning_db, doc_uuid)
+                                    await learning_db.commit()
+                                except Exception as e:
+                                    await learning_db.rollback()
+                                    logger.warning("更新相似文档邻居失败，可稍后批量重建", error=str(e), document_id=document_id)
                         finally:
                             await learning_db.close()
                     except Exception as e:
@@ -1112,7 +1216,9 @@ def process_document_task(self, document_id: str, task_id: str, enabled_views: O
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
     
-    loop.run_until_complete(_process())
+    # 重新处理时整个任务（类型识别、视角处理等）的AI调用都绕过响应缓存
+    with bypass_response_cache(not use_cache):
+        loop.run_until_complete(_process())
 
 
 @celery_app.task(bind=True, name="app.tasks.document_processing.process_secondary_views")
@@ -1122,7 +1228,8 @@ def process_secondary_views_task(
     secondary_views: list, 
     content: str, 
     segments_json: str,
-    task_id: Optional[str] = None
+    task_id: Optional[str] = None,
+    use_cache: bool = True
 ):
     """
     异步处理次视角的后台任务
@@ -1135,6 +1242,7 @@ def process_secondary_views_task(
         content: 预处理后的内容
         segments_json: 段落切分结果的JSON字符串
         task_id: 主任务ID（用于进度更新和流式生成）
+        use_cache: 是否使用AI响应缓存（与主任务一致）
     """
     import json
     import nest_asyncio
@@ -1176,7 +1284,8 @@ def process_secondary_views_task(
                         is_primary=False,
                         db=None,  # 创建独立session
                         progress_callback=None,
-                        task_id=task_id  # 传递task_id用于流式生成
+                        task_id=task_id,  # 传递task_id用于流式生成
+                        use_cache=use_cache
                     )
                     
                     if result:
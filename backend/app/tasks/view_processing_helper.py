@@ -103,7 +103,8 @@ async def process_view_independently(
     progress_callback: Optional[callable] = None,
     incremental_save: bool = True,  # 是否启用增量保存
     stream_callback: Optional[callable] = None,  # 流式内容回调函数
-    task_id: Optional[str] = None  # 新增：用于流式生成
+    task_id: Optional[str] = None,  # 新增：用于流式生成
+    use_cache: bool = True  # 是否使用AI响应缓存（重新处理时为False）
 ) -> Optional[Dict]:
     """
     独立处理单个view，不影响其他view
@@ -121,6 +122,7 @@ async def process_view_independently(
         is_primary: 是否为主视角
         db: 数据库会话（可选，如果为None则创建新session）
         progress_callback: 进度回调函数
+        use_cache: 是否使用AI响应缓存（False时重新调用AI生成）
     
     Returns:
         处理结果，如果失败则返回None
@@ -131,10 +133,6 @@ async def process_view_independently(
         db = AsyncSessionLocal()
     
     try:
-        # 获取处理器
-        processor_class = ViewRegistry.get_processor(view)
-        processor = processor_class()
-        
         # 处理文档
         start_time = datetime.now()
         
@@ -158,12 +156,16 @@ async def process_view_independently(
                     }, ensure_ascii=False)
                 )
         
-        # 如果是架构文档且需要进度回调
+        # 复用已切分的段落（视角无关），处理器不再重复切分
         type_mapping = ViewRegistry.get_type_mapping(view)
-        if type_mapping == 'architecture' and progress_callback:
-            result_data = await processor.process(content, progress_callback=progress_callback, stream_callback=stream_cb if task_id else None)
-        else:
-            result_data = await processor.process(content, stream_callback=stream_cb if task_id else None)
+        result_data = await ViewRegistry.process(
+            view,
+            content,
+            segments=segments,
+            progress_callback=progress_callback,
+            stream_callback=stream_cb if task_id else None,
+            use_cache=use_cache
+        )
         
         processing_time = int((datetime.now() - start_time).total_seconds())
         
@@ -188,6 +190,10 @@ async def process_view_independently(
         db.add(view_result)
         await db.commit()  # 立即提交，确保该view结果稳定
         
+        # 提取该view的技术名词（知识图谱按技术聚合，不再读取结果JSONB）
+        from app.services.document_technology_service import DocumentTechnologyService
+        await DocumentTechnologyService.save_for_view_safely(db, document_id, view, type_mapping, result_data)
+        
         logger.info(
             "View处理完成",
             document_id=document_id,
@@ -235,7 +241,8 @@ async def process_views_with_priority(
     detection_scores: Dict[str, float],
     db: AsyncSession,
     progress_callback: Optional[callable] = None,
-    task_id: Optional[str] = None  # 新增：用于流式生成
+    task_id: Optional[str] = None,  # 新增：用于流式生成
+    use_cache: bool = True  # 是否使用AI响应缓存（重新处理时为False，次视角后台任务同样绕过）
 ) -> Dict[str, Any]:
     """
     处理多个视角（主次视角优先级策略）
@@ -253,6 +260,7 @@ async def process_views_with_priority(
         detection_scores: 系统检测的特征得分
         db: 数据库会话
         progress_callback: 进度回调函数
+        use_cache: 是否使用AI响应缓存
     
     Returns:
         {
@@ -277,7 +285,8 @@ async def process_views_with_priority(
             db=db,
             progress_callback=progress_callback,
             stream_callback=None,
-            task_id=task_id
+            task_id=task_id,
+            use_cache=use_cache
         )
         
         if primary_result:
@@ -309,6 +318,7 @@ async def process_views_with_priority(
             # 使用apply_async创建异步任务，不等待结果
             process_secondary_views_task.apply_async(
                 args=[document_id, secondary_views, content, segments_json, task_id],
+                kwargs={"use_cache": use_cache},
                 countdown=5  # 延迟5秒后开始处理，确保主视角任务已返回
             )
             logger.info(
@@ -0,0 +1,34 @@
+"""
+批量补充文档技术名词表
+对所有已有处理结果提取技术名词并覆盖document_technologies中对应视角的记录：
+- 执行011迁移后为已有文档生成技术名词（否则知识图谱只包含迁移后处理的文档）
+- 技术名词提取规则修改后重新执行
+
+用法: python scripts/backfill_document_technologies.py [--batch-size 200]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.database import AsyncSessionLocal
+from app.services.document_technology_service import DocumentTechnologyService
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="批量补充文档技术名词表")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批处理（并提交）的处理结果数")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        total = await DocumentTechnologyService.backfill(db, batch_size=args.batch_size)
+    print(f"已为 {total} 个处理结果提取技术名词，耗时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+嵌入模型后端吞吐基准测试
+对比 torch / onnx / onnx_int8 后端的加载耗时、批量编码吞吐（条/秒）和进程内存增量
+
+用法: python scripts/benchmark_embedding_backends.py [--backends torch onnx onnx_int8] [--count 512] [--batch-size 32]
+"""
+import argparse
+import random
+import resource
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.embedding_backends import get_backend_class
+
+
+def build_texts(count: int, seed: int = 0) -> list:
+    """生成长度不一的中英文混合段落（接近分块向量化的输入）"""
+    rng = random.Random(seed)
+    words = ["分布式", "缓存", "数据库", "消息队列", "微服务", "Kubernetes", "Redis", "latency",
+             "throughput", "一致性", "事务", "索引", "API", "Gateway", "容器", "负载均衡"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(5, 120))) for _ in range(count)]
+
+
+def max_rss_mb() -> float:
+    """进程峰值常驻内存（MB，Linux）"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入模型后端吞吐基准测试")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx_int8"], help="参与对比的后端")
+    parser.add_argument("--count", type=int, default=512, help="文本条数")
+    parser.add_argument("--batch-size", type=int, default=32, help="批大小")
+    parser.add_argument("--repeat", type=int, default=3, help="重复次数（取最短耗时）")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME, help="模型名称")
+    args = parser.parse_args()
+    
+    texts = sorted(build_texts(args.count), key=len)
+    print(f"{'后端':>10} {'加载(s)':>8} {'编码(s)':>8} {'吞吐(条/s)':>12} {'峰值内存增量(MB)':>18}")
+    for name in args.backends:
+        # 每个后端的内存增量按峰值RSS的增长估算，建议每次只测一个后端以获得准确的内存数据
+        rss_before = max_rss_mb()
+        start = time.perf_counter()
+        backend = get_backend_class(name)(args.model).load()
+        load_time = time.perf_counter() - start
+        
+        backend.encode(texts[:args.batch_size], batch_size=args.batch_size)
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            backend.encode(texts, batch_size=args.batch_size)
+            best = min(best, time.perf_counter() - start)
+        print(f"{name:>10} {load_time:>8.2f} {best:>8.2f} {len(texts) / best:>12.1f} {max_rss_mb() - rss_before:>18.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+"""
+知识图谱构建基准测试
+对比逐对循环的参考实现与NumPy向量化实现的耗时，并校验两者生成的节点和边完全一致。
+
+随机生成（固定种子）技术-文档数据：技术名称包含关联关系定义中的技术和合成技术，每个文档包含若干技术。
+不依赖数据库和AI服务，直接测试节点选择和边构建（build_graph的第3-5步）：
+向量化实现调用KnowledgeGraphBuilder.select_technology_nodes / build_technology_edges，
+共同文档数（生产环境由document_technologies按技术对聚合）在内存中按文档统计。
+参考实现和内存中的组装只用于本脚本和单元测试，不在生产代码中。
+
+用法: python scripts/benchmark_knowledge_graph.py [--techs 600] [--docs 10000] [--per-doc 12] [--max-nodes 50,200,600]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.knowledge_graph_builder import KnowledgeGraphBuilder
+from app.services.tech_relationship_service import TechRelationshipService
+
+
+def generate_data(tech_count: int, doc_count: int, per_doc: int, seed: int):
+    """生成技术 -> 文档集合映射（热门技术出现频率更高）"""
+    rng = random.Random(seed)
+    known = set(TechRelationshipService.TECH_RELATIONSHIPS)
+    for related_list in TechRelationshipService.TECH_RELATIONSHIPS.values():
+        known.update(tech for tech, _ in related_list)
+    techs = sorted(known)[:tech_count]
+    techs += [f"Tech-{i}" for i in range(tech_count - len(techs))]
+    weights = [1.0 / (rank + 1) ** 0.8 for rank in range(len(techs))]
+    
+    technology_docs_map = {}
+    for doc in range(doc_count):
+        for tech in set(rng.choices(techs, weights=weights, k=per_doc)):
+            technology_docs_map.setdefault(tech, set()).add(f"doc-{doc}")
+    return set(technology_docs_map), technology_docs_map
+
+
+def shared_document_counts(techs: List[str], technology_docs_map: Dict[str, Set[str]]):
+    """
+    技术两两之间的共同文档数（与DocumentTechnologyService.shared_document_counts的按技术对聚合一致）
+    
+    Returns:
+        len(techs) x len(techs) 整数矩阵（对角线为该技术的文档数）
+    """
+    import numpy as np
+    
+    positions = {tech: i for i, tech in enumerate(techs)}
+    doc_techs = {}
+    for tech in techs:
+        for doc in technology_docs_map.get(tech, ()):
+            doc_techs.setdefault(doc, []).append(positions[tech])
+    
+    counts = np.zeros((len(techs), len(techs)), dtype=np.int64)
+    for indices in doc_techs.values():
+        indices = np.asarray(indices)
+        counts[np.ix_(indices, indices)] += 1
+    return counts
+
+
+def build_technology_graph(
+    all_technologies: Set[str],
+    technology_docs_map: Dict[str, Set[str]],
+    similarity_threshold: float,
+    max_nodes: int,
+    single_document: bool = False
+) -> Tuple[List[Dict], List[Dict]]:
+    """用内存中的技术-文档数据调用向量化的节点选择和边构建（与build_graph的第4-5步相同）"""
+    # 技术顺序与参考实现的遍历顺序一致，保证同分时排序相同
+    if single_document:
+        techs = list(all_technologies)
+        frequencies = None
+    else:
+        techs = list(technology_docs_map)
+        frequencies = [len(technology_docs_map[tech]) for tech in techs]
+    
+    selection = KnowledgeGraphBuilder.select_technology_nodes(techs, frequencies, max_nodes)
+    shared = None if single_document else shared_document_counts(selection[0], technology_docs_map)
+    return KnowledgeGraphBuilder.build_technology_edges(selection, shared, similarity_threshold, max_nodes)
+
+
+def build_technology_graph_python(
+    all_technologies: Set[str],
+    technology_docs_map: Dict[str, Set[str]],
+    similarity_threshold: float,
+    max_nodes: int,
+    single_document: bool
+) -> Tuple[List[Dict], List[Dict]]:
+    """
+    逐对循环的技术图谱构建（重构前的参考实现，结果与build_technology_graph一致）
+    
+    Returns:
+        (节点列表, 边列表)
+    """
+    # 3. 构建技术名词节点（优化：优先选择有强关联关系的技术）
+    from app.services.tech_relationship_service import get_tech_relationship_service
+    relationship_service = get_tech_relationship_service()
+    
+    # 一次性计算所有技术两两之间的关联强度，节点选择、边数量统计和边构建共用
+    candidate_techs = list(all_technologies)
+    tech_positions = {tech: i for i, tech in enumerate(candidate_techs)}
+    strength_matrix = relationship_service.strength_matrix(candidate_techs)
+    
+    def relationship_strength_of(tech1: str, tech2: str) -> float:
+        return strength_matrix[tech_positions[tech1]][tech_positions[tech2]]
+    
+    if single_document:
+        # 单文档模式：只显示该文档中的技术名词，但优先选择有强关联关系的
+        tech_scores = {}
+        for tech in all_technologies:
+            # 计算技术的重要性分数：基于与其他技术的关联强度
+            score = 0
+            related_count = 0
+            for other_tech in all_technologies:
+                if tech != other_tech:
+                    strength = relationship_strength_of(tech, other_tech)
+                    if strength > 0:
+                        score += strength
+                        related_count += 1
+            # 重要性 = 平均关联强度 + 关联数量权重
+            avg_strength = score / related_count if related_count > 0 else 0
+            tech_scores[tech] = avg_strength * 0.7 + (related_count / len(all_technologies)) * 0.3 if len(all_technologies) > 1 else 1.0
+        
+        # 按重要性分数排序
+        sorted_techs = sorted(tech_scores.items(), key=lambda x: x[1], reverse=True)
+        selected_techs = [tech for tech, score in sorted_techs[:max_nodes]]
+        tech_frequency = {tech: 1 for tech in selected_techs}
+    else:
+        # 多文档模式：按出现频率和关联关系综合排序
+        tech_frequency = {tech: len(docs) for tech, docs in technology_docs_map.items()}
+        tech_scores = {}
+        for tech, freq in tech_frequency.items():
+            # 计算综合分数：频率 + 关联关系强度
+            related_strength_sum = 0
+            related_count = 0
+            for other_tech, other_freq in tech_frequency.items():
+                if tech != other_tech:
+                    strength = relationship_strength_of(tech, other_tech)
+                    if strength > 0:
+                        related_strength_sum += strength
+                        related_count += 1
+            avg_related_strength = related_strength_sum / related_count if related_count > 0 else 0
+            # 综合分数 = 频率权重(0.4) + 关联强度权重(0.6)
+            tech_scores[tech] = (freq / max(tech_frequency.values()) if tech_frequency.values() else 0) * 0.4 + avg_related_strength * 0.6
+        
+        sorted_techs = sorted(tech_scores.items(), key=lambda x: x[1], reverse=True)
+        selected_techs = [tech for tech, score in sorted_techs[:max_nodes]]
+    
+    # 4. 构建节点列表（优化：节点大小基于重要性和关联度）
+    nodes = []
+    # 计算每个节点的边数量（用于确定节点大小）
+    node_edge_count = {}
+    for tech in selected_techs:
+        node_edge_count[tech] = 0
+    
+    # 临时计算边数量（在正式构建边之前）
+    for i, tech1 in enumerate(selected_techs):
+        for j, tech2 in enumerate(selected_techs):
+            if i >= j:
+                continue
+            strength = relationship_strength_of(tech1, tech2)
+            if strength >= similarity_threshold:
+                node_edge_count[tech1] = node_edge_count.get(tech1, 0) + 1
+                node_edge_count[tech2] = node_edge_count.get(tech2, 0) + 1
+    
+    max_edge_count = max(node_edge_count.values()) if node_edge_count.values() else 1
+    
+    for tech in selected_techs:
+        frequency = tech_frequency[tech]
+        edge_count = node_edge_count.get(tech, 0)
+        
+        # 节点大小基于：频率(30%) + 关联度(70%)
+        # 关联度 = 边的数量 / 最大边数量
+        edge_ratio = edge_count / max_edge_count if max_edge_count > 0 else 0
+        importance = (frequency / max(tech_frequency.values()) if tech_frequency.values() else 1) * 0.3 + edge_ratio * 0.7
+        
+        # 节点大小：最小30，最大60
+        size = int(30 + importance * 30)
+        
+        nodes.append({
+            "id": tech,
+            "label": tech,
+            "type": "technology",
+            "frequency": frequency,
+            "color": KnowledgeGraphBuilder._get_tech_color(tech),
+            "size": size
+        })
+    
+    # 5. 构建边列表（基于技术栈的实际关联关系，优化筛选逻辑）
+    edges = []
+    processed_pairs = set()
+    
+    # 先收集所有可能的边及其权重
+    candidate_edges = []
+    
+    for i, tech1 in enumerate(selected_techs):
+        for j, tech2 in enumerate(selected_techs):
+            if i >= j:
+                continue
+            
+            pair_key = tuple(sorted([tech1, tech2]))
+            if pair_key in processed_pairs:
+                continue
+            
+            processed_pairs.add(pair_key)
+            
+            # 获取技术栈的实际关联强度（基于架构师/开发者的视角）
+            relationship_strength = relationship_strength_of(tech1, tech2)
+            
+            # 如果关联强度超过阈值，加入候选边
+            if relationship_strength >= similarity_threshold:
+                if single_document:
+                    # 单文档模式：只使用技术栈关联强度
+                    final_weight = relationship_strength
+                    cooccurrence = 1.0
+                    docs_count = 1
+                else:
+                    # 多文档模式：使用技术栈关联强度 + 文档共现度
+                    docs_with_tech1 = technology_docs_map.get(tech1, set())
+                    docs_with_tech2 = technology_docs_map.get(tech2, set())
+                    docs_with_both = docs_with_tech1 & docs_with_tech2
+                    docs_with_either = docs_with_tech1 | docs_with_tech2
+                    
+                    cooccurrence = len(docs_with_both) / len(docs_with_either) if len(docs_with_either) > 0 else 0
+                    
+                    # 最终权重 = 技术栈关联强度 * 0.7 + 文档共现度 * 0.3
+                    final_weight = relationship_strength * 0.7 + cooccurrence * 0.3
+                    docs_count = len(docs_with_both)
+                
+                candidate_edges.append({
+                    "source": tech1,
+                    "target": tech2,
+                    "cooccurrence": round(cooccurrence, 3),
+                    "relationship_strength": round(relationship_strength, 3),
+                    "weight": round(final_weight, 3),
+                    "label": f"{relationship_strength:.2f}",
+                    "documents_count": docs_count
+                })
+    
+    # 按最终权重排序
+    candidate_edges.sort(key=lambda x: x["weight"], reverse=True)
+    
+    # 优化边筛选：确保每个节点至少有一条边（如果可能），但优先保留强关联边
+    # 1. 先保留所有强关联边（权重 >= 0.5）
+    strong_edges = [e for e in candidate_edges if e["relationship_strength"] >= 0.5]
+    edges.extend(strong_edges)
+    
+    # 2. 确保每个节点至少有一条边（如果还没有）
+    nodes_with_edges = set()
+    for edge in edges:
+        nodes_with_edges.add(edge["source"])
+        nodes_with_edges.add(edge["target"])
+    
+    for tech in selected_techs:
+        if tech not in nodes_with_edges:
+            # 为该节点找一条最强的边
+            for edge in candidate_edges:
+                if edge not in edges and (edge["source"] == tech or edge["target"] == tech):
+                    edges.append(edge)
+                    nodes_with_edges.add(tech)
+                    break
+    
+    # 3. 补充其他边，但限制总数
+    remaining_edges = [e for e in candidate_edges if e not in edges]
+    # 限制边的数量：最多 max_nodes * 2（避免图过于复杂）
+    max_edges = min(len(edges) + len(remaining_edges), max_nodes * 2)
+    edges.extend(remaining_edges[:max_edges - len(edges)])
+    
+    # 最终排序
+    edges.sort(key=lambda x: x["weight"], reverse=True)
+    
+    return nodes, edges
+
+
+def timed(func, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="知识图谱构建基准测试")
+    parser.add_argument("--techs", type=int, default=600, help="技术数量")
+    parser.add_argument("--docs", type=int, default=10000, help="文档数量")
+    parser.add_argument("--per-doc", type=int, default=12, help="每个文档抽取的技术数")
+    parser.add_argument("--max-nodes", default="50,200,600", help="最大节点数（逗号分隔）")
+    parser.add_argument("--threshold", type=float, default=0.3, help="关联度阈值")
+    parser.add_argument("--repeat", type=int, default=3, help="每种方式重复次数（取最快一次）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+    
+    all_technologies, technology_docs_map = generate_data(args.techs, args.docs, args.per_doc, args.seed)
+    print(f"技术数: {len(all_technologies)}，文档数: {args.docs}")
+    print(f"{'模式':>6} {'最大节点':>8} {'循环(ms)':>10} {'向量化(ms)':>11} {'加速':>7} {'边数':>6} {'一致':>4}")
+    
+    for single_document in (False, True):
+        mode = "单文档" if single_document else "多文档"
+        for max_nodes in [int(m) for m in args.max_nodes.split(",")]:
+            graph_args = (all_technologies, technology_docs_map, args.threshold, max_nodes, single_document)
+            loop_time, expected = timed(
+                lambda: build_technology_graph_python(*graph_args), args.repeat
+            )
+            vector_time, actual = timed(
+                lambda: build_technology_graph(*graph_args), args.repeat
+            )
+            print(f"{mode:>6} {max_nodes:>8} {loop_time * 1000:>10.1f} {vector_time * 1000:>11.1f} "
+                  f"{loop_time / vector_time:>6.1f}x {len(actual[1]):>6} {'是' if actual == expected else '否':>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+相似文档推荐基准测试
+对比两种查询方式的延迟和召回率：
+- exact: 对所有行计算综合分数后排序（旧方案，顺序扫描，耗时随行数线性增长）
+- two_phase: HNSW索引按向量距离召回候选，再对候选按综合分数重排（RecommendationService._recommend_by_document）
+
+每个规模在临时表中生成数据（服务端setseed固定随机种子，结果可复现），以表中已有向量作为查询向量，测试结束后删除临时表。
+- ann_recall@k: HNSW返回的前k个与精确距离排序前k个的重合比例（索引本身的召回率）
+- overlap@k: 两阶段结果与精确综合排序结果前k个的重合比例
+
+用法: python scripts/benchmark_recommendation_ann.py [--rows 10000,100000,1000000] [--dim 384] [--queries 100]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+
+TABLE = "bench_recommendation_ann"
+DOCUMENT_TYPES = ["interview", "technical", "architecture"]
+
+# 与推荐服务一致的综合分数（相似度、类型匹配、质量、新鲜度加权）
+COMPOSITE_SCORE = """
+    (0.7 * (1 - (embedding <=> CAST(:q AS vector))) +
+     0.15 * CASE WHEN document_type = :target_type THEN 1.0 ELSE 0.5 END +
+     0.1 * COALESCE(quality_score / 100.0, 0.5) +
+     0.05 * CASE
+         WHEN upload_time > NOW() - INTERVAL '7 days' THEN 1.0
+         WHEN upload_time > NOW() - INTERVAL '30 days' THEN 0.8
+         WHEN upload_time > NOW() - INTERVAL '90 days' THEN 0.6
+         ELSE 0.4
+     END)
+"""
+
+
+async def create_table(db, rows: int, dim: int, seed: float) -> float:
+    """在服务端生成数据并建立HNSW索引，返回建索引耗时"""
+    await db.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+    await db.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            id integer PRIMARY KEY,
+            document_type text,
+            quality_score integer,
+            upload_time timestamptz,
+            embedding vector({dim})
+        )
+    """))
+    await db.execute(text("SELECT setseed(:seed)"), {"seed": seed})
+    # 子查询引用g，保证每行重新生成向量
+    await db.execute(text(f"""
+        INSERT INTO {TABLE} (id, document_type, quality_score, upload_time, embedding)
+        SELECT
+            g,
+            (ARRAY{DOCUMENT_TYPES})[1 + g % {len(DOCUMENT_TYPES)}],
+            (random() * 100)::int,
+            NOW() - random() * INTERVAL '365 days',
+            (SELECT array_agg(random() - 0.5 + g * 0)::real[] FROM generate_series(1, {dim}))::vector({dim})
+        FROM generate_series(1, {rows}) g
+    """))
+    start = time.perf_counter()
+    await db.execute(text(
+        f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+    ))
+    build_time = time.perf_counter() - start
+    await db.execute(text(f"ANALYZE {TABLE}"))
+    await db.commit()
+    return build_time
+
+
+async def exact_query(db, q: str, target_type: str, k: int) -> list:
+    result = await db.execute(text(f"""
+        SELECT id FROM {TABLE}
+        ORDER BY {COMPOSITE_SCORE} DESC
+        LIMIT :k
+    """), {"q": q, "target_type": target_type, "k": k})
+    return [row.id for row in result]
+
+
+async def exact_neighbors(db, q: str, k: int) -> list:
+    """不使用索引的精确距离排序（ann_recall的基准）"""
+    await db.execute(text("SET LOCAL enable_indexscan = off"))
+    result = await db.execute(text(
+        f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"
+    ), {"q": q, "k": k})
+    ids = [row.id for row in result]
+    await db.commit()
+    return ids
+
+
+async def two_phase_query(db, q: str, target_type: str, k: int, candidates: int, ef_search: int) -> tuple:
+    """返回(候选id, 重排后前k个id)"""
+    await db.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(max(ef_search, candidates))})
+    result = await db.execute(text(
+        f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :candidates"
+    ), {"q": q, "candidates": candidates})
+    candidate_ids = [row.id for row in result]
+    result = await db.execute(text(f"""
+        SELECT id FROM {TABLE}
+        WHERE id = ANY(:ids)
+        ORDER BY {COMPOSITE_SCORE} DESC
+        LIMIT :k
+    """), {"q": q, "target_type": target_type, "ids": candidate_ids, "k": k})
+    top = [row.id for row in result]
+    await db.commit()
+    return candidate_ids, top
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)] * 1000
+
+
+async def run_scale(db, rows: int, args) -> dict:
+    build_time = await create_table(db, rows, args.dim, args.seed)
+    
+    rng = random.Random(args.seed)
+    query_ids = rng.sample(range(1, rows + 1), min(args.queries, rows))
+    result = await db.execute(text(
+        f"SELECT id, document_type, embedding::text AS q FROM {TABLE} WHERE id = ANY(:ids)"
+    ), {"ids": query_ids})
+    queries = result.fetchall()
+    
+    exact_latencies, two_phase_latencies = [], []
+    ann_recalls, overlaps = [], []
+    for query in queries:
+        start = time.perf_counter()
+        exact_top = await exact_query(db, query.q, query.document_type, args.k)
+        exact_latencies.append(time.perf_counter() - start)
+        await db.commit()
+        
+        start = time.perf_counter()
+        candidate_ids, top = await two_phase_query(
+            db, query.q, query.document_type, args.k, args.candidates, args.ef_search
+        )
+        two_phase_latencies.append(time.perf_counter() - start)
+        
+        neighbors = await exact_neighbors(db, query.q, args.k)
+        ann_recalls.append(len(set(candidate_ids[:args.k]) & set(neighbors)) / args.k)
+        overlaps.append(len(set(top) & set(exact_top)) / args.k)
+    
+    await db.execute(text(f"DROP TABLE {TABLE}"))
+    await db.commit()
+    
+    return {
+        "build_s": build_time,
+        "exact_p50": percentile(exact_latencies, 0.5),
+        "exact_p95": percentile(exact_latencies, 0.95),
+        "ann_p50": percentile(two_phase_latencies, 0.5),
+        "ann_p95": percentile(two_phase_latencies, 0.95),
+        "ann_recall": sum(ann_recalls) / len(ann_recalls),
+        "overlap": sum(overlaps) / len(overlaps),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="相似文档推荐基准测试")
+    parser.add_argument("--rows", default="10000,100000,1000000", help="数据规模（逗号分隔）")
+    parser.add_argument("--dim", type=int, default=384, help="向量维度")
+    parser.add_argument("--queries", type=int, default=100, help="查询次数")
+    parser.add_argument("--k", type=int, default=10, help="每次推荐返回的条数")
+    parser.add_argument("--candidates", type=int, default=100, help="第一阶段候选数")
+    parser.add_argument("--ef-search", type=int, default=100, help="HNSW搜索宽度")
+    parser.add_argument("--seed", type=float, default=0.42, help="随机种子（-1到1）")
+    args = parser.parse_args()
+    
+    print(f"{'行数':>9} {'建索引(s)':>10} {'精确P50':>9} {'精确P95':>9} {'两阶段P50':>10} {'两阶段P95':>10} "
+          f"{'ANN召回@k':>10} {'重合@k':>8}")
+    async with AsyncSessionLocal() as db:
+        for rows in [int(r) for r in args.rows.split(",")]:
+            r = await run_scale(db, rows, args)
+            print(f"{rows:>9} {r['build_s']:>10.1f} {r['exact_p50']:>9.2f} {r['exact_p95']:>9.2f} "
+                  f"{r['ann_p50']:>10.2f} {r['ann_p95']:>10.2f} {r['ann_recall']:>10.3f} {r['overlap']:>8.3f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
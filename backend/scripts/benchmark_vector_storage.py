@@ -0,0 +1,108 @@
+"""
+向量存储基准测试
+对比三种存储方式的表大小（含TOAST）、索引大小和top-k查询延迟：
+- padded: vector(1536)，原生向量零填充（旧方案）
+- native: vector(原生维度)
+- halfvec: halfvec(原生维度)（需要pgvector 0.7+）
+
+在临时表中生成随机单位向量，每种方式分别建立HNSW索引后执行相同的查询，测试结束后删除临时表
+
+用法: python scripts/benchmark_vector_storage.py [--rows 20000] [--dim 384] [--queries 200]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+
+PADDED_DIMENSION = 1536
+
+
+def random_unit_vectors(count: int, dim: int, seed: int) -> list:
+    rng = random.Random(seed)
+    vectors = []
+    for _ in range(count):
+        vector = [rng.gauss(0, 1) for _ in range(dim)]
+        norm = sum(x * x for x in vector) ** 0.5
+        vectors.append([x / norm for x in vector])
+    return vectors
+
+
+def to_literal(vector: list, dim: int) -> str:
+    """向量转换为pgvector文本格式，不足dim维时零填充"""
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + ",0" * (dim - len(vector)) + "]"
+
+
+async def run_variant(db, name: str, column_type: str, dim: int, vectors: list, queries: list, k: int) -> dict:
+    table = f"bench_vector_storage_{name}"
+    await db.execute(text(f"DROP TABLE IF EXISTS {table}"))
+    await db.execute(text(f"CREATE TABLE {table} (id serial PRIMARY KEY, embedding {column_type}({dim}))"))
+    for offset in range(0, len(vectors), 1000):
+        values = ",".join(f"('{to_literal(v, dim)}')" for v in vectors[offset:offset + 1000])
+        await db.execute(text(f"INSERT INTO {table} (embedding) VALUES {values}"))
+    
+    start = time.perf_counter()
+    await db.execute(text(f"CREATE INDEX ON {table} USING hnsw (embedding {column_type}_cosine_ops)"))
+    build_time = time.perf_counter() - start
+    await db.commit()
+    
+    sizes = (await db.execute(text(
+        f"SELECT pg_table_size('{table}'), pg_indexes_size('{table}')"
+    ))).one()
+    
+    latencies = []
+    for query in queries:
+        literal = to_literal(query, dim)
+        start = time.perf_counter()
+        await db.execute(text(
+            f"SELECT id FROM {table} ORDER BY embedding <=> CAST(:q AS {column_type}) LIMIT :k"
+        ), {"q": literal, "k": k})
+        latencies.append(time.perf_counter() - start)
+    
+    await db.execute(text(f"DROP TABLE {table}"))
+    await db.commit()
+    
+    latencies.sort()
+    return {
+        "table_mb": sizes[0] / 1024 / 1024,
+        "index_mb": sizes[1] / 1024 / 1024,
+        "build_s": build_time,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="向量存储基准测试")
+    parser.add_argument("--rows", type=int, default=20000, help="向量条数")
+    parser.add_argument("--dim", type=int, default=384, help="嵌入模型原生维度")
+    parser.add_argument("--queries", type=int, default=200, help="查询次数")
+    parser.add_argument("--k", type=int, default=10, help="每次查询返回的条数")
+    parser.add_argument("--skip-halfvec", action="store_true", help="跳过halfvec（pgvector低于0.7时使用）")
+    args = parser.parse_args()
+    
+    vectors = random_unit_vectors(args.rows, args.dim, seed=0)
+    queries = random_unit_vectors(args.queries, args.dim, seed=1)
+    
+    variants = [("padded", "vector", PADDED_DIMENSION), ("native", "vector", args.dim)]
+    if not args.skip_halfvec:
+        variants.append(("halfvec", "halfvec", args.dim))
+    
+    print(f"{'方式':>8} {'表(MB)':>8} {'索引(MB)':>9} {'建索引(s)':>10} {'P50(ms)':>9} {'P95(ms)':>9}")
+    async with AsyncSessionLocal() as db:
+        for name, column_type, dim in variants:
+            r = await run_variant(db, name, column_type, dim, vectors, queries, args.k)
+            print(f"{name:>8} {r['table_mb']:>8.1f} {r['index_mb']:>9.1f} {r['build_s']:>10.2f} "
+                  f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
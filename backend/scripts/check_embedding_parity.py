@@ -0,0 +1,55 @@
+"""
+嵌入模型后端一致性校验
+用PyTorch后端（sentence-transformers）的输出作为参考，逐条计算ONNX/int8后端输出的余弦相似度，
+最小值低于阈值时以非0状态码退出（切换EMBEDDING_BACKEND前运行）
+
+用法: python scripts/check_embedding_parity.py [--backends onnx onnx_int8] [--threshold 0.99]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.services.embedding_backends import cosine_parity, get_backend_class
+
+SAMPLE_TEXTS = [
+    "Redis是一个基于内存的键值数据库，常用于缓存和消息队列。",
+    "Kubernetes通过Deployment管理无状态应用的副本数量和滚动升级。",
+    "什么是分布式事务？请说明两阶段提交的流程和缺点。",
+    "微服务架构中，API网关负责路由、鉴权、限流和协议转换。",
+    "MySQL的B+树索引适合范围查询，联合索引遵循最左前缀原则。",
+    "The CAP theorem states that a distributed system can only guarantee two of consistency, availability and partition tolerance.",
+    "使用Kafka时，消费者组内的每个分区只会被一个消费者消费。",
+    "短文本",
+    "Docker镜像由多层只读层组成，容器在镜像之上增加一个可写层。" * 8,
+    "面试题：HashMap在JDK 1.8中做了哪些优化？链表长度超过8时会转换为红黑树。",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="嵌入模型后端一致性校验")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "onnx_int8"], help="待校验的后端")
+    parser.add_argument("--threshold", type=float, default=0.99, help="余弦相似度下限")
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME, help="模型名称")
+    args = parser.parse_args()
+    
+    reference = get_backend_class("torch")(args.model).load().encode(SAMPLE_TEXTS)
+    
+    failed = False
+    for name in args.backends:
+        candidate = get_backend_class(name)(args.model).load().encode(SAMPLE_TEXTS)
+        similarities = cosine_parity(reference, candidate)
+        worst = min(similarities)
+        status = "通过" if worst >= args.threshold else "未通过"
+        print(f"{name:>10}: 最小余弦相似度 {worst:.5f}，平均 {sum(similarities) / len(similarities):.5f} [{status}]")
+        failed = failed or worst < args.threshold
+    
+    if failed:
+        raise SystemExit(f"存在余弦相似度低于 {args.threshold} 的后端")
+
+
+if __name__ == "__main__":
+    main()
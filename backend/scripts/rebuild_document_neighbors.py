@@ -0,0 +1,35 @@
+"""
+批量重建相似文档邻居表
+对所有已生成向量的文档重新检索前K个最相似文档并覆盖邻居列表：
+- 执行010迁移后为已有文档生成邻居列表
+- 定期执行，修正增量更新的近似误差，补齐删除文档后邻居列表的空缺
+
+用法: python scripts/rebuild_document_neighbors.py [--batch-size 200]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.services.document_neighbor_service import DocumentNeighborService
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="批量重建相似文档邻居表")
+    parser.add_argument("--batch-size", type=int, default=200, help="每批处理（并提交）的文档数")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        total = await DocumentNeighborService.rebuild(db, batch_size=args.batch_size)
+    print(f"已重建 {total} 个文档的邻居列表（K={settings.DOCUMENT_NEIGHBORS_K}），耗时 {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,118 @@
+"""
+更换嵌入模型后重新生成所有向量
+不同模型的向量不可比较，维度不同时也无法写入同一向量列。修改EMBEDDING_MODEL_NAME /
+EMBEDDING_DIMENSION / EMBEDDING_STORAGE_TYPE（或USE_LOCAL_EMBEDDING）后执行：
+1. 向量列的类型或维度与配置不一致时，清空向量、修改列类型并重建HNSW索引
+2. 向量不是当前存储模型生成的文档，用中间结果中的内容重新分块向量化，覆盖文档向量和分块向量
+3. 完成后运行 python scripts/rebuild_document_neighbors.py 重建相似文档邻居表
+
+用法: python scripts/reembed_documents.py [--batch-size 50] [--skip-alter]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select, text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.embedding_vector import storage_model_name, vector_sql_type
+from app.models.intermediate_result import DocumentIntermediateResult
+from app.models.system_learning_data import SystemLearningData
+from app.services.embedding_service import get_embedding_service
+
+# (表名, 向量索引名, 索引参数)，与008/009迁移一致
+VECTOR_TABLES = [
+    ('system_learning_data', 'idx_system_learning_data_embedding', 'WITH (m = 16, ef_construction = 64)'),
+    ('document_segment_embeddings', 'idx_document_segment_embeddings_embedding', ''),
+]
+
+
+async def alter_vector_columns(db) -> None:
+    """向量列类型与配置不一致时清空向量并修改列类型（旧向量无法转换为新模型的向量）"""
+    target = f"{vector_sql_type()}({settings.EMBEDDING_DIMENSION})"
+    for table, index_name, with_clause in VECTOR_TABLES:
+        current = (await db.execute(text("""
+            SELECT format_type(a.atttypid, a.atttypmod)
+            FROM pg_attribute a
+            WHERE a.attrelid = CAST(:table AS regclass) AND a.attname = 'embedding'
+        """), {"table": table})).scalar_one()
+        if current == target:
+            continue
+        
+        print(f"{table}.embedding: {current} -> {target}")
+        await db.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+        if table == 'system_learning_data':
+            await db.execute(text(f"UPDATE {table} SET embedding = NULL, embedding_model = NULL"))
+        else:
+            await db.execute(text(f"DELETE FROM {table}"))
+        await db.execute(text(f"ALTER TABLE {table} ALTER COLUMN embedding TYPE {target} USING NULL"))
+        await db.execute(text(f"""
+            CREATE INDEX IF NOT EXISTS {index_name}
+            ON {table}
+            USING hnsw (embedding {vector_sql_type()}_cosine_ops)
+            {with_clause}
+        """))
+        await db.commit()
+
+
+async def reembed(db, batch_size: int) -> int:
+    """重新向量化向量不是当前存储模型生成的学习数据（每批提交一次）"""
+    embedding_service = get_embedding_service()
+    model = storage_model_name()
+    total = 0
+    last_id = None
+    while True:
+        query = (
+            select(SystemLearningData, DocumentIntermediateResult)
+            .join(DocumentIntermediateResult, DocumentIntermediateResult.document_id == SystemLearningData.document_id)
+            .where(SystemLearningData.embedding_model.is_distinct_from(model))
+            .order_by(SystemLearningData.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.where(SystemLearningData.id > last_id)
+        rows = (await db.execute(query)).all()
+        if not rows:
+            break
+        
+        for learning_data, intermediate in rows:
+            # 分块位置对应预处理后的内容（与文档处理时一致）
+            content = intermediate.preprocessed_content or intermediate.content
+            embedding, chunks = await embedding_service.generate_document_embedding(content, intermediate.segments)
+            if embedding is None:
+                continue
+            learning_data.embedding = embedding
+            learning_data.embedding_model = model
+            if settings.EMBEDDING_STORE_SEGMENTS:
+                await embedding_service.save_segment_embeddings(db, learning_data.document_id, chunks)
+        await db.commit()
+        
+        total += len(rows)
+        last_id = rows[-1][0].id
+        print(f"已处理 {total} 条学习数据")
+    return total
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="更换嵌入模型后重新生成所有向量")
+    parser.add_argument("--batch-size", type=int, default=50, help="每批处理（并提交）的学习数据条数")
+    parser.add_argument("--skip-alter", action="store_true", help="不检查和修改向量列类型")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        if not args.skip_alter:
+            await alter_vector_columns(db)
+        total = await reembed(db, args.batch_size)
+    print(f"已用 {storage_model_name()} 重新向量化 {total} 条学习数据，耗时 {time.perf_counter() - start:.1f}s")
+    print("请运行 python scripts/rebuild_document_neighbors.py 重建相似文档邻居表")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,7 +5,11 @@ import pytest
 import asyncio
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.elements import TextClause
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -37,6 +41,95 @@ def test_documents_dir():
     """测试文档目录"""
     return Path(__file__).parent / "fixtures" / "test_documents"
 
+# fakeredis客户端fixture（用于限流、响应缓存和向量缓存的单元测试）
+@pytest.fixture
+def fake_redis():
+    """
+    创建fakeredis异步客户端的工厂函数
+    
+    每次调用使用独立的FakeServer；fakeredis未安装时跳过使用该fixture的测试
+    """
+    fakeredis = pytest.importorskip("fakeredis")
+    from fakeredis import aioredis as fake_aioredis
+    
+    def make(decode_responses: bool = False):
+        return fake_aioredis.FakeRedis(server=fakeredis.FakeServer(), decode_responses=decode_responses)
+    return make
+
+# 内存数据库会话（用于不需要数据库的服务单元测试）
+class FakeResult:
+    """查询结果（fetchall / scalar_one_or_none / scalars().all()）"""
+    
+    def __init__(self, rows=None, scalar=None):
+        self._rows = rows or []
+        self._scalar = scalar
+    
+    def fetchall(self):
+        return list(self._rows)
+    
+    def scalar_one_or_none(self):
+        return self._scalar
+    
+    def scalars(self):
+        return SimpleNamespace(all=lambda: list(self._rows))
+
+
+class FakeSession:
+    """
+    按SQL片段返回预设结果的会话，记录执行的语句、参数以及保存点和提交事件
+    
+    responses为 [(SQL片段, 结果)]，按顺序匹配第一个，没有匹配时返回空结果；
+    结果为列表时作为返回行，为函数时以(sql, params)调用后再转换，其他值作为标量。
+    text()语句记录原始SQL，其他语句按PostgreSQL方言编译
+    """
+    
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.calls = []
+        self.events = []
+    
+    async def execute(self, statement, params=None):
+        if isinstance(statement, TextClause):
+            sql = statement.text
+        else:
+            compiled = statement.compile(dialect=postgresql.dialect())
+            sql = str(compiled)
+            params = params if params is not None else compiled.params
+        self.calls.append((sql, params))
+        for keyword, response in self.responses:
+            if keyword in sql:
+                if callable(response):
+                    response = response(sql, params)
+                return FakeResult(rows=response) if isinstance(response, list) else FakeResult(scalar=response)
+        return FakeResult()
+    
+    @asynccontextmanager
+    async def begin_nested(self):
+        self.events.append("savepoint")
+        try:
+            yield
+        except Exception:
+            self.events.append("rollback_savepoint")
+            raise
+        self.events.append("release_savepoint")
+    
+    async def commit(self):
+        self.events.append("commit")
+    
+    async def rollback(self):
+        self.events.append("rollback")
+    
+    def statements(self, keyword):
+        return [(sql, params) for sql, params in self.calls if keyword in sql]
+
+
+@pytest.fixture
+def fake_session():
+    """创建FakeSession的工厂函数（参数为按SQL片段匹配的预设结果）"""
+    def make(*responses):
+        return FakeSession(responses)
+    return make
+
 # 数据库session fixture（用于需要数据库的测试）
 @pytest.fixture
 async def db_session():
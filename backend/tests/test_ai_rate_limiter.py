@@ -0,0 +1,96 @@
+"""
+AIRateLimiter单元测试（使用fakeredis模拟Redis）
+"""
+import asyncio
+import pytest
+
+from app.services.ai_rate_limiter import AIRateLimiter
+
+
+def _make_limiter(fake_redis, **kwargs):
+    limiter = AIRateLimiter(**kwargs)
+    limiter.enabled = True
+    client = fake_redis(decode_responses=True)
+    limiter._get_redis = lambda: client
+    return limiter, client
+
+
+def test_estimate_tokens():
+    """测试token预估（输入字符 + 输出上限）"""
+    messages = [{"role": "system", "content": "a" * 10}, {"role": "user", "content": "b" * 90}]
+    assert AIRateLimiter.estimate_tokens(messages, max_tokens=500) == 60 + 500
+    assert AIRateLimiter.estimate_tokens(messages) == 60 + AIRateLimiter.DEFAULT_COMPLETION_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_semaphore_limits_concurrency(fake_redis):
+    """测试分布式信号量限制并发调用数"""
+    limiter, _ = _make_limiter(fake_redis, max_concurrent=2, requests_per_minute=0, tokens_per_minute=0, max_wait=10)
+    active = [0]
+    peak = [0]
+    
+    async def call():
+        async with limiter.acquire(100):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.05)
+            active[0] -= 1
+    
+    await asyncio.gather(*[call() for _ in range(6)])
+    assert peak[0] == 2
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_and_times_out(fake_redis):
+    """测试token桶耗尽后排队，超过最长等待时间抛出TimeoutError"""
+    limiter, _ = _make_limiter(fake_redis, max_concurrent=0, requests_per_minute=0, tokens_per_minute=6000, max_wait=0.2)
+    
+    async with limiter.acquire(6000) as ticket:
+        assert ticket.queue_wait_ms < 200
+    
+    # 桶已空，补满6000个token需要约60秒，超过max_wait
+    with pytest.raises(TimeoutError):
+        async with limiter.acquire(6000):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_fail_open_when_redis_unavailable():
+    """测试Redis不可用时直接放行"""
+    limiter = AIRateLimiter(redis_url="redis://127.0.0.1:1/0", max_concurrent=1, max_wait=1)
+    limiter.enabled = True
+    
+    async with limiter.acquire(100) as ticket:
+        assert ticket.queue_wait_ms >= 0
+
+
+@pytest.mark.asyncio
+async def test_throttled_call_does_not_hold_semaphore(fake_redis):
+    """测试在令牌桶上排队的调用不占用并发名额"""
+    limiter, client = _make_limiter(
+        fake_redis, max_concurrent=1, requests_per_minute=0, tokens_per_minute=6000, max_wait=0.3
+    )
+    
+    async with limiter.acquire(6000):
+        pass
+    
+    waiting = asyncio.ensure_future(limiter.acquire(6000).__aenter__())
+    await asyncio.sleep(0.1)
+    assert await client.zcard(limiter._semaphore_key) == 0
+    with pytest.raises(TimeoutError):
+        await waiting
+
+
+@pytest.mark.asyncio
+async def test_semaphore_lease_renewed_while_held(fake_redis):
+    """测试持有期间续租，超过租约时长的调用（如长时间的流式响应）不会被其他调用挤占名额"""
+    limiter, client = _make_limiter(fake_redis, max_concurrent=1, requests_per_minute=0, tokens_per_minute=0, max_wait=0.1)
+    limiter.lease_seconds = 0.3
+    
+    async with limiter.acquire(100):
+        await asyncio.sleep(0.7)
+        with pytest.raises(TimeoutError):
+            async with limiter.acquire(100):
+                pass
+    
+    assert await client.zcard(limiter._semaphore_key) == 0
@@ -0,0 +1,187 @@
+"""
+AIResponseCache单元测试（使用fakeredis模拟Redis）
+"""
+import pytest
+from types import SimpleNamespace
+
+from app.services.ai_response_cache import AIResponseCache, bypass_response_cache
+from app.services.ai_service import AIService
+
+
+def _make_cache(fake_redis, **kwargs):
+    kwargs.setdefault("disk_path", "")
+    cache = AIResponseCache(**kwargs)
+    cache.enabled = True
+    client = fake_redis()
+    cache._get_redis = lambda: client
+    return cache, client
+
+
+def test_make_key_depends_on_request():
+    """测试缓存key由模型、温度和消息决定"""
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": "hello"}]
+    key = AIResponseCache.make_key("deepseek-chat", 0.3, messages)
+    
+    assert key == AIResponseCache.make_key("deepseek-chat", 0.3, [dict(m) for m in messages])
+    assert key != AIResponseCache.make_key("deepseek-chat", 0.7, messages)
+    assert key != AIResponseCache.make_key("deepseek-reasoner", 0.3, messages)
+    assert key != AIResponseCache.make_key("deepseek-chat", 0.3, messages[1:])
+
+
+@pytest.mark.asyncio
+async def test_get_set_and_stats(fake_redis):
+    """测试读写和命中统计"""
+    cache, _ = _make_cache(fake_redis)
+    
+    assert await cache.get("k1") is None
+    await cache.set("k1", "result")
+    assert await cache.get("k1") == "result"
+    
+    stats = await cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_invalid_cached_response_counted_as_miss(fake_redis):
+    """测试未通过校验的缓存内容视为未命中，计入未命中统计"""
+    import json
+    
+    cache, _ = _make_cache(fake_redis)
+    await cache.set("k1", "not json")
+    
+    assert await cache.get("k1", json.loads) is None
+    assert await cache.get("k1") == "not json"
+    
+    stats = await cache.get_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(fake_redis):
+    """测试超过上限后淘汰最久未访问的条目"""
+    cache, _ = _make_cache(fake_redis, max_entries=2)
+    
+    await cache.set("a", "A")
+    await cache.set("b", "B")
+    assert await cache.get("a") == "A"  # a变为最近访问
+    await cache.set("c", "C")
+    
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "A"
+    assert await cache.get("c") == "C"
+
+
+@pytest.mark.asyncio
+async def test_disk_tier(tmp_path, fake_redis):
+    """测试Redis未命中时从磁盘缓存读取并回填Redis"""
+    cache, client = _make_cache(fake_redis, disk_path=str(tmp_path / "ai_cache.db"), disk_max_entries=1)
+    
+    await cache.set("k1", "old")
+    await cache.set("k2", "new")
+    await client.flushall()
+    
+    assert await cache.get("k1") is None  # 超过磁盘上限被淘汰
+    assert await cache.get("k2") == "new"
+    assert await client.get(cache._entry_key("k2")) == b"new"
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_uses_cache(fake_redis):
+    """测试相同请求第二次命中缓存不调用API，use_cache=False时绕过缓存"""
+    service = AIService(api_key="test-key")
+    service.use_async_client = False
+    service.monitoring_service = SimpleNamespace(enabled=False)
+    service.response_cache, _ = _make_cache(fake_redis)
+    calls = []
+    
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="answer"))],
+            usage=None
+        )
+    
+    service._sync_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    messages = [{"role": "user", "content": "same prompt"}]
+    
+    assert await service.chat_completion(messages=messages, temperature=0.3) == "answer"
+    assert await service.chat_completion(messages=messages, temperature=0.3) == "answer"
+    assert len(calls) == 1
+    
+    await service.chat_completion(messages=messages, temperature=0.3, use_cache=False)
+    assert len(calls) == 2
+    
+    # 重新处理/切换视角的作用域内同样绕过缓存
+    with bypass_response_cache():
+        await service.chat_completion(messages=messages, temperature=0.3)
+    assert len(calls) == 3
+    with bypass_response_cache(False):
+        await service.chat_completion(messages=messages, temperature=0.3)
+    assert len(calls) == 3
+
+
+def _mock_service(fake_redis, responses, calls):
+    """按顺序返回responses中的内容（同步回退路径）"""
+    service = AIService(api_key="test-key")
+    service.use_async_client = False
+    service.monitoring_service = SimpleNamespace(enabled=False)
+    service.response_cache, _ = _make_cache(fake_redis)
+    
+    def create(**kwargs):
+        calls.append(kwargs)
+        content = responses[min(len(calls), len(responses)) - 1]
+        if kwargs.get("stream"):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])])
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=None
+        )
+    
+    service._sync_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+    )
+    return service
+
+
+@pytest.mark.asyncio
+async def test_generate_json_does_not_cache_invalid_json(fake_redis):
+    """测试JSON格式无效的响应不写入缓存，重试时重新调用API，有效响应之后命中缓存"""
+    calls = []
+    service = _mock_service(fake_redis, ["这不是JSON", '{"answer": 1}'], calls)
+    
+    with pytest.raises(Exception, match="JSON格式无效"):
+        await service.generate_json("prompt")
+    assert await service.generate_json("prompt") == {"answer": 1}
+    assert await service.generate_json("prompt") == {"answer": 1}
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_does_not_cache_invalid_response(fake_redis):
+    """测试流式响应未通过校验时不写入缓存，已缓存的无效响应视为未命中"""
+    import json
+    
+    calls = []
+    service = _mock_service(fake_redis, ["not json", '{"ok": true}'], calls)
+    messages = [{"role": "user", "content": "same prompt"}]
+    
+    async def collect():
+        return "".join([chunk async for chunk in service.chat_completion_stream(
+            messages=messages, response_validator=json.loads
+        )])
+    
+    assert await collect() == "not json"
+    assert await collect() == '{"ok": true}'
+    assert await collect() == '{"ok": true}'
+    assert len(calls) == 2
+    
+    # 校验前写入的无效响应（旧缓存）被忽略
+    key = service.response_cache.make_key("deepseek-chat", 0.7, messages, None)
+    await service.response_cache.set(key, "stale")
+    assert await collect() == '{"ok": true}'
+    assert len(calls) == 3
@@ -0,0 +1,120 @@
+"""
+AIService单元测试（不调用真实API）
+"""
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+from app.services.ai_rate_limiter import AIRateLimiter
+from app.services.ai_service import AIService, _iter_stream_chunks
+
+
+def _make_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+@pytest.mark.asyncio
+async def test_async_client_reused_within_loop():
+    """测试同一事件循环内复用异步客户端（共享连接池）"""
+    service = AIService(api_key="test-key")
+    client1 = service._get_async_client()
+    client2 = service._get_async_client()
+    assert client1 is client2
+    await service.aclose()
+    assert service._async_client is None
+
+
+@pytest.mark.asyncio
+async def test_iter_stream_chunks_sync_fallback():
+    """测试同步回退的流式响应在线程池中逐块读取"""
+    chunks = [_make_chunk("a"), _make_chunk("b"), _make_chunk("c")]
+    collected = []
+    async for chunk in _iter_stream_chunks(iter(chunks)):
+        collected.append(chunk.choices[0].delta.content)
+    assert collected == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_block_event_loop():
+    """测试同步回退路径不阻塞事件循环"""
+    import time
+    
+    service = AIService(api_key="test-key")
+    service.use_async_client = False
+    
+    def slow_create(**kwargs):
+        time.sleep(0.3)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=" ok "))],
+            usage=None
+        )
+    
+    service._sync_client = SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=slow_create))
+    )
+    service.monitoring_service = SimpleNamespace(enabled=False)
+    
+    ticks = []
+    
+    async def ticker():
+        for _ in range(5):
+            ticks.append(1)
+            await asyncio.sleep(0.02)
+    
+    result, _ = await asyncio.gather(
+        service.chat_completion(messages=[{"role": "user", "content": "hi"}]),
+        ticker()
+    )
+    assert result == "ok"
+    assert len(ticks) == 5
+
+
+class _RecordingLimiter:
+    """记录record_usage调用的限流器"""
+    
+    def __init__(self):
+        self.usage = []
+    
+    estimate_tokens = staticmethod(AIRateLimiter.estimate_tokens)
+    estimate_usage = staticmethod(AIRateLimiter.estimate_usage)
+    
+    @asynccontextmanager
+    async def acquire(self, estimated_tokens):
+        yield None
+    
+    async def record_usage(self, estimated_tokens, actual_tokens):
+        self.usage.append((estimated_tokens, actual_tokens))
+
+
+async def _stream(service, **kwargs):
+    collected = []
+    async for text in service.chat_completion_stream(
+        messages=[{"role": "user", "content": "a" * 100}], max_tokens=500, use_cache=False, **kwargs
+    ):
+        collected.append(text)
+    return collected
+
+
+@pytest.mark.asyncio
+async def test_stream_records_usage():
+    """测试流式调用按最后一块的usage校正token桶，没有usage时按已生成的内容估算"""
+    service = AIService(api_key="test-key")
+    service.rate_limiter = _RecordingLimiter()
+    requests = []
+    chunks = [_make_chunk("a"), _make_chunk("b")]
+    
+    async def fake_create(timeout=None, **params):
+        requests.append(params)
+        return iter(chunks)
+    
+    service._create_completion = fake_create
+    
+    assert await _stream(service) == ["a", "b"]
+    assert requests[0]["extra_body"] == {"stream_options": {"include_usage": True}}
+    assert service.rate_limiter.usage == [(560, AIRateLimiter.estimate_usage([{"content": "a" * 100}], "ab"))]
+    
+    chunks.append(SimpleNamespace(choices=[], usage={"total_tokens": 321}))
+    service.rate_limiter.usage.clear()
+    assert await _stream(service) == ["a", "b"]
+    assert service.rate_limiter.usage == [(560, 321)]
@@ -0,0 +1,164 @@
+"""
+ContextPacker单元测试（不加载嵌入模型，不调用真实API）
+"""
+import asyncio
+import pytest
+
+from app.core.config import settings
+from app.services.ai_service import AIService
+from app.services.context_packer import ContextPacker, _VectorMemo
+
+TOPICS = ["Redis缓存", "Kafka消息队列", "MySQL索引", "Nginx负载均衡", "Docker容器"]
+
+
+def _make_segments(count):
+    return [
+        {"id": i + 1, "text": f"第{i + 1}段介绍{TOPICS[i % len(TOPICS)]}的用法。" + "补充说明。" * 20,
+         "position": i * 120, "length": 120}
+        for i in range(count)
+    ]
+
+
+class _FakeEmbeddingService:
+    """按主题生成one-hot向量的嵌入服务，记录调用次数"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    async def generate_embeddings_batch(self, texts):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return [[1.0 if topic in text else 0.0 for topic in TOPICS] + [0.01] for text in texts]
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    service = _FakeEmbeddingService()
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_service", lambda: service)
+    monkeypatch.setattr(ContextPacker, "_vector_memo", type(ContextPacker._vector_memo)())
+    return service
+
+
+@pytest.mark.asyncio
+async def test_short_document_keeps_all_segments(fake_embeddings):
+    """测试未超出预算时原样返回全部段落，不做向量化"""
+    segments = _make_segments(5)
+    selected = await ContextPacker.select_segments(segments, "Redis", token_budget=10000, top_k=50)
+    assert selected is segments
+    assert fake_embeddings.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_select_relevant_segments_within_budget(fake_embeddings):
+    """测试按相关性选取段落：不超过预算和top_k，保留原编号并按原文顺序排列"""
+    segments = _make_segments(50)
+    budget = sum(ContextPacker.estimate_tokens(s) for s in segments[:10])
+    
+    selected = await ContextPacker.select_segments(segments, "Kafka消息队列", token_budget=budget, top_k=8)
+    
+    assert 0 < len(selected) <= 8
+    assert sum(ContextPacker.estimate_tokens(s) for s in selected) <= budget
+    assert all("Kafka" in s["text"] for s in selected)
+    assert [s["id"] for s in selected] == sorted(s["id"] for s in selected)
+    assert all(s is segments[s["id"] - 1] for s in selected)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_steps_embed_segments_once(fake_embeddings):
+    """测试并发的子步骤共用同一次段落向量化"""
+    segments = _make_segments(40)
+    await asyncio.gather(*[
+        ContextPacker.select_segments(segments, topic, token_budget=500, top_k=5)
+        for topic in TOPICS
+    ])
+    # 1次段落向量化 + 每个检索问题1次
+    assert fake_embeddings.calls == 1 + len(TOPICS)
+
+
+@pytest.mark.asyncio
+async def test_lexical_fallback_without_embeddings(monkeypatch):
+    """测试向量化不可用时按词面匹配选取段落"""
+    class _Unavailable:
+        async def generate_embeddings_batch(self, texts):
+            return [None] * len(texts)
+    
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_service", lambda: _Unavailable())
+    monkeypatch.setattr(ContextPacker, "_vector_memo", type(ContextPacker._vector_memo)())
+    segments = _make_segments(30)
+    
+    selected = await ContextPacker.select_segments(segments, "MySQL索引", token_budget=400, top_k=3)
+    assert selected and all("MySQL" in s["text"] for s in selected)
+
+
+@pytest.mark.asyncio
+async def test_failed_embeddings_not_memoized(monkeypatch):
+    """测试向量化失败的结果不缓存，服务恢复后重新向量化"""
+    class _Flaky(_FakeEmbeddingService):
+        async def generate_embeddings_batch(self, texts):
+            vectors = await super().generate_embeddings_batch(texts)
+            return [None] * len(texts) if self.calls == 1 else vectors
+    
+    service = _Flaky()
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_service", lambda: service)
+    monkeypatch.setattr(ContextPacker, "_vector_memo", type(ContextPacker._vector_memo)())
+    
+    assert await ContextPacker._embed_texts(["Redis缓存"]) == [None]
+    assert await ContextPacker._embed_texts(["Redis缓存"]) != [None]
+    assert service.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_memo_eviction_keeps_fresh_vectors(fake_embeddings, monkeypatch):
+    """测试段落数超出缓存上限时仍使用本次向量化的结果，不退化为词面匹配"""
+    lexical_calls = []
+    monkeypatch.setattr(settings, "AI_CONTEXT_VECTOR_MEMO_MB", 0)
+    monkeypatch.setattr(ContextPacker, "_lexical_scores",
+                        classmethod(lambda cls, texts, query: lexical_calls.append(query) or [0.0] * len(texts)))
+    segments = _make_segments(50)
+    
+    selected = await ContextPacker.select_segments(segments, "Kafka消息队列", token_budget=500, top_k=5)
+    
+    assert lexical_calls == []
+    assert selected and all("Kafka" in s["text"] for s in selected)
+    assert len(ContextPacker._vector_memo) == 1
+
+
+def test_vector_memo_evicts_by_bytes(monkeypatch):
+    """测试向量缓存按占用字节数淘汰最久未使用的条目"""
+    monkeypatch.setattr(settings, "AI_CONTEXT_VECTOR_MEMO_MB", 1)
+    memo = _VectorMemo()
+    vector = [0.5] * (100 * 1024)  # float32存储400KB
+    
+    memo.put("a", vector)
+    memo.put("b", vector)
+    assert memo.get("a") is not None
+    memo.put("c", vector)
+    
+    assert "b" not in memo and "a" in memo and "c" in memo
+    assert memo.nbytes == 2 * 4 * len(vector)
+
+
+@pytest.mark.asyncio
+async def test_generate_with_sources_sends_selected_segments(fake_embeddings, monkeypatch):
+    """测试检索模式下prompt只包含选中的段落，且使用原段落编号"""
+    captured = {}
+    
+    async def fake_generate_json(self, prompt, **kwargs):
+        captured["prompt"] = prompt
+        return {"source_ids": [], "confidence": 80}
+    
+    monkeypatch.setattr(AIService, "generate_json", fake_generate_json)
+    service = AIService(api_key="test-key")
+    segments = _make_segments(50)
+    
+    await service.generate_with_sources(
+        prompt="分析Docker容器", segments=segments,
+        retrieval_query="Docker容器", context_token_budget=300
+    )
+    prompt = captured["prompt"]
+    sent_ids = [s["id"] for s in segments if f"[段落{s['id']}] " in prompt]
+    assert sent_ids and len(sent_ids) < len(segments)
+    assert all(TOPICS[(i - 1) % len(TOPICS)] == "Docker容器" for i in sent_ids)
+    
+    await service.generate_with_sources(prompt="分析", segments=segments)
+    assert all(f"[段落{s['id']}] " in captured["prompt"] for s in segments)
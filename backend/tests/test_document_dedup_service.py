@@ -0,0 +1,92 @@
+"""
+DocumentDedupService单元测试
+"""
+import pytest
+from uuid import uuid4
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.document_dedup_service import DocumentDedupService
+from app.models.document import Document
+from app.models.document_type import DocumentType
+from app.models.intermediate_result import DocumentIntermediateResult
+from app.models.processing_result import ProcessingResult
+
+
+def test_content_hash_matches_file_hash(tmp_path):
+    """测试上传时计算的指纹与从文件计算的指纹一致"""
+    data = b"same onboarding pdf" * 100000
+    file_path = tmp_path / "doc.pdf"
+    file_path.write_bytes(data)
+    
+    assert DocumentDedupService.compute_content_hash(data) == DocumentDedupService.compute_file_hash(str(file_path))
+    assert DocumentDedupService.compute_content_hash(data) != DocumentDedupService.compute_content_hash(data + b"x")
+
+
+def _make_document(content_hash: str, status: str, filename: str) -> Document:
+    return Document(
+        id=uuid4(),
+        filename=filename,
+        file_path=f'/test/{filename}',
+        file_size=1000,
+        file_type='pdf',
+        status=status,
+        content_hash=content_hash
+    )
+
+
+@pytest.mark.asyncio
+async def test_find_and_clone_completed_duplicate(db_session: AsyncSession):
+    """测试查找相同内容的已完成文档并复制其结果"""
+    content_hash = uuid4().hex * 2
+    source = _make_document(content_hash, 'completed', 'a.pdf')
+    target = _make_document(content_hash, 'processing', 'b.pdf')
+    db_session.add_all([source, target])
+    await db_session.flush()
+    
+    db_session.add_all([
+        DocumentIntermediateResult(document_id=source.id, content="原始内容", preprocessed_content="预处理内容",
+                                   segments=[{'id': 1, 'text': '段落1'}], metadata_json={'filename': 'a.pdf'}),
+        DocumentType(document_id=source.id, detected_type='technical', primary_view='learning',
+                     enabled_views=['learning', 'system'], detection_scores={'learning': 0.8, 'system': 0.5},
+                     confidence=0.8, detection_method='rule'),
+        ProcessingResult(document_id=source.id, view='learning', document_type='technical',
+                         result_data={'prerequisites': {}}, is_primary=True),
+    ])
+    await db_session.flush()
+    
+    duplicate = await DocumentDedupService.find_completed_duplicate(target, db_session)
+    assert duplicate.id == source.id
+    
+    result = await DocumentDedupService.clone_results(duplicate, target, db_session)
+    assert result['primary_view'] == 'learning'
+    assert result['cloned_views'] == ['learning']
+    assert result['missing_views'] == ['system']
+    assert result['segments'] == [{'id': 1, 'text': '段落1'}]
+    
+    cloned = await db_session.execute(
+        select(ProcessingResult).where(ProcessingResult.document_id == target.id)
+    )
+    assert [r.view for r in cloned.scalars().all()] == ['learning']
+
+
+@pytest.mark.asyncio
+async def test_clone_skipped_for_unprocessed_views(db_session: AsyncSession):
+    """测试用户指定的视角超出源文档启用视角时不复用"""
+    content_hash = uuid4().hex * 2
+    source = _make_document(content_hash, 'completed', 'a.pdf')
+    target = _make_document(content_hash, 'processing', 'b.pdf')
+    db_session.add_all([source, target])
+    await db_session.flush()
+    
+    db_session.add_all([
+        DocumentIntermediateResult(document_id=source.id, content="原始内容"),
+        DocumentType(document_id=source.id, detected_type='technical', primary_view='learning',
+                     enabled_views=['learning'], detection_method='rule'),
+        ProcessingResult(document_id=source.id, view='learning', document_type='technical',
+                         result_data={}, is_primary=True),
+    ])
+    await db_session.flush()
+    
+    result = await DocumentDedupService.clone_results(source, target, db_session, required_views=['qa'])
+    assert result is None
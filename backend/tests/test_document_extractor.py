@@ -0,0 +1,108 @@
+"""
+DocumentExtractor单元测试（使用测试文档，不依赖数据库）
+"""
+import asyncio
+import pytest
+from pathlib import Path
+
+from app.services.document_extractor import DocumentExtractor
+from app.services.extraction_executor import ExtractionExecutor
+
+PDF_PATH = str(Path(__file__).parent / "fixtures" / "test_documents" / "test_technical.pdf")
+
+
+async def _collect_pages(mode):
+    pages = []
+    async for page_num, total_pages, page_text in DocumentExtractor.iter_pdf_pages(PDF_PATH, mode=mode):
+        pages.append((page_num, total_pages, page_text))
+    return pages
+
+
+def _collect_pages_in_worker(mode):
+    """在守护进程（Celery prefork工作进程）中逐页提取PDF"""
+    # fork继承的线程池没有工作线程，重新创建
+    ExtractionExecutor._instances.clear()
+    return asyncio.run(_collect_pages(mode))
+
+
+@pytest.mark.asyncio
+async def test_iter_pdf_pages_thread_and_process_match():
+    """测试thread模式和process模式逐页结果一致且按页码顺序返回"""
+    thread_pages = await _collect_pages("thread")
+    process_pages = await _collect_pages("process")
+    
+    assert [p[0] for p in thread_pages] == list(range(1, len(thread_pages) + 1))
+    assert thread_pages == process_pages
+
+
+@pytest.mark.asyncio
+async def test_extract_pdf_progress_and_truncation(monkeypatch):
+    """测试进度回调单调递增，内容超过上限时提前停止"""
+    progress = []
+    
+    async def progress_callback(current, total):
+        progress.append((current, total))
+    
+    content = await DocumentExtractor.extract_pdf(PDF_PATH, progress_callback=progress_callback)
+    assert content
+    assert [c for c, _ in progress] == list(range(1, len(progress) + 1))
+    
+    monkeypatch.setattr(DocumentExtractor, "MAX_CONTENT_LENGTH", 10)
+    truncated = await DocumentExtractor.extract_pdf(PDF_PATH)
+    assert content.startswith(truncated)
+    assert len(truncated) < len(content)
+
+
+@pytest.mark.asyncio
+async def test_process_mode_in_daemonic_worker_uses_threads():
+    """测试Celery prefork工作进程（守护进程）中process模式按thread模式提取，结果一致"""
+    billiard = pytest.importorskip("billiard")
+    
+    with billiard.Pool(1) as pool:
+        worker_pages = pool.apply(_collect_pages_in_worker, ("process",))
+    
+    assert worker_pages == await _collect_pages("thread")
+
+
+@pytest.mark.asyncio
+async def test_process_pool_failure_before_first_page_falls_back(monkeypatch):
+    """测试进程池在返回第一页前失败（守护进程报错）时按thread模式提取"""
+    async def failing_pages(file_path, executor):
+        raise AssertionError("daemonic processes are not allowed to have children")
+        yield
+    
+    monkeypatch.setattr(DocumentExtractor, "_iter_pdf_pages_process", failing_pages)
+    
+    assert await _collect_pages("process") == await _collect_pages("thread")
+
+
+@pytest.mark.asyncio
+async def test_thread_mode_discards_timed_out_pages(monkeypatch):
+    """测试超时的页面换新线程继续提取，超时页数达到上限后停止，卡住的线程不影响其他文档"""
+    import threading
+    from app.services import document_extractor
+    
+    release = threading.Event()
+    original = document_extractor._extract_pdf_page
+    
+    def slow_page(pdf, index):
+        if index in (0, 2, 3):
+            release.wait(10)
+        return original(pdf, index)
+    
+    monkeypatch.setattr(document_extractor, "_extract_pdf_page", slow_page)
+    monkeypatch.setattr(DocumentExtractor, "PDF_PAGE_TIMEOUT", 1)
+    monkeypatch.setattr(DocumentExtractor, "MAX_PDF_PAGE_TIMEOUTS", 2)
+    monkeypatch.setattr(DocumentExtractor, "MAX_PDF_PAGES", 4)
+    try:
+        pages = await _collect_pages("thread")
+        
+        assert [p[0] for p in pages] == [1, 2, 3]
+        assert pages[0][2] == "" and pages[2][2] == ""
+        assert pages[1][2]
+        
+        # 其他文档使用自己的线程，不等待卡住的页面
+        monkeypatch.setattr(document_extractor, "_extract_pdf_page", original)
+        assert len(await _collect_pages("thread")) == 4
+    finally:
+        release.set()
@@ -0,0 +1,163 @@
+"""
+相似文档邻居服务单元测试
+- 增量更新和读取：使用数据库session执行实际SQL，检查邻居表内容（HNSW检索替换为已知相似度）
+- 批量重建：使用内存会话，检查每批重建的文档和提交
+"""
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.document_neighbor import DocumentNeighbor
+from app.models.embedding_vector import storage_model_name
+from app.models.system_learning_data import SystemLearningData
+from app.services.document_neighbor_service import DocumentNeighborService
+
+
+def _make_document(name: str) -> Document:
+    return Document(
+        id=uuid.uuid4(),
+        filename=name,
+        file_path=f'/test/{name}',
+        file_size=1000,
+        file_type='pdf',
+        status='completed'
+    )
+
+
+def _fake_search(nearest, searched=None):
+    """替换HNSW检索，按已知相似度返回近邻"""
+    async def search_nearest(db, document_id, embedding, limit):
+        if searched is not None:
+            searched.append((document_id, embedding, limit))
+        return nearest[:limit]
+    return staticmethod(search_nearest)
+
+
+async def _add_documents(db: AsyncSession, *names):
+    documents = [_make_document(f"{name}.pdf") for name in names]
+    db.add_all(documents)
+    await db.flush()
+    return [document.id for document in documents]
+
+
+async def _add_embedding(db: AsyncSession, document_id):
+    db.add(SystemLearningData(
+        document_id=document_id,
+        content_summary="摘要",
+        document_type="technical",
+        embedding=[0.1] * settings.EMBEDDING_DIMENSION,
+        embedding_model=storage_model_name()
+    ))
+    await db.flush()
+
+
+async def _neighbor_lists(db: AsyncSession, document_ids):
+    """{文档ID: {邻居ID: 相似度}}"""
+    result = await db.execute(
+        select(DocumentNeighbor.document_id, DocumentNeighbor.neighbor_id, DocumentNeighbor.similarity)
+        .where(DocumentNeighbor.document_id.in_(document_ids))
+    )
+    lists = {document_id: {} for document_id in document_ids}
+    for row in result.fetchall():
+        lists[row.document_id][row.neighbor_id] = row.similarity
+    return lists
+
+
+@pytest.mark.asyncio
+async def test_update_inserts_new_document_and_trims_lists_to_k(db_session: AsyncSession, monkeypatch):
+    """测试增量更新：新文档写入前K个邻居，插入近邻的列表后每个列表保留K个，淘汰最不相似的"""
+    monkeypatch.setattr(settings, "DOCUMENT_NEIGHBORS_K", 2)
+    new, a, b, c, x, y = await _add_documents(db_session, "new", "a", "b", "c", "x", "y")
+    await _add_embedding(db_session, new)
+    await DocumentNeighborService.replace_neighbors(db_session, a, [(x, 0.9), (y, 0.5)])
+    await DocumentNeighborService.replace_neighbors(db_session, b, [(x, 0.4), (y, 0.3)])
+    await DocumentNeighborService.replace_neighbors(db_session, c, [(x, 0.95), (y, 0.9)])
+    searched = []
+    monkeypatch.setattr(DocumentNeighborService, "search_nearest",
+                        _fake_search([(a, 0.8), (b, 0.7), (c, 0.6)], searched))
+    
+    count = await DocumentNeighborService.update_for_document(db_session, new)
+    
+    assert count == 2
+    (_, embedding, limit), = searched
+    assert embedding is not None and limit == 4
+    assert await _neighbor_lists(db_session, [new, a, b, c]) == {
+        new: {a: 0.8, b: 0.7},
+        a: {x: 0.9, new: 0.8},
+        b: {new: 0.7, x: 0.4},
+        c: {x: 0.95, y: 0.9},
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_refreshes_existing_reverse_entry(db_session: AsyncSession, monkeypatch):
+    """测试重新处理：新文档已在近邻的列表中时更新相似度，不产生重复记录"""
+    monkeypatch.setattr(settings, "DOCUMENT_NEIGHBORS_K", 2)
+    new, a, x = await _add_documents(db_session, "new", "a", "x")
+    await _add_embedding(db_session, new)
+    await DocumentNeighborService.replace_neighbors(db_session, a, [(x, 0.5), (new, 0.2)])
+    monkeypatch.setattr(DocumentNeighborService, "search_nearest", _fake_search([(a, 0.8)]))
+    
+    assert await DocumentNeighborService.update_for_document(db_session, new) == 1
+    assert await _neighbor_lists(db_session, [new, a]) == {new: {a: 0.8}, a: {new: 0.8, x: 0.5}}
+
+
+@pytest.mark.asyncio
+async def test_update_without_embedding_is_noop(db_session: AsyncSession, monkeypatch):
+    """测试文档没有向量时不检索、不修改邻居表"""
+    document_id, = await _add_documents(db_session, "empty")
+    monkeypatch.setattr(DocumentNeighborService, "search_nearest", _fake_search([(uuid.uuid4(), 0.9)]))
+    
+    assert await DocumentNeighborService.update_for_document(db_session, document_id) == 0
+    assert await _neighbor_lists(db_session, [document_id]) == {document_id: {}}
+
+
+@pytest.mark.asyncio
+async def test_get_neighbors_orders_by_similarity_with_document_info(db_session: AsyncSession):
+    """测试读取邻居：按相似度降序取前N个，并带出文档信息"""
+    document_id, a, b, c = await _add_documents(db_session, "doc", "a", "b", "c")
+    await DocumentNeighborService.replace_neighbors(db_session, document_id, [(a, 0.5), (b, 0.9), (c, 0.7)])
+    
+    rows = await DocumentNeighborService.get_neighbors(db_session, document_id, 2)
+    
+    assert [(row.document_id, row.similarity, row.filename) for row in rows] == [(b, 0.9, "b.pdf"), (c, 0.7, "c.pdf")]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_replaces_lists_in_batches(fake_session, monkeypatch):
+    """测试批量重建：按文档ID分批检索前K个邻居覆盖列表，每批提交一次"""
+    monkeypatch.setattr(settings, "DOCUMENT_NEIGHBORS_K", 3)
+    document_ids = sorted(uuid.uuid4() for _ in range(5))
+    
+    def page(sql, params):
+        last_id = params.get("document_id_1")
+        remaining = [d for d in document_ids if last_id is None or d > last_id]
+        return remaining[:params["param_1"]]
+    
+    db = fake_session(
+        ("SELECT DISTINCT system_learning_data.document_id", page),
+        ("SELECT system_learning_data.embedding", (0.1, 0.2)),
+    )
+    searched, replaced = [], {}
+    
+    async def search_nearest(db, document_id, embedding, limit):
+        searched.append((embedding, limit))
+        return [(neighbor_id, 0.5) for neighbor_id in document_ids if neighbor_id != document_id][:limit]
+    
+    async def replace_neighbors(db, document_id, neighbors):
+        replaced[document_id] = neighbors
+    
+    monkeypatch.setattr(DocumentNeighborService, "search_nearest", staticmethod(search_nearest))
+    monkeypatch.setattr(DocumentNeighborService, "replace_neighbors", staticmethod(replace_neighbors))
+    
+    assert await DocumentNeighborService.rebuild(db, batch_size=2) == 5
+    
+    assert set(replaced) == set(document_ids)
+    assert all(len(neighbors) == 3 and document_id not in dict(neighbors)
+               for document_id, neighbors in replaced.items())
+    assert searched == [("[0.1,0.2]", 3)] * 5
+    assert db.events == ["commit"] * 3
@@ -0,0 +1,218 @@
+"""
+文档技术名词服务单元测试
+- 保存和聚合查询：使用数据库session执行实际SQL（每个测试使用独立的文档类型，不受已有数据影响）
+- 保存点和容错：使用内存会话记录保存点和提交事件
+"""
+import uuid
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.models.document_technology import DocumentTechnology
+from app.services.document_technology_service import DocumentTechnologyService
+from app.services.knowledge_graph_builder import KnowledgeGraphBuilder
+from scripts.benchmark_knowledge_graph import build_technology_graph
+
+
+def _unique_document_type() -> str:
+    return f"test-{uuid.uuid4().hex[:12]}"
+
+
+async def _add_document(db: AsyncSession, status: str = 'completed'):
+    document = Document(
+        id=uuid.uuid4(),
+        filename='tech.pdf',
+        file_path='/test/tech.pdf',
+        file_size=1000,
+        file_type='pdf',
+        status=status
+    )
+    db.add(document)
+    await db.flush()
+    return document.id
+
+
+async def _add_technologies(db: AsyncSession, document_type: str, docs, status: str = 'completed'):
+    """
+    写入文档技术名词
+    
+    Args:
+        docs: 每个文档的 [(视角, 技术)] 列表
+    
+    Returns:
+        文档ID列表
+    """
+    document_ids = []
+    for view_technologies in docs:
+        document_id = await _add_document(db, status)
+        db.add_all([
+            DocumentTechnology(document_id=document_id, view=view, document_type=document_type, technology=tech)
+            for view, tech in view_technologies
+        ])
+        document_ids.append(document_id)
+    await db.flush()
+    return document_ids
+
+
+async def _saved_rows(db: AsyncSession, document_id):
+    result = await db.execute(
+        select(DocumentTechnology.view, DocumentTechnology.technology)
+        .where(DocumentTechnology.document_id == document_id)
+    )
+    return sorted(tuple(row) for row in result.fetchall())
+
+
+@pytest.mark.asyncio
+async def test_extract_normalizes_and_adds_architecture_components():
+    """测试提取：去重排序、MQ标准化为RocketMQ、包含架构文档组件依赖中的技术名词"""
+    result_data = {
+        "related_technologies": ["MQ", "RocketMQ 消息队列", "Redis", "Redis"],
+        "components": [{"name": "订单服务", "dependencies": ["使用 Kafka 发送消息"]}],
+    }
+    
+    technologies = await DocumentTechnologyService.extract_technologies(result_data, "system")
+    
+    assert technologies == sorted(set(technologies))
+    assert "MQ" not in technologies
+    assert {"RocketMQ", "Redis", "Kafka"} <= set(technologies)
+
+
+@pytest.mark.asyncio
+async def test_save_for_view_replaces_rows_of_view(db_session: AsyncSession):
+    """测试保存：覆盖该视角的技术名词，不影响其他视角"""
+    document_id = await _add_document(db_session)
+    await DocumentTechnologyService.save_for_view(
+        db_session, document_id, "learning", "technical", {"related_technologies": ["Kafka"]}
+    )
+    await DocumentTechnologyService.save_for_view(
+        db_session, document_id, "qa", "interview", {"related_technologies": ["MySQL"]}
+    )
+    
+    technologies = await DocumentTechnologyService.save_for_view(
+        db_session, str(document_id), "learning", "technical", {"related_technologies": ["Redis", "Docker"]}
+    )
+    
+    assert technologies == ["Docker", "Redis"]
+    assert await _saved_rows(db_session, document_id) == [
+        ("learning", "Docker"), ("learning", "Redis"), ("qa", "MySQL")
+    ]
+
+
+@pytest.mark.asyncio
+async def test_save_for_view_without_technologies_only_deletes(db_session: AsyncSession):
+    """测试结果中没有技术名词时只清空该视角的记录"""
+    document_id = await _add_document(db_session)
+    await DocumentTechnologyService.save_for_view(
+        db_session, document_id, "qa", "interview", {"related_technologies": ["Redis"]}
+    )
+    
+    assert await DocumentTechnologyService.save_for_view(db_session, document_id, "qa", "interview", None) == []
+    assert await _saved_rows(db_session, document_id) == []
+
+
+@pytest.mark.asyncio
+async def test_save_for_view_safely_commits_in_savepoint(fake_session):
+    """测试容错保存：在保存点中写入，默认提交；commit=False时交给调用方提交"""
+    db = fake_session()
+    
+    technologies = await DocumentTechnologyService.save_for_view_safely(
+        db, uuid.uuid4(), "learning", "technical", {"related_technologies": ["Redis"]}
+    )
+    assert technologies == ["Redis"]
+    assert db.events == ["savepoint", "release_savepoint", "commit"]
+    
+    db = fake_session()
+    await DocumentTechnologyService.save_for_view_safely(
+        db, uuid.uuid4(), "learning", "technical", {"related_technologies": ["Redis"]}, commit=False
+    )
+    assert db.events == ["savepoint", "release_savepoint"]
+
+
+@pytest.mark.asyncio
+async def test_save_for_view_safely_swallows_errors(fake_session, monkeypatch):
+    """测试提取失败只回滚保存点并返回空列表，调用方事务不受影响"""
+    async def failing_extract(result_data, document_type):
+        raise RuntimeError("extractor down")
+    
+    monkeypatch.setattr(DocumentTechnologyService, "extract_technologies", staticmethod(failing_extract))
+    db = fake_session()
+    
+    assert await DocumentTechnologyService.save_for_view_safely(
+        db, uuid.uuid4(), "learning", "technical", {}, commit=False
+    ) == []
+    assert db.events == ["savepoint", "rollback_savepoint"]
+    assert db.calls == []
+
+
+@pytest.mark.asyncio
+async def test_technology_frequencies_count_completed_documents(db_session: AsyncSession):
+    """测试技术出现的文档数：同一文档的多个视角只计一次，只统计已完成的文档"""
+    document_type = _unique_document_type()
+    first, _ = await _add_technologies(db_session, document_type, [
+        [("learning", "Redis"), ("system", "Redis"), ("learning", "MySQL")],
+        [("learning", "Redis")],
+    ])
+    await _add_technologies(db_session, document_type, [[("learning", "Redis"), ("learning", "Kafka")]],
+                            status='processing')
+    
+    assert await DocumentTechnologyService.technology_frequencies(db_session, document_type) == [
+        ("MySQL", 1), ("Redis", 2)
+    ]
+    assert await DocumentTechnologyService.technology_frequencies(db_session, document_type, first) == [
+        ("MySQL", 1), ("Redis", 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_shared_document_counts_builds_symmetric_matrix(db_session: AsyncSession):
+    """测试共同文档数矩阵：按技术对聚合的结果填充为对称矩阵，对角线为文档数"""
+    document_type = _unique_document_type()
+    await _add_technologies(db_session, document_type, [
+        [("learning", "Redis"), ("system", "Redis"), ("learning", "MySQL")],
+        [("learning", "Redis"), ("qa", "MySQL")],
+        [("learning", "Redis"), ("learning", "Docker")],
+    ])
+    await _add_technologies(db_session, document_type, [[("learning", "Redis"), ("learning", "MySQL")]],
+                            status='processing')
+    
+    counts = await DocumentTechnologyService.shared_document_counts(
+        db_session, ["Redis", "MySQL", "Kafka"], document_type
+    )
+    
+    assert counts.tolist() == [[3, 2, 0], [2, 2, 0], [0, 0, 0]]
+
+
+@pytest.mark.asyncio
+async def test_build_graph_matches_in_memory_aggregation(db_session: AsyncSession):
+    """测试多文档知识图谱：数据库按技术聚合的结果与内存中的技术-文档关联计算一致"""
+    document_type = _unique_document_type()
+    techs = ["Spring Boot", "MySQL", "Redis", "Kafka", "Docker", "Kubernetes", "Nginx", "Vue"]
+    docs = [[("learning", techs[(doc * 3 + k) % len(techs)]) for k in range(3)] for doc in range(12)]
+    document_ids = await _add_technologies(db_session, document_type, docs)
+    
+    graph = await KnowledgeGraphBuilder.build_graph(
+        db_session, similarity_threshold=0.3, max_nodes=5, document_type=document_type
+    )
+    
+    assert "error" not in graph
+    technology_docs_map = {}
+    for document_id, view_technologies in zip(document_ids, docs):
+        for _, tech in view_technologies:
+            technology_docs_map.setdefault(tech, set()).add(document_id)
+    technology_docs_map = dict(sorted(technology_docs_map.items()))
+    nodes, edges = build_technology_graph(
+        set(technology_docs_map), technology_docs_map, 0.3, 5
+    )
+    assert (graph["nodes"], graph["edges"]) == (nodes, edges)
+    assert graph["total_nodes"] == 5
+
+
+@pytest.mark.asyncio
+async def test_build_graph_without_technologies_returns_empty_graph(db_session: AsyncSession):
+    """测试没有技术名词时返回空图谱"""
+    graph = await KnowledgeGraphBuilder.build_graph(db_session, document_type=_unique_document_type())
+    
+    assert "error" not in graph
+    assert graph["nodes"] == [] and graph["edges"] == []
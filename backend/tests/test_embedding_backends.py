@@ -0,0 +1,95 @@
+"""
+嵌入模型推理后端单元测试（不依赖torch/onnxruntime）
+"""
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_backends import (
+    EmbeddingBackend, OnnxBackend, OnnxInt8Backend, SentenceTransformerBackend, cosine_parity, get_backend_class
+)
+from app.services.embedding_service import EmbeddingService
+
+
+def test_get_backend_class():
+    """测试按名称选择后端，未知名称报错"""
+    assert get_backend_class("torch") is SentenceTransformerBackend
+    assert get_backend_class("onnx") is OnnxBackend
+    assert get_backend_class("onnx_int8") is OnnxInt8Backend
+    with pytest.raises(ValueError):
+        get_backend_class("tensorrt")
+
+
+def test_incomplete_backend_cannot_be_instantiated():
+    """测试未实现全部抽象方法的后端在实例化时即报错"""
+    class _PartialBackend(EmbeddingBackend):
+        name = "partial"
+        
+        def load(self):
+            return self
+    
+    with pytest.raises(TypeError):
+        _PartialBackend("model")
+    with pytest.raises(TypeError):
+        EmbeddingBackend("model")
+
+
+def test_mean_pooling_ignores_padding():
+    """测试平均池化只统计attention mask为1的token"""
+    token_embeddings = np.array([
+        [[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]],
+        [[2.0, 0.0], [0.0, 0.0], [0.0, 0.0]],
+    ], dtype=np.float32)
+    attention_mask = np.array([[1, 1, 0], [1, 0, 0]])
+    
+    pooled = OnnxBackend.mean_pooling(token_embeddings, attention_mask)
+    assert pooled.tolist() == [[2.0, 3.0], [2.0, 0.0]]
+
+
+def test_cosine_parity():
+    """测试逐条余弦相似度"""
+    reference = [[1.0, 0.0], [1.0, 1.0]]
+    similarities = cosine_parity(reference, [[2.0, 0.0], [1.0, 0.0]])
+    assert similarities == pytest.approx([1.0, 0.70710678])
+
+
+def test_service_backend_selection(monkeypatch):
+    """测试服务按配置选择后端，非PyTorch后端的向量单独缓存，无效配置回退到PyTorch"""
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "onnx_int8")
+    service = EmbeddingService(server_url="")
+    assert service._backend_class is OnnxInt8Backend
+    assert service._local_model_id == f"{settings.EMBEDDING_MODEL_NAME}#onnx_int8"
+    
+    monkeypatch.setattr(settings, "EMBEDDING_BACKEND", "unknown")
+    service = EmbeddingService(server_url="")
+    assert service._backend_class is SentenceTransformerBackend
+    assert service._local_model_id == settings.EMBEDDING_MODEL_NAME
+
+
+@pytest.mark.asyncio
+async def test_service_loads_selected_backend(monkeypatch):
+    """测试本地模型通过所选后端加载和推理"""
+    class _FakeBackend(SentenceTransformerBackend):
+        name = "fake"
+        
+        def load(self):
+            self.loaded_model = self.model_name
+            return self
+        
+        def get_sentence_embedding_dimension(self):
+            return settings.EMBEDDING_DIMENSION
+        
+        def encode(self, texts, batch_size=32):
+            embeddings = np.zeros((len(texts), settings.EMBEDDING_DIMENSION))
+            embeddings[:, 0] = [len(t) for t in texts]
+            return embeddings
+    
+    service = EmbeddingService(server_url="")
+    service._backend_class = _FakeBackend
+    service._use_local_model = True
+    
+    embeddings = await service._generate_via_local_model(["ab", "c"])
+    assert isinstance(service._local_model, _FakeBackend)
+    assert service._local_model.loaded_model == settings.EMBEDDING_MODEL_NAME
+    assert [e[0] for e in embeddings] == [2.0, 1.0]
+    assert len(embeddings[0]) == service.embedding_dimension
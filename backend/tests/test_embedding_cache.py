@@ -0,0 +1,77 @@
+"""
+EmbeddingCache单元测试（使用fakeredis模拟Redis）
+"""
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+
+MODEL = "test-model"
+
+
+def _make_cache(fake_redis, **kwargs):
+    kwargs.setdefault("disk_path", "")
+    cache = EmbeddingCache(**kwargs)
+    cache.enabled = True
+    client = fake_redis()
+    cache._get_redis = lambda: client
+    return cache, client
+
+
+def test_make_key_normalizes_whitespace_and_depends_on_model():
+    """测试缓存key忽略空白差异，区分模型"""
+    key = EmbeddingCache.make_key(MODEL, "分布式  缓存\n设计")
+    assert key == EmbeddingCache.make_key(MODEL, " 分布式 缓存 设计 ")
+    assert key != EmbeddingCache.make_key("other-model", "分布式 缓存 设计")
+    assert key != EmbeddingCache.make_key(MODEL, "分布式缓存设计")
+
+
+def test_make_key_depends_on_dimension(monkeypatch):
+    """测试修改存储维度后旧维度的缓存不再命中"""
+    key = EmbeddingCache.make_key(MODEL, "分布式缓存设计")
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", settings.EMBEDDING_DIMENSION + 1)
+    assert EmbeddingCache.make_key(MODEL, "分布式缓存设计") != key
+
+
+@pytest.mark.asyncio
+async def test_get_set_many_and_stats(fake_redis):
+    """测试批量读写、float16紧凑存储和命中统计"""
+    cache, client = _make_cache(fake_redis, dtype="float16")
+    vectors = [[0.1, 0.2, 0.3], None, [1.0, -1.0, 0.5]]
+    
+    assert await cache.get_many(MODEL, ["a", "b", "c"]) == [None, None, None]
+    await cache.set_many(MODEL, ["a", "b", "c"], vectors)
+    results = await cache.get_many(MODEL, ["a", "b", "c"])
+    
+    assert results[1] is None
+    assert results[0] == pytest.approx(vectors[0], abs=1e-3)
+    assert results[2] == pytest.approx(vectors[2], abs=1e-3)
+    assert len(await client.get(cache._entry_key(EmbeddingCache.make_key(MODEL, "a")))) == 3 * 2
+    
+    stats = await cache.get_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 4
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction(fake_redis):
+    """测试超过上限后淘汰最久未访问的向量"""
+    cache, _ = _make_cache(fake_redis, max_entries=2)
+    
+    await cache.set_many(MODEL, ["a"], [[1.0]])
+    await cache.set_many(MODEL, ["b"], [[2.0]])
+    assert await cache.get_many(MODEL, ["a"]) == [[1.0]]  # a变为最近访问
+    await cache.set_many(MODEL, ["c"], [[3.0]])
+    
+    assert await cache.get_many(MODEL, ["a", "b", "c"]) == [[1.0], None, [3.0]]
+
+
+@pytest.mark.asyncio
+async def test_disk_cache_survives_redis_loss(tmp_path, fake_redis):
+    """测试Redis数据丢失后从磁盘命中并回填Redis"""
+    cache, client = _make_cache(fake_redis, disk_path=str(tmp_path / "embeddings.db"), dtype="float32")
+    await cache.set_many(MODEL, ["a", "b"], [[0.5, 0.25], [0.75, 1.0]])
+    await client.flushall()
+    
+    assert await cache.get_many(MODEL, ["b", "x", "a"]) == [[0.75, 1.0], None, [0.5, 0.25]]
+    assert await client.exists(cache._entry_key(EmbeddingCache.make_key(MODEL, "a")))
@@ -0,0 +1,82 @@
+"""
+共享嵌入服务单元测试（假模型 + httpx ASGI传输，不启动真实进程）
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_server import ModelHost, create_app
+from app.services.embedding_service import EmbeddingService
+
+
+class _FakeModel:
+    def __init__(self):
+        self.calls = []
+    
+    def encode(self, texts, batch_size=32):
+        self.calls.append(list(texts))
+        return [[float(len(text))] + [1.0] * (settings.EMBEDDING_DIMENSION - 1) for text in texts]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """模型宿主 + 指向ASGI应用的客户端EmbeddingService（客户端不使用缓存）"""
+    monkeypatch.setattr(settings, "EMBEDDING_MICRO_BATCH_WAIT_MS", 20)
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_cache", EmbeddingCache)
+    
+    host = ModelHost()
+    host._use_local_model = True
+    host._local_model = _FakeModel()
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(host)), base_url="http://embedding-server")
+    
+    def make_client():
+        client = EmbeddingService(server_url="http://embedding-server")
+        client._get_server_client = lambda: http_client
+        return client
+    
+    return host, make_client
+
+
+@pytest.mark.asyncio
+async def test_client_uses_server_without_loading_model(server):
+    """测试配置嵌入服务后客户端不加载模型，向量由服务端生成"""
+    host, make_client = server
+    client = make_client()
+    
+    results = await client.generate_embeddings_batch(["短", "较长的文本"])
+    
+    assert client._use_local_model and client._local_model is None
+    assert [r[0] for r in results] == [1.0, 5.0]
+    assert len(results[0]) == client.embedding_dimension
+    assert host._local_model.calls == [["短", "较长的文本"]]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_workers_coalesced_on_server(server):
+    """测试多个Worker的并发请求在服务端合并为一次前向计算"""
+    host, make_client = server
+    clients = [make_client() for _ in range(4)]
+    
+    results = await asyncio.gather(*[
+        client.generate_embeddings_batch([f"worker{i}-{j}" for j in range(3)])
+        for i, client in enumerate(clients)
+    ])
+    
+    assert len(host._local_model.calls) == 1
+    assert sorted(host._local_model.calls[0]) == sorted(f"worker{i}-{j}" for i in range(4) for j in range(3))
+    assert all(r is not None for batch in results for r in batch)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_server_returns_none(monkeypatch, tmp_path):
+    """测试嵌入服务不可用时返回None，不抛出异常"""
+    monkeypatch.setattr(settings, "EMBEDDING_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_cache", EmbeddingCache)
+    client = EmbeddingService(server_url=f"unix://{tmp_path / 'missing.sock'}")
+    
+    assert await client.generate_embeddings_batch(["文本"]) == [None]
@@ -0,0 +1,270 @@
+"""
+EmbeddingService批量向量化单元测试（使用假模型，不加载sentence-transformers）
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embedding_service import EmbeddingService
+
+
+class _FakeModel:
+    """记录encode调用的假模型，向量第一维为文本长度（维度与存储维度一致）"""
+    
+    def __init__(self, dimension=None):
+        self.calls = []
+        self.dimension = dimension or settings.EMBEDDING_DIMENSION
+    
+    def encode(self, texts, batch_size=32):
+        self.calls.append((list(texts), batch_size))
+        return [[float(len(text))] + [1.0] * (self.dimension - 1) for text in texts]
+    
+    def count_tokens(self, texts):
+        # 每2个字符1个token
+        return [-(-len(text) // 2) for text in texts]
+
+
+@pytest.fixture(autouse=True)
+def embedding_cache(monkeypatch, fake_redis):
+    """每个测试使用独立的fakeredis向量缓存"""
+    cache = EmbeddingCache(disk_path="")
+    cache.enabled = True
+    client = fake_redis()
+    cache._get_redis = lambda: client
+    monkeypatch.setattr("app.services.embedding_service.get_embedding_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def local_service():
+    service = EmbeddingService()
+    service._use_local_model = True
+    service._local_model = _FakeModel()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_batch_single_encode_sorted_by_length(local_service):
+    """测试批量向量化只调用一次encode，输入按长度排序，结果与原顺序对应"""
+    texts = ["ccc", "", "a", "bbbbbb", "   ", "dd"]
+    results = await local_service.generate_embeddings_batch(texts)
+    
+    calls = local_service._local_model.calls
+    assert len(calls) == 1
+    assert calls[0] == (["a", "dd", "ccc", "bbbbbb"], settings.EMBEDDING_BATCH_SIZE)
+    
+    assert results[1] is None and results[4] is None
+    for text, embedding in zip(texts, results):
+        if embedding is not None:
+            assert len(embedding) == local_service.embedding_dimension
+            assert embedding[0] == len(text)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_single_calls_coalesced(local_service, monkeypatch):
+    """测试并发的单条请求合并为一次前向计算"""
+    monkeypatch.setattr(settings, "EMBEDDING_MICRO_BATCH_WAIT_MS", 20)
+    texts = [f"文本{i}" * (i + 1) for i in range(10)]
+    
+    results = await asyncio.gather(*[local_service.generate_embedding(text) for text in texts])
+    
+    assert len(local_service._local_model.calls) == 1
+    assert [r[0] for r in results] == [float(len(text)) for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_micro_batch_flushes_at_batch_size(local_service, monkeypatch):
+    """测试队列达到批大小时立即计算，不等待超时"""
+    monkeypatch.setattr(settings, "EMBEDDING_MICRO_BATCH_WAIT_MS", 60000)
+    monkeypatch.setattr(settings, "EMBEDDING_BATCH_SIZE", 4)
+    
+    results = await asyncio.wait_for(
+        asyncio.gather(*[local_service.generate_embedding(f"t{i}") for i in range(8)]),
+        timeout=5
+    )
+    assert len(local_service._local_model.calls) == 2
+    assert all(r is not None for r in results)
+
+
+@pytest.mark.asyncio
+async def test_openai_fallback_uses_array_input_and_shared_client(monkeypatch):
+    """测试OpenAI方案一次请求传入多条文本，客户端只创建一次"""
+    requests = []
+    
+    def create(model, input):
+        requests.append(list(input))
+        # 乱序返回，按index对应
+        data = [SimpleNamespace(index=i, embedding=[float(i)] * 1536) for i in range(len(input))]
+        return SimpleNamespace(data=list(reversed(data)))
+    
+    clients_created = []
+    
+    def fake_openai(api_key):
+        clients_created.append(api_key)
+        return SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "OPENAI_EMBEDDING_MAX_INPUTS", 3)
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", False)
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSION", 1536)
+    monkeypatch.setattr("openai.OpenAI", fake_openai)
+    service = EmbeddingService()
+    service._use_local_model = False
+    
+    results = await service.generate_embeddings_batch(["a", "b", "c", "d", "e"])
+    await service.generate_embeddings_batch(["f"])
+    
+    assert requests == [["a", "b", "c"], ["d", "e"], ["f"]]
+    assert len(clients_created) == 1
+    assert [r[0] for r in results] == [0.0, 1.0, 2.0, 0.0, 1.0]
+
+
+@pytest.mark.asyncio
+async def test_openai_fallback_disabled_for_local_storage_model(monkeypatch):
+    """测试存储模型是本地模型时不降级到OpenAI（其他模型的向量与已存储的向量不可比较）"""
+    requests = []
+    
+    def fake_openai(api_key):
+        return SimpleNamespace(embeddings=SimpleNamespace(
+            create=lambda model, input: requests.append(list(input))
+        ))
+    
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", True)
+    monkeypatch.setattr("openai.OpenAI", fake_openai)
+    service = EmbeddingService()
+    service._use_local_model = False
+    
+    assert await service.generate_embeddings_batch(["a", "b"]) == [None, None]
+    assert requests == []
+
+
+@pytest.mark.asyncio
+async def test_vectors_with_other_dimension_rejected(local_service):
+    """测试维度与存储维度不一致的向量被丢弃，而不是截断或零填充"""
+    local_service._local_model = _FakeModel(dimension=local_service.embedding_dimension + 1)
+    
+    assert await local_service.generate_embeddings_batch(["模型维度不一致"]) == [None]
+
+
+def test_build_chunks_cover_document(monkeypatch):
+    """测试分块按顺序覆盖整篇文档，位置与原文对应"""
+    monkeypatch.setattr(settings, "EMBEDDING_CHUNK_CHARS", 200)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_CHUNKS", 1000)
+    content = "\n\n".join(f"第{i}段：" + "内容" * 30 for i in range(400))
+    
+    chunks = EmbeddingService.build_chunks(content, chars_per_token=2.0)
+    
+    assert all(len(chunk["text"]) <= 200 for chunk in chunks)
+    assert chunks[0]["start"] == 0 and chunks[-1]["end"] == len(content)
+    assert sum(chunk["text"].count("段：") for chunk in chunks) == 400
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous["end"] <= chunk["start"]
+    for chunk in chunks:
+        assert content[chunk["start"]:chunk["end"]] == chunk["text"]
+
+
+def test_long_document_chunks_sampled_not_enlarged(monkeypatch):
+    """测试超长文档的分块数超过上限时从全文均匀抽取分块，分块不放大到模型窗口之外"""
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", True)
+    monkeypatch.setattr(settings, "EMBEDDING_CHUNK_CHARS", 1000)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_SEQ_LENGTH", 128)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_CHUNKS", 50)
+    content = "\n\n".join(f"第{i}段：" + "内容" * 30 for i in range(400))
+    
+    chunks = EmbeddingService.build_chunks(content)
+    
+    assert len(chunks) == 50
+    assert [chunk["chunk_index"] for chunk in chunks] == list(range(50))
+    assert all(len(chunk["text"]) <= 126 for chunk in chunks)
+    assert chunks[0]["start"] == 0 and chunks[-1]["end"] == len(content)
+    # 抽取的分块在全文中均匀分布
+    gaps = [chunk["start"] - previous["start"] for previous, chunk in zip(chunks, chunks[1:])]
+    assert max(gaps) <= 2 * len(content) / 50
+    for chunk in chunks:
+        assert content[chunk["start"]:chunk["end"]] == chunk["text"]
+
+
+def test_local_chunks_fit_model_window(monkeypatch):
+    """测试本地模型的分块按字符/token比例换算后不超过模型窗口，超长段落按字符切开且位置与原文对应"""
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", True)
+    monkeypatch.setattr(settings, "EMBEDDING_CHUNK_CHARS", 1000)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_SEQ_LENGTH", 128)
+    content = "短段落\n\n" + "长" * 300 + "\n\n结尾"
+    
+    chunks = EmbeddingService.build_chunks(content)
+    
+    assert EmbeddingService.chunk_char_budget() == 126
+    assert all(len(chunk["text"]) <= 126 for chunk in chunks)
+    assert "".join(chunk["text"] for chunk in chunks).count("长") == 300
+    assert chunks[-1]["end"] == len(content)
+    for chunk in chunks:
+        assert content[chunk["start"]:chunk["end"]] == chunk["text"]
+    
+    assert EmbeddingService.chunk_char_budget(3.5) == 441
+    assert EmbeddingService.chunk_char_budget(20.0) == 1000
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", False)
+    assert EmbeddingService.chunk_char_budget() == 1000
+
+
+def test_estimate_chars_per_token():
+    """测试按字符类型估算字符/token比例：中文约1个字符1个token，英文按3个字符1个token"""
+    assert EmbeddingService.estimate_chars_per_token("中文内容" * 10) == 1.0
+    assert EmbeddingService.estimate_chars_per_token("abc" * 10) == pytest.approx(3.0)
+    assert 1.0 < EmbeddingService.estimate_chars_per_token("中文 mixed text") < 3.0
+
+
+@pytest.mark.asyncio
+async def test_document_chunks_sized_with_tokenizer(local_service, monkeypatch):
+    """测试本地模型的分块按分词器测得的字符/token比例放大（假分词器每2个字符1个token）"""
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", True)
+    monkeypatch.setattr(settings, "EMBEDDING_CHUNK_CHARS", 1000)
+    monkeypatch.setattr(settings, "EMBEDDING_MAX_SEQ_LENGTH", 128)
+    content = "\n\n".join(f"第{i}段：" + "内容" * 300 for i in range(20))
+    
+    assert await local_service._measure_chars_per_token(content) == 2.0
+    _, chunks = await local_service.generate_document_embedding(content)
+    
+    assert max(len(chunk["text"]) for chunk in chunks) == 252
+    
+    # 使用共享嵌入服务时本进程没有分词器，按字符类型估算
+    local_service._server_url = "http://embedding:8100"
+    assert await local_service._measure_chars_per_token(content) == 1.0
+
+
+def test_pool_embeddings_weighted_and_normalized():
+    """测试按权重平均后归一化"""
+    pooled = EmbeddingService.pool_embeddings([[1.0, 0.0], [0.0, 1.0]], weights=[3, 1])
+    assert pooled == pytest.approx([0.9486833, 0.3162278])
+    assert EmbeddingService.pool_embeddings([]) is None
+
+
+@pytest.mark.asyncio
+async def test_document_embedding_covers_long_document(local_service, monkeypatch):
+    """测试长文档分块后一次批量向量化，文档末尾内容也参与向量化"""
+    content = "\n\n".join(f"第{i}段：" + "内容" * 100 for i in range(200))
+    
+    embedding, chunks = await local_service.generate_document_embedding(content)
+    
+    calls = local_service._local_model.calls
+    assert len(calls) == 1
+    assert any("第199段" in text for text in calls[0][0])
+    assert len(chunks) == len(calls[0][0]) > 1
+    assert len(embedding) == local_service.embedding_dimension
+    assert sum(x * x for x in embedding) == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_cached_texts_skip_inference(local_service, embedding_cache):
+    """测试已缓存的文本不再做模型推理，只向量化未命中的文本"""
+    first = await local_service.generate_embeddings_batch(["缓存文本一", "缓存文本二"])
+    second = await local_service.generate_embeddings_batch(["缓存文本二", "新文本", " 缓存文本一 "])
+    
+    calls = local_service._local_model.calls
+    assert [texts for texts, _ in calls] == [["缓存文本一", "缓存文本二"], ["新文本"]]
+    assert second[0] == pytest.approx(first[1], abs=1e-3)
+    assert second[2] == pytest.approx(first[0], abs=1e-3)
+    assert embedding_cache.hits == 2
@@ -0,0 +1,55 @@
+"""
+原生维度向量列类型单元测试（不依赖数据库）
+"""
+import pytest
+from pgvector.sqlalchemy import Vector
+
+from app.core.config import settings
+from app.models.document_segment_embedding import DocumentSegmentEmbedding
+from app.models.embedding_vector import (
+    OPENAI_EMBEDDING_MODEL, HalfVector, embedding_type, storage_model_name, vector_sql_type
+)
+from app.models.system_learning_data import SystemLearningData
+from app.services.embedding_service import EmbeddingService
+
+
+def test_models_use_native_dimension():
+    """测试向量列和向量化服务使用配置的原生维度，而不是1536"""
+    column_type = SystemLearningData.__table__.c.embedding.type
+    assert column_type.dim == settings.EMBEDDING_DIMENSION
+    assert EmbeddingService(server_url="").embedding_dimension == settings.EMBEDDING_DIMENSION
+
+
+def test_embedding_type_follows_storage_type(monkeypatch):
+    """测试按存储类型创建vector或halfvec列"""
+    monkeypatch.setattr(settings, "EMBEDDING_STORAGE_TYPE", "vector")
+    assert type(embedding_type(384)) is Vector
+    assert embedding_type(384).get_col_spec() == "VECTOR(384)"
+    
+    monkeypatch.setattr(settings, "EMBEDDING_STORAGE_TYPE", "halfvec")
+    assert isinstance(embedding_type(384), HalfVector)
+    assert embedding_type(384).get_col_spec() == "HALFVEC(384)"
+    assert vector_sql_type() == "halfvec"
+    
+    monkeypatch.setattr(settings, "EMBEDDING_STORAGE_TYPE", "float8[]")
+    with pytest.raises(ValueError):
+        vector_sql_type()
+
+
+def test_halfvec_reuses_vector_text_format():
+    """测试halfvec与vector使用相同的文本格式读写"""
+    column_type = HalfVector(3)
+    bind = column_type.bind_processor(None)
+    result = column_type.result_processor(None, None)
+    assert result(bind([0.5, -1.0, 0.25])).tolist() == [0.5, -1.0, 0.25]
+
+
+def test_storage_model_follows_configuration(monkeypatch):
+    """测试存储模型随配置切换，向量表都记录生成向量的模型"""
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", True)
+    assert storage_model_name() == settings.EMBEDDING_MODEL_NAME
+    monkeypatch.setattr(settings, "USE_LOCAL_EMBEDDING", False)
+    assert storage_model_name() == OPENAI_EMBEDDING_MODEL
+    
+    for model in (SystemLearningData, DocumentSegmentEmbedding):
+        assert "embedding_model" in model.__table__.c
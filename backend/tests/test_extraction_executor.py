@@ -0,0 +1,170 @@
+"""
+ExtractionExecutor单元测试（不依赖数据库）
+"""
+import asyncio
+import time
+import pytest
+from pathlib import Path
+
+from app.core.config import settings
+from app.services.document_extractor import DocumentExtractor
+from app.services.extraction_executor import ExtractionExecutor
+
+MD_PATH = str(Path(__file__).parent / "fixtures" / "test_documents" / "test_architecture.md")
+
+
+def _square(x):
+    return x * x
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _divide(a, b):
+    return a / b
+
+
+def _write_pid_and_sleep(pid_path, seconds):
+    import os
+    Path(pid_path).write_text(str(os.getpid()))
+    time.sleep(seconds)
+
+
+def _process_alive(pid):
+    import os
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def _extract_markdown_in_worker(path):
+    """在守护进程（Celery prefork工作进程）中按process模式提取Markdown"""
+    settings.EXTRACTION_EXECUTOR = "process"
+    ExtractionExecutor._instances.clear()
+    content = asyncio.run(DocumentExtractor.extract(path, "md"))
+    return content, ExtractionExecutor.get_instance().mode
+
+
+def _timeout_in_worker():
+    """在守护进程中按process模式执行超时的解析，返回是否超时和耗时"""
+    ExtractionExecutor._instances.clear()
+    executor = ExtractionExecutor("process", max_workers=1)
+    start = time.monotonic()
+    try:
+        asyncio.run(executor.run(_sleep, 30, timeout=0.5))
+    except asyncio.TimeoutError:
+        return True, time.monotonic() - start
+    return False, time.monotonic() - start
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["process", "thread"])
+async def test_run_returns_result(mode):
+    """测试两种模式都能返回函数结果"""
+    executor = ExtractionExecutor(mode, max_workers=1)
+    try:
+        assert await executor.run(_square, 7) == 49
+    finally:
+        executor.reset()
+
+
+@pytest.mark.asyncio
+async def test_process_timeout_kills_only_its_own_process():
+    """测试process模式超时后立即返回，只终止超时任务的子进程，同时进行的解析正常完成"""
+    executor = ExtractionExecutor("process", max_workers=2)
+    
+    start = time.monotonic()
+    slow = asyncio.ensure_future(executor.run(_sleep, 30, timeout=0.5))
+    other = asyncio.ensure_future(executor.run(_sleep, 1.5))
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await slow
+    assert time.monotonic() - start < 10
+    assert await other == 1.5
+    assert executor.mode == "process"
+    assert await executor.run(_square, 3) == 9
+
+
+@pytest.mark.asyncio
+async def test_process_cancel_kills_process(tmp_path):
+    """测试取消正在执行的解析时终止其子进程"""
+    pid_path = tmp_path / "child.pid"
+    executor = ExtractionExecutor("process", max_workers=1)
+    task = asyncio.ensure_future(executor.run(_write_pid_and_sleep, str(pid_path), 30))
+    await asyncio.sleep(1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    
+    pid = int(pid_path.read_text())
+    for _ in range(50):
+        if not _process_alive(pid):
+            break
+        await asyncio.sleep(0.1)
+    assert not _process_alive(pid)
+
+
+@pytest.mark.asyncio
+async def test_process_error_propagates():
+    """测试子进程中的异常原样抛出"""
+    executor = ExtractionExecutor("process", max_workers=1)
+    with pytest.raises(ZeroDivisionError):
+        await executor.run(_divide, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_extract_markdown_via_executor():
+    """测试Markdown通过解析执行器提取，内容与直接读取一致"""
+    content = await DocumentExtractor.extract(MD_PATH, "md")
+    with open(MD_PATH, "r", encoding="utf-8") as f:
+        assert content == f.read()
+
+
+def test_process_mode_in_daemonic_worker():
+    """测试Celery prefork工作进程（守护进程）中process模式可用：解析在子进程中完成，超时可中断"""
+    billiard = pytest.importorskip("billiard")
+    
+    with billiard.Pool(1) as pool:
+        content, mode = pool.apply(_extract_markdown_in_worker, (MD_PATH,))
+        timed_out, elapsed = pool.apply(_timeout_in_worker)
+    
+    with open(MD_PATH, "r", encoding="utf-8") as f:
+        assert content == f.read()
+    assert mode == "process"
+    assert timed_out and elapsed < 10
+
+
+@pytest.mark.asyncio
+async def test_process_start_failure_falls_back_to_threads(monkeypatch):
+    """测试子进程无法启动（运行环境禁止创建进程）时，切换到线程池重新执行"""
+    import app.services.extraction_executor as extraction_executor
+    
+    class _FailingProcess:
+        def __init__(self, target=None, args=(), daemon=None):
+            pass
+        
+        def start(self):
+            raise OSError("fork not permitted")
+    
+    class _Context:
+        def Pipe(self, duplex=True):
+            import multiprocessing
+            return multiprocessing.Pipe(duplex)
+        
+        Process = _FailingProcess
+    
+    monkeypatch.setattr(extraction_executor, "_process_context", lambda: _Context())
+    executor = ExtractionExecutor("process", max_workers=1)
+    try:
+        assert await executor.run(_square, 5) == 25
+        assert executor.mode == "thread"
+    finally:
+        executor.reset()
@@ -0,0 +1,92 @@
+"""
+InterviewProcessor单元测试（AI调用已替换）
+"""
+import asyncio
+import time
+import pytest
+
+from app.services.interview_processor import InterviewProcessor
+
+
+def _segments(count):
+    return [
+        {"id": i, "text": f"问题{i}：什么是X{i}？答案：X{i}是一种技术。", "position": i * 30, "length": 28}
+        for i in range(1, count + 1)
+    ]
+
+
+def test_merge_answer_windows():
+    """测试按窗口顺序合并答案，source_ids取并集"""
+    merged = InterviewProcessor._merge_answer_windows([
+        {"answers": ["A1", "A2"], "source_ids": [3, 1], "confidence": 80, "has_meta": True},
+        {"answers": ["A2", "A3"], "source_ids": [45, 41], "confidence": 60, "has_meta": True},
+        {"answers": ["A4"], "source_ids": [], "confidence": None, "has_meta": False},
+    ])
+    assert merged["answers"] == ["A1", "A2", "A3", "A4"]
+    assert merged["source_ids"] == [1, 3, 41, 45]
+    assert merged["base_confidence"] == 70
+    assert merged["has_meta"] is True
+
+
+@pytest.mark.asyncio
+async def test_extract_answers_fans_out_windows(monkeypatch):
+    """测试长文档答案提取按窗口并行执行"""
+    calls = []
+    
+    async def fake_request(window_segments):
+        calls.append([seg["id"] for seg in window_segments])
+        await asyncio.sleep(0.1)
+        first = window_segments[0]["id"]
+        if first == 41:
+            raise RuntimeError("窗口失败")
+        return {
+            "answers": [f"answer-{seg['id']}" for seg in window_segments[:2]],
+            "source_ids": [seg["id"] for seg in window_segments[:2]],
+            "confidence": 80,
+            "has_meta": True
+        }
+    
+    monkeypatch.setattr(InterviewProcessor, "_request_answers", staticmethod(fake_request))
+    monkeypatch.setattr(InterviewProcessor, "ANSWER_WINDOW_SEGMENTS", 20)
+    
+    segments = _segments(60)
+    content = "\n\n".join(seg["text"] for seg in segments)
+    
+    start = time.monotonic()
+    result = await InterviewProcessor._extract_answers(content, segments)
+    elapsed = time.monotonic() - start
+    
+    assert len(calls) == 3
+    assert elapsed < 0.25
+    # 失败的窗口被跳过，其余窗口按原文顺序合并
+    assert result["answers"] == ["answer-1", "answer-2", "answer-21", "answer-22"]
+    assert [source["id"] for source in result["sources"]] == [1, 2, 21, 22]
+
+
+@pytest.mark.asyncio
+async def test_answers_run_concurrently_with_summary(monkeypatch):
+    """测试答案提取不等待内容总结和问题生成"""
+    timeline = []
+    
+    async def summary(content, segments):
+        await asyncio.sleep(0.2)
+        timeline.append("summary")
+        return {"key_points": ["Python"]}
+    
+    async def questions(content, segments, summary):
+        await asyncio.sleep(0.2)
+        timeline.append("questions")
+        return [{"question": "Q", "hint": "H"}]
+    
+    async def answers(content, segments):
+        await asyncio.sleep(0.1)
+        timeline.append("answers")
+        return {"answers": ["A"], "confidence": None, "confidence_label": None, "sources": []}
+    
+    monkeypatch.setattr(InterviewProcessor, "_extract_summary", staticmethod(summary))
+    monkeypatch.setattr(InterviewProcessor, "_generate_questions", staticmethod(questions))
+    monkeypatch.setattr(InterviewProcessor, "_extract_answers", staticmethod(answers))
+    
+    result = await InterviewProcessor.process("问题1：什么是Python？\n\n答案：一种编程语言。")
+    assert timeline[0] == "answers"
+    assert result["generated_questions"] == [{"question": "Q", "hint": "H"}]
@@ -0,0 +1,61 @@
+"""
+知识图谱向量化构建单元测试（与逐对循环的参考实现对比，参考实现见scripts/benchmark_knowledge_graph.py）
+"""
+import random
+
+import pytest
+
+from app.services.tech_relationship_service import TechRelationshipService
+from scripts.benchmark_knowledge_graph import (
+    build_technology_graph, build_technology_graph_python, shared_document_counts
+)
+
+
+def _known_technologies():
+    techs = set(TechRelationshipService.TECH_RELATIONSHIPS)
+    for related_list in TechRelationshipService.TECH_RELATIONSHIPS.values():
+        techs.update(tech for tech, _ in related_list)
+    return sorted(techs)
+
+
+def _random_graph_input(seed: int, tech_count: int, doc_count: int, per_doc: int):
+    rng = random.Random(seed)
+    techs = (_known_technologies() + [f"Tech-{i}" for i in range(tech_count)])[:tech_count]
+    technology_docs_map = {}
+    for doc in range(doc_count):
+        for tech in rng.sample(techs, min(per_doc, len(techs))):
+            technology_docs_map.setdefault(tech, set()).add(f"doc-{doc}")
+    return set(technology_docs_map), technology_docs_map
+
+
+@pytest.mark.parametrize("single_document", [False, True])
+@pytest.mark.parametrize("threshold,max_nodes", [(0.3, 50), (0.5, 10), (0.0, 200), (0.3, 3)])
+def test_vectorized_graph_matches_reference(single_document, threshold, max_nodes):
+    """测试向量化实现生成的节点和边与逐对循环完全一致（包括顺序）"""
+    for seed in range(5):
+        all_technologies, technology_docs_map = _random_graph_input(seed, 60, 40, 6)
+        args = (all_technologies, technology_docs_map, threshold, max_nodes, single_document)
+        
+        nodes, edges = build_technology_graph(*args)
+        
+        assert (nodes, edges) == build_technology_graph_python(*args)
+
+
+def test_cooccurrence_from_shared_documents():
+    """测试共现度为共同文档数 / 任一文档数"""
+    technology_docs_map = {
+        'Java': {'d1', 'd2', 'd3'},
+        'Spring': {'d1', 'd2'},
+        'Python': {'d4'},
+    }
+    
+    shared = shared_document_counts(['Java', 'Spring', 'Python'], technology_docs_map)
+    assert shared.tolist() == [[3, 2, 0], [2, 2, 0], [0, 0, 1]]
+    
+    _, edges = build_technology_graph(
+        set(technology_docs_map), technology_docs_map, 0.3, 10
+    )
+    java_spring = next(e for e in edges if {e["source"], e["target"]} == {'Java', 'Spring'})
+    assert java_spring["documents_count"] == 2
+    assert java_spring["cooccurrence"] == round(2 / 3, 3)
+    assert java_spring["weight"] == round(0.9 * 0.7 + (2 / 3) * 0.3, 3)
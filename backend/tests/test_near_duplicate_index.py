@@ -0,0 +1,63 @@
+"""
+NearDuplicateIndex和TextPreprocessor.filter_noise去重单元测试（不依赖数据库）
+"""
+import random
+
+from app.services.near_duplicate_index import NearDuplicateIndex
+from app.services.text_preprocessor import TextPreprocessor
+
+
+def _random_paragraph(rng, words=40):
+    vocabulary = ["数据库", "缓存", "消息队列", "微服务", "网关", "索引", "replica", "shard",
+                  "latency", "throughput", "Kubernetes", "Redis", "分布式", "一致性", "事务"]
+    return " ".join(rng.choice(vocabulary) + str(rng.randint(0, 999)) for _ in range(words))
+
+
+def test_index_detects_near_duplicates():
+    """测试近似重复（少量差异）被识别，不相关文本不被误判"""
+    rng = random.Random(42)
+    index = NearDuplicateIndex(threshold=0.7)
+    base = _random_paragraph(rng)
+    
+    assert index.add_if_unique(base)
+    assert not index.add_if_unique(base)
+    assert not index.add_if_unique(base + " 附加")
+    assert index.query(base.replace(" ", "  ")) == 0
+    
+    for _ in range(200):
+        assert index.add_if_unique(_random_paragraph(rng))
+    assert len(index) == 201
+
+
+def test_signature_is_deterministic():
+    """测试签名与进程无关（不依赖Python的随机化hash），长度固定"""
+    index = NearDuplicateIndex()
+    shingles = index.shingle("分布式缓存一致性设计")
+    assert index.signature(shingles) == NearDuplicateIndex().signature(shingles)
+    assert len(index.signature(shingles)) == NearDuplicateIndex.NUM_PERM
+    assert len(index.signature(index.shingle("ab"))) == NearDuplicateIndex.NUM_PERM
+
+
+def test_filter_noise_removes_repeated_boilerplate():
+    """测试大文档中重复的页眉/版权声明被去除，正文段落全部保留且顺序不变"""
+    rng = random.Random(7)
+    body = [_random_paragraph(rng) for _ in range(2000)]
+    paragraphs = []
+    for i, para in enumerate(body):
+        paragraphs.append(para)
+        if i % 10 == 0:
+            paragraphs.append(f"Copyright 2024 ACME Corp. All rights reserved. 内部资料 第{i}章")
+    
+    result = TextPreprocessor.filter_noise("\n\n".join(paragraphs), file_type="docx")
+    kept = result.split("\n\n")
+    
+    assert kept[0] == body[0]
+    assert sum("Copyright" in p for p in kept) == 1
+    assert [p for p in kept if "Copyright" not in p] == body
+
+
+def test_filter_noise_threshold():
+    """测试相似度阈值可配置"""
+    content = "微服务网关负责鉴权和限流，后端服务A\n\n微服务网关负责鉴权和限流，后端服务B"
+    assert len(TextPreprocessor.filter_noise(content, "md", similarity_threshold=0.6).split("\n\n")) == 1
+    assert len(TextPreprocessor.filter_noise(content, "md", similarity_threshold=1.0).split("\n\n")) == 2
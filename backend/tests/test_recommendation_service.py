@@ -0,0 +1,220 @@
+"""
+推荐服务两阶段检索单元测试（不依赖数据库，使用内存会话返回候选和重排结果）
+"""
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.recommendation_service import RecommendationService
+
+
+def _ranked_row(similarity: float, type_score: float = 1.0, quality: float = 0.8, freshness: float = 1.0):
+    return SimpleNamespace(
+        document_id=uuid.uuid4(),
+        content_summary="摘要",
+        document_type="technical",
+        quality_score=int(quality * 100),
+        processing_time=1,
+        filename="a.pdf",
+        file_type="pdf",
+        upload_time=datetime.now(),
+        similarity_score=similarity,
+        type_score=type_score,
+        quality_score_normalized=quality,
+        freshness_score=freshness
+    )
+
+
+def _session(fake_session, target, candidate_ids, ranked_rows, neighbor_ids=None):
+    """
+    推荐查询的内存会话
+    
+    候选召回返回candidate_ids；重排只返回document_id在本次候选中的ranked_rows（顺序打乱，
+    由服务按综合分数排序）
+    """
+    def rerank(sql, params):
+        candidates = set(params["candidate_ids"])
+        return [row for row in reversed(ranked_rows) if row.document_id in candidates]
+    
+    return fake_session(
+        ("set_config", []),
+        ("FROM document_neighbors", list(neighbor_ids or [])),
+        ("system_learning_data.document_id =", target),
+        ("ANY(:candidate_ids)", rerank),
+        ("LIMIT :candidate_limit", [SimpleNamespace(document_id=i) for i in candidate_ids]),
+    )
+
+
+def _target():
+    return SimpleNamespace(embedding=[0.1, 0.2, 0.3], document_type="technical")
+
+
+@pytest.mark.asyncio
+async def test_candidate_stage_orders_by_distance_only(fake_session):
+    """测试第一阶段只按向量距离排序（可走HNSW索引），第二阶段只对候选重排"""
+    rows = [_ranked_row(0.8), _ranked_row(0.9)]
+    candidate_ids = [row.document_id for row in rows] + [uuid.uuid4()]
+    db = _session(fake_session, _target(), candidate_ids, rows)
+    
+    results = await RecommendationService._recommend_by_document(
+        db, str(uuid.uuid4()), limit=5, document_type="technical", min_quality_score=60
+    )
+    
+    sqls = [sql for sql, _ in db.calls]
+    config_index = next(i for i, sql in enumerate(sqls) if "set_config('hnsw.ef_search'" in sql)
+    candidate_index = next(i for i, sql in enumerate(sqls) if "LIMIT :candidate_limit" in sql)
+    rerank_index = next(i for i, sql in enumerate(sqls) if "ANY(:candidate_ids)" in sql)
+    assert config_index < candidate_index < rerank_index
+    
+    candidate_sql, candidate_params = db.calls[candidate_index]
+    order_by = candidate_sql.split("ORDER BY")[1]
+    assert order_by.split("LIMIT")[0].strip() == "sld.embedding <=> CAST(:target_embedding AS vector)"
+    assert "JOIN" not in candidate_sql
+    assert "sld.document_type = :document_type" in candidate_sql
+    assert candidate_params["candidate_limit"] == max(50, settings.RECOMMENDATION_ANN_CANDIDATES)
+    
+    _, rerank_params = db.calls[rerank_index]
+    assert rerank_params["candidate_ids"] == candidate_ids
+    assert [r["document_id"] for r in results] == [str(rows[1].document_id), str(rows[0].document_id)]
+    assert [r["similarity"] for r in results] == [0.9, 0.8]
+
+
+@pytest.mark.asyncio
+async def test_rerank_orders_by_score_and_filters_low_similarity(fake_session):
+    """测试重排：按综合推荐分数排序（不是按相似度），最高相似度>=0.7时过滤相似度<0.7的候选"""
+    # 综合分数 = 0.7*相似度 + 0.15*类型匹配 + 0.1*质量 + 0.05*新鲜度
+    high_quality = _ranked_row(0.72, type_score=1.0, quality=1.0, freshness=1.0)   # 0.804
+    most_similar = _ranked_row(0.9, type_score=0.5, quality=0.5, freshness=0.4)    # 0.775
+    low_quality = _ranked_row(0.75, type_score=0.5, quality=0.2, freshness=1.0)    # 0.670
+    below_threshold = _ranked_row(0.69, type_score=1.0, quality=1.0, freshness=1.0)  # 0.783，相似度不足
+    rows = [high_quality, most_similar, low_quality, below_threshold]
+    neighbor_ids = [row.document_id for row in rows]
+    
+    db = _session(fake_session, _target(), [], rows, neighbor_ids=neighbor_ids)
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 3, None, None)
+    
+    assert [r["document_id"] for r in results] == [
+        str(high_quality.document_id), str(most_similar.document_id), str(low_quality.document_id)
+    ]
+    assert [r["recommendation_score"] for r in results] == [0.804, 0.775, 0.67]
+    
+    db = _session(fake_session, _target(), [], rows, neighbor_ids=neighbor_ids)
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 2, None, None)
+    assert [r["document_id"] for r in results] == [str(high_quality.document_id), str(most_similar.document_id)]
+
+
+@pytest.mark.asyncio
+async def test_rerank_uses_score_threshold_when_similarity_is_low(fake_session):
+    """测试最高相似度<0.7时改用综合推荐分数阈值（最高分数>=0.7时阈值为0.7）"""
+    best = _ranked_row(0.65, type_score=1.0, quality=1.0, freshness=1.0)    # 0.755
+    second = _ranked_row(0.6, type_score=1.0, quality=0.9, freshness=1.0)   # 0.710
+    weak = _ranked_row(0.5, type_score=0.5, quality=0.5, freshness=0.4)     # 0.495
+    rows = [weak, second, best]
+    
+    db = _session(fake_session, _target(), [row.document_id for row in rows], rows)
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 5, None, None)
+    
+    assert [r["document_id"] for r in results] == [str(best.document_id), str(second.document_id)]
+    assert [r["similarity"] for r in results] == [0.65, 0.6]
+
+
+@pytest.mark.asyncio
+async def test_precomputed_neighbors_skip_vector_search(fake_session):
+    """测试已有邻居列表时直接作为候选，不执行向量检索"""
+    rows = [_ranked_row(0.9)]
+    neighbor_ids = [rows[0].document_id, uuid.uuid4()]
+    db = _session(fake_session, _target(), [], rows, neighbor_ids=neighbor_ids)
+    
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 1, None, None)
+    
+    sqls = [sql for sql, _ in db.calls]
+    assert not any("set_config" in sql or "LIMIT :candidate_limit" in sql for sql in sqls)
+    rerank_params = next(params for sql, params in db.calls if "ANY(:candidate_ids)" in sql)
+    assert rerank_params["candidate_ids"] == neighbor_ids
+    assert rerank_params["limit"] == len(neighbor_ids)
+    assert [r["document_id"] for r in results] == [str(rows[0].document_id)]
+
+
+@pytest.mark.asyncio
+async def test_neighbor_shortfall_falls_back_to_vector_search(fake_session):
+    """测试邻居列表重排后不足limit条时，回退到ANN检索补足候选"""
+    neighbor_row, ann_rows = _ranked_row(0.8), [_ranked_row(0.9), _ranked_row(0.85)]
+    neighbor_ids = [neighbor_row.document_id, uuid.uuid4()]
+    candidate_ids = [neighbor_row.document_id] + [row.document_id for row in ann_rows]
+    db = _session(fake_session, _target(), candidate_ids, [neighbor_row] + ann_rows, neighbor_ids=neighbor_ids)
+    
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 5, None, None)
+    
+    rerank_calls = [params["candidate_ids"] for sql, params in db.calls if "ANY(:candidate_ids)" in sql]
+    assert rerank_calls == [neighbor_ids, candidate_ids]
+    assert [r["similarity"] for r in results] == [0.9, 0.85, 0.8]
+
+
+@pytest.mark.asyncio
+async def test_filters_skip_precomputed_neighbors(fake_session):
+    """测试带过滤条件时不使用邻居列表（邻居列表不考虑过滤条件），直接ANN检索"""
+    rows = [_ranked_row(0.9)]
+    candidate_ids = [rows[0].document_id, uuid.uuid4()]
+    db = _session(fake_session, _target(), candidate_ids, rows, neighbor_ids=[uuid.uuid4()])
+    
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 1, "technical", None)
+    
+    sqls = [sql for sql, _ in db.calls]
+    assert not any("FROM document_neighbors" in sql for sql in sqls)
+    rerank_params = next(params for sql, params in db.calls if "ANY(:candidate_ids)" in sql)
+    assert rerank_params["candidate_ids"] == candidate_ids
+    assert [r["document_id"] for r in results] == [str(rows[0].document_id)]
+
+
+@pytest.mark.asyncio
+async def test_no_candidates_skips_rerank(fake_session):
+    """测试没有候选时不执行重排查询"""
+    db = _session(fake_session, _target(), [], [])
+    
+    results = await RecommendationService._recommend_by_document(db, str(uuid.uuid4()), 5, None, None)
+    
+    assert results == []
+    assert not any("ANY(:candidate_ids)" in sql for sql, _ in db.calls)
+
+
+@pytest.mark.asyncio
+async def test_ef_search_covers_candidate_count(fake_session, monkeypatch):
+    """测试ef_search不小于候选数，且不超过pgvector的上限"""
+    monkeypatch.setattr(settings, "RECOMMENDATION_HNSW_EF_SEARCH", 40)
+    db = fake_session()
+    
+    await RecommendationService.configure_ann_search(db, 200)
+    await RecommendationService.configure_ann_search(db, 5000)
+    
+    assert [params["ef_search"] for _, params in db.calls] == ["200", "1000"]
+
+
+@pytest.mark.asyncio
+async def test_recommend_documents_merges_local_documents_and_books(monkeypatch):
+    """测试指定文档时同时返回相似的本地文档和书籍，按推荐度排序，单路失败不影响另一路"""
+    calls = {}
+    
+    async def fake_by_document(db, document_id, limit, document_type, min_quality_score):
+        calls["local"] = (document_id, limit, document_type, min_quality_score)
+        return [{"document_id": "d1", "recommendation_score": 0.75}]
+    
+    async def fake_books(db, document_id, limit):
+        return [{"document_id": None, "recommendation_score": 0.9, "is_book": True}]
+    
+    monkeypatch.setattr(RecommendationService, "_recommend_by_document", staticmethod(fake_by_document))
+    monkeypatch.setattr(RecommendationService, "_recommend_books", staticmethod(fake_books))
+    
+    result = await RecommendationService.recommend_documents(None, document_id="doc", limit=5, document_type="technical")
+    
+    assert calls["local"] == ("doc", 5, "technical", None)
+    assert [r["recommendation_score"] for r in result["recommendations"]] == [0.9, 0.75]
+    
+    async def failing_books(db, document_id, limit):
+        raise RuntimeError("ai down")
+    
+    monkeypatch.setattr(RecommendationService, "_recommend_books", staticmethod(failing_books))
+    result = await RecommendationService.recommend_documents(None, document_id="doc", limit=1)
+    assert result["recommendations"] == [{"document_id": "d1", "recommendation_score": 0.75}]
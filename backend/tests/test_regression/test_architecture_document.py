@@ -125,7 +125,7 @@ async def test_architecture_progress_callback(
     测试架构文档的进度回调机制
     
     验证：
-    1. 进度回调包含5个步骤的更新
+    1. 进度回调包含各分支完成的更新（子步骤并行执行，完成顺序不固定）
     2. 每个步骤的stage信息正确
     3. 进度值递增
     """
@@ -148,11 +148,12 @@ async def test_architecture_progress_callback(
     logger.info("开始监听进度更新", document_id=document_id)
     progress_updates = []
     expected_stages = [
-        "步骤1/5：提取配置流程",
-        "步骤2/5：识别组件",
-        "步骤3/5：生成架构视图",
-        "步骤4/5：生成白话解释",
-        "步骤5/5：生成检查清单"
+        "配置流程提取完成",
+        "组件识别完成",
+        "全景视图生成完成",
+        "白话串讲生成完成",
+        "检查清单生成完成",
+        "技术栈提取完成"
     ]
     
     async for progress in monitor_progress(
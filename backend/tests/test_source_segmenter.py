@@ -0,0 +1,101 @@
+"""
+SourceSegmenter单元测试（不依赖数据库）
+"""
+import time
+
+from app.services.source_segmenter import SourceSegmenter
+
+
+def _assert_offsets(content, segments):
+    for segment in segments:
+        assert content[segment["start"]:segment["end"]] == segment["text"]
+        assert segment["position"] == segment["start"]
+        assert segment["length"] == segment["end"] - segment["start"]
+
+
+def test_segment_markdown_blocks_with_offsets():
+    """测试代码块、引用块、列表和普通段落都被切分为独立段落，位置精确"""
+    content = (
+        "  第一段内容\n"
+        "\n"
+        "- 列表项1\n"
+        "- 列表项2\n"
+        "  续行\n"
+        "列表后的文字\n"
+        "> 引用1\n"
+        "> 引用2\n"
+        "\n"
+        "```python\n"
+        "x = 1\n"
+        "\n"
+        "y = 2\n"
+        "```\n"
+    )
+    segments = SourceSegmenter.segment_content(content)
+    _assert_offsets(content, segments)
+    
+    assert [s["text"] for s in segments] == [
+        "第一段内容",
+        "- 列表项1\n- 列表项2\n  续行",
+        "列表后的文字",
+        "> 引用1\n> 引用2",
+        "```python\nx = 1\n\ny = 2\n```",
+    ]
+    assert [s["id"] for s in segments] == [1, 2, 3, 4, 5]
+
+
+def test_repeated_blocks_get_distinct_positions():
+    """测试重复出现的相同block各自记录自己的位置"""
+    block = "> 重复的引用\n> 第二行\n\n- 重复的列表\n\n"
+    content = block * 3
+    segments = SourceSegmenter.segment_content(content)
+    _assert_offsets(content, segments)
+    
+    assert len(segments) == 6
+    assert len({s["start"] for s in segments}) == 6
+
+
+def test_long_segment_split_on_sentences():
+    """测试超长段落在句子边界切分，每段不超过阈值且位置精确"""
+    content = "开头。" + "这是一个用于测试的较长句子。" * 400 + "\n\n" + "无" * 4500
+    segments = SourceSegmenter.segment_content(content)
+    _assert_offsets(content, segments)
+    
+    assert len(segments) > 2
+    assert all(s["length"] <= SourceSegmenter.MAX_SEGMENT_LENGTH for s in segments)
+    assert all(s["text"].endswith("。") for s in segments if "句子" in s["text"])
+
+
+def test_large_document_is_fast():
+    """测试大文档（约36万字符）切分远低于超时时间，不会回退到快速模式"""
+    block = "## 标题\n\n段落内容，包含一些文字。\n\n- 列表1\n- 列表2\n\n> 引用\n\n```\ncode\n```\n\n"
+    content = block * 6000
+    
+    start = time.monotonic()
+    segments = SourceSegmenter.segment_content(content, timeout=5.0)
+    assert time.monotonic() - start < 2.0
+    
+    assert len(segments) == 6000 * 5
+    _assert_offsets(content, segments)
+
+
+def test_get_segments_reuses_supplied_and_memoized(monkeypatch):
+    """测试传入的切分结果直接使用，未传入时相同内容只切分一次"""
+    supplied = [{"id": 1, "text": "已切分", "position": 0, "length": 3}]
+    assert SourceSegmenter.get_segments("任意内容", supplied) is supplied
+    
+    calls = []
+    original = SourceSegmenter.segment_content
+    
+    def counting_segment_content(content, timeout=5.0):
+        calls.append(content)
+        return original(content, timeout)
+    
+    monkeypatch.setattr(SourceSegmenter, "segment_content", staticmethod(counting_segment_content))
+    content = "缓存测试段落一。\n\n缓存测试段落二。"
+    first = SourceSegmenter.get_segments(content)
+    second = SourceSegmenter.get_segments(content)
+    
+    assert first is second
+    assert len(calls) == 1
+    assert [s["text"] for s in first] == ["缓存测试段落一。", "缓存测试段落二。"]
@@ -0,0 +1,221 @@
+"""
+StepScheduler单元测试
+"""
+import asyncio
+import time
+import pytest
+
+from app.services.step_scheduler import ProcessingStep, StepScheduler
+
+
+def _sleeper(value, delay=0.1, log=None):
+    async def run(**kwargs):
+        if log is not None:
+            log.append(("start", value))
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("end", value))
+        return value
+    return run
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    """测试互不依赖的步骤并发执行"""
+    steps = [ProcessingStep(name, _sleeper(name, 0.2)) for name in ("a", "b", "c")]
+    start = time.monotonic()
+    results = await StepScheduler(steps, max_concurrency=3).run()
+    elapsed = time.monotonic() - start
+    assert results == {"a": "a", "b": "b", "c": "c"}
+    assert elapsed < 0.4
+
+
+@pytest.mark.asyncio
+async def test_dependency_result_passed_as_kwarg():
+    """测试依赖步骤的结果以关键字参数传入"""
+    async def second(first):
+        return first + 1
+    
+    steps = [
+        ProcessingStep("second", second, depends_on=("first",)),
+        ProcessingStep("first", _sleeper(1, 0.01)),
+    ]
+    results = await StepScheduler(steps).run()
+    assert results["second"] == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_cap():
+    """测试并发上限"""
+    running = [0]
+    peak = [0]
+    
+    async def work():
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.05)
+        running[0] -= 1
+    
+    steps = [ProcessingStep(f"s{i}", work) for i in range(6)]
+    await StepScheduler(steps, max_concurrency=2).run()
+    assert peak[0] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_step_uses_fallback():
+    """测试步骤失败时使用默认值，依赖它的步骤继续执行"""
+    async def broken():
+        raise RuntimeError("boom")
+    
+    async def dependent(broken):
+        return {"received": broken}
+    
+    steps = [
+        ProcessingStep("broken", broken, fallback=lambda: []),
+        ProcessingStep("dependent", dependent, depends_on=("broken",)),
+    ]
+    results = await StepScheduler(steps).run()
+    assert results["broken"] == []
+    assert results["dependent"] == {"received": []}
+
+
+@pytest.mark.asyncio
+async def test_callback_exception_cancels_remaining_steps():
+    """测试完成回调抛出的异常会取消其余步骤并向上抛出"""
+    async def on_complete(step, completed, total):
+        raise TimeoutError("处理超时")
+    
+    steps = [
+        ProcessingStep("fast", _sleeper("fast", 0.01)),
+        ProcessingStep("slow", _sleeper("slow", 5)),
+    ]
+    with pytest.raises(TimeoutError):
+        await StepScheduler(steps, on_step_complete=on_complete).run()
+
+
+@pytest.mark.asyncio
+async def test_nested_scheduler_shares_outer_concurrency_cap():
+    """测试步骤内嵌套的调度器与外层共用并发上限，等待嵌套步骤期间让出外层步骤的名额"""
+    running = [0]
+    peak = [0]
+    
+    async def work():
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.05)
+        running[0] -= 1
+        return "done"
+    
+    async def nested():
+        inner = [ProcessingStep(f"window_{i}", work) for i in range(4)]
+        return await StepScheduler(inner, max_concurrency=3).run()
+    
+    steps = [ProcessingStep("outer_a", work), ProcessingStep("outer_b", work), ProcessingStep("nested", nested)]
+    start = time.monotonic()
+    results = await StepScheduler(steps, max_concurrency=3).run()
+    elapsed = time.monotonic() - start
+    
+    assert results["nested"] == {f"window_{i}": "done" for i in range(4)}
+    assert peak[0] == 3
+    # 外层步骤结束后嵌套步骤使用全部3个名额：不是逐个串行执行
+    assert elapsed < 0.2
+
+
+def test_invalid_definitions():
+    """测试无效的步骤定义"""
+    noop = _sleeper(None, 0)
+    with pytest.raises(ValueError):
+        StepScheduler([ProcessingStep("a", noop, depends_on=("missing",))])
+    with pytest.raises(ValueError):
+        StepScheduler([ProcessingStep("a", noop), ProcessingStep("a", noop)])
+    with pytest.raises(ValueError):
+        StepScheduler([
+            ProcessingStep("a", noop, depends_on=("b",)),
+            ProcessingStep("b", noop, depends_on=("a",)),
+        ])
+
+
+@pytest.mark.asyncio
+async def test_technical_processor_runs_steps_concurrently(monkeypatch):
+    """测试TechnicalProcessor的子步骤并发执行，耗时约为最长依赖链"""
+    from app.services.technical_processor import TechnicalProcessor
+    
+    async def prerequisites(content, segments):
+        await asyncio.sleep(0.2)
+        return {"required": ["Python"], "recommended": []}
+    
+    async def learning_path(content, segments, prereq):
+        assert prereq["required"] == ["Python"]
+        await asyncio.sleep(0.2)
+        return [{"stage": 1}]
+    
+    async def methods(content, segments):
+        await asyncio.sleep(0.2)
+        raise RuntimeError("AI调用失败")
+    
+    async def related(content, segments):
+        await asyncio.sleep(0.2)
+        return {"technologies": ["Django"]}
+    
+    monkeypatch.setattr(TechnicalProcessor, "_analyze_prerequisites", staticmethod(prerequisites))
+    monkeypatch.setattr(TechnicalProcessor, "_plan_learning_path", staticmethod(learning_path))
+    monkeypatch.setattr(TechnicalProcessor, "_suggest_learning_methods", staticmethod(methods))
+    monkeypatch.setattr(TechnicalProcessor, "_analyze_related_technologies", staticmethod(related))
+    
+    start = time.monotonic()
+    result = await TechnicalProcessor.process("Python Web开发入门。\n\n先学习基础语法，再学习Django。")
+    elapsed = time.monotonic() - start
+    
+    assert elapsed < 0.6
+    assert result["learning_path"] == [{"stage": 1}]
+    assert result["related_technologies"] == {"technologies": ["Django"]}
+    # 失败步骤使用默认值
+    assert result["learning_methods"]["confidence"] == 50.0
+
+
+@pytest.mark.asyncio
+async def test_architecture_processor_branches_and_progress(monkeypatch):
+    """测试ArchitectureProcessor按依赖并行执行，并按分支完成报告递增进度"""
+    from app.services.architecture_processor import ArchitectureProcessor
+    
+    order = []
+    
+    def fake(name, delay, value):
+        async def run(content, segments, *deps):
+            order.append(("start", name, deps))
+            await asyncio.sleep(delay)
+            order.append(("end", name))
+            return value
+        return staticmethod(run)
+    
+    monkeypatch.setattr(ArchitectureProcessor, "_extract_config_steps", fake("config_steps", 0.1, [{"step": 1}]))
+    monkeypatch.setattr(ArchitectureProcessor, "_identify_components", fake("components", 0.15, [{"name": "API"}]))
+    monkeypatch.setattr(ArchitectureProcessor, "_generate_architecture_view", fake("architecture_view", 0.1, "view"))
+    monkeypatch.setattr(ArchitectureProcessor, "_generate_plain_explanation", fake("plain_explanation", 0.2, "plain"))
+    monkeypatch.setattr(ArchitectureProcessor, "_generate_checklist", fake("checklist", 0.1, {"items": []}))
+    monkeypatch.setattr(ArchitectureProcessor, "_extract_related_technologies", fake("related_technologies", 0.1, {"technologies": []}))
+    
+    progress_updates = []
+    
+    async def progress_callback(progress, stage):
+        progress_updates.append((progress, stage))
+    
+    start = time.monotonic()
+    result = await ArchitectureProcessor.process(
+        "系统由API网关和订单服务组成。\n\n部署步骤：先安装依赖，再修改配置。",
+        progress_callback=progress_callback
+    )
+    elapsed = time.monotonic() - start
+    
+    # 最长依赖链：组件识别(0.15) -> 架构视图/技术栈(0.1)，远小于串行总和(0.75)
+    assert elapsed < 0.5
+    assert result["architecture_view"] == "view"
+    assert ("start", "architecture_view", ([{"name": "API"}],)) in order
+    assert order.index(("end", "components")) < order.index(("start", "architecture_view", ([{"name": "API"}],)))
+    assert order.index(("end", "config_steps")) < order.index(("start", "checklist", ([{"step": 1}],)))
+    
+    progresses = [p for p, _ in progress_updates]
+    assert progresses[0] == ArchitectureProcessor.PROGRESS_START
+    assert progresses[-1] == ArchitectureProcessor.PROGRESS_END
+    assert progresses == sorted(progresses)
+    assert len(progress_updates) == 7
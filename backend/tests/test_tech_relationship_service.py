@@ -0,0 +1,65 @@
+"""
+技术关联关系索引单元测试
+"""
+import pytest
+
+from app.services.tech_relationship_service import TechRelationshipIndex, TechRelationshipService
+
+
+RELATIONSHIPS = {
+    'Java': [('Spring', 0.9), ('Kafka', 0.5)],
+    'Kafka': [('Java', 0.6)],
+}
+STACKS = [
+    {'name': 'A', 'technologies': ['Java', 'Redis', 'Docker'], 'weight': 0.9},
+    {'name': 'B', 'technologies': ['Go', 'Redis', 'Docker'], 'weight': 0.5},
+]
+
+
+def test_strength_is_symmetric_and_case_insensitive():
+    """测试关联关系双向、大小写无关，同一对技术取最大强度"""
+    index = TechRelationshipIndex(RELATIONSHIPS, STACKS)
+    
+    assert index.strength('Java', 'Spring') == 0.9
+    assert index.strength('spring', 'JAVA') == 0.9
+    assert index.strength('Java', 'Kafka') == index.strength('Kafka', 'Java') == 0.6
+
+
+def test_stack_and_type_fallbacks():
+    """测试没有直接关联时按第一个共同技术栈、同类技术的顺序计算"""
+    index = TechRelationshipIndex(RELATIONSHIPS, STACKS)
+    
+    assert index.strength('Redis', 'Docker') == pytest.approx(0.9 * 0.6)
+    assert index.strength('Go', 'docker') == pytest.approx(0.5 * 0.6)
+    assert index.strength('MySQL', 'MongoDB') == 0.3
+    assert index.strength('Unknown', 'Other') == 0.0
+
+
+def test_strength_matrix_matches_pairwise_lookup():
+    """测试批量矩阵与逐对查询一致"""
+    techs = ['Java', 'Spring', 'Redis', 'docker', 'Go', 'MySQL', 'MongoDB', 'Unknown']
+    index = TechRelationshipIndex(RELATIONSHIPS, STACKS)
+    
+    matrix = index.strength_matrix(techs)
+    
+    assert matrix == [[index.strength(a, b) for b in techs] for a in techs]
+    assert TechRelationshipService.strength_matrix([]) == []
+
+
+def test_related_technologies_include_reverse_relationships():
+    """测试相关技术包含反向关联并按强度排序"""
+    index = TechRelationshipIndex(RELATIONSHIPS, STACKS)
+    
+    assert index.related('kafka') == [('Java', 0.6)]
+    assert index.related('Java') == [('Spring', 0.9), ('Kafka', 0.6)]
+
+
+def test_rebuild_index_after_update(monkeypatch):
+    """测试修改关联关系定义后重建索引生效"""
+    monkeypatch.setattr(TechRelationshipService, 'TECH_RELATIONSHIPS', {'Rust': [('Tokio', 0.9)]})
+    monkeypatch.setattr(TechRelationshipService, '_index', None)
+    assert TechRelationshipService.get_relationship_strength_sync('Rust', 'Tokio') == 0.9
+    
+    TechRelationshipService.TECH_RELATIONSHIPS['Rust'] = [('Tokio', 0.7)]
+    TechRelationshipService.rebuild_index()
+    assert TechRelationshipService.get_relationship_strength_sync('tokio', 'rust') == 0.7
@@ -0,0 +1,46 @@
+"""
+TextPreprocessor单遍格式统一/清洗单元测试（不依赖数据库）
+"""
+import random
+from pathlib import Path
+
+import pytest
+
+from app.services.text_preprocessor import TextPreprocessor
+
+FIXTURE_PATH = Path(__file__).parent / "fixtures" / "test_documents" / "test_architecture.md"
+
+# 覆盖换行、各类空白（含Unicode空白）、控制字符、零宽字符和连续空行的字符表
+_ALPHABET = ["a", "b", "中", " ", "  ", "\t", "\n", "\n\n\n", "\r", "\r\n", "\x00", "\x0b", "\x0c",
+             "\x1c", "\x1f", "\x7f", "\x85", "\x9f", "\xa0", "​", "﻿", "　", " "]
+
+
+def _multi_pass(content):
+    return TextPreprocessor.clean_text(TextPreprocessor.normalize_format(content))
+
+
+@pytest.mark.parametrize("content", [
+    "",
+    "   ",
+    "\n\n\n\n",
+    "a\n   \n\n\nb",
+    "a \x00 b\n\x00\n\n\nc",
+    "\t缩进\t行　内  空白  \r\n\r\n\r\n\r\n结尾​ ",
+])
+def test_normalize_and_clean_matches_multi_pass(content):
+    """测试典型边界情况下单遍结果与多遍结果完全一致"""
+    assert TextPreprocessor.normalize_and_clean(content) == _multi_pass(content)
+
+
+def test_normalize_and_clean_matches_multi_pass_fuzz():
+    """随机输入下单遍结果与多遍结果完全一致"""
+    rng = random.Random(2024)
+    for _ in range(20000):
+        content = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 40)))
+        assert TextPreprocessor.normalize_and_clean(content) == _multi_pass(content), repr(content)
+
+
+def test_normalize_and_clean_fixture():
+    """真实文档上单遍结果与多遍结果完全一致"""
+    content = FIXTURE_PATH.read_text(encoding="utf-8")
+    assert TextPreprocessor.normalize_and_clean(content) == _multi_pass(content)
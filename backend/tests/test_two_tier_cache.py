@@ -0,0 +1,73 @@
+"""
+TwoTierCache单元测试（使用fakeredis模拟Redis，SQLite磁盘缓存写入临时目录）
+"""
+import sqlite3
+import time
+
+import pytest
+
+from app.services.two_tier_cache import TwoTierCache
+
+
+class _BytesCache(TwoTierCache):
+    _key_prefix = "test_cache"
+    _disk_table = "items"
+    _label = "测试缓存"
+
+
+def _make_cache(fake_redis, disk_path, disk_max_entries):
+    cache = _BytesCache(
+        redis_url="redis://unused", ttl=3600, max_entries=100,
+        disk_path=disk_path, disk_max_entries=disk_max_entries
+    )
+    client = fake_redis()
+    cache._get_redis = lambda: client
+    return cache, client
+
+
+def _disk_entries(path):
+    conn = sqlite3.connect(path)
+    try:
+        count = conn.execute("SELECT entries FROM cache_entry_counts WHERE name = 'items'").fetchone()[0]
+        keys = sorted(row[0] for row in conn.execute("SELECT key FROM items"))
+        return count, keys
+    finally:
+        conn.close()
+
+
+@pytest.mark.asyncio
+async def test_disk_overwrite_keeps_entry_count(tmp_path, fake_redis):
+    """测试覆盖写入已有key不增加条目数，不会误淘汰其他条目"""
+    path = str(tmp_path / "cache.db")
+    cache, client = _make_cache(fake_redis, path, disk_max_entries=2)
+    
+    await cache._store_many({"a": b"1", "b": b"2"})
+    for value in (b"3", b"4", b"5"):
+        await cache._store_many({"a": value})
+    await client.flushall()
+    
+    assert await cache._load_many(["a", "b"]) == [b"5", b"2"]
+    assert _disk_entries(path) == (2, ["a", "b"])
+
+
+@pytest.mark.asyncio
+async def test_disk_eviction_counts_existing_file(tmp_path, fake_redis):
+    """测试已有的缓存文件首次打开时统计条目数，超出上限后淘汰最久未访问的条目"""
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE items (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+        "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+    )
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO items VALUES (?, ?, ?, ?)",
+        [(key, b"old", now, now - age) for key, age in (("x", 30), ("y", 20), ("z", 10))]
+    )
+    conn.commit()
+    conn.close()
+    cache, _ = _make_cache(fake_redis, path, disk_max_entries=3)
+    
+    await cache._store_many({"new": b"value"})
+    
+    assert _disk_entries(path) == (3, ["new", "y", "z"])
@@ -53,3 +53,53 @@ def test_get_display_name():
     assert ViewRegistry.get_display_name('system') == '系统视角'
     assert ViewRegistry.get_display_name('invalid') == 'invalid'  # 未注册的视角返回原值
 
+
+
+@pytest.mark.asyncio
+async def test_process_passes_segments(monkeypatch):
+    """测试通过注册表调用处理器时传入预先切分的段落，仅支持进度回调的处理器收到progress_callback"""
+    received = {}
+    
+    class DummyProcessor:
+        async def process(self, content, stream_callback=None, segments=None, **kwargs):
+            received.update(content=content, segments=segments, kwargs=kwargs)
+            return {"ok": True}
+    
+    monkeypatch.setitem(ViewRegistry._registry, 'dummy', {
+        'processor_class': DummyProcessor,
+        'type_mapping': 'technical',
+        'result_adapter': None,
+        'supports_progress': False,
+        'display_name': 'dummy'
+    })
+    segments = [{"id": 1, "text": "段落", "position": 0, "length": 2}]
+    
+    result = await ViewRegistry.process('dummy', "段落", segments=segments, progress_callback=lambda *a: None)
+    
+    assert result == {"ok": True}
+    assert received["segments"] is segments
+    assert "progress_callback" not in received["kwargs"]
+
+
+@pytest.mark.asyncio
+async def test_process_use_cache_false_bypasses_response_cache(monkeypatch):
+    """测试use_cache=False时处理器（包括其中并发的子步骤）内的AI调用绕过响应缓存"""
+    import asyncio
+    from app.services.ai_response_cache import is_response_cache_bypassed
+    
+    class DummyProcessor:
+        async def process(self, content, stream_callback=None, segments=None):
+            step = asyncio.ensure_future(asyncio.sleep(0, result=is_response_cache_bypassed()))
+            return {"bypassed": is_response_cache_bypassed(), "step_bypassed": await step}
+    
+    monkeypatch.setitem(ViewRegistry._registry, 'dummy', {
+        'processor_class': DummyProcessor,
+        'type_mapping': 'technical',
+        'result_adapter': None,
+        'supports_progress': False,
+        'display_name': 'dummy'
+    })
+    
+    assert await ViewRegistry.process('dummy', "内容") == {"bypassed": False, "step_bypassed": False}
+    assert await ViewRegistry.process('dummy', "内容", use_cache=False) == {"bypassed": True, "step_bypassed": True}
+    assert not is_response_cache_bypassed()